@@ -193,6 +193,7 @@ TRANSLATIONS = {
         "scheduler_reloaded": "调度器已重新加载",
         
         # 任务状态
+        "status_pending": "等待中",
         "status_running": "运行中",
         "status_completed": "已完成",
         "status_failed": "失败",
@@ -238,6 +239,13 @@ TRANSLATIONS = {
         "execute_now": "立即执行",
         "job_started": "任务已开始执行",
         "job_execution_failed": "任务执行失败",
+        "live_task_progress": "实时任务进度",
+        "live_task_progress_help": "通过服务端推送实时显示任务进度，无需刷新页面",
+        "no_recent_tasks": "暂无任务记录",
+        "task_stream_error": "任务进度推送连接失败",
+        "items_found": "发现商品数",
+        "items_saved": "保存商品数",
+        "task_errors": "错误数",
         
         # 新增翻译
         "product_list": "商品列表",
@@ -571,6 +579,7 @@ TRANSLATIONS = {
         "scheduler_reloaded": "Scheduler reloaded",
         
         # Task Status
+        "status_pending": "Pending",
         "status_running": "Running",
         "status_completed": "Completed",
         "status_failed": "Failed",
@@ -616,6 +625,13 @@ TRANSLATIONS = {
         "execute_now": "Execute Now",
         "job_started": "Job started",
         "job_execution_failed": "Job execution failed",
+        "live_task_progress": "Live Task Progress",
+        "live_task_progress_help": "Show task progress pushed by the server without refreshing the page",
+        "no_recent_tasks": "No recent tasks",
+        "task_stream_error": "Task progress stream connection failed",
+        "items_found": "Items Found",
+        "items_saved": "Items Saved",
+        "task_errors": "Errors",
         
         # 新增翻译
         "product_list": "Product List",
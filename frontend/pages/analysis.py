@@ -75,7 +75,8 @@ def load_products_data(api_url: str, product_type: str = "all") -> pd.DataFrame:
             f"{api_url}/api/products/list",
             params={
                 "page_size": 100,  # 固定使用100，而不是从配置文件读取
-                "product_type": product_type
+                "product_type": product_type,
+                "fields": "analytics"  # 只返回分析需要的标量字段和主优惠
             },
             timeout=5
         )
@@ -1,5 +1,9 @@
 import streamlit as st
 import requests
+import httpx
+import json
+import time
+from httpx_sse import connect_sse
 from datetime import datetime, timedelta, UTC
 import pytz
 from frontend.i18n.language import init_language, get_text
@@ -60,6 +64,12 @@ st.markdown(f"""
 </style>
 """, unsafe_allow_html=True)
 
+# 实时任务进度单次订阅的最长时间（秒），超过后停止推送，重新打开开关即可继续
+LIVE_PROGRESS_SECONDS = 600
+
+# 等待任务事件的最长时间（秒），服务端空闲时每15秒发送keepalive事件，超时视为连接已失效
+TASK_EVENT_READ_TIMEOUT = 60
+
 # 常用时区列表
 COMMON_TIMEZONES = [
     "Asia/Shanghai",
@@ -370,6 +380,83 @@ def reload_scheduler(api_url: str) -> bool:
         st.error(f"{get_text('error')}: {str(e)}")
         return False
 
+def stream_task_events(api_url: str, last_event_id: Optional[int] = None, kind: Optional[str] = None):
+    """
+    订阅任务进度事件（Server-Sent Events）
+    
+    Args:
+        api_url: API服务地址
+        last_event_id: 最后收到的事件ID，断线重连时从其后继续
+        kind: 只订阅该类型的任务（crawl/job）
+        
+    Yields:
+        Dict: 事件内容，首个事件为snapshot（当前任务列表），没有新事件时定期收到keepalive
+    
+    Raises:
+        httpx.ReadTimeout: 超过TASK_EVENT_READ_TIMEOUT秒没有收到任何数据
+    """
+    params = {"kind": kind} if kind else {}
+    headers = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}
+    with httpx.Client(timeout=httpx.Timeout(10.0, read=TASK_EVENT_READ_TIMEOUT)) as client:
+        with connect_sse(client, "GET", f"{api_url}/api/tasks/events", params=params, headers=headers) as source:
+            for sse in source.iter_sse():
+                yield json.loads(sse.data)
+
+def render_task_table(placeholder, tasks: Dict[str, Dict], timezone: str):
+    """在占位容器中显示最近任务的进度"""
+    if not tasks:
+        placeholder.info(get_text("no_recent_tasks"))
+        return
+    
+    rows = sorted(tasks.values(), key=lambda t: t["created_at"] or "", reverse=True)[:20]
+    df = pd.DataFrame(rows)
+    for col in ['started_at', 'updated_at']:
+        df[col] = df[col].apply(lambda x: format_datetime(x, timezone) if x else "")
+    df['name'] = df.apply(lambda row: row['job_id'] or row['crawler_type'] or row['id'], axis=1)
+    df['status'] = df['status'].apply(lambda x: get_text(f"status_{x}"))
+    
+    placeholder.dataframe(
+        df[['name', 'status', 'items_found', 'items_saved', 'errors', 'started_at', 'updated_at']],
+        hide_index=True,
+        column_config={
+            'name': get_text('job_id'),
+            'status': get_text('status'),
+            'items_found': get_text('items_found'),
+            'items_saved': get_text('items_saved'),
+            'errors': get_text('task_errors'),
+            'started_at': get_text('start_time'),
+            'updated_at': get_text('last_update')
+        }
+    )
+
+def render_live_task_progress(api_url: str, timezone: str):
+    """订阅服务端推送的任务进度并就地更新表格，代替轮询任务状态和st.rerun()"""
+    st.markdown("---")
+    st.subheader(get_text("live_task_progress"))
+    if not st.toggle(get_text("live_task_progress"), key="live_task_progress",
+                     help=get_text("live_task_progress_help")):
+        return
+    
+    placeholder = st.empty()
+    tasks: Dict[str, Dict] = {}
+    deadline = time.monotonic() + LIVE_PROGRESS_SECONDS
+    try:
+        for event in stream_task_events(api_url):
+            # keepalive只用于检查截止时间，任务长时间没有进度时也能按时结束
+            if event["type"] != "keepalive":
+                if event["type"] == "snapshot":
+                    tasks = {task["id"]: task for task in event["data"]["tasks"]}
+                elif event.get("task"):
+                    tasks[event["task_id"]] = event["task"]
+                render_task_table(placeholder, tasks, timezone)
+            if time.monotonic() > deadline:
+                break
+    except httpx.ReadTimeout:
+        # 服务端长时间没有任何数据（如中间代理吞掉了keepalive），结束本次实时显示
+        pass
+    except httpx.HTTPError as e:
+        st.error(f"{get_text('task_stream_error')}: {str(e)}")
+
 def format_datetime(dt: Union[str, datetime], timezone: Optional[str] = None) -> str:
     """格式化日期时间
     
@@ -1410,6 +1497,9 @@ def main():
             st.markdown(f"**{get_text('avg_execution_time')}:** {format_duration(scheduler_status.get('avg_execution_time', 0))}")
             st.markdown(f"**{get_text('total_items_collected')}:** {scheduler_status.get('total_items_collected', 0)}")
             st.markdown(f"**{get_text('last_execution')}:** {format_datetime(scheduler_status.get('last_execution_time'), current_timezone)}")
+    
+    # 实时任务进度放在页面最后：订阅期间脚本会持续等待推送
+    render_live_task_progress(api_url, current_timezone)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
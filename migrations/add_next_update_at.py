@@ -0,0 +1,54 @@
+"""
+添加next_update_at列及其索引的数据库迁移脚本
+"""
+
+import sqlite3
+import os
+from pathlib import Path
+
+def migrate():
+    # 获取数据库文件路径
+    data_dir = Path(__file__).parent.parent / "data" / "db"
+    db_file = os.environ.get("PRODUCTS_DB_PATH", data_dir / "amazon_products.db")
+    
+    # 连接数据库
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    
+    try:
+        # 检查列是否已存在
+        cursor.execute("PRAGMA table_info(products)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if "next_update_at" not in columns:
+            # 初始值为NULL，由调度器在下次同步时按优先级计算
+            cursor.execute("""
+                ALTER TABLE products 
+                ADD COLUMN next_update_at TIMESTAMP
+            """)
+            print("成功添加next_update_at列")
+        else:
+            print("next_update_at列已存在")
+        
+        # 调度器按到期时间顺序读取商品，需要索引
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_products_next_update_at
+            ON products (next_update_at)
+        """)
+        print("已创建ix_products_next_update_at索引")
+        
+        # 提交更改
+        conn.commit()
+        print("数据库迁移完成")
+        
+    except Exception as e:
+        print(f"迁移失败: {str(e)}")
+        conn.rollback()
+        raise
+    
+    finally:
+        # 关闭连接
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
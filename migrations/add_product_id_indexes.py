@@ -0,0 +1,46 @@
+"""
+为offers和coupon_history的product_id列添加索引的数据库迁移脚本
+"""
+
+import sqlite3
+import os
+from pathlib import Path
+
+def migrate():
+    # 获取数据库文件路径
+    data_dir = Path(__file__).parent.parent / "data" / "db"
+    db_file = os.environ.get("PRODUCTS_DB_PATH", data_dir / "amazon_products.db")
+    
+    # 连接数据库
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    
+    try:
+        # 商品列表和批量查询按ASIN列表加载优惠和优惠券，没有索引时每次都要扫描整张表
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_offers_product_id
+            ON offers (product_id)
+        """)
+        print("已创建ix_offers_product_id索引")
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_coupon_history_product_id
+            ON coupon_history (product_id)
+        """)
+        print("已创建ix_coupon_history_product_id索引")
+        
+        # 提交更改
+        conn.commit()
+        print("数据库迁移完成")
+        
+    except Exception as e:
+        print(f"迁移失败: {str(e)}")
+        conn.rollback()
+        raise
+    
+    finally:
+        # 关闭连接
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,83 @@
+"""
+压缩products.raw_data历史数据的数据库迁移脚本
+
+raw_data改为zlib压缩存储（见models.database.CompressedText）。读取时兼容明文，
+本脚本把已有的明文数据批量压缩，再执行VACUUM回收空间，并打印迁移前后的数据库文件大小。
+"""
+
+import sqlite3
+import os
+import zlib
+from pathlib import Path
+
+# 每批压缩的行数
+BATCH_SIZE = 500
+
+# 与 models.database.RAW_DATA_COMPRESS_LEVEL 保持一致
+COMPRESS_LEVEL = 6
+
+
+def migrate():
+    # 获取数据库文件路径
+    data_dir = Path(__file__).parent.parent / "data" / "db"
+    db_file = os.environ.get("PRODUCTS_DB_PATH", data_dir / "amazon_products.db")
+    size_before = os.path.getsize(db_file)
+
+    # 连接数据库
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+
+    try:
+        # 只处理仍以明文存储的行，脚本可重复执行
+        total = 0
+        text_bytes = 0
+        compressed_bytes = 0
+        last_id = 0
+        while True:
+            cursor.execute("""
+                SELECT id, raw_data FROM products
+                WHERE id > ? AND typeof(raw_data) = 'text'
+                ORDER BY id LIMIT ?
+            """, (last_id, BATCH_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for product_id, raw_data in rows:
+                data = raw_data.encode("utf-8")
+                compressed = zlib.compress(data, COMPRESS_LEVEL)
+                text_bytes += len(data)
+                compressed_bytes += len(compressed)
+                updates.append((compressed, product_id))
+            cursor.executemany("UPDATE products SET raw_data = ? WHERE id = ?", updates)
+            conn.commit()
+
+            total += len(rows)
+            last_id = rows[-1][0]
+            print(f"已压缩 {total} 行")
+
+        if total:
+            print(f"raw_data共 {total} 行: {text_bytes / 1024:.1f} KB -> {compressed_bytes / 1024:.1f} KB")
+        else:
+            print("raw_data已全部压缩，无需处理")
+
+        # 回收压缩后空出的页
+        print("执行VACUUM...")
+        conn.execute("VACUUM")
+
+        size_after = os.path.getsize(db_file)
+        print(f"数据库文件大小: {size_before / 1024 / 1024:.2f} MB -> {size_after / 1024 / 1024:.2f} MB")
+        print("数据库迁移完成")
+
+    except Exception as e:
+        print(f"迁移失败: {str(e)}")
+        conn.rollback()
+        raise
+
+    finally:
+        # 关闭连接
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -7,17 +7,24 @@
 - Offer: 产品优惠信息
 - CouponHistory: 优惠券历史记录
 - ProductVariant: 产品变体关系
+- DataVersion: 各数据表的写入版本号，供读接口的响应缓存判断数据是否变化
 """
 
 import os
 import json
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, JSON, Text, ForeignKey
+import logging
+import zlib
+from sqlalchemy import create_engine, event, text, Column, Integer, String, Float, Boolean, DateTime, JSON, Text, ForeignKey
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, deferred, undefer_group
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime, UTC
 from pathlib import Path
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any, Generator
+from typing import Optional, Dict, Any, Generator, Iterable, Sequence
+
+logger = logging.getLogger(__name__)
 
 # 确保数据存储目录存在
 data_dir = Path(__file__).parent.parent / "data" / "db"
@@ -47,6 +54,43 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # SQLAlchemy模型基类
 Base = declarative_base()
 
+# 延迟加载的大字段分组：查询Product实体时默认不读取，需要时用undefer_group按组加载
+DETAILS_GROUP = "details"    # categories/browse_nodes/features 三个JSON列
+RAW_DATA_GROUP = "raw"       # 原始数据raw_data
+
+# raw_data压缩级别，6是zlib默认值，压缩率和速度较均衡
+RAW_DATA_COMPRESS_LEVEL = 6
+
+
+class CompressedText(TypeDecorator):
+    """
+    zlib压缩存储的文本列
+
+    写入时压缩为字节串，读取时解压为字符串。列声明仍为TEXT，
+    SQLite按值的实际类型存储，压缩前写入的明文历史数据可以原样读出。
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(value.encode("utf-8"), RAW_DATA_COMPRESS_LEVEL)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return zlib.decompress(value).decode("utf-8")
+
+
+def undefer_heavy_columns():
+    """
+    查询选项：一并加载延迟加载的大字段
+
+    写入路径使用：旧值已加载时，ORM只在新旧值不同时才把这些列写入UPDATE。
+    """
+    return (undefer_group(DETAILS_GROUP), undefer_group(RAW_DATA_GROUP))
+
 class Product(Base):
     """
     产品数据模型
@@ -56,6 +100,9 @@ class Product(Base):
     - offers: 一对多关系，关联商品的优惠信息
     - coupons: 一对多关系，关联商品的优惠券历史
     - variants: 一对多关系，关联商品的变体信息
+    
+    categories/browse_nodes/features 和 raw_data 是延迟加载的大字段，
+    列表、统计和更新器查询实体时不读取，访问属性时才按组加载。
     """
     __tablename__ = "products"
 
@@ -90,23 +137,25 @@ class Product(Base):
     # 分类信息
     binding = Column(String(100))  # 商品绑定类型(如Kindle/平装书等)
     product_group = Column(String(100))  # 商品分组
-    categories = Column(Text)  # 商品分类路径，存储为JSON字符串
-    browse_nodes = Column(Text)  # 亚马逊浏览节点信息，存储为JSON字符串
+    categories = deferred(Column(Text), group=DETAILS_GROUP)  # 商品分类路径，存储为JSON字符串
+    browse_nodes = deferred(Column(Text), group=DETAILS_GROUP)  # 亚马逊浏览节点信息，存储为JSON字符串
     
     # 其他信息
     deal_type = Column(String(50))  # 优惠类型
-    features = Column(Text)  # 商品特性列表，存储为JSON字符串
+    features = deferred(Column(Text), group=DETAILS_GROUP)  # 商品特性列表，存储为JSON字符串
     
     # 时间信息，用于追踪记录的生命周期
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC))  # 记录创建时间
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))  # 记录更新时间
     discount_updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC))  # 折扣信息最后更新时间
+    next_update_at = Column(DateTime(timezone=True), index=True)  # 折扣信息下次计划更新时间，由DiscountUpdateScheduler维护
     timestamp = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC))  # 数据采集时间
     
     # 元数据
     source = Column(String(50))  # 数据来源：bestseller/coupon/cj
     api_provider = Column(String(50))  # API提供者：pa-api/cj-api
-    raw_data = Column(Text)  # 原始API响应数据，存储为JSON字符串
+    # 原始API响应数据，JSON字符串压缩存储；赋值时先取旧值比较，内容未变时不写入
+    raw_data = deferred(Column(CompressedText), group=RAW_DATA_GROUP, active_history=True)
 
     # 关联关系定义
     offers = relationship("Offer", back_populates="product", cascade="all, delete-orphan")
@@ -147,7 +196,7 @@ class Offer(Base):
     
     # 主键和外键
     id = Column(Integer, primary_key=True, autoincrement=True)
-    product_id = Column(String(10), ForeignKey("products.asin", ondelete="CASCADE"))
+    product_id = Column(String(10), ForeignKey("products.asin", ondelete="CASCADE"), index=True)  # 按商品批量加载
     
     # 价格信息
     price = Column(Float)  # 优惠价格
@@ -193,7 +242,7 @@ class CouponHistory(Base):
     __tablename__ = "coupon_history"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    product_id = Column(String(10), ForeignKey("products.asin", ondelete="CASCADE"))
+    product_id = Column(String(10), ForeignKey("products.asin", ondelete="CASCADE"), index=True)  # 按商品批量加载
     
     # 优惠券信息
     coupon_type = Column(String(50))  # 优惠券类型：percentage(百分比)/fixed(固定金额)
@@ -232,6 +281,60 @@ class ProductVariant(Base):
     # 关联到主商品表
     product = relationship("Product", back_populates="variants")
 
+class DataVersion(Base):
+    """
+    数据表写入版本号
+
+    每张表一行，SessionLocal会话中的ORM写入（新增、修改、删除、批量更新/删除）提交时在同一事务中把对应表的版本号加一。
+    版本号保存在数据库中，爬虫等子进程的写入对API进程同样可见；读接口按版本号判断缓存是否失效。
+    直接执行SQL脚本的写入不会更新版本号。
+    """
+    __tablename__ = "data_versions"
+
+    name = Column(String(64), primary_key=True)  # 表名
+    version = Column(Integer, nullable=False, default=0)  # 版本号，每次写入加一
+
+# 版本号自增语句，表中还没有该行时插入
+_BUMP_VERSION_SQL = text(
+    "INSERT INTO data_versions (name, version) VALUES (:name, 1) "
+    "ON CONFLICT(name) DO UPDATE SET version = version + 1"
+)
+
+def _bump_data_versions(session: Session, tables: Iterable[str]):
+    """在会话当前事务中把各表的版本号加一"""
+    tables = sorted(set(tables) - {DataVersion.__tablename__})
+    if not tables:
+        return
+    try:
+        session.connection().execute(_BUMP_VERSION_SQL, [{"name": name} for name in tables])
+    except OperationalError as e:
+        # 旧数据库还没有data_versions表（未执行init_db）时不影响写入
+        logger.warning(f"更新数据版本号失败: {str(e)}")
+
+# 只监听商品库的会话（SessionLocal创建的会话），任务注册表、调度历史等其他库的会话没有data_versions表
+@event.listens_for(SessionLocal, "after_flush")
+def _bump_versions_after_flush(session, flush_context):
+    """flush中有实际变更的表版本号加一"""
+    objects = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if session.is_modified(obj, include_collections=False)
+    ]
+    _bump_data_versions(session, (obj.__table__.name for obj in objects if hasattr(obj, "__table__")))
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _bump_versions_on_bulk_dml(orm_execute_state):
+    """query.update()/delete() 和 session.execute(insert/update/delete) 等批量写入不经过flush"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _bump_data_versions(orm_execute_state.session, [mapper.local_table.name])
+
+def get_data_versions(db: Session, tables: Sequence[str]) -> Dict[str, int]:
+    """读取各表的版本号，从未写入过的表为0"""
+    rows = db.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(tables)).all()
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows)
+    return versions
+
 def init_db():
     """
     初始化数据库
@@ -0,0 +1,622 @@
+"""
+商品响应序列化模块
+
+所有ProductService读取接口共用的"数据库行 -> 响应字典"转换：
+- 只查询需要的列，直接从行元组构建可JSON序列化的字典，不创建ORM实体；
+- categories/browse_nodes/features 三个JSON文本列的解析结果按 (asin, updated_at) 缓存，
+  商品未更新时重复请求不再 json.loads；
+- 一页商品的优惠信息和最新优惠券各用一条查询批量加载，避免逐个商品查询；
+- 输出字段与 ProductInfo.model_dump(mode="json") 一致，但跳过pydantic校验，
+  接口直接返回 JSONResponse，避免服务层和FastAPI各校验、序列化一遍；
+- 支持字段投影（Projection）：预定义的 card/analytics/full 或逗号分隔的字段列表，
+  投影决定查询的商品列和优惠列、是否加载优惠券、解析哪些JSON列以及输出哪些字段。
+
+缓存中的列表会被多个响应共享，调用方不要原地修改。
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from .database import CouponHistory, Offer, Product
+
+logger = logging.getLogger(__name__)
+
+# 构建响应需要的商品列，updated_at作为JSON列缓存的行版本
+PRODUCT_COLUMNS = (
+    Product.asin,
+    Product.title,
+    Product.url,
+    Product.brand,
+    Product.main_image,
+    Product.timestamp,
+    Product.binding,
+    Product.product_group,
+    Product.categories,
+    Product.browse_nodes,
+    Product.features,
+    Product.cj_url,
+    Product.api_provider,
+    Product.source,
+    Product.current_price,
+    Product.original_price,
+    Product.updated_at,
+)
+
+# 需要返回元数据时额外查询的原始数据列
+PRODUCT_COLUMNS_WITH_RAW_DATA = PRODUCT_COLUMNS + (Product.raw_data,)
+
+OFFER_COLUMNS = (
+    Offer.product_id,
+    Offer.condition,
+    Offer.price,
+    Offer.currency,
+    Offer.savings,
+    Offer.savings_percentage,
+    Offer.is_prime,
+    Offer.is_amazon_fulfilled,
+    Offer.is_free_shipping_eligible,
+    Offer.availability,
+    Offer.merchant_name,
+    Offer.is_buybox_winner,
+    Offer.deal_type,
+    Offer.coupon_type,
+    Offer.coupon_value,
+    Offer.commission,
+)
+
+COUPON_COLUMNS = (
+    CouponHistory.id,
+    CouponHistory.product_id,
+    CouponHistory.coupon_type,
+    CouponHistory.coupon_value,
+    CouponHistory.expiration_date,
+    CouponHistory.terms,
+    CouponHistory.updated_at,
+)
+
+# 以JSON文本存储的列表列
+JSON_COLUMNS = ("categories", "browse_nodes", "features")
+
+# 商品响应字段，顺序与ProductInfo一致；raw_data只在完整投影下按include_metadata返回
+PRODUCT_FIELDS = (
+    "asin", "title", "url", "brand", "main_image", "offers", "timestamp", "coupon_info",
+    "binding", "product_group", "categories", "browse_nodes", "features", "cj_url",
+    "api_provider", "source", "coupon_expiration_date", "coupon_terms", "coupon_history",
+)
+
+# 优惠响应字段，顺序与ProductOffer一致
+OFFER_FIELDS = (
+    "condition", "price", "original_price", "currency", "savings", "savings_percentage",
+    "is_prime", "is_amazon_fulfilled", "is_free_shipping_eligible", "availability",
+    "merchant_name", "is_buybox_winner", "deal_type", "coupon_type", "coupon_value",
+    "coupon_history", "commission",
+)
+
+# 与优惠券记录相关的商品字段
+COUPON_FIELDS = ("coupon_expiration_date", "coupon_terms", "coupon_history")
+
+# 商品字段依赖的products表列（除同名列外），asin总会查询
+_FIELD_COLUMNS = {
+    "categories": ("categories", "updated_at"),
+    "browse_nodes": ("browse_nodes", "updated_at"),
+    "features": ("features", "updated_at"),
+    "cj_url": ("cj_url", "api_provider"),
+    "offers": ("current_price", "original_price", "api_provider"),
+    "coupon_info": (),
+    "coupon_expiration_date": (),
+    "coupon_terms": (),
+    "coupon_history": (),
+}
+
+# 优惠字段为空时的默认值，与offer_dict一致
+_OFFER_DEFAULTS = {
+    "condition": "New",
+    "price": 0.0,
+    "currency": "USD",
+    "is_prime": False,
+    "is_amazon_fulfilled": False,
+    "is_free_shipping_eligible": False,
+    "availability": "Available",
+    "merchant_name": "Amazon",
+    "is_buybox_winner": False,
+}
+
+
+@dataclass(frozen=True)
+class Projection:
+    """
+    商品响应的字段投影
+
+    Attributes:
+        name: 投影名称，字段列表投影为规范化后的字段串
+        fields: 输出的商品字段，按PRODUCT_FIELDS顺序
+        offer_fields: offers中每个优惠输出的字段，按OFFER_FIELDS顺序
+        first_offer_only: 是否只返回第一个（主）优惠
+    """
+    name: str
+    fields: Tuple[str, ...] = PRODUCT_FIELDS
+    offer_fields: Tuple[str, ...] = OFFER_FIELDS
+    first_offer_only: bool = False
+
+    @property
+    def is_full(self) -> bool:
+        """是否为完整投影（输出全部ProductInfo字段）"""
+        return (self.fields == PRODUCT_FIELDS and self.offer_fields == OFFER_FIELDS
+                and not self.first_offer_only)
+
+    @property
+    def needs_offers(self) -> bool:
+        return "offers" in self.fields
+
+    @property
+    def needs_coupon(self) -> bool:
+        return any(name in self.fields for name in COUPON_FIELDS)
+
+    @cached_property
+    def json_fields(self) -> Tuple[str, ...]:
+        """需要解析的JSON列"""
+        return tuple(name for name in JSON_COLUMNS if name in self.fields)
+
+    @cached_property
+    def columns(self) -> tuple:
+        """需要查询的商品列，完整投影即PRODUCT_COLUMNS"""
+        keys = {"asin"}
+        for name in self.fields:
+            keys.update(_FIELD_COLUMNS.get(name, (name,)))
+        return tuple(column for column in PRODUCT_COLUMNS if column.key in keys)
+
+    @cached_property
+    def offer_columns(self) -> tuple:
+        """需要查询的优惠列，完整投影即OFFER_COLUMNS"""
+        return (Offer.product_id,) + tuple(
+            column for column in OFFER_COLUMNS[1:] if column.key in self.offer_fields
+        )
+
+    def product_columns(self, include_metadata: bool = False) -> tuple:
+        """查询商品时的列，完整投影且需要元数据时附加raw_data"""
+        if include_metadata and self.is_full:
+            return self.columns + (Product.raw_data,)
+        return self.columns
+
+
+FULL_PROJECTION = Projection("full")
+
+# 预定义投影：
+# card      商品卡片，不含features、优惠券记录，只返回主优惠的价格、折扣、Prime、优惠券和佣金
+# analytics 数据分析页，只有标量字段和主优惠的价格类字段，不查询、不解析任何JSON列
+PROJECTIONS: Dict[str, Projection] = {
+    "full": FULL_PROJECTION,
+    "card": Projection(
+        "card",
+        fields=("asin", "title", "url", "brand", "main_image", "offers", "timestamp", "binding",
+                "product_group", "categories", "browse_nodes", "cj_url", "api_provider", "source"),
+        offer_fields=("price", "currency", "savings", "savings_percentage", "is_prime",
+                      "coupon_type", "coupon_value", "commission"),
+        first_offer_only=True,
+    ),
+    "analytics": Projection(
+        "analytics",
+        fields=("asin", "title", "brand", "offers", "timestamp", "binding", "product_group"),
+        offer_fields=("price", "savings", "savings_percentage", "is_prime", "availability",
+                      "merchant_name", "coupon_type", "coupon_value"),
+        first_offer_only=True,
+    ),
+}
+
+
+def resolve_projection(fields: Optional[str]) -> Optional[Projection]:
+    """
+    解析fields参数
+
+    Args:
+        fields: 预定义投影名称（card/analytics/full），或逗号分隔的字段列表，
+            优惠字段写作 offers.price，单独的 offers 表示全部优惠字段；asin总会返回
+
+    Returns:
+        Projection，参数为空时返回None（即完整投影）
+
+    Raises:
+        ValueError: 未知的投影名称或字段
+    """
+    if not fields or not fields.strip():
+        return None
+    fields = fields.strip()
+    if fields in PROJECTIONS:
+        return PROJECTIONS[fields]
+
+    product_fields = {"asin"}
+    offer_fields = set()
+    for part in fields.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part == "offers":
+            product_fields.add("offers")
+            offer_fields.update(OFFER_FIELDS)
+        elif part.startswith("offers."):
+            name = part[len("offers."):]
+            if name not in OFFER_FIELDS:
+                raise ValueError(f"未知的优惠字段: {name}")
+            product_fields.add("offers")
+            offer_fields.add(name)
+        elif part in PRODUCT_FIELDS:
+            product_fields.add(part)
+        else:
+            raise ValueError(f"未知的字段: {part}，可用投影: {', '.join(PROJECTIONS)}")
+
+    ordered_fields = tuple(name for name in PRODUCT_FIELDS if name in product_fields)
+    ordered_offer_fields = tuple(name for name in OFFER_FIELDS if name in offer_fields)
+    if ordered_fields == PRODUCT_FIELDS and ordered_offer_fields == OFFER_FIELDS:
+        return FULL_PROJECTION
+
+    # 规范化的名称与请求中字段的顺序和重复无关
+    parts = [name for name in ordered_fields if name != "offers"]
+    parts += [f"offers.{name}" for name in ordered_offer_fields]
+    return Projection(",".join(parts), fields=ordered_fields, offer_fields=ordered_offer_fields)
+
+
+# IN条件每批最多的ASIN数，低于SQLite 3.32之前默认的999个参数上限
+IN_CHUNK_SIZE = 500
+
+# JSON列解析缓存容量（按商品计）
+JSON_CACHE_SIZE = 4096
+
+_json_cache: "OrderedDict[Tuple[str, Any], Dict[str, list]]" = OrderedDict()
+_json_cache_lock = threading.Lock()
+_json_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _load_list(text: Optional[str]) -> list:
+    """解析JSON文本列，空值和非列表结果返回空列表"""
+    if not text:
+        return []
+    value = json.loads(text)
+    return value if isinstance(value, list) else []
+
+
+def parse_json_columns(row, names: Sequence[str] = JSON_COLUMNS) -> Tuple[list, ...]:
+    """
+    解析商品行的JSON列（默认 categories、browse_nodes、features），按names的顺序返回
+
+    结果按 (asin, updated_at) 缓存，商品更新后updated_at变化，旧条目自然失效；
+    没有updated_at的行不缓存。投影只查询部分JSON列时只解析这些列，
+    缓存条目中缺少的列在之后的请求中补充。
+
+    Raises:
+        json.JSONDecodeError: 列内容不是合法JSON
+    """
+    version = row.updated_at
+    if version is None:
+        return tuple(_load_list(getattr(row, name)) for name in names)
+
+    key = (row.asin, version)
+    with _json_cache_lock:
+        parsed = _json_cache.get(key)
+        if parsed is not None and all(name in parsed for name in names):
+            _json_cache.move_to_end(key)
+            _json_cache_stats["hits"] += 1
+            return tuple(parsed[name] for name in names)
+
+    values = {name: _load_list(getattr(row, name)) for name in names}
+    with _json_cache_lock:
+        _json_cache.setdefault(key, {}).update(values)
+        _json_cache.move_to_end(key)
+        _json_cache_stats["misses"] += 1
+        while len(_json_cache) > JSON_CACHE_SIZE:
+            _json_cache.popitem(last=False)
+    return tuple(values[name] for name in names)
+
+
+def clear_json_cache():
+    """清空JSON列解析缓存"""
+    with _json_cache_lock:
+        _json_cache.clear()
+        _json_cache_stats.update(hits=0, misses=0)
+
+
+def json_cache_stats() -> Dict[str, int]:
+    """JSON列解析缓存的命中统计"""
+    with _json_cache_lock:
+        return {"size": len(_json_cache), **_json_cache_stats}
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    """datetime转为与pydantic JSON模式一致的字符串（UTC时区写作Z）"""
+    if value is None:
+        return None
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def chunked(items: Sequence[Any], size: Optional[int] = None) -> Iterable[Sequence[Any]]:
+    """按size（默认IN_CHUNK_SIZE）切分序列，用于拆分IN条件的参数"""
+    size = size or IN_CHUNK_SIZE
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_product_rows(db: Session, asins: Sequence[str], columns: Sequence[Any] = PRODUCT_COLUMNS) -> List[Any]:
+    """按ASIN列表查询商品行，ASIN去重后每IN_CHUNK_SIZE个一条查询，结果顺序不保证"""
+    rows: List[Any] = []
+    for chunk in chunked(list(dict.fromkeys(asins))):
+        rows.extend(db.query(*columns).filter(Product.asin.in_(chunk)).all())
+    return rows
+
+
+def load_offers(db: Session, asins: Sequence[str], columns: Sequence[Any] = OFFER_COLUMNS) -> Dict[str, List[Any]]:
+    """
+    批量加载多个商品的优惠信息，按ASIN分组；columns须包含Offer.product_id
+
+    每IN_CHUNK_SIZE个ASIN一条查询，每个商品的优惠按ID排序。
+    """
+    offers: Dict[str, List[Any]] = {}
+    for chunk in chunked(list(dict.fromkeys(asins))):
+        for offer in db.query(*columns).filter(Offer.product_id.in_(chunk)).order_by(Offer.id):
+            offers.setdefault(offer.product_id, []).append(offer)
+    return offers
+
+
+def load_latest_coupons(db: Session, asins: Sequence[str], order_column=CouponHistory.updated_at) -> Dict[str, Any]:
+    """
+    批量加载多个商品各自最新的优惠券记录，每IN_CHUNK_SIZE个ASIN一条查询
+
+    Args:
+        db: 数据库会话
+        asins: 商品ASIN列表
+        order_column: 判断"最新"所用的时间列
+    """
+    coupons: Dict[str, Any] = {}
+    for chunk in chunked(list(dict.fromkeys(asins))):
+        latest = db.query(
+            CouponHistory.product_id,
+            func.max(order_column).label("latest_at")
+        ).filter(
+            CouponHistory.product_id.in_(chunk)
+        ).group_by(CouponHistory.product_id).subquery()
+
+        rows = db.query(*COUPON_COLUMNS).join(
+            latest,
+            and_(
+                CouponHistory.product_id == latest.c.product_id,
+                order_column == latest.c.latest_at
+            )
+        ).order_by(CouponHistory.id)
+
+        # 同一时间有多条记录时取ID最大的一条
+        coupons.update((coupon.product_id, coupon) for coupon in rows)
+    return coupons
+
+
+def coupon_history_dict(coupon) -> Dict[str, Any]:
+    """优惠券记录转为响应中的coupon_history字典"""
+    return {
+        "id": coupon.id,
+        "product_id": coupon.product_id,
+        "coupon_type": coupon.coupon_type,
+        "coupon_value": coupon.coupon_value,
+        "expiration_date": coupon.expiration_date.isoformat() if coupon.expiration_date else None,
+        "terms": coupon.terms,
+        "updated_at": coupon.updated_at.isoformat() if coupon.updated_at else None
+    }
+
+
+def offer_dict(offer, product) -> Dict[str, Any]:
+    """优惠信息行转为ProductOffer字段的字典，缺失的必填字段使用默认值"""
+    is_cj = product.api_provider == "cj-api"
+    return {
+        "condition": offer.condition or "New",
+        "price": offer.price or 0.0,
+        "original_price": product.original_price,
+        "currency": offer.currency or "USD",
+        "savings": offer.savings,
+        "savings_percentage": offer.savings_percentage,
+        "is_prime": offer.is_prime or False,
+        "is_amazon_fulfilled": offer.is_amazon_fulfilled or False,
+        "is_free_shipping_eligible": offer.is_free_shipping_eligible or False,
+        "availability": offer.availability or "Available",
+        "merchant_name": offer.merchant_name or "Amazon",
+        "is_buybox_winner": offer.is_buybox_winner or False,
+        "deal_type": offer.deal_type,
+        "coupon_type": offer.coupon_type,
+        "coupon_value": offer.coupon_value,
+        "coupon_history": None,
+        "commission": offer.commission if is_cj else None,
+    }
+
+
+def projected_offer_dict(offer, product, offer_fields: Sequence[str]) -> Dict[str, Any]:
+    """按投影只生成offer_fields中的优惠字段，取值规则与offer_dict一致"""
+    item = {}
+    for name in offer_fields:
+        if name == "original_price":
+            item[name] = product.original_price
+        elif name == "coupon_history":
+            item[name] = None
+        elif name == "commission":
+            item[name] = offer.commission if product.api_provider == "cj-api" else None
+        elif name in _OFFER_DEFAULTS:
+            item[name] = getattr(offer, name) or _OFFER_DEFAULTS[name]
+        else:
+            item[name] = getattr(offer, name)
+    return item
+
+
+def _filter_browse_nodes(browse_nodes: list, include_browse_nodes: Optional[List[str]]) -> list:
+    """只保留指定ID的浏览节点，无匹配时返回全部"""
+    # 忽略接口文档中的默认占位值
+    if include_browse_nodes and include_browse_nodes != ["string"]:
+        filtered_nodes = [node for node in browse_nodes if node.get("id") in include_browse_nodes]
+        # 只有在找到匹配项时才使用筛选结果
+        if filtered_nodes:
+            return filtered_nodes
+    return browse_nodes
+
+
+def product_dict(
+    row,
+    offers: Iterable[Any] = (),
+    coupon=None,
+    include_coupon_history: bool = True,
+    include_browse_nodes: Optional[List[str]] = None,
+    include_metadata: bool = False,
+    projection: Optional[Projection] = None
+) -> Dict[str, Any]:
+    """
+    商品行转为ProductInfo字段的字典
+
+    第一个优惠的价格使用products表中的current_price。
+
+    Args:
+        row: 按PRODUCT_COLUMNS（或projection.columns）查询得到的商品行
+        offers: 该商品的优惠信息行
+        coupon: 该商品最新的优惠券记录行
+        include_coupon_history: 是否返回完整的优惠券历史字典
+        include_browse_nodes: 只返回这些ID的浏览节点（无匹配时返回全部）
+        include_metadata: 是否返回raw_data（行中需包含raw_data列，仅完整投影）
+        projection: 字段投影，为空时输出全部字段
+
+    Raises:
+        ValueError: 缺少title或url等必填字段
+        json.JSONDecodeError: JSON列内容无效
+    """
+    if projection is not None and not projection.is_full:
+        return _projected_product_dict(
+            row, offers, coupon, projection, include_coupon_history, include_browse_nodes
+        )
+
+    if row.title is None or row.url is None:
+        raise ValueError(f"商品 {row.asin} 缺少标题或链接")
+
+    categories, browse_nodes, features = parse_json_columns(row)
+    browse_nodes = _filter_browse_nodes(browse_nodes, include_browse_nodes)
+
+    offer_items = [offer_dict(offer, row) for offer in offers]
+    if offer_items and row.current_price is not None:
+        offer_items[0]["price"] = row.current_price
+
+    raw_data = None
+    if include_metadata and getattr(row, "raw_data", None):
+        try:
+            raw_data = json.loads(row.raw_data)
+        except ValueError:
+            pass
+
+    return {
+        "asin": row.asin,
+        "title": row.title,
+        "url": row.url,
+        "brand": row.brand,
+        "main_image": row.main_image,
+        "offers": offer_items,
+        "timestamp": _iso(row.timestamp or datetime.utcnow()),
+        "coupon_info": None,
+        "binding": row.binding,
+        "product_group": row.product_group,
+        "categories": categories,
+        "browse_nodes": browse_nodes,
+        "features": features,
+        "cj_url": row.cj_url if row.api_provider == "cj-api" else None,
+        "api_provider": row.api_provider,
+        "source": row.source,
+        "raw_data": raw_data if isinstance(raw_data, dict) else None,
+        "coupon_expiration_date": _iso(coupon.expiration_date) if coupon else None,
+        "coupon_terms": coupon.terms if coupon else None,
+        "coupon_history": coupon_history_dict(coupon) if coupon and include_coupon_history else None,
+    }
+
+
+def _projected_product_dict(
+    row,
+    offers: Iterable[Any],
+    coupon,
+    projection: Projection,
+    include_coupon_history: bool,
+    include_browse_nodes: Optional[List[str]]
+) -> Dict[str, Any]:
+    """按投影只生成需要的字段，未投影的JSON列不解析，各字段取值规则与完整输出一致"""
+    fields = projection.fields
+    if ("title" in fields and row.title is None) or ("url" in fields and row.url is None):
+        raise ValueError(f"商品 {row.asin} 缺少标题或链接")
+
+    parsed = {}
+    if projection.json_fields:
+        parsed = dict(zip(projection.json_fields, parse_json_columns(row, projection.json_fields)))
+        if "browse_nodes" in parsed:
+            parsed["browse_nodes"] = _filter_browse_nodes(parsed["browse_nodes"], include_browse_nodes)
+
+    item = {}
+    for name in fields:
+        if name in parsed:
+            item[name] = parsed[name]
+        elif name == "offers":
+            if projection.first_offer_only:
+                offers = list(offers)[:1]
+            offer_items = [projected_offer_dict(offer, row, projection.offer_fields) for offer in offers]
+            if offer_items and "price" in projection.offer_fields and row.current_price is not None:
+                offer_items[0]["price"] = row.current_price
+            item[name] = offer_items
+        elif name == "timestamp":
+            item[name] = _iso(row.timestamp or datetime.utcnow())
+        elif name == "cj_url":
+            item[name] = row.cj_url if row.api_provider == "cj-api" else None
+        elif name == "coupon_info":
+            item[name] = None
+        elif name == "coupon_expiration_date":
+            item[name] = _iso(coupon.expiration_date) if coupon else None
+        elif name == "coupon_terms":
+            item[name] = coupon.terms if coupon else None
+        elif name == "coupon_history":
+            item[name] = coupon_history_dict(coupon) if coupon and include_coupon_history else None
+        else:
+            item[name] = getattr(row, name)
+    return item
+
+
+def serialize_products(
+    db: Session,
+    rows: Sequence[Any],
+    include_coupon_history: bool = True,
+    coupon_order_column=CouponHistory.updated_at,
+    include_browse_nodes: Optional[List[str]] = None,
+    include_metadata: bool = False,
+    projection: Optional[Projection] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    批量把商品行转为响应字典
+
+    优惠信息和最新优惠券各用一条查询加载，投影不需要的不加载。返回列表与rows一一对应，
+    无法转换的商品记录错误日志并返回None。
+    """
+    projection = projection or FULL_PROJECTION
+    asins = [row.asin for row in rows]
+    offers = load_offers(db, asins, projection.offer_columns) if projection.needs_offers else {}
+    coupons = load_latest_coupons(db, asins, coupon_order_column) if projection.needs_coupon else {}
+
+    results: List[Optional[Dict[str, Any]]] = []
+    for row in rows:
+        try:
+            results.append(product_dict(
+                row,
+                offers.get(row.asin, ()),
+                coupons.get(row.asin),
+                include_coupon_history=include_coupon_history,
+                include_browse_nodes=include_browse_nodes,
+                include_metadata=include_metadata,
+                projection=projection
+            ))
+        except json.JSONDecodeError as e:
+            logger.error(f"解析商品 {row.asin} 的JSON数据时出错: {str(e)}")
+            results.append(None)
+        except Exception as e:
+            logger.error(f"处理商品 {row.asin} 时出错: {str(e)}")
+            results.append(None)
+    return results
@@ -10,9 +10,23 @@ logger = logging.getLogger(__name__)
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, asc
 from datetime import datetime, timedelta, timezone # 导入 timezone
-from .database import Product, Offer, CouponHistory
+from .database import Product, Offer, CouponHistory, undefer_heavy_columns
 from .product import ProductInfo, ProductOffer
-from functools import lru_cache
+from .product_serializer import (
+    FULL_PROJECTION, PRODUCT_COLUMNS, Projection,
+    load_latest_coupons, load_offers, load_product_rows, product_dict, serialize_products
+)
+
+# 不写入raw_data的字段：timestamp每次抓取都不同，会让内容未变的商品也重写raw_data；raw_data避免嵌套自身
+RAW_DATA_EXCLUDED_FIELDS = {'timestamp', 'raw_data'}
+
+def raw_data_json(product_info: ProductInfo) -> str:
+    """生成商品的raw_data，相同内容的多次抓取得到相同的字符串"""
+    data = product_info.dict(exclude=RAW_DATA_EXCLUDED_FIELDS)
+    # ProductInfo.dict()总会补上timestamp
+    for field in RAW_DATA_EXCLUDED_FIELDS:
+        data.pop(field, None)
+    return json.dumps(data)
 
 class ProductService:
     """
@@ -67,7 +81,7 @@ class ProductService:
             # 元数据
             source=source,
             api_provider=product_info.api_provider if hasattr(product_info, 'api_provider') else "pa-api",
-            raw_data=json.dumps(product_info.dict())
+            raw_data=raw_data_json(product_info)
         )
         
         db.add(db_product)
@@ -109,7 +123,7 @@ class ProductService:
             categories = json.dumps(product_info.categories or [])
             browse_nodes = json.dumps(product_info.browse_nodes or [])
             # raw_data可以由用户提供，或基于输入信息生成
-            raw_data = json.dumps(product_info.raw_data or product_info.dict(exclude={'raw_data'})) # 优先用用户提供的
+            raw_data = json.dumps(product_info.raw_data) if product_info.raw_data else raw_data_json(product_info) # 优先用用户提供的
 
             # 创建 Product 对象
             db_product = Product(
@@ -220,7 +234,7 @@ class ProductService:
                  logger.warning(f"手动创建商品 {product_info.asin} 后未能从数据库重新检索，返回原始输入。")
                  return product_info
                  
-            return created_product_info
+            return ProductInfo.model_validate(created_product_info)
 
         except ValueError as ve:
             db.rollback()
@@ -248,7 +262,8 @@ class ProductService:
             Exception: 如果数据库操作失败
         """
         # 检查商品是否存在
-        existing_product = db.query(Product).filter(Product.asin == product_info.asin).first()
+        existing_product = db.query(Product).options(*undefer_heavy_columns())\
+            .filter(Product.asin == product_info.asin).first()
         if not existing_product:
             raise ValueError(f"ASIN {product_info.asin} 不存在，无法更新。")
             
@@ -304,7 +319,7 @@ class ProductService:
                 existing_product.source = product_info.source
                 
             # 更新原始数据
-            existing_product.raw_data = json.dumps(product_info.dict(exclude={'raw_data'}) if not product_info.raw_data else product_info.raw_data)
+            existing_product.raw_data = json.dumps(product_info.raw_data) if product_info.raw_data else raw_data_json(product_info)
             
             # 删除现有的offer记录
             db.query(Offer).filter(Offer.product_id == existing_product.asin).delete()
@@ -374,7 +389,7 @@ class ProductService:
                 logger.warning(f"更新商品 {product_info.asin} 后未能从数据库重新检索，返回原始输入。")
                 return product_info
                 
-            return updated_product_info
+            return ProductInfo.model_validate(updated_product_info)
             
         except ValueError as ve:
             db.rollback()
@@ -399,8 +414,9 @@ class ProductService:
             Optional[Product]: 更新后的商品对象，如果失败则返回None
         """
         try:
-            # 查找现有商品
-            product = db.query(Product).filter(Product.asin == product_info.asin).first()
+            # 查找现有商品，同时加载大字段以便跳过内容未变化的列
+            product = db.query(Product).options(*undefer_heavy_columns())\
+                .filter(Product.asin == product_info.asin).first()
             if not product:
                 return None
                 
@@ -445,7 +461,7 @@ class ProductService:
             
             # 更新API提供者和原始数据
             product.api_provider = product_info.api_provider
-            product.raw_data = json.dumps(product_info.dict())
+            product.raw_data = raw_data_json(product_info)
             
             # 只更新时间戳，不更新source
             product.updated_at = datetime.now()
@@ -461,86 +477,17 @@ class ProductService:
             raise Exception(f"更新商品失败: {str(e)}")
     
     @staticmethod
-    def get_product_by_asin(db: Session, asin: str) -> Optional[ProductInfo]:
-        """根据ASIN获取商品信息"""
+    def get_product_by_asin(db: Session, asin: str) -> Optional[Dict[str, Any]]:
+        """根据ASIN获取商品信息，返回与ProductInfo字段一致的字典"""
         try:
-            product = db.query(Product).filter(Product.asin == asin).first()
-            
-            if not product:
+            row = db.query(*PRODUCT_COLUMNS).filter(Product.asin == asin).first()
+            if not row:
                 return None
             
-            # 解析JSON字符串
-            categories = json.loads(product.categories) if product.categories else []
-            browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-            features = json.loads(product.features) if product.features else []
-            
-            # 确保解析后的数据是列表类型
-            if not isinstance(categories, list):
-                categories = []
-            if not isinstance(browse_nodes, list):
-                browse_nodes = []
-            if not isinstance(features, list):
-                features = []
-            
-            # 获取商品的所有优惠信息
-            offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
-            
-            # 获取最新的优惠券历史记录，改用updated_at排序
-            latest_coupon = db.query(CouponHistory).filter(
-                CouponHistory.product_id == product.asin
-            ).order_by(CouponHistory.updated_at.desc()).first()
-            
-            # 转换优惠券对象为字典
-            coupon_history = None
-            if latest_coupon:
-                coupon_history = {
-                    "id": latest_coupon.id,
-                    "product_id": latest_coupon.product_id,
-                    "coupon_type": latest_coupon.coupon_type,
-                    "coupon_value": latest_coupon.coupon_value,
-                    "expiration_date": latest_coupon.expiration_date.isoformat() if latest_coupon.expiration_date else None,
-                    "terms": latest_coupon.terms,
-                    "updated_at": latest_coupon.updated_at.isoformat() if latest_coupon.updated_at else None
-                }
-                
-            return ProductInfo(
-                asin=product.asin,
-                title=product.title,
-                url=product.url,
-                brand=product.brand,
-                main_image=product.main_image,
-                timestamp=product.timestamp or datetime.utcnow(),
-                binding=product.binding,
-                product_group=product.product_group,
-                categories=categories,
-                browse_nodes=browse_nodes,
-                features=features,
-                cj_url=product.cj_url if product.api_provider == "cj-api" else None,
-                api_provider=product.api_provider,
-                source=product.source,  # 添加数据来源字段
-                offers=[
-                    ProductOffer(
-                        condition=o.condition or "New",  # 提供默认值
-                        price=o.price or 0.0,  # 提供默认值
-                        original_price=product.original_price,  # 添加原始价格
-                        currency=o.currency or "USD",  # 提供默认值
-                        savings=o.savings,
-                        savings_percentage=o.savings_percentage,
-                        is_prime=o.is_prime or False,
-                        availability=o.availability or "Available",  # 提供默认值
-                        merchant_name=o.merchant_name or "Amazon",  # 提供默认值
-                        is_buybox_winner=o.is_buybox_winner or False,
-                        deal_type=o.deal_type,
-                        coupon_type=getattr(o, 'coupon_type', None),
-                        coupon_value=getattr(o, 'coupon_value', None),
-                        commission=o.commission if product.api_provider == "cj-api" else None
-                    ) for o in offers
-                ],
-                # 添加优惠券过期日期和条款
-                coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
-                coupon_terms=latest_coupon.terms if latest_coupon else None,
-                # 添加完整的优惠券历史信息
-                coupon_history=coupon_history
+            return product_dict(
+                row,
+                load_offers(db, [asin]).get(asin, ()),
+                load_latest_coupons(db, [asin]).get(asin)
             )
         except Exception as e:
             logger.error(f"获取商品 {asin} 详情时出错: {str(e)}")
@@ -551,162 +498,43 @@ class ProductService:
         db: Session, 
         asins: Union[str, List[str]], 
         include_metadata: bool = False,
-        include_browse_nodes: Optional[List[str]] = None
-    ) -> Union[Optional[ProductInfo], List[Optional[ProductInfo]]]:
+        include_browse_nodes: Optional[List[str]] = None,
+        projection: Optional[Projection] = None
+    ) -> Union[Optional[Dict[str, Any]], List[Optional[Dict[str, Any]]]]:
         """根据ASIN获取商品详细信息，支持单个或批量查询
         
         Args:
             db: 数据库会话
             asins: 单个ASIN字符串或ASIN列表
-            include_metadata: 是否包含元数据
+            include_metadata: 是否包含元数据（仅完整投影）
             include_browse_nodes: 要包含的浏览节点ID列表
+            projection: 字段投影，为空时返回全部字段
             
         Returns:
-            单个ASIN时返回单个ProductInfo对象或None
-            ASIN列表时返回ProductInfo对象列表，未找到的项为None
+            单个ASIN时返回单个商品字典（字段与ProductInfo一致）或None
+            ASIN列表时返回商品字典列表，未找到的项为None
         """
         try:
             # 处理单个ASIN的情况
             if isinstance(asins, str):
                 return ProductService._get_single_product_details(
-                    db, asins, include_metadata, include_browse_nodes
+                    db, asins, include_metadata, include_browse_nodes, projection
                 )
             
-            # 处理ASIN列表的情况
-            products = db.query(Product).filter(Product.asin.in_(asins)).all()
-            product_dict = {p.asin: p for p in products}
-            
-            # 获取所有相关的优惠信息
-            offers = db.query(Offer).filter(Offer.product_id.in_(asins)).all()
-            offers_dict = {}
-            for offer in offers:
-                if offer.product_id not in offers_dict:
-                    offers_dict[offer.product_id] = []
-                offers_dict[offer.product_id].append(offer)
-            
-            # 获取所有相关的优惠券历史记录
-            # 使用子查询获取每个商品的最新优惠券历史记录
-            latest_coupon_subquery = db.query(
-                CouponHistory.product_id,
-                func.max(CouponHistory.updated_at).label('max_updated_at')
-            ).filter(
-                CouponHistory.product_id.in_(asins)
-            ).group_by(CouponHistory.product_id).subquery()
-            
-            latest_coupons = db.query(CouponHistory).join(
-                latest_coupon_subquery,
-                and_(
-                    CouponHistory.product_id == latest_coupon_subquery.c.product_id,
-                    CouponHistory.updated_at == latest_coupon_subquery.c.max_updated_at
-                )
-            ).all()
-            
-            coupon_dict = {}
-            for coupon in latest_coupons:
-                coupon_dict[coupon.product_id] = {
-                    "id": coupon.id,
-                    "product_id": coupon.product_id,
-                    "coupon_type": coupon.coupon_type,
-                    "coupon_value": coupon.coupon_value,
-                    "expiration_date": coupon.expiration_date.isoformat() if coupon.expiration_date else None,
-                    "terms": coupon.terms,
-                    "updated_at": coupon.updated_at.isoformat() if coupon.updated_at else None
-                }
+            # 处理ASIN列表的情况：商品、优惠、优惠券各按批次查询，每批一条SQL，
+            # 第一个优惠的价格在序列化时直接取自商品行的current_price
+            columns = (projection or FULL_PROJECTION).product_columns(include_metadata)
+            rows = load_product_rows(db, asins, columns)
+            items = serialize_products(
+                db, rows,
+                include_browse_nodes=include_browse_nodes,
+                include_metadata=include_metadata,
+                projection=projection
+            )
+            items_by_asin = {row.asin: item for row, item in zip(rows, items)}
             
-            # 构建结果列表
-            results = []
-            for asin in asins:
-                product = product_dict.get(asin)
-                if not product:
-                    results.append(None)
-                    continue
-                
-                try:
-                    # 解析JSON字符串
-                    categories = json.loads(product.categories) if product.categories else []
-                    browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-                    features = json.loads(product.features) if product.features else []
-                    
-                    # 确保解析后的数据是列表类型
-                    if not isinstance(categories, list):
-                        categories = []
-                    if not isinstance(browse_nodes, list):
-                        browse_nodes = []
-                    if not isinstance(features, list):
-                        features = []
-                    
-                    # 如果提供了include_browse_nodes参数，进行筛选
-                    if include_browse_nodes and include_browse_nodes != ["string"]:  # 忽略默认的无效值
-                        filtered_nodes = [
-                            node for node in browse_nodes 
-                            if node.get('id') in include_browse_nodes
-                        ]
-                        # 只有在找到匹配项时才使用筛选结果
-                        if filtered_nodes:
-                            browse_nodes = filtered_nodes
-                    
-                    # 获取商品的优惠信息
-                    product_offers = offers_dict.get(asin, [])
-                    
-                    # 获取优惠券历史记录
-                    coupon_history = coupon_dict.get(asin)
-                    
-                    # 构建商品信息对象
-                    product_info = ProductInfo(
-                        asin=product.asin,
-                        title=product.title,
-                        url=product.url,
-                        brand=product.brand,
-                        main_image=product.main_image,
-                        timestamp=product.timestamp or datetime.utcnow(),
-                        binding=product.binding,
-                        product_group=product.product_group,
-                        categories=categories,
-                        browse_nodes=browse_nodes,
-                        features=features,
-                        cj_url=product.cj_url if product.api_provider == "cj-api" else None,
-                        api_provider=product.api_provider,
-                        source=product.source,  # 添加数据来源字段
-                        offers=[
-                            ProductOffer(
-                                condition=o.condition or "New",
-                                price=o.price or 0.0,
-                                original_price=product.original_price,
-                                currency=o.currency or "USD",
-                                savings=o.savings,
-                                savings_percentage=o.savings_percentage,
-                                is_prime=o.is_prime or False,
-                                availability=o.availability or "Available",
-                                merchant_name=o.merchant_name or "Amazon",
-                                is_buybox_winner=o.is_buybox_winner or False,
-                                deal_type=o.deal_type,
-                                coupon_type=getattr(o, 'coupon_type', None),
-                                coupon_value=getattr(o, 'coupon_value', None),
-                                commission=o.commission if product.api_provider == "cj-api" else None
-                            ) for o in product_offers
-                        ],
-                        # 添加优惠券过期日期、条款和历史记录
-                        coupon_expiration_date=coupon_history["expiration_date"] if coupon_history else None,
-                        coupon_terms=coupon_history["terms"] if coupon_history else None,
-                        coupon_history=coupon_history
-                    )
-                    
-                    # 添加元数据（如果需要）
-                    if include_metadata and product.raw_data:
-                        try:
-                            raw_data = json.loads(product.raw_data)
-                            product_info.raw_data = raw_data
-                        except:
-                            pass
-                        
-                    results.append(product_info)
-                    
-                except Exception as e:
-                    logger.error(f"处理商品 {asin} 时出错: {str(e)}")
-                    results.append(None)
-                    continue
-                
-            return results
+            # 按请求顺序返回，未找到或处理出错的项为None
+            return [items_by_asin.get(asin) for asin in asins]
             
         except Exception as e:
             logger.error(f"获取商品详情时出错: {str(e)}")
@@ -717,109 +545,27 @@ class ProductService:
         db: Session, 
         asin: str,
         include_metadata: bool = False,
-        include_browse_nodes: Optional[List[str]] = None
-    ) -> Optional[ProductInfo]:
+        include_browse_nodes: Optional[List[str]] = None,
+        projection: Optional[Projection] = None
+    ) -> Optional[Dict[str, Any]]:
         """获取单个商品的详细信息(内部方法)"""
         try:
-            product = db.query(Product).filter(Product.asin == asin).first()
-            if not product:
+            projection = projection or FULL_PROJECTION
+            row = db.query(*projection.product_columns(include_metadata)).filter(Product.asin == asin).first()
+            if not row:
                 return None
             
-            # 解析JSON字符串
-            categories = json.loads(product.categories) if product.categories else []
-            browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-            features = json.loads(product.features) if product.features else []
-            
-            # 确保解析后的数据是列表类型
-            if not isinstance(categories, list):
-                categories = []
-            if not isinstance(browse_nodes, list):
-                browse_nodes = []
-            if not isinstance(features, list):
-                features = []
-            
-            # 如果提供了include_browse_nodes参数，进行筛选
-            if include_browse_nodes and include_browse_nodes != ["string"]:  # 忽略默认的无效值
-                filtered_nodes = [
-                    node for node in browse_nodes 
-                    if node.get('id') in include_browse_nodes
-                ]
-                # 只有在找到匹配项时才使用筛选结果
-                if filtered_nodes:
-                    browse_nodes = filtered_nodes
-            
-            # 获取商品的优惠信息
-            offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
-            
-            # 获取最新的优惠券历史记录，改用updated_at排序
-            latest_coupon = db.query(CouponHistory).filter(
-                CouponHistory.product_id == product.asin
-            ).order_by(CouponHistory.updated_at.desc()).first()
-            
-            # 转换优惠券对象为字典
-            coupon_history = None
-            if latest_coupon:
-                coupon_history = {
-                    "id": latest_coupon.id,
-                    "product_id": latest_coupon.product_id,
-                    "coupon_type": latest_coupon.coupon_type,
-                    "coupon_value": latest_coupon.coupon_value,
-                    "expiration_date": latest_coupon.expiration_date.isoformat() if latest_coupon.expiration_date else None,
-                    "terms": latest_coupon.terms,
-                    "updated_at": latest_coupon.updated_at.isoformat() if latest_coupon.updated_at else None
-                }
-            
-            # 构建商品信息对象
-            product_info = ProductInfo(
-                asin=product.asin,
-                title=product.title,
-                url=product.url,
-                brand=product.brand,
-                main_image=product.main_image,
-                timestamp=product.timestamp or datetime.utcnow(),
-                binding=product.binding,
-                product_group=product.product_group,
-                categories=categories,
-                browse_nodes=browse_nodes,
-                features=features,
-                cj_url=product.cj_url if product.api_provider == "cj-api" else None,
-                api_provider=product.api_provider,
-                source=product.source,  # 添加数据来源字段
-                offers=[
-                    ProductOffer(
-                        condition=o.condition or "New",
-                        price=o.price or 0.0,
-                        original_price=product.original_price,
-                        currency=o.currency or "USD",
-                        savings=o.savings,
-                        savings_percentage=o.savings_percentage,
-                        is_prime=o.is_prime or False,
-                        availability=o.availability or "Available",
-                        merchant_name=o.merchant_name or "Amazon",
-                        is_buybox_winner=o.is_buybox_winner or False,
-                        deal_type=o.deal_type,
-                        coupon_type=getattr(o, 'coupon_type', None),
-                        coupon_value=getattr(o, 'coupon_value', None),
-                        commission=o.commission if product.api_provider == "cj-api" else None
-                    ) for o in offers
-                ],
-                # 添加优惠券过期日期和条款
-                coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
-                coupon_terms=latest_coupon.terms if latest_coupon else None,
-                # 添加完整的优惠券历史信息
-                coupon_history=coupon_history
+            offers = load_offers(db, [asin], projection.offer_columns) if projection.needs_offers else {}
+            coupons = load_latest_coupons(db, [asin]) if projection.needs_coupon else {}
+            return product_dict(
+                row,
+                offers.get(asin, ()),
+                coupons.get(asin),
+                include_browse_nodes=include_browse_nodes,
+                include_metadata=include_metadata,
+                projection=projection
             )
             
-            # 添加元数据（如果需要）
-            if include_metadata and product.raw_data:
-                try:
-                    raw_data = json.loads(product.raw_data)
-                    product_info.raw_data = raw_data
-                except:
-                    pass
-            
-            return product_info
-            
         except Exception as e:
             logger.error(f"获取商品 {asin} 详情时出错: {str(e)}")
             raise e
@@ -854,14 +600,15 @@ class ProductService:
                 # 获取第一个优惠（通常是最佳优惠）
                 best_offer = product_info.offers[0] if product_info.offers else None
                 
-                # 查找现有产品
-                product = db.query(Product).filter(Product.asin == product_info.asin).first()
+                # 查找现有产品，同时加载大字段以便跳过内容未变化的列
+                product = db.query(Product).options(*undefer_heavy_columns())\
+                    .filter(Product.asin == product_info.asin).first()
                 
                 # 序列化列表类型的字段
                 features = json.dumps(product_info.features) if product_info.features else json.dumps([])
                 categories = json.dumps(product_info.categories) if product_info.categories else json.dumps([])
                 browse_nodes = json.dumps(product_info.browse_nodes) if product_info.browse_nodes else json.dumps([])
-                raw_data = json.dumps(product_info.dict())
+                raw_data = raw_data_json(product_info)
                 
                 if not product:
                     # 创建新产品
@@ -1015,7 +762,6 @@ class ProductService:
             raise Exception(f"提交事务时出错: {str(e)}")
 
     @staticmethod
-    @lru_cache(maxsize=128)  # 设置缓存大小为128
     def get_category_stats(db: Session, product_type: Optional[str] = None, 
                           page: int = 1, page_size: int = 50, 
                           sort_by: str = 'count', sort_order: str = 'desc') -> Dict[str, Any]:
@@ -1101,14 +847,6 @@ class ProductService:
                 }
             }
 
-    @staticmethod
-    def clear_category_stats_cache():
-        """清除get_category_stats函数的缓存"""
-        if hasattr(ProductService.get_category_stats, 'cache_clear'):
-            ProductService.get_category_stats.cache_clear()
-            return True
-        return False
-
     @staticmethod
     def _apply_sorting(query, sort_by: Optional[str], sort_order: str = "desc"):
         """
@@ -1174,7 +912,8 @@ class ProductService:
         product_groups: Optional[List[str]] = None,
         api_provider: Optional[str] = None,  # 将source改为api_provider
         min_commission: Optional[int] = None,
-        brands: Optional[List[str]] = None  # 新增brands参数
+        brands: Optional[List[str]] = None,  # 新增brands参数
+        projection: Optional[Projection] = None
     ) -> Dict[str, Any]:
         """获取商品列表，支持分页、筛选和排序"""
         try:
@@ -1240,77 +979,17 @@ class ProductService:
             offset = (page - 1) * page_size
             query = query.offset(offset).limit(page_size)
             
-            # 执行查询
-            products = query.all()
+            # 执行查询，只取构建响应（和投影）需要的列
+            rows = query.with_entities(*(projection or FULL_PROJECTION).columns).all()
             
-            # 转换为ProductInfo对象
-            result = []
-            for product in products:
-                try:
-                    # 解析JSON字符串
-                    categories = json.loads(product.categories) if product.categories else []
-                    browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-                    features = json.loads(product.features) if product.features else []
-                    
-                    # 确保解析后的数据是列表类型
-                    if not isinstance(categories, list):
-                        categories = []
-                    if not isinstance(browse_nodes, list):
-                        browse_nodes = []
-                    if not isinstance(features, list):
-                        features = []
-                    
-                    offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
-                    
-                    # 获取最新的优惠券历史记录
-                    latest_coupon = db.query(CouponHistory).filter(
-                        CouponHistory.product_id == product.asin
-                    ).order_by(CouponHistory.created_at.desc()).first()
-                    
-                    product_info = ProductInfo(
-                        asin=product.asin,
-                        title=product.title,
-                        url=product.url,
-                        brand=product.brand,
-                        main_image=product.main_image,
-                        timestamp=product.timestamp or datetime.utcnow(),
-                        binding=product.binding,
-                        product_group=product.product_group,
-                        categories=categories,
-                        browse_nodes=browse_nodes,
-                        features=features,
-                        cj_url=product.cj_url if product.api_provider == "cj-api" else None,
-                        api_provider=product.api_provider,
-                        source=product.source,  # 添加数据来源字段
-                        offers=[
-                            ProductOffer(
-                                condition=offer.condition or "New",
-                                price=offer.price or 0.0,
-                                original_price=product.original_price,
-                                currency=offer.currency or "USD",
-                                savings=offer.savings,
-                                savings_percentage=offer.savings_percentage,
-                                is_prime=offer.is_prime or False,
-                                availability=offer.availability or "Available",
-                                merchant_name=offer.merchant_name or "Amazon",
-                                is_buybox_winner=offer.is_buybox_winner or False,
-                                deal_type=offer.deal_type,
-                                coupon_type=getattr(offer, 'coupon_type', None),
-                                coupon_value=getattr(offer, 'coupon_value', None),
-                                commission=offer.commission if product.api_provider == "cj-api" else None
-                            ) for offer in offers
-                        ],
-                        # 添加优惠券过期日期和条款
-                        coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
-                        coupon_terms=latest_coupon.terms if latest_coupon else None
-                    )
-                    result.append(product_info)
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析商品 {product.asin} 的JSON数据时出错: {str(e)}")
-                    continue
-                except Exception as e:
-                    logger.error(f"处理商品 {product.asin} 时出错: {str(e)}")
-                    continue
+            # 批量加载优惠信息和优惠券并转换为响应字典，无法转换的商品跳过
+            items = serialize_products(
+                db, rows,
+                include_coupon_history=False,
+                coupon_order_column=CouponHistory.created_at,
+                projection=projection
+            )
+            result = [item for item in items if item is not None]
                 
             return {
                 "items": result,
@@ -1584,7 +1263,8 @@ class ProductService:
         browse_node_ids: Optional[List[str]] = None,
         bindings: Optional[List[str]] = None,
         product_groups: Optional[List[str]] = None,
-        brands: Optional[List[str]] = None  # 新增brands参数
+        brands: Optional[List[str]] = None,  # 新增brands参数
+        projection: Optional[Projection] = None
     ) -> Dict[str, Any]:
         """获取优惠券商品列表"""
         try:
@@ -1652,92 +1332,11 @@ class ProductService:
             offset = (page - 1) * page_size
             query = query.offset(offset).limit(page_size)
             
-            # 执行查询
-            products = query.all()
+            # 执行查询，只取构建响应（和投影）需要的列
+            rows = query.with_entities(*(projection or FULL_PROJECTION).columns).all()
             
-            # 转换为ProductInfo对象
-            result = []
-            for product in products:
-                try:
-                    # 解析JSON字符串
-                    categories = json.loads(product.categories) if product.categories else []
-                    browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-                    features = json.loads(product.features) if product.features else []
-                    
-                    # 确保解析后的数据是列表类型
-                    if not isinstance(categories, list):
-                        categories = []
-                    if not isinstance(browse_nodes, list):
-                        browse_nodes = []
-                    if not isinstance(features, list):
-                        features = []
-                    
-                    offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
-                    
-                    # 获取最新的优惠券历史记录，包含过期日期和条款
-                    latest_coupon = db.query(CouponHistory).filter(
-                        CouponHistory.product_id == product.asin
-                    ).order_by(CouponHistory.updated_at.desc()).first()
-                    
-                    # 转换优惠券对象为字典
-                    coupon_history = None
-                    if latest_coupon:
-                        coupon_history = {
-                            "id": latest_coupon.id,
-                            "product_id": latest_coupon.product_id,
-                            "coupon_type": latest_coupon.coupon_type,
-                            "coupon_value": latest_coupon.coupon_value,
-                            "expiration_date": latest_coupon.expiration_date.isoformat() if latest_coupon.expiration_date else None,
-                            "terms": latest_coupon.terms,
-                            "updated_at": latest_coupon.updated_at.isoformat() if latest_coupon.updated_at else None
-                        }
-                    
-                    product_info = ProductInfo(
-                        asin=product.asin,
-                        title=product.title,
-                        url=product.url,
-                        brand=product.brand,
-                        main_image=product.main_image,
-                        timestamp=product.timestamp or datetime.utcnow(),
-                        binding=product.binding,
-                        product_group=product.product_group,
-                        categories=categories,
-                        browse_nodes=browse_nodes,
-                        features=features,
-                        cj_url=product.cj_url if product.api_provider == "cj-api" else None,
-                        api_provider=product.api_provider,
-                        source=product.source,  # 添加数据来源字段
-                        offers=[
-                            ProductOffer(
-                                condition=offer.condition or "New",
-                                price=offer.price or 0.0,
-                                original_price=product.original_price,
-                                currency=offer.currency or "USD",
-                                savings=offer.savings,
-                                savings_percentage=offer.savings_percentage,
-                                is_prime=offer.is_prime or False,
-                                availability=offer.availability or "Available",
-                                merchant_name=offer.merchant_name or "Amazon",
-                                is_buybox_winner=offer.is_buybox_winner or False,
-                                deal_type=offer.deal_type,
-                                coupon_type=getattr(offer, 'coupon_type', None),
-                                coupon_value=getattr(offer, 'coupon_value', None),
-                                commission=offer.commission if product.api_provider == "cj-api" else None
-                            ) for offer in offers
-                        ],
-                        # 添加优惠券过期日期和条款
-                        coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
-                        coupon_terms=latest_coupon.terms if latest_coupon else None,
-                        # 添加完整的优惠券历史信息
-                        coupon_history=coupon_history
-                    )
-                    result.append(product_info)
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析商品 {product.asin} 的JSON数据时出错: {str(e)}")
-                    continue
-                except Exception as e:
-                    logger.error(f"处理商品 {product.asin} 时出错: {str(e)}")
-                    continue
+            # 批量加载优惠信息和优惠券并转换为响应字典，无法转换的商品跳过
+            result = [item for item in serialize_products(db, rows, projection=projection) if item is not None]
                 
             return {
                 "items": result,
@@ -1771,7 +1370,8 @@ class ProductService:
         browse_node_ids: Optional[List[str]] = None,  # 添加browse_node_ids参数
         bindings: Optional[List[str]] = None,         # 添加bindings参数
         product_groups: Optional[List[str]] = None,    # 添加product_groups参数
-        brands: Optional[List[str]] = None  # 新增brands参数
+        brands: Optional[List[str]] = None,  # 新增brands参数
+        projection: Optional[Projection] = None
     ) -> Dict[str, Any]:
         """获取折扣商品列表"""
         try:
@@ -1831,92 +1431,11 @@ class ProductService:
             offset = (page - 1) * page_size
             query = query.offset(offset).limit(page_size)
             
-            # 执行查询
-            products = query.all()
+            # 执行查询，只取构建响应（和投影）需要的列
+            rows = query.with_entities(*(projection or FULL_PROJECTION).columns).all()
             
-            # 转换为ProductInfo对象
-            result = []
-            for product in products:
-                try:
-                    # 解析JSON字符串
-                    categories = json.loads(product.categories) if product.categories else []
-                    browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-                    features = json.loads(product.features) if product.features else []
-                    
-                    # 确保解析后的数据是列表类型
-                    if not isinstance(categories, list):
-                        categories = []
-                    if not isinstance(browse_nodes, list):
-                        browse_nodes = []
-                    if not isinstance(features, list):
-                        features = []
-                    
-                    offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
-                    
-                    # 获取最新的优惠券历史记录，使用updated_at排序
-                    latest_coupon = db.query(CouponHistory).filter(
-                        CouponHistory.product_id == product.asin
-                    ).order_by(CouponHistory.updated_at.desc()).first()
-                    
-                    # 转换优惠券对象为字典
-                    coupon_history = None
-                    if latest_coupon:
-                        coupon_history = {
-                            "id": latest_coupon.id,
-                            "product_id": latest_coupon.product_id,
-                            "coupon_type": latest_coupon.coupon_type,
-                            "coupon_value": latest_coupon.coupon_value,
-                            "expiration_date": latest_coupon.expiration_date.isoformat() if latest_coupon.expiration_date else None,
-                            "terms": latest_coupon.terms,
-                            "updated_at": latest_coupon.updated_at.isoformat() if latest_coupon.updated_at else None
-                        }
-                    
-                    product_info = ProductInfo(
-                        asin=product.asin,
-                        title=product.title,
-                        url=product.url,
-                        brand=product.brand,
-                        main_image=product.main_image,
-                        timestamp=product.timestamp or datetime.utcnow(),
-                        binding=product.binding,
-                        product_group=product.product_group,
-                        categories=categories,
-                        browse_nodes=browse_nodes,
-                        features=features,
-                        cj_url=product.cj_url if product.api_provider == "cj-api" else None,
-                        api_provider=product.api_provider,
-                        source=product.source,  # 添加数据来源字段
-                        offers=[
-                            ProductOffer(
-                                condition=offer.condition or "New",
-                                price=offer.price or 0.0,
-                                original_price=product.original_price,
-                                currency=offer.currency or "USD",
-                                savings=offer.savings,
-                                savings_percentage=offer.savings_percentage,
-                                is_prime=offer.is_prime or False,
-                                availability=offer.availability or "Available",
-                                merchant_name=offer.merchant_name or "Amazon",
-                                is_buybox_winner=offer.is_buybox_winner or False,
-                                deal_type=offer.deal_type,
-                                coupon_type=getattr(offer, 'coupon_type', None),
-                                coupon_value=getattr(offer, 'coupon_value', None),
-                                commission=offer.commission if product.api_provider == "cj-api" else None
-                            ) for offer in offers
-                        ],
-                        # 添加优惠券过期日期和条款
-                        coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
-                        coupon_terms=latest_coupon.terms if latest_coupon else None,
-                        # 添加完整的优惠券历史信息
-                        coupon_history=coupon_history
-                    )
-                    result.append(product_info)
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析商品 {product.asin} 的JSON数据时出错: {str(e)}")
-                    continue
-                except Exception as e:
-                    logger.error(f"处理商品 {product.asin} 时出错: {str(e)}")
-                    continue
+            # 批量加载优惠信息和优惠券并转换为响应字典，无法转换的商品跳过
+            result = [item for item in serialize_products(db, rows, projection=projection) if item is not None]
                 
             return {
                 "items": result,
@@ -2065,7 +1584,6 @@ class ProductService:
             raise 
 
     @staticmethod
-    @lru_cache(maxsize=128)  # 设置缓存大小为128
     def get_brand_stats(db: Session, product_type: Optional[str] = None, 
                          page: int = 1, page_size: int = 50, 
                          sort_by: str = 'count', sort_order: str = 'desc') -> Dict[str, Any]:
@@ -2147,12 +1665,6 @@ class ProductService:
                 }
             }
 
-    @staticmethod
-    def clear_brand_stats_cache():
-        """清空品牌统计信息缓存"""
-        ProductService.get_brand_stats.cache_clear()
-        return {"cleared": True, "message": "品牌统计缓存已清空"}
-        
     @staticmethod
     def is_valid_asin(string: str) -> bool:
         """
@@ -2202,7 +1714,8 @@ class ProductService:
         is_prime_only: bool = False,
         product_groups: Optional[Union[List[str], str]] = None,
         brands: Optional[Union[List[str], str]] = None,
-        api_provider: Optional[str] = None
+        api_provider: Optional[str] = None,
+        projection: Optional[Projection] = None
     ) -> Dict[str, Any]:
         """
         根据关键词搜索产品
@@ -2221,6 +1734,7 @@ class ProductService:
             product_groups: 商品分类
             brands: 品牌
             api_provider: API提供商
+            projection: 字段投影，为空时返回全部字段
             
         Returns:
             Dict: 包含商品列表和分页信息的字典
@@ -2231,80 +1745,12 @@ class ProductService:
                 logger.info(f"检测到ASIN格式关键词: {keyword}，尝试直接查询产品")
                 
                 # 直接按ASIN查询产品
-                product = db.query(Product).filter(Product.asin == keyword).first()
+                row = db.query(*(projection or FULL_PROJECTION).columns).filter(Product.asin == keyword).first()
                 
-                if product:
-                    # 产品存在，直接返回结果
-                    try:
-                        # 解析JSON字符串
-                        categories = json.loads(product.categories) if product.categories else []
-                        browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-                        features = json.loads(product.features) if product.features else []
-                        
-                        # 确保解析后的数据是列表类型
-                        if not isinstance(categories, list):
-                            categories = []
-                        if not isinstance(browse_nodes, list):
-                            browse_nodes = []
-                        if not isinstance(features, list):
-                            features = []
-                        
-                        # 获取商品的优惠信息
-                        offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
-                        
-                        # 如果是优惠券商品，获取优惠券历史记录
-                        latest_coupon = None
-                        if product.source == "coupon":
-                            latest_coupon = db.query(CouponHistory).filter(
-                                CouponHistory.product_id == product.asin
-                            ).order_by(CouponHistory.updated_at.desc()).first()
-                        
-                        # 转换为ProductOffer对象
-                        product_offers = []
-                        for offer in offers:
-                            product_offers.append(
-                                ProductOffer(
-                                    condition=offer.condition,
-                                    price=offer.price,
-                                    original_price=product.original_price,
-                                    currency=offer.currency,
-                                    savings=offer.savings,
-                                    savings_percentage=offer.savings_percentage,
-                                    is_prime=offer.is_prime,
-                                    is_amazon_fulfilled=offer.is_amazon_fulfilled,
-                                    is_free_shipping_eligible=offer.is_free_shipping_eligible,
-                                    availability=offer.availability,
-                                    merchant_name=offer.merchant_name,
-                                    is_buybox_winner=offer.is_buybox_winner,
-                                    deal_type=offer.deal_type,
-                                    coupon_type=offer.coupon_type,
-                                    coupon_value=offer.coupon_value,
-                                    commission=offer.commission
-                                )
-                            )
-                        
-                        # 创建ProductInfo对象
-                        product_info = ProductInfo(
-                            asin=product.asin,
-                            title=product.title,
-                            url=product.url,
-                            brand=product.brand,
-                            main_image=product.main_image,
-                            timestamp=product.timestamp or datetime.utcnow(),
-                            binding=product.binding,
-                            product_group=product.product_group,
-                            categories=categories,
-                            browse_nodes=browse_nodes,
-                            features=features,
-                            cj_url=product.cj_url,
-                            api_provider=product.api_provider,
-                            source=product.source,  # 添加数据来源字段
-                            offers=product_offers,
-                            # 只有优惠券商品才添加优惠券过期日期和条款
-                            coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
-                            coupon_terms=latest_coupon.terms if latest_coupon else None
-                        )
-                        
+                if row:
+                    # 产品存在，直接返回结果；处理出错时serialize_products返回None，回退到关键词搜索
+                    product_info = serialize_products(db, [row], projection=projection)[0]
+                    if product_info is not None:
                         return {
                             "success": True,
                             "data": {
@@ -2315,9 +1761,6 @@ class ProductService:
                                 "is_asin_search": True  # 标识这是ASIN搜索结果
                             }
                         }
-                    except Exception as e:
-                        logger.error(f"处理ASIN产品时出错: {str(e)}")
-                        # 如果处理ASIN产品出错，回退到关键词搜索
                 
                 # 如果找不到产品或处理出错，记录信息并继续执行关键词搜索
                 logger.info(f"未找到ASIN为{keyword}的产品，继续执行关键词搜索")
@@ -2411,94 +1854,12 @@ class ProductService:
             offset = (page - 1) * page_size
             query = query.offset(offset).limit(page_size)
             
-            # 执行查询
-            products = query.all()
+            # 执行查询，只取构建响应（和投影）需要的列
+            rows = query.with_entities(*(projection or FULL_PROJECTION).columns).all()
+            
+            # 批量加载优惠信息和优惠券并转换为响应字典，无法转换的商品跳过
+            result = [item for item in serialize_products(db, rows, projection=projection) if item is not None]
             
-            # 转换为ProductInfo对象
-            result = []
-            for product in products:
-                try:
-                    # 解析JSON字符串
-                    categories = json.loads(product.categories) if product.categories else []
-                    browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
-                    features = json.loads(product.features) if product.features else []
-                    
-                    # 确保解析后的数据是列表类型
-                    if not isinstance(categories, list):
-                        categories = []
-                    if not isinstance(browse_nodes, list):
-                        browse_nodes = []
-                    if not isinstance(features, list):
-                        features = []
-                    
-                    # 获取商品的优惠信息
-                    offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
-                    
-                    # 如果是优惠券商品，获取优惠券历史记录
-                    latest_coupon = None
-                    if product.source == "coupon":
-                        latest_coupon = db.query(CouponHistory).filter(
-                            CouponHistory.product_id == product.asin
-                        ).order_by(CouponHistory.updated_at.desc()).first()
-                    
-                    # 转换优惠券对象为字典
-                    coupon_history = None
-                    if latest_coupon:
-                        coupon_history = {
-                            "id": latest_coupon.id,
-                            "product_id": latest_coupon.product_id,
-                            "coupon_type": latest_coupon.coupon_type,
-                            "coupon_value": latest_coupon.coupon_value,
-                            "expiration_date": latest_coupon.expiration_date.isoformat() if latest_coupon.expiration_date else None,
-                            "terms": latest_coupon.terms,
-                            "updated_at": latest_coupon.updated_at.isoformat() if latest_coupon.updated_at else None
-                        }
-                    
-                    product_info = ProductInfo(
-                        asin=product.asin,
-                        title=product.title,
-                        url=product.url,
-                        brand=product.brand,
-                        main_image=product.main_image,
-                        timestamp=product.timestamp or datetime.utcnow(),
-                        binding=product.binding,
-                        product_group=product.product_group,
-                        categories=categories,
-                        browse_nodes=browse_nodes,
-                        features=features,
-                        cj_url=product.cj_url,
-                        api_provider=product.api_provider,
-                        source=product.source,  # 添加数据来源字段
-                        offers=[
-                            ProductOffer(
-                                condition=offer.condition or "New",
-                                price=offer.price or 0.0,
-                                original_price=product.original_price,
-                                currency=offer.currency or "USD",
-                                savings=offer.savings,
-                                savings_percentage=offer.savings_percentage,
-                                is_prime=offer.is_prime or False,
-                                availability=offer.availability or "Available",
-                                merchant_name=offer.merchant_name or "Amazon",
-                                is_buybox_winner=offer.is_buybox_winner or False,
-                                deal_type=offer.deal_type,
-                                coupon_type=offer.coupon_type,
-                                coupon_value=offer.coupon_value,
-                                commission=offer.commission
-                            ) for offer in offers
-                        ],
-                        # 添加优惠券过期日期和条款
-                        coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
-                        coupon_terms=latest_coupon.terms if latest_coupon else None,
-                        # 添加完整的优惠券历史信息
-                        coupon_history=coupon_history
-                    )
-                    
-                    result.append(product_info)
-                except Exception as e:
-                    logger.error(f"处理商品 {product.asin} 时出错: {str(e)}")
-                    continue
-                
             # 返回结果
             return {
                 "success": True,
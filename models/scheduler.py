@@ -1,4 +1,5 @@
 import os
+import threading
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import pytz
@@ -49,6 +50,9 @@ class SchedulerManager:
     _db_path = None
     _timezone = os.getenv('SCHEDULER_TIMEZONE', 'Asia/Shanghai')
     _logger = None  # 添加日志记录器引用
+    _worker_pool = None  # 常驻任务工作进程池
+    _pool_shutdown_thread = None  # 在后台关闭进程池的线程
+    _leader_election = None  # 多个API工作进程之间的主节点选举
     
     def __new__(cls):
         if cls._instance is None:
@@ -132,9 +136,9 @@ class SchedulerManager:
                 timezone=pytz.timezone(self._timezone)
             )
             
-            # 如果调度器未运行，则启动它
+            # 如果调度器未运行，则启动它；启用选举时先以暂停状态启动，成为主节点后才执行任务
             if not SchedulerManager._scheduler.running:
-                SchedulerManager._scheduler.start()
+                SchedulerManager._scheduler.start(paused=self._leader_election_enabled())
     
     @property
     def scheduler(self):
@@ -359,9 +363,155 @@ class SchedulerManager:
                 task_log.error(f"爬虫执行失败: {str(e)}")
                 raise
 
+    @staticmethod
+    def _worker_pool_enabled() -> bool:
+        """是否使用常驻任务工作进程池（默认启用，关闭后每个任务启动独立进程）"""
+        return os.getenv("SCHEDULER_WORKER_POOL", "true").lower() == "true"
+    
+    def start_worker_pool(self, workers: Optional[int] = None):
+        """启动常驻任务工作进程池，之后的任务都交给进程池执行
+        
+        只有执行定时任务的进程需要进程池：启用选举时在成为主节点后启动，失去主节点身份时关闭。
+        
+        Args:
+            workers: 工作进程数量，默认读取SCHEDULER_WORKERS环境变量
+        """
+        from src.core.job_worker_pool import JobWorkerPool
+        
+        if SchedulerManager._worker_pool is not None and SchedulerManager._worker_pool.running:
+            return SchedulerManager._worker_pool
+        
+        job_timeout = float(os.getenv("SCHEDULER_JOB_TIMEOUT", "21600"))
+        max_memory_mb = float(os.getenv("SCHEDULER_JOB_MAX_MEMORY_MB", "4096"))
+        pool = JobWorkerPool(
+            workers=workers or int(os.getenv("SCHEDULER_WORKERS", "2")),
+            job_timeout=job_timeout if job_timeout > 0 else None,
+            max_memory_mb=max_memory_mb if max_memory_mb > 0 else None,
+            max_jobs_per_worker=int(os.getenv("SCHEDULER_WORKER_MAX_JOBS", "50"))
+        )
+        pool.start()
+        SchedulerManager._worker_pool = pool
+        self._logger.info(f"任务工作进程池已启动，工作进程数: {pool.workers}")
+        return pool
+    
+    def stop_worker_pool(self, timeout: float = 30.0, wait: bool = True):
+        """关闭任务工作进程池，运行中的任务最多等待timeout秒
+        
+        Args:
+            timeout: 等待运行中任务的最长时间（秒）
+            wait: False时在后台线程中关闭，立即返回；True时同时等待之前的后台关闭完成
+        """
+        pool = SchedulerManager._worker_pool
+        SchedulerManager._worker_pool = None
+        if pool is not None and not wait:
+            thread = threading.Thread(
+                target=self._shutdown_pool, args=(pool, timeout), name="JobWorkerPoolShutdown", daemon=True
+            )
+            SchedulerManager._pool_shutdown_thread = thread
+            thread.start()
+            return
+        if pool is not None:
+            self._shutdown_pool(pool, timeout)
+        thread = SchedulerManager._pool_shutdown_thread
+        if thread is not None:
+            thread.join()
+            SchedulerManager._pool_shutdown_thread = None
+    
+    def _shutdown_pool(self, pool, timeout: float):
+        pool.shutdown(wait=True, timeout=timeout)
+        self._logger.info("任务工作进程池已关闭")
+    
+    def _run_in_pool(self, job_id: str, crawler_type: str, max_items: int,
+                     config_params: Optional[Dict[str, Any]] = None, wait: bool = True):
+        """将任务交给工作进程池执行，并把结果写入任务历史
+        
+        Args:
+            job_id: 任务ID
+            crawler_type: 爬虫类型
+            max_items: 最大采集数量
+            config_params: 额外配置参数
+            wait: 是否等待任务完成
+        """
+        from src.core.task_registry import get_task_registry
+        
+        with self.Session() as session:
+            history = JobHistoryModel(
+                job_id=job_id,
+                start_time=datetime.now(),
+                status='running',
+                error="任务已提交到工作进程池"
+            )
+            session.add(history)
+            session.commit()
+            history_id = history.id
+        
+        # 登记本次执行，工作进程向其上报进度
+        task_id = get_task_registry().create_task(
+            "job", job_id=job_id, crawler_type=crawler_type,
+            params={"max_items": max_items, "config": config_params}
+        )
+        future = SchedulerManager._worker_pool.submit(
+            job_id, crawler_type, max_items, config_params, task_id=task_id
+        )
+        self._logger.info(f"任务 {job_id} 已提交到工作进程池，类型：{crawler_type}")
+        if wait:
+            self._record_job_result(history_id, future, task_id)
+        else:
+            future.add_done_callback(lambda f: self._record_job_result(history_id, f, task_id))
+        return future
+    
+    def _record_job_result(self, history_id: int, future, task_id: Optional[str] = None):
+        """等待工作进程池返回结果并更新任务历史和任务登记表"""
+        try:
+            result = future.result()
+            status = result.status
+            items_collected = result.items_collected
+            end_time = datetime.fromtimestamp(result.finished_at)
+            if status == 'completed':
+                message = f"任务已完成，日志文件: {result.log_file}"
+            else:
+                message = f"{result.error}，日志文件: {result.log_file}" if result.log_file else result.error
+        except Exception as e:
+            status, items_collected, end_time, message = 'failed', 0, datetime.now(), str(e)
+        
+        if task_id:
+            from src.core.task_registry import get_task_registry
+            try:
+                get_task_registry().finish_task(
+                    task_id, status,
+                    result={"items_collected": items_collected},
+                    error=None if status == 'completed' else message,
+                    items_saved=items_collected
+                )
+            except Exception as e:
+                self._logger.error(f"更新任务登记表 {task_id} 失败: {str(e)}")
+        
+        try:
+            with self.Session() as session:
+                history = session.get(JobHistoryModel, history_id)
+                if history is None:
+                    return
+                history.end_time = end_time
+                history.status = status
+                history.items_collected = items_collected
+                history.error = message
+                job_id = history.job_id
+                session.commit()
+            log = self._logger.info if status == 'completed' else self._logger.error
+            log(f"任务 {job_id} 执行结束，状态：{status}，处理商品数量：{items_collected}")
+        except Exception as e:
+            self._logger.error(f"更新任务历史 {history_id} 失败: {str(e)}")
+
     @staticmethod
     def _execute_job(job_id: str, crawler_type: str, max_items: int, config_params: Optional[Dict[str, Any]] = None):
-        """执行任务（使用独立进程）"""
+        """执行任务（工作进程池已启动时交给进程池，否则使用独立进程）"""
+        if SchedulerManager._worker_pool is not None and SchedulerManager._worker_pool.running:
+            try:
+                SchedulerManager()._run_in_pool(job_id, crawler_type, max_items, config_params, wait=True)
+            except Exception as e:
+                logger.error(f"执行任务 {job_id} 出错: {str(e)}")
+            return
+        
         import subprocess
         import sys
         import json
@@ -801,16 +951,69 @@ class SchedulerManager:
             'running': self.scheduler.running if self.scheduler else False,
             'running_jobs': running_jobs,
             'total_jobs': len(self.scheduler.get_jobs()),
-            'timezone': self._timezone
+            'timezone': self._timezone,
+            'leader': self.is_leader(),
+            'leader_term': SchedulerManager._leader_election.term if SchedulerManager._leader_election else None,
+            'worker_pool': self._worker_pool.get_status() if self._worker_pool is not None else None
         }
     
+    @staticmethod
+    def _leader_election_enabled() -> bool:
+        """是否启用主节点选举（默认启用，单进程调试时可关闭）"""
+        return os.getenv("SCHEDULER_LEADER_ELECTION", "true").lower() == "true"
+    
+    def is_leader(self) -> bool:
+        """当前进程是否负责执行定时任务"""
+        if SchedulerManager._leader_election is None:
+            return not self._leader_election_enabled()
+        return SchedulerManager._leader_election.is_leader
+    
+    def _start_leader_election(self):
+        """启动租约选举，只有主节点恢复调度器执行任务"""
+        from src.core.leader_election import LeaderElection
+        
+        if SchedulerManager._leader_election is not None:
+            return
+        election = LeaderElection(
+            self._db_path,
+            name="scheduler",
+            lease_seconds=float(os.getenv("SCHEDULER_LEASE_SECONDS", "30")),
+            heartbeat_interval=float(os.getenv("SCHEDULER_HEARTBEAT_SECONDS", "10")),
+            on_elected=self._on_elected,
+            on_revoked=self._on_revoked,
+            # 其他进程可能通过API修改了任务，主节点每次心跳时重新检查任务存储
+            on_heartbeat=self.scheduler.wakeup
+        )
+        SchedulerManager._leader_election = election
+        election.start()
+    
+    def _on_elected(self):
+        """成为主节点：启动任务工作进程池并恢复执行定时任务"""
+        self._logger.info(f"当前进程成为调度主节点，任期：{SchedulerManager._leader_election.term}")
+        if self._worker_pool_enabled():
+            self.start_worker_pool()
+        if self.scheduler.running:
+            self.scheduler.resume()
+    
+    def _on_revoked(self):
+        """失去主节点身份：暂停执行定时任务并关闭任务工作进程池，任务存储仍可读写"""
+        self._logger.warning("当前进程不再是调度主节点，暂停执行定时任务")
+        if self.scheduler.running:
+            self.scheduler.pause()
+        # 非主节点不保留空闲的工作进程；在后台等待运行中的任务结束，不阻塞选举心跳线程
+        self.stop_worker_pool(wait=False)
+    
     def start(self):
         """启动调度器"""
         self._logger.info("正在启动调度器")
         try:
             if not self.scheduler.running:
-                self.scheduler.start()
+                self.scheduler.start(paused=self._leader_election_enabled())
                 self._logger.info("调度器启动成功")
+            if self._leader_election_enabled():
+                self._start_leader_election()
+            elif self._worker_pool_enabled():
+                self.start_worker_pool()
         except Exception as e:
             self._logger.error(f"启动调度器失败: {str(e)}")
             raise
@@ -819,6 +1022,10 @@ class SchedulerManager:
         """停止调度器"""
         self._logger.info("正在停止调度器")
         try:
+            # 先释放租约，其他进程可以立即接管
+            if SchedulerManager._leader_election is not None:
+                SchedulerManager._leader_election.stop()
+                SchedulerManager._leader_election = None
             if self.scheduler.running:
                 self.scheduler.shutdown()
                 self._logger.info("调度器已停止")
@@ -832,6 +1039,7 @@ class SchedulerManager:
         try:
             self.stop()
             self._init_scheduler()
+            self.start()
             self._logger.info("调度器重新加载完成")
         except Exception as e:
             self._logger.error(f"重新加载调度器失败: {str(e)}")
@@ -861,6 +1069,11 @@ class SchedulerManager:
             # 检查是否有额外配置参数
             config_params = job.args[3] if len(job.args) > 3 else None
             
+            # 工作进程池已启动时交给进程池，不等待任务完成
+            if self._worker_pool is not None and self._worker_pool.running:
+                self._run_in_pool(job_id, crawler_type, max_items, config_params, wait=False)
+                return
+            
             # 使用独立进程而不是线程来执行任务
             import subprocess
             import sys
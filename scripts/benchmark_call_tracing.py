@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+调用跟踪装饰器开销基准测试脚本
+
+测量 log_function_call 和 with_api_logging 在不同日志级别下的每次调用额外开销（微秒），
+同时覆盖同步函数和协程函数。日志写入空sink，只计算格式化和Loguru处理本身的开销。
+
+用法示例:
+    python scripts/benchmark_call_tracing.py
+    python scripts/benchmark_call_tracing.py --iterations 100000 --level WARNING
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from loguru import logger
+
+from src.utils.log_config import log_function_call
+from src.utils.api_logger import with_api_logging
+
+# 模拟CJ接口调用的典型参数
+ARGS = (["B0000000%02d" % i for i in range(20)],)
+KWARGS = {
+    "method": "POST",
+    "url": "https://ads.api.cj.com/query",
+    "headers": {"Authorization": "Bearer token", "Content-Type": "application/json"},
+    "data": {"asins": ARGS[0], "api_key": "secret"},
+}
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='调用跟踪装饰器开销基准测试')
+    parser.add_argument('--iterations', type=int, default=20000, help='每个场景的调用次数')
+    parser.add_argument('--level', type=str, default='INFO', help='日志处理器级别')
+    return parser.parse_args()
+
+
+def target(*args, **kwargs):
+    return {"status": "ok"}
+
+
+async def async_target(*args, **kwargs):
+    return {"status": "ok"}
+
+
+def measure_sync(func, iterations: int) -> float:
+    """返回每次调用的平均耗时（微秒）"""
+    for _ in range(min(iterations, 1000)):
+        func(*ARGS, **KWARGS)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(*ARGS, **KWARGS)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def measure_async(func, iterations: int) -> float:
+    """在同一个事件循环中顺序await，返回每次调用的平均耗时（微秒）"""
+    async def run(count):
+        for _ in range(count):
+            await func(*ARGS, **KWARGS)
+
+    asyncio.run(run(min(iterations, 1000)))
+    start = time.perf_counter()
+    asyncio.run(run(iterations))
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    logger.remove()
+    logger.add(lambda message: None, level=args.level.upper())
+
+    sync_base = measure_sync(target, args.iterations)
+    async_base = measure_async(async_target, args.iterations)
+    scenarios = [
+        ("log_function_call", log_function_call(target), log_function_call(async_target)),
+        ("log_function_call 1%", log_function_call(sample_rate=0.01)(target),
+         log_function_call(sample_rate=0.01)(async_target)),
+        ("with_api_logging", with_api_logging("CJ")(target), with_api_logging("CJ")(async_target)),
+        ("with_api_logging 1%", with_api_logging("CJ", sample_rate=0.01)(target),
+         with_api_logging("CJ", sample_rate=0.01)(async_target)),
+    ]
+
+    print(f"日志级别: {args.level.upper()}  基线: 同步 {sync_base:.2f}微秒, 协程 {async_base:.2f}微秒")
+    print(f"{'装饰器':<24}{'同步额外开销':>14}{'协程额外开销':>14}   (微秒/次)")
+    for name, sync_func, async_func in scenarios:
+        sync_cost = measure_sync(sync_func, args.iterations) - sync_base
+        async_cost = measure_async(async_func, args.iterations) - async_base
+        print(f"{name:<24}{sync_cost:>14.2f}{async_cost:>14.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
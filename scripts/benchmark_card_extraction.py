@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+商品卡片提取基准测试脚本
+
+在本地生成一个包含N个商品卡片的模拟Deals页面，用无头Chrome分别执行逐卡片提取（旧方式：
+find_elements后对每个卡片调用is_displayed、get_attribute、位置检查和find_element）和
+card_extractor.extract_cards批量提取，输出每次滚动的WebDriver往返次数和每秒处理的卡片数。
+
+用法示例:
+    # 默认60个卡片，滚动10次
+    python scripts/benchmark_card_extraction.py
+
+    # 指定卡片数量和滚动次数
+    python scripts/benchmark_card_extraction.py --cards 120 --scrolls 20 --no-headless
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from selenium.webdriver.common.by import By
+
+from src.core.card_extractor import (
+    CARD_SELECTOR, COUPON_BADGE_SELECTOR, extract_cards, track_round_trips
+)
+from src.utils.webdriver_manager import WebDriverConfig
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='商品卡片提取基准测试')
+    parser.add_argument('--cards', type=int, default=60, help='模拟页面中的商品卡片数量')
+    parser.add_argument('--scrolls', type=int, default=10, help='每种方式执行的滚动次数')
+    parser.add_argument('--no-headless', action='store_true', help='禁用无头模式')
+    return parser.parse_args()
+
+
+def build_page(card_count: int) -> str:
+    """生成模拟Deals页面的HTML"""
+    cards = []
+    for index in range(card_count):
+        asin = f"B{index:09d}"
+        badge = (f'<span class="CouponExperienceBadge-module__label_x">Save {5 + index % 20}%</span>'
+                 if index % 2 == 0 else '')
+        cards.append(
+            f'<div data-testid="{asin}" data-test-index="{index}" '
+            f'class="GridItem-module__container_x" style="height:220px">'
+            f'<a href="https://www.amazon.com/dp/{asin}">商品 {index}</a>{badge}</div>'
+        )
+    return f'<html><body><div data-viewport-type="window">{"".join(cards)}</div></body></html>'
+
+
+def legacy_extract(driver) -> int:
+    """旧方式：每个卡片多次WebDriver往返"""
+    cards = driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR)
+    processed = 0
+    for card in cards:
+        if not card.is_displayed():
+            continue
+        card.get_attribute('data-test-index')
+        card.get_attribute('data-testid')
+        viewport_height = driver.execute_script("return window.innerHeight")
+        top = card.location['y']
+        bottom = top + card.size['height']
+        scroll = driver.execute_script("return window.pageYOffset")
+        if not (top >= scroll and bottom <= scroll + viewport_height):
+            continue
+        try:
+            card.find_element(By.CSS_SELECTOR, 'a[href*="/dp/"]').get_attribute('href')
+            card.find_element(By.CSS_SELECTOR, COUPON_BADGE_SELECTOR).text
+        except Exception:
+            pass
+        processed += 1
+    return processed
+
+
+def batched_extract(driver) -> int:
+    """新方式：一次往返取回所有卡片"""
+    return sum(1 for card in extract_cards(driver) if card['displayed'] and card['fully_visible'])
+
+
+def run(driver, extract, scrolls: int):
+    """滚动页面并执行提取，返回(每次滚动往返次数, 每秒卡片数)"""
+    driver.execute_script("window.scrollTo(0, 0);")
+    total_cards = 0
+    elapsed = 0.0
+    with track_round_trips(driver) as round_trips:
+        for _ in range(scrolls):
+            driver.execute_script("window.scrollBy(0, window.innerHeight * 0.8);")
+            start = time.perf_counter()
+            total_cards += extract(driver)
+            elapsed += time.perf_counter() - start
+    # 每次滚动本身的scrollBy也算一次往返，与爬虫中的情况一致
+    per_scroll = round_trips.count / scrolls
+    rate = total_cards / elapsed if elapsed > 0 else float('inf')
+    return per_scroll, rate
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        page = Path(tmp_dir) / "deals.html"
+        page.write_text(build_page(args.cards), encoding='utf-8')
+
+        driver = WebDriverConfig.create_chrome_driver(headless=not args.no_headless)
+        try:
+            driver.get(page.as_uri())
+            print(f"模拟页面: {args.cards} 个卡片, 每种方式滚动 {args.scrolls} 次")
+            print(f"{'方式':<12}{'往返/滚动':>12}{'卡片/秒':>12}")
+            for name, extract in (("逐卡片", legacy_extract), ("批量提取", batched_extract)):
+                per_scroll, rate = run(driver, extract, args.scrolls)
+                print(f"{name:<12}{per_scroll:>12.1f}{rate:>12.0f}")
+        finally:
+            driver.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
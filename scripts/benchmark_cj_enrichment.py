@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+CJ富化请求基准测试脚本
+
+用模拟的CJ接口（替换CJAPIClient._make_request，按固定延迟返回数据）对比两种富化方式：
+逐个商品调用get_product_details和generate_product_link（旧方式），以及
+collect_products.fetch_cj_data复用可用性查询结果并批量生成推广链接（新方式）。
+输出每100个ASIN的CJ请求次数和总耗时。
+
+用法示例:
+    # 默认100个ASIN，每批10个，模拟延迟50毫秒
+    python scripts/benchmark_cj_enrichment.py
+
+    # 指定ASIN数量、CJ可用比例、延迟和并发批次数
+    python scripts/benchmark_cj_enrichment.py --asins 200 --available 0.5 --latency 0.1 --concurrency 4
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from typing import Dict, List
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from loguru import logger
+
+from src.core.cj_api_client import CJAPIClient
+from src.core.collect_products import fetch_cj_data
+from src.utils.log_config import get_logger
+
+
+class MockCJClient(CJAPIClient):
+    """模拟CJ接口：统计各端点的请求次数，不访问网络"""
+
+    def __init__(self, available_ratio: float, latency: float):
+        self.base_url = "mock://cj"
+        self.pid = "mock-pid"
+        self.cid = "mock-cid"
+        self.headers = {}
+        self.logger = get_logger("MockCJClient")
+        self.available_ratio = available_ratio
+        self.latency = latency
+        self.calls = Counter()
+
+    def is_available(self, asin: str) -> bool:
+        """按ASIN序号确定是否在CJ平台可用，保证两种方式结果一致"""
+        return (int(asin[1:]) % 100) < self.available_ratio * 100
+
+    async def _make_request(self, endpoint: str, method: str = "POST", data: Dict = None, **kwargs) -> Dict:
+        self.calls[endpoint] += 1
+        await asyncio.sleep(self.latency)
+        if endpoint == "/get_products":
+            asins = data["asins"].split(",")
+            products = [
+                {"asin": asin, "commission": "5%", "discount": "20%",
+                 "coupon": {"type": "percentage", "value": 10}}
+                for asin in asins if self.is_available(asin)
+            ]
+            return {"code": 0, "data": {"list": products, "has_more": False, "cursor": ""}}
+        if endpoint == "/generate_product_link":
+            asins = data["asins"].split(",")
+            return {"code": 0, "data": [
+                {"asin": asin, "link": f"https://cj.example/{asin}"} for asin in asins
+            ]}
+        return {"code": -1, "message": f"未知端点: {endpoint}"}
+
+
+async def legacy_enrich(client: MockCJClient, batch_asins: List[str]) -> int:
+    """旧方式：检查可用性后逐个获取详情和推广链接"""
+    availability = await client.check_products_availability(batch_asins)
+    enriched = 0
+    for asin, available in availability.items():
+        if not available:
+            continue
+        details = await client.get_product_details(asin)
+        if details:
+            await client.generate_product_link(asin)
+            enriched += 1
+    return enriched
+
+
+async def batched_enrich(client: MockCJClient, batch_asins: List[str], semaphore: asyncio.Semaphore) -> int:
+    """新方式：一次查询获取详情，批量生成推广链接"""
+    details, links = await fetch_cj_data(client, batch_asins, semaphore)
+    return sum(1 for asin in details if asin in links)
+
+
+async def run(name: str, client: MockCJClient, asins: List[str], batch_size: int, concurrency: int):
+    """按批次运行富化，返回(请求次数, 富化商品数, 耗时)"""
+    batches = [asins[i:i + batch_size] for i in range(0, len(asins), batch_size)]
+    start = time.perf_counter()
+    if name == "legacy":
+        # 旧方式逐批顺序处理
+        enriched = 0
+        for batch in batches:
+            enriched += await legacy_enrich(client, batch)
+    else:
+        semaphore = asyncio.Semaphore(concurrency)
+        results = await asyncio.gather(*(batched_enrich(client, batch, semaphore) for batch in batches))
+        enriched = sum(results)
+    return sum(client.calls.values()), enriched, time.perf_counter() - start
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='CJ富化请求基准测试')
+    parser.add_argument('--asins', type=int, default=100, help='ASIN数量')
+    parser.add_argument('--batch-size', type=int, default=10, help='每批ASIN数量')
+    parser.add_argument('--available', type=float, default=0.7, help='CJ平台可用商品比例')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟的单次请求延迟（秒）')
+    parser.add_argument('--concurrency', type=int, default=2, help='新方式同时处理的批次数')
+    parser.add_argument('--verbose', action='store_true', help='输出富化过程中的日志')
+    return parser.parse_args()
+
+
+async def main_async(args) -> int:
+    if not args.verbose:
+        # 只保留基准结果输出
+        logging.disable(logging.CRITICAL)
+        logger.remove()
+    asins = [f"B{i:09d}" for i in range(args.asins)]
+    print(f"ASIN: {args.asins}, 每批 {args.batch_size} 个, CJ可用比例 {args.available:.0%}, "
+          f"模拟延迟 {args.latency * 1000:.0f}ms")
+    print(f"{'方式':<10}{'请求数':>8}{'请求/100 ASIN':>16}{'富化数':>8}{'耗时(秒)':>10}")
+    for name in ("legacy", "batched"):
+        client = MockCJClient(args.available, args.latency)
+        calls, enriched, elapsed = await run(name, client, asins, args.batch_size, args.concurrency)
+        per_hundred = calls * 100 / len(asins) if asins else 0
+        print(f"{name:<10}{calls:>8}{per_hundred:>16.1f}{enriched:>8}{elapsed:>10.2f}")
+    return 0
+
+
+def main():
+    """主函数"""
+    return asyncio.run(main_async(parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+优惠券解析微基准测试脚本
+
+对fixture语料中的每个页面重复调用coupon_parser.parse_coupon，输出每个页面和整体的解析速度(次/秒)。
+
+用法示例:
+    # 使用默认语料 tests/fixtures/coupon_pages
+    python scripts/benchmark_coupon_parser.py
+
+    # 指定语料目录和迭代次数
+    python scripts/benchmark_coupon_parser.py --corpus /path/to/pages --iterations 500
+
+    # 传入预先解析的DOM快照，只测量提取部分
+    python scripts/benchmark_coupon_parser.py --snapshot
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.coupon_parser import parse_coupon, to_document
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='优惠券解析微基准测试')
+    parser.add_argument('--corpus', type=str,
+                        default=os.path.join(project_root, 'tests', 'fixtures', 'coupon_pages'),
+                        help='HTML语料目录')
+    parser.add_argument('--iterations', type=int, default=200, help='每个页面的解析次数')
+    parser.add_argument('--snapshot', action='store_true', help='使用预先解析的DOM快照，排除HTML解析时间')
+    return parser.parse_args()
+
+
+def benchmark(source, iterations: int) -> float:
+    """重复解析并返回每秒解析次数"""
+    parse_coupon(source)  # 预热
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse_coupon(source)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed > 0 else float('inf')
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    pages = sorted(Path(args.corpus).glob('*.html'))
+    if not pages:
+        print(f"语料目录中没有HTML文件: {args.corpus}")
+        return 1
+
+    mode = "DOM快照" if args.snapshot else "HTML源码"
+    print(f"语料: {args.corpus} ({len(pages)} 个页面), 每页迭代 {args.iterations} 次, 输入: {mode}")
+    print(f"{'页面':<32}{'大小(KB)':>10}{'解析/秒':>12}")
+
+    total_time = 0.0
+    for page in pages:
+        html = page.read_text(encoding='utf-8')
+        source = to_document(html) if args.snapshot else html
+        rate = benchmark(source, args.iterations)
+        total_time += args.iterations / rate
+        print(f"{page.name:<32}{len(html) / 1024:>10.1f}{rate:>12.0f}")
+
+    overall = len(pages) * args.iterations / total_time if total_time > 0 else float('inf')
+    print(f"{'整体':<32}{'':>10}{overall:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+日志上下文微基准测试脚本
+
+测量进入和退出日志上下文的开销（次/秒、每次微秒数），对比：
+- configure: 旧实现，每次进入/退出都调用 logger.configure(extra=...)
+- LogContext: 基于contextvars的实现
+- TaskLogContext: ProductUpdater在每个商品上使用的任务上下文
+
+同时测量在上下文中写一条日志（空sink）的开销，以及多线程并发时的总吞吐。
+
+用法示例:
+    python scripts/benchmark_log_context.py
+    python scripts/benchmark_log_context.py --iterations 50000 --threads 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from loguru import logger
+
+from src.utils.log_config import LogContext
+from src.core.product_updater import TaskLogContext
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='日志上下文微基准测试')
+    parser.add_argument('--iterations', type=int, default=20000, help='每个场景的进入/退出次数')
+    parser.add_argument('--threads', type=int, default=4, help='并发场景的线程数')
+    return parser.parse_args()
+
+
+class ConfigureContext:
+    """旧实现：进入和退出时重建Loguru全局extra"""
+
+    def __init__(self, **kwargs):
+        self.context_data = kwargs
+
+    def __enter__(self):
+        logger.configure(extra=self.context_data)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        logger.configure(extra={"name": "DefaultLogger"})
+
+
+def enter_exit(factory, iterations: int, log: bool = False):
+    for i in range(iterations):
+        with factory(task_id=f"UPDATE:B{i:09d}"):
+            if log:
+                logger.info("处理商品")
+
+
+def measure(factory, iterations: int, threads: int = 1, log: bool = False) -> float:
+    """返回每次进入/退出的平均耗时（微秒），多线程时为总耗时除以总次数"""
+    enter_exit(factory, min(iterations, 1000), log)  # 预热
+    workers = [threading.Thread(target=enter_exit, args=(factory, iterations, log)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * threads) * 1e6
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    logger.remove()
+    logger.add(lambda message: None, format="{extra[task_id]} {message}", level="INFO")
+
+    scenarios = [
+        ("configure", ConfigureContext),
+        ("LogContext", LogContext),
+        ("TaskLogContext", TaskLogContext),
+    ]
+    print(f"{'场景':<16}{'单线程':>12}{'单线程+日志':>14}{f'{args.threads}线程':>12}   (微秒/次)")
+    for name, factory in scenarios:
+        single = measure(factory, args.iterations)
+        with_log = measure(factory, args.iterations, log=True)
+        threaded = measure(factory, args.iterations // args.threads, threads=args.threads)
+        print(f"{name:<16}{single:>12.2f}{with_log:>14.2f}{threaded:>12.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
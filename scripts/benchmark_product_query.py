@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+商品批量查询（/api/products/query）基准测试脚本
+
+在临时SQLite数据库中生成商品、优惠和优惠券数据，比较不同ASIN数量下一次批量查询的耗时和SQL语句数：
+- 逐个补查价格: 批量加载后再为每个ASIN查询一次products表复制current_price/original_price（改动前接口的做法）
+- 批量查询: ProductService.get_product_details_by_asin，价格在序列化时取自商品行，
+  商品、优惠、优惠券每500个ASIN各一条查询
+- 批量查询(无索引): 删除offers/coupon_history的product_id索引后的批量查询
+
+用法示例:
+    python scripts/benchmark_product_query.py
+    python scripts/benchmark_product_query.py --products 20000 --sizes 10 100 500 1000 --rounds 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta, UTC
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from models import product_serializer
+from models.database import Base, CouponHistory, Offer, Product
+from models.product_service import ProductService
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='商品批量查询基准测试')
+    parser.add_argument('--products', type=int, default=10000, help='生成的商品数量')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500, 1000], help='每次查询的ASIN数量')
+    parser.add_argument('--rounds', type=int, default=10, help='每个场景重复查询的次数')
+    return parser.parse_args()
+
+
+def seed(db, count: int):
+    """生成测试数据，每个商品2个优惠和2条优惠券记录"""
+    now = datetime.now(UTC)
+    for i in range(count):
+        asin = f"B{i:09d}"
+        db.add(Product(
+            asin=asin,
+            title=f"Wireless Noise Cancelling Headphones Model {i}",
+            url=f"https://www.amazon.com/dp/{asin}",
+            brand=f"Brand {i % 50}",
+            current_price=50.0 + i % 100,
+            original_price=80.0 + i % 100,
+            categories='["Electronics", "Headphones"]',
+            browse_nodes='[{"id": "172541", "name": "Headphones"}]',
+            features='["Noise cancelling", "40h battery"]',
+            api_provider="pa-api",
+            source="discount",
+            timestamp=now,
+        ))
+        for n in range(2):
+            db.add(Offer(product_id=asin, price=45.0 + n, currency="USD", savings=30.0, savings_percentage=35))
+            db.add(CouponHistory(product_id=asin, coupon_type="percentage", coupon_value=5 + n,
+                                 updated_at=now - timedelta(days=n)))
+    db.commit()
+
+
+def query_with_price_lookups(db, asins):
+    """改动前接口：批量加载后逐个ASIN再查一次products表覆盖价格"""
+    products = ProductService.get_product_details_by_asin(db, asins)
+    for product in products:
+        if product and product["offers"]:
+            db_product = db.query(Product).filter(Product.asin == product["asin"]).first()
+            if db_product and db_product.current_price is not None:
+                product["offers"][0]["price"] = db_product.current_price
+                product["offers"][0]["original_price"] = db_product.original_price
+    return products
+
+
+def query_batched(db, asins):
+    """批量查询：价格覆盖已在加载时完成"""
+    return ProductService.get_product_details_by_asin(db, asins)
+
+
+def measure(name: str, func, db, asin_pool, size: int, rounds: int, statements: list):
+    """随机取size个ASIN重复查询，返回中位数耗时（毫秒）"""
+    timings = []
+    counts = []
+    for _ in range(rounds):
+        asins = random.sample(asin_pool, size)
+        product_serializer.clear_json_cache()
+        db.expire_all()
+        statements.clear()
+        start = time.perf_counter()
+        func(db, asins)
+        timings.append(time.perf_counter() - start)
+        counts.append(len(statements))
+    timings.sort()
+    median = timings[len(timings) // 2] * 1000
+    print(f"  {name:<22} {median:9.2f} ms   SQL {max(counts):5d} 条")
+    return median
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    random.seed(42)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        print(f"生成 {args.products} 个商品...")
+        seed(db, args.products)
+        asin_pool = [f"B{i:09d}" for i in range(args.products)]
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+        results = {}
+        for size in args.sizes:
+            print(f"\n{size} 个ASIN（中位数，共 {args.rounds} 次）:")
+            legacy = measure("逐个补查价格", query_with_price_lookups, db, asin_pool, size, args.rounds, statements)
+            batched = measure("批量查询", query_batched, db, asin_pool, size, args.rounds, statements)
+            results[size] = batched
+            print(f"  加速 {legacy / batched:.1f}x")
+
+        print("\n删除product_id索引后:")
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS ix_offers_product_id"))
+            conn.execute(text("DROP INDEX IF EXISTS ix_coupon_history_product_id"))
+        for size in args.sizes:
+            measure(f"批量查询(无索引) {size}", query_batched, db, asin_pool, size, args.rounds, statements)
+
+        smallest, largest = min(results), max(results)
+        print(f"\n批量查询 {largest} 个ASIN耗时为 {smallest} 个的 {results[largest] / results[smallest]:.1f} 倍")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
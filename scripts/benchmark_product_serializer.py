@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+商品列表序列化基准测试脚本
+
+在临时SQLite数据库中生成商品、优惠和优惠券数据，比较一页商品（默认100条）从查询到JSON编码的吞吐量（行/秒）：
+- 旧实现: ORM实体 + 逐个商品查询优惠和优惠券 + 每行json.loads + pydantic ProductInfo校验，
+  再由接口逐个查询current_price，最后由FastAPI的jsonable_encoder再转换一遍
+- 新实现（冷缓存）: ProductService.list_coupon_products，按列查询并批量加载，直接生成响应字典
+- 新实现（热缓存）: 同上，JSON列解析结果已按行版本缓存
+
+另外单独比较"仅序列化"阶段（数据已查出，不含SQL），便于观察校验和JSON解析本身的开销，
+以及 full/card/analytics 三种字段投影下每页的响应体积和耗时。
+
+用法示例:
+    python scripts/benchmark_product_serializer.py
+    python scripts/benchmark_product_serializer.py --products 2000 --page-size 100 --rounds 50
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta, UTC
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import product_serializer
+from models.database import Base, CouponHistory, Offer, Product
+from models.product import ProductInfo, ProductOffer
+from models.product_service import ProductService
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='商品列表序列化基准测试')
+    parser.add_argument('--products', type=int, default=1000, help='生成的商品数量')
+    parser.add_argument('--offers', type=int, default=3, help='每个商品的优惠数量')
+    parser.add_argument('--page-size', type=int, default=100, help='每页商品数量')
+    parser.add_argument('--rounds', type=int, default=20, help='每个场景重复请求的次数')
+    return parser.parse_args()
+
+
+def seed(db, count: int, offers: int):
+    """生成测试数据，JSON列大小接近真实采集结果"""
+    now = datetime.now(UTC)
+    for i in range(count):
+        asin = f"B{i:09d}"
+        db.add(Product(
+            asin=asin,
+            title=f"Wireless Noise Cancelling Headphones Model {i}",
+            url=f"https://www.amazon.com/dp/{asin}",
+            brand=f"Brand {i % 50}",
+            main_image=f"https://m.media-amazon.com/images/I/{asin}.jpg",
+            current_price=50.0 + i % 100,
+            original_price=80.0 + i % 100,
+            savings_percentage=30,
+            binding="Electronics",
+            product_group="Home Theater",
+            categories=json.dumps(["Electronics", "Headphones", "Over-Ear", f"Series {i % 7}"]),
+            browse_nodes=json.dumps([
+                {"id": str(172541 + n), "name": f"Node {n}", "is_root": n == 0} for n in range(10)
+            ]),
+            features=json.dumps([f"Feature {n}: " + "long description " * 8 for n in range(8)]),
+            api_provider="cj-api" if i % 3 == 0 else "pa-api",
+            source="coupon",
+            timestamp=now,
+        ))
+        for n in range(offers):
+            db.add(Offer(product_id=asin, price=45.0 + n, currency="USD", savings=30.0, savings_percentage=35,
+                         is_prime=True, merchant_name="Amazon", commission="4%"))
+        db.add(CouponHistory(product_id=asin, coupon_type="percentage", coupon_value=10,
+                             expiration_date=now + timedelta(days=7), terms="Limited time", updated_at=now))
+    db.commit()
+
+
+def legacy_product_info(product, offers, latest_coupon) -> ProductInfo:
+    """旧实现中每行的转换：json.loads三列并构建、校验ProductInfo"""
+    categories = json.loads(product.categories) if product.categories else []
+    browse_nodes = json.loads(product.browse_nodes) if product.browse_nodes else []
+    features = json.loads(product.features) if product.features else []
+    return ProductInfo(
+        asin=product.asin, title=product.title, url=product.url, brand=product.brand,
+        main_image=product.main_image, timestamp=product.timestamp or datetime.utcnow(),
+        binding=product.binding, product_group=product.product_group,
+        categories=categories, browse_nodes=browse_nodes, features=features,
+        cj_url=product.cj_url if product.api_provider == "cj-api" else None,
+        api_provider=product.api_provider, source=product.source,
+        offers=[
+            ProductOffer(
+                condition=o.condition or "New", price=o.price or 0.0, original_price=product.original_price,
+                currency=o.currency or "USD", savings=o.savings, savings_percentage=o.savings_percentage,
+                is_prime=o.is_prime or False, availability=o.availability or "Available",
+                merchant_name=o.merchant_name or "Amazon", is_buybox_winner=o.is_buybox_winner or False,
+                deal_type=o.deal_type, coupon_type=o.coupon_type, coupon_value=o.coupon_value,
+                commission=o.commission if product.api_provider == "cj-api" else None
+            ) for o in offers
+        ],
+        coupon_expiration_date=latest_coupon.expiration_date if latest_coupon else None,
+        coupon_terms=latest_coupon.terms if latest_coupon else None,
+    )
+
+
+def legacy_page(db, page_size: int):
+    """旧实现：逐行查询、json.loads、pydantic校验，接口再补查current_price并二次转换"""
+    products = db.query(Product).filter(Product.source == "coupon")\
+        .order_by(Product.timestamp.desc()).limit(page_size).all()
+    items = []
+    for product in products:
+        offers = db.query(Offer).filter(Offer.product_id == product.asin).all()
+        latest_coupon = db.query(CouponHistory).filter(
+            CouponHistory.product_id == product.asin
+        ).order_by(CouponHistory.updated_at.desc()).first()
+        items.append(legacy_product_info(product, offers, latest_coupon))
+    for item in items:
+        db_product = db.query(Product).filter(Product.asin == item.asin).first()
+        if item.offers and db_product.current_price is not None:
+            item.offers[0].price = db_product.current_price
+    return json.dumps(jsonable_encoder({"items": items, "total": len(items)}))
+
+
+def new_page(db, page_size: int, projection=None):
+    """新实现：按列查询、批量加载并直接生成响应字典"""
+    result = ProductService.list_coupon_products(db, page_size=page_size, projection=projection)
+    return json.dumps(result)
+
+
+def legacy_serialize(products, offers, coupons):
+    """旧实现的仅序列化阶段：逐行构建、校验ProductInfo，再jsonable_encoder"""
+    items = [legacy_product_info(p, offers.get(p.asin, []), coupons.get(p.asin)) for p in products]
+    return json.dumps(jsonable_encoder(items))
+
+
+def new_serialize(rows, offers, coupons):
+    """新实现的仅序列化阶段：直接从行元组生成响应字典"""
+    items = [product_serializer.product_dict(row, offers.get(row.asin, ()), coupons.get(row.asin)) for row in rows]
+    return json.dumps(items)
+
+
+def measure_serialize(name: str, func, data, page_size: int, rounds: int, before_round=None):
+    """对已查出的一页数据重复序列化，返回每页耗时和行/秒"""
+    timings = []
+    for _ in range(rounds):
+        if before_round:
+            before_round()
+        start = time.perf_counter()
+        func(*data)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"{name:<14} 每页中位数 {median * 1000:8.2f} ms   {page_size / median:10.0f} 行/秒")
+    return median
+
+
+def measure(name: str, func, db, page_size: int, rounds: int, before_round=None):
+    """重复请求同一页，返回每页耗时和行/秒"""
+    timings = []
+    for _ in range(rounds):
+        if before_round:
+            before_round()
+        db.expire_all()
+        start = time.perf_counter()
+        func(db, page_size)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"{name:<14} 每页中位数 {median * 1000:8.2f} ms   {page_size / median:10.0f} 行/秒")
+    return median
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        print(f"生成 {args.products} 个商品，每个商品 {args.offers} 个优惠...")
+        seed(db, args.products, args.offers)
+        print(f"每页 {args.page_size} 条，每个场景请求 {args.rounds} 次\n")
+
+        legacy = measure("旧实现", legacy_page, db, args.page_size, args.rounds)
+        cold = measure("新实现(冷缓存)", new_page, db, args.page_size, args.rounds,
+                       before_round=product_serializer.clear_json_cache)
+        warm = measure("新实现(热缓存)", new_page, db, args.page_size, args.rounds)
+
+        print(f"\n冷缓存加速 {legacy / cold:.1f}x，热缓存加速 {legacy / warm:.1f}x")
+
+        # 仅序列化阶段：提前查出一页数据
+        print("\n仅序列化（不含SQL）:")
+        products = db.query(Product).order_by(Product.id).limit(args.page_size).all()
+        asins = [p.asin for p in products]
+        legacy_offers = {}
+        for offer in db.query(Offer).filter(Offer.product_id.in_(asins)):
+            legacy_offers.setdefault(offer.product_id, []).append(offer)
+        legacy_coupons = {c.product_id: c for c in db.query(CouponHistory).filter(CouponHistory.product_id.in_(asins))}
+        rows = db.query(*product_serializer.PRODUCT_COLUMNS).filter(Product.asin.in_(asins)).all()
+        data = (rows, product_serializer.load_offers(db, asins), product_serializer.load_latest_coupons(db, asins))
+
+        legacy = measure_serialize("旧实现", legacy_serialize, (products, legacy_offers, legacy_coupons),
+                                   args.page_size, args.rounds)
+        cold = measure_serialize("新实现(冷缓存)", new_serialize, data, args.page_size, args.rounds,
+                                 before_round=product_serializer.clear_json_cache)
+        warm = measure_serialize("新实现(热缓存)", new_serialize, data, args.page_size, args.rounds)
+        print(f"\n冷缓存加速 {legacy / cold:.1f}x，热缓存加速 {legacy / warm:.1f}x")
+
+        # 字段投影：每页响应体积和耗时（冷缓存）
+        print("\n字段投影（冷缓存）:")
+        full_size = len(new_page(db, args.page_size))
+        for name, projection in product_serializer.PROJECTIONS.items():
+            size = len(new_page(db, args.page_size, projection))
+            median = measure(name, lambda db, page_size: new_page(db, page_size, projection), db,
+                             args.page_size, args.rounds, before_round=product_serializer.clear_json_cache)
+            print(f"{'':<14} 响应 {size / 1024:8.1f} KB   (full的 {size / full_size * 100:.0f}%)")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
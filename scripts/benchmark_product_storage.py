@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+商品表存储基准测试脚本
+
+用ProductService批量写入生成的商品，比较大字段延迟加载和raw_data压缩前后：
+- 数据库文件大小（raw_data明文 vs 压缩，均已VACUUM）
+- 每页查询读取的字节数：
+  * 实体查询 db.query(Product)（统计、更新器、清理任务等使用），改动前读取全部列，改动后不读取延迟加载的大字段
+  * 列表接口按列查询（序列化模块的PRODUCT_COLUMNS），不读取raw_data
+
+用法示例:
+    python scripts/benchmark_product_storage.py
+    python scripts/benchmark_product_storage.py --products 5000 --page-size 100
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import zlib
+import argparse
+import tempfile
+from datetime import datetime, UTC
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from sqlalchemy import create_engine, desc, select
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Base, Product
+from models.product import ProductInfo, ProductOffer
+from models.product_serializer import PRODUCT_COLUMNS
+from models.product_service import ProductService
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='商品表存储基准测试')
+    parser.add_argument('--products', type=int, default=2000, help='生成的商品数量')
+    parser.add_argument('--page-size', type=int, default=100, help='每页商品数量')
+    return parser.parse_args()
+
+
+def make_product_info(i: int) -> ProductInfo:
+    """生成一个字段规模接近真实采集结果的商品"""
+    asin = f"B{i:09d}"
+    return ProductInfo(
+        asin=asin,
+        title=f"Wireless Noise Cancelling Headphones Model {i} with 40h Battery",
+        url=f"https://www.amazon.com/dp/{asin}",
+        brand=f"Brand {i % 50}",
+        main_image=f"https://m.media-amazon.com/images/I/{asin}.jpg",
+        timestamp=datetime.now(UTC),
+        binding="Electronics",
+        product_group="Home Theater",
+        categories=["Electronics", "Headphones", "Over-Ear", f"Series {i % 7}"],
+        browse_nodes=[{"id": str(172541 + n), "name": f"Node {n}", "is_root": n == 0} for n in range(10)],
+        # 亚马逊商品要点通常每条150~250字符
+        features=[
+            f"Feature {n} ({i}): industry-leading noise cancellation with two processors and eight microphones, "
+            "up to 40 hours of battery life with quick charging, and a soft fit leather headband for comfort"
+            for n in range(8)
+        ],
+        offers=[ProductOffer(condition="New", price=49.99, currency="USD", savings=20.0, savings_percentage=28,
+                             availability="In Stock", merchant_name="Amazon", is_prime=True)],
+    )
+
+
+def value_size(value) -> int:
+    """估算一个列值从SQLite读出的字节数"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, memoryview)):
+        return len(value)
+    return 8
+
+
+def bytes_read(engine, statement) -> int:
+    """执行语句并统计返回的所有列值字节数"""
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return sum(value_size(value) for row in conn.exec_driver_sql(sql) for value in row)
+
+
+def vacuum_size(db_file: str) -> int:
+    """VACUUM后返回数据库文件大小"""
+    conn = sqlite3.connect(db_file)
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(db_file)
+
+
+def decompress_raw_data(db_file: str):
+    """把raw_data还原为明文，模拟改动前的存储方式"""
+    conn = sqlite3.connect(db_file)
+    rows = conn.execute("SELECT id, raw_data FROM products WHERE typeof(raw_data) = 'blob'").fetchall()
+    conn.executemany("UPDATE products SET raw_data = ? WHERE id = ?",
+                     [(zlib.decompress(raw).decode("utf-8"), product_id) for product_id, raw in rows])
+    conn.commit()
+    conn.close()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "products.db")
+        legacy_file = os.path.join(tmp_dir, "products_legacy.db")
+
+        engine = create_engine(f"sqlite:///{db_file}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        print(f"写入 {args.products} 个商品...")
+        ProductService.bulk_create_or_update_products(
+            db, [make_product_info(i) for i in range(args.products)], source="discount", include_metadata=True
+        )
+        db.close()
+        engine.dispose()
+
+        shutil.copy(db_file, legacy_file)
+        decompress_raw_data(legacy_file)
+        new_size = vacuum_size(db_file)
+        legacy_size = vacuum_size(legacy_file)
+
+        print("\n数据库文件大小:")
+        print(f"  raw_data明文   {legacy_size / 1024:10.1f} KB")
+        print(f"  raw_data压缩   {new_size / 1024:10.1f} KB   ({(1 - new_size / legacy_size) * 100:.0f}% 减少)")
+
+        engine = create_engine(f"sqlite:///{db_file}")
+        legacy_engine = create_engine(f"sqlite:///{legacy_file}")
+        db = sessionmaker(bind=engine)()
+
+        all_columns = select(*Product.__table__.columns).order_by(desc(Product.timestamp)).limit(args.page_size)
+        entity_page = db.query(Product).order_by(desc(Product.timestamp)).limit(args.page_size)
+        list_page = db.query(*PRODUCT_COLUMNS).order_by(desc(Product.timestamp)).limit(args.page_size)
+
+        before = bytes_read(legacy_engine, all_columns)
+        entity = bytes_read(engine, entity_page.statement)
+        listed = bytes_read(engine, list_page.statement)
+
+        print(f"\n每页 {args.page_size} 条读取的字节数:")
+        print(f"  改动前 db.query(Product)      {before / 1024:10.1f} KB")
+        print(f"  改动后 db.query(Product)      {entity / 1024:10.1f} KB   ({(1 - entity / before) * 100:.0f}% 减少)")
+        print(f"  改动后 列表接口按列查询        {listed / 1024:10.1f} KB   ({(1 - listed / before) * 100:.0f}% 减少)")
+
+        db.close()
+        engine.dispose()
+        legacy_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
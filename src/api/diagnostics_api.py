@@ -0,0 +1,138 @@
+"""
+运行时诊断API接口（仅管理员）。
+提供限时栈采样分析、tracemalloc快照比较和对象类型统计，用于在不重启服务的情况下排查慢请求和内存增长。
+
+所有接口都需要请求头 X-Admin-Token 与环境变量 ADMIN_TOKEN 一致；未设置 ADMIN_TOKEN 时接口全部禁用。
+"""
+
+import asyncio
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from starlette.responses import PlainTextResponse
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, HTTP_409_CONFLICT
+
+from src.utils import diagnostics
+
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """校验管理员令牌"""
+    expected = os.environ.get("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="诊断接口未启用，请设置ADMIN_TOKEN")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="管理员令牌无效")
+
+
+# 创建路由器
+router = APIRouter(
+    prefix="/api/admin/diagnostics",
+    tags=["diagnostics"],
+    dependencies=[Depends(verify_admin_token)],
+    include_in_schema=False
+)
+
+
+@router.post("/profile")
+async def run_profile(
+    seconds: float = Query(10.0, gt=0, le=diagnostics.MAX_PROFILE_SECONDS, description="采样时长(秒)"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="采样间隔(毫秒)"),
+    include_idle: bool = Query(False, description="是否包含空闲等待的线程栈"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$", description="collapsed为火焰图折叠栈，json为函数排行")
+):
+    """
+    对API进程做限时栈采样分析
+
+    collapsed格式可直接交给 flamegraph.pl 或 speedscope 生成火焰图。
+    采样在线程池中进行，期间事件循环照常处理请求。
+    """
+    try:
+        result = await asyncio.to_thread(
+            diagnostics.profile, seconds=seconds, interval=interval_ms / 1000, include_idle=include_idle
+        )
+    except diagnostics.DiagnosticsBusyError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+
+    if format == "json":
+        return {
+            "samples": result["samples"],
+            "seconds": result["seconds"],
+            "functions": diagnostics.top_functions(result["stacks"], limit=50),
+        }
+    return PlainTextResponse(
+        diagnostics.format_collapsed(result["stacks"]),
+        headers={"Content-Disposition": f'attachment; filename="profile-{os.getpid()}.folded"'}
+    )
+
+
+@router.get("/tracemalloc")
+async def get_tracemalloc_status():
+    """tracemalloc状态和已保存的快照"""
+    return diagnostics.tracemalloc_status()
+
+
+@router.post("/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(25, ge=1, le=100, description="调用栈深度")):
+    """开启tracemalloc（开启后分配内存会变慢，排查结束后请停止）"""
+    started = diagnostics.start_tracemalloc(frames)
+    return {"started": started, **diagnostics.tracemalloc_status()}
+
+
+@router.post("/tracemalloc/stop")
+async def stop_tracemalloc():
+    """停止tracemalloc并丢弃快照"""
+    diagnostics.stop_tracemalloc()
+    return diagnostics.tracemalloc_status()
+
+
+@router.post("/tracemalloc/snapshots")
+async def take_snapshot(label: Optional[str] = Query(None, description="快照备注")):
+    """保存一个快照"""
+    try:
+        return await asyncio.to_thread(diagnostics.take_snapshot, label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/tracemalloc/top")
+async def top_allocations(
+    snapshot_id: Optional[int] = Query(None, description="快照ID，不指定时使用当前内存"),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """按代码位置统计占用最多的内存"""
+    try:
+        return await asyncio.to_thread(diagnostics.top_allocations, snapshot_id, key_type, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/tracemalloc/diff")
+async def compare_snapshots(
+    base_id: int = Query(..., description="基准快照ID"),
+    target_id: Optional[int] = Query(None, description="目标快照ID，不指定时与当前内存比较"),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """比较两个快照，按内存增长降序返回代码位置"""
+    try:
+        return await asyncio.to_thread(diagnostics.compare_snapshots, base_id, target_id, key_type, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/objects")
+async def object_types(
+    limit: int = Query(30, ge=1, le=500),
+    growth: bool = Query(False, description="只返回自上次统计以来数量增加的类型")
+):
+    """按类型统计对象数及与上次统计相比的增量"""
+    if growth:
+        return await asyncio.to_thread(diagnostics.object_type_growth, limit)
+    return await asyncio.to_thread(diagnostics.object_type_counts, limit)
@@ -161,22 +161,22 @@ async def get_log_statistics(
         )
         
         # 获取总体统计
-        logs = query.search(
+        total_logs = query.count(
             start_time=start_time,
             end_time=end_time
         )
-        error_logs = query.search(
+        error_logs = query.count(
             start_time=start_time,
             end_time=end_time,
             level="ERROR"
         )
         
         # 计算错误率
-        error_rate = (len(error_logs) / len(logs)) * 100 if logs else 0
+        error_rate = (error_logs / total_logs) * 100 if total_logs else 0
         
         return {
-            "total_logs": len(logs),
-            "error_logs": len(error_logs),
+            "total_logs": total_logs,
+            "error_logs": error_logs,
             "error_rate": error_rate,
             "error_distribution": error_dist,
             "anomalies": anomalies
@@ -11,7 +11,7 @@ import argparse
 from pathlib import Path
 import csv
 import asyncio
-from typing import List, Set
+from typing import Callable, List, Optional, Set
 import aiofiles
 import logging
 import os
@@ -24,6 +24,8 @@ if project_root not in sys.path:
 
 try:
     from src.utils.webdriver_manager import WebDriverConfig
+    from src.core.webdriver_pool import WebDriverPool, get_shared_pool
+    from src.core.card_extractor import extract_cards, get_scroll_metrics, track_round_trips
     from src.utils.logger_manager import (
         log_info, log_debug, log_warning, 
         log_error, log_success, log_progress,
@@ -105,11 +107,9 @@ def save_results(asins, filename, format='txt'):
         log_error(f"保存结果时出错: {str(e)}")
         raise
 
-def setup_driver(headless=True):
-    """设置Chrome浏览器选项"""
+def create_driver(headless=True):
+    """创建带有Deals页面专用选项的Chrome浏览器，供WebDriver池调用"""
     try:
-        log_section("初始化Chrome浏览器")
-        
         # 获取基础配置的options
         options = WebDriverConfig.setup_chrome_options(headless=headless)
         log_debug("Chrome基础选项配置完成")
@@ -137,9 +137,22 @@ def setup_driver(headless=True):
         
     except Exception as e:
         log_error(f"ChromeDriver初始化失败: {str(e)}")
-        WebDriverConfig.cleanup_chrome_processes()
         raise
 
+def get_driver_pool(headless=True) -> WebDriverPool:
+    """获取Deals爬虫共享的WebDriver池，保持一个预热的浏览器供下次爬取直接使用"""
+    return get_shared_pool("bestseller", headless=headless, driver_factory=create_driver,
+                           size=2, min_idle=1)
+
+def setup_driver(headless=True):
+    """从共享的WebDriver池租用浏览器"""
+    log_section("初始化Chrome浏览器")
+    driver = get_driver_pool(headless).get_driver()
+    if driver is None:
+        raise RuntimeError("从WebDriver池获取浏览器超时")
+    log_success("已从WebDriver池租用浏览器")
+    return driver
+
 def extract_asin_from_url(url):
     """从URL中提取ASIN"""
     try:
@@ -171,9 +184,7 @@ def scroll_page(driver, scroll_count):
     """智能滚动页面"""
     try:
         # 获取页面信息
-        window_height = driver.execute_script("return window.innerHeight;")
-        total_height = driver.execute_script("return document.body.scrollHeight;")
-        current_position = driver.execute_script("return window.pageYOffset;")
+        window_height, total_height, current_position = get_scroll_metrics(driver)
         
         log_debug(f"滚动状态 - 窗口高度: {window_height}px, 总高度: {total_height}px, 当前位置: {current_position}px")
         
@@ -224,12 +235,22 @@ def check_view_more_button(driver):
         pass  # 静默处理按钮未找到的情况
     return False
 
-async def crawl_deals(max_items: int = 100, timeout: int = 30, headless: bool = True) -> List[str]:
+async def crawl_deals(max_items: int = 100, timeout: int = 30, headless: bool = True,
+                      on_items: Optional[Callable[[List[str]], None]] = None) -> List[str]:
     """
     异步爬取Amazon Deals页面的商品ASIN
+    
+    Args:
+        max_items: 目标商品数量
+        timeout: 连续多少秒未发现新商品时结束
+        headless: 是否使用无头模式
+        on_items: 每次滚动发现新ASIN后的回调，用于边爬取边处理
     """
     start_time = time.time()
     driver = None
+    all_asins = []
+    scroll_count = 0
+    round_trips = None
     try:
         log_section("开始Amazon Deals爬取任务")
         log_info(f"配置信息:")
@@ -238,7 +259,6 @@ async def crawl_deals(max_items: int = 100, timeout: int = 30, headless: bool =
         log_info(f"  • 无头模式: {'是' if headless else '否'}")
         
         driver = setup_driver(headless=headless)
-        all_asins = []
         seen_asins = set()
         no_new_items_count = 0
         connection_retry_count = 0
@@ -258,83 +278,84 @@ async def crawl_deals(max_items: int = 100, timeout: int = 30, headless: bool =
             log_warning("未找到viewport容器，请检查页面结构")
             return all_asins
         
-        scroll_count = 0
         last_success_time = time.time()
         
-        while True:
-            scroll_count += 1
-            log_debug(f"执行第 {scroll_count} 次页面滚动")
-            
-            if time.time() - last_success_time > timeout:
-                log_warning(f"{timeout}秒内未发现新商品，结束爬取")
-                break
+        with track_round_trips(driver) as round_trips:
+            while True:
+                scroll_count += 1
+                log_debug(f"执行第 {scroll_count} 次页面滚动，累计WebDriver往返 {round_trips.count} 次")
             
-            if handle_connection_problem(driver):
-                connection_retry_count += 1
-                log_warning(f"网络连接问题，第 {connection_retry_count} 次重试")
-                if connection_retry_count >= 5:
-                    log_error("连接问题持续存在，终止爬取")
+                if time.time() - last_success_time > timeout:
+                    log_warning(f"{timeout}秒内未发现新商品，结束爬取")
                     break
-                continue
-            else:
-                connection_retry_count = 0
             
-            if not scroll_page(driver, scroll_count):
-                log_warning("页面滚动失败，尝试继续...")
-                time.sleep(1)
-                continue
+                if handle_connection_problem(driver):
+                    connection_retry_count += 1
+                    log_warning(f"网络连接问题，第 {connection_retry_count} 次重试")
+                    if connection_retry_count >= 5:
+                        log_error("连接问题持续存在，终止爬取")
+                        break
+                    continue
+                else:
+                    connection_retry_count = 0
             
-            previous_count = len(all_asins)
-            try:
-                product_cards = viewport_container.find_elements(
-                    By.CSS_SELECTOR, 
-                    'div[data-testid^="B"][class*="GridItem-module__container"]'
-                )
-                log_debug(f"本次滚动找到 {len(product_cards)} 个商品卡片")
+                if not scroll_page(driver, scroll_count):
+                    log_warning("页面滚动失败，尝试继续...")
+                    time.sleep(1)
+                    continue
+            
+                previous_count = len(all_asins)
+                try:
+                    # 一次往返取回所有商品卡片，去重在Python端完成
+                    product_cards = extract_cards(driver, root=viewport_container)
+                    log_debug(f"本次滚动找到 {len(product_cards)} 个商品卡片")
                 
-                for card in product_cards:
-                    if len(all_asins) >= max_items:
-                        log_success(f"已达到目标数量: {max_items} 个商品")
-                        return all_asins
+                    for card in product_cards:
+                        if len(all_asins) >= max_items:
+                            break
                     
-                    try:
-                        main_asin = card.get_attribute('data-testid')
+                        main_asin = card['asin']
                         if main_asin and main_asin not in seen_asins:
                             seen_asins.add(main_asin)
                             all_asins.append(main_asin)
                             if len(all_asins) % 10 == 0:
                                 log_progress(f"已采集 {len(all_asins)}/{max_items} 个商品 ({(len(all_asins)/max_items*100):.1f}%)")
-                    except Exception as e:
-                        log_error(f"获取商品ASIN失败: {str(e)}")
-                        continue
-            except Exception as e:
-                log_error(f"获取商品元素失败: {str(e)}")
-                continue
+                except Exception as e:
+                    log_error(f"获取商品元素失败: {str(e)}")
+                    continue
+                
+                # 立即交出本次滚动的新ASIN，无需等待整个爬取结束
+                if on_items and len(all_asins) > previous_count:
+                    on_items(all_asins[previous_count:])
+                
+                if len(all_asins) >= max_items:
+                    log_success(f"已达到目标数量: {max_items} 个商品")
+                    return all_asins
             
-            new_items = len(all_asins) - previous_count
-            if new_items > 0:
-                log_success(f"本次滚动新增 {new_items} 个商品")
-                last_success_time = time.time()
-                no_new_items_count = 0
-            else:
-                no_new_items_count += 1
-                if check_view_more_button(driver):
-                    log_success("发现并点击了'加载更多'按钮")
+                new_items = len(all_asins) - previous_count
+                if new_items > 0:
+                    log_success(f"本次滚动新增 {new_items} 个商品")
+                    last_success_time = time.time()
                     no_new_items_count = 0
-                    continue
+                else:
+                    no_new_items_count += 1
+                    if check_view_more_button(driver):
+                        log_success("发现并点击了'加载更多'按钮")
+                        no_new_items_count = 0
+                        continue
                     
-                if no_new_items_count >= 3:
-                    log_warning("连续3次未发现新商品，可能已到达页面底部")
-                    break
+                    if no_new_items_count >= 3:
+                        log_warning("连续3次未发现新商品，可能已到达页面底部")
+                        break
             
-            time.sleep(random.uniform(0.3, 0.5))
+                time.sleep(random.uniform(0.3, 0.5))
             
     except Exception as e:
         log_error(f"爬取过程中发生严重错误: {str(e)}")
     finally:
         if driver:
-            driver.quit()
-            log_debug("浏览器资源已释放")
+            get_driver_pool(headless).release_driver(driver, pages=1)
+            log_debug("浏览器已归还WebDriver池")
         
         end_time = time.time()
         duration = end_time - start_time
@@ -344,6 +365,8 @@ async def crawl_deals(max_items: int = 100, timeout: int = 30, headless: bool =
         log_success(f"  • 总耗时: {duration:.1f} 秒")
         log_success(f"  • 成功获取: {len(all_asins)} 个商品")
         log_success(f"  • 平均速度: {len(all_asins)/duration:.1f} 个/秒")
+        if round_trips is not None and scroll_count > 0:
+            log_success(f"  • WebDriver往返: {round_trips.count} 次 (平均每次滚动 {round_trips.count/scroll_count:.1f} 次)")
     
     return all_asins
 
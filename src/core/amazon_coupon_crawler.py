@@ -10,7 +10,7 @@ import re
 import argparse
 from pathlib import Path
 import csv
-from typing import Dict, List, Optional, TypedDict
+from typing import Callable, Dict, List, Optional, TypedDict
 from datetime import datetime, UTC
 import asyncio
 import aiofiles
@@ -27,6 +27,11 @@ if project_root not in sys.path:
 
 try:
     from src.utils.webdriver_manager import WebDriverConfig
+    from src.core.webdriver_pool import WebDriverPool, get_shared_pool
+    from src.core.card_extractor import (
+        CARD_SELECTOR, CardInfo, extract_cards, get_scroll_metrics,
+        parse_card_index, track_round_trips
+    )
     from src.utils.logger_manager import (
         log_info, log_debug, log_warning, 
         log_error, log_success, log_progress,
@@ -35,6 +40,11 @@ try:
     from src.utils.config_loader import config_loader
 except ImportError:
     from ..utils.webdriver_manager import WebDriverConfig
+    from .webdriver_pool import WebDriverPool, get_shared_pool
+    from .card_extractor import (
+        CARD_SELECTOR, CardInfo, extract_cards, get_scroll_metrics,
+        parse_card_index, track_round_trips
+    )
     from ..utils.logger_manager import (
         log_info, log_debug, log_warning, 
         log_error, log_success, log_progress,
@@ -51,6 +61,8 @@ class CrawlStats:
     duplicate_count: int = 0     # 重复商品数
     coupon_stats: dict = None    # 优惠券统计
     last_index: int = -1         # 最后处理的商品索引
+    scroll_count: int = 0        # 滚动次数
+    round_trips: int = 0         # WebDriver命令往返次数
     
     def __post_init__(self):
         # 确保start_time包含时区信息
@@ -67,6 +79,11 @@ class CrawlStats:
         """计算重复率"""
         return (self.duplicate_count / self.total_seen * 100) if self.total_seen > 0 else 0
     
+    @property
+    def round_trips_per_scroll(self) -> float:
+        """计算每次滚动的WebDriver往返次数"""
+        return (self.round_trips / self.scroll_count) if self.scroll_count > 0 else 0
+    
     def update_coupon_stats(self, coupon_type: str, value: float):
         """更新优惠券统计信息"""
         stats = self.coupon_stats[coupon_type]
@@ -107,13 +124,17 @@ def parse_arguments():
     parser.add_argument('--timeout', type=int, default=30, help='无新商品超时时间(秒)')
     return parser.parse_args()
 
+def get_driver_pool(headless=True) -> WebDriverPool:
+    """获取进程内共享的WebDriver池，池中保持预热的浏览器供下次爬取直接使用"""
+    return get_shared_pool(headless=headless)
+
 def setup_driver(headless=True):
-    """设置Chrome浏览器选项"""
-    try:
-        return WebDriverConfig.create_chrome_driver(headless=headless)
-    except Exception as e:
-        log_error(f"ChromeDriver初始化失败: {str(e)}")
-        raise
+    """从共享的WebDriver池租用浏览器"""
+    driver = get_driver_pool(headless).get_driver()
+    if driver is None:
+        log_error("ChromeDriver初始化失败: 从WebDriver池获取浏览器超时")
+        raise RuntimeError("从WebDriver池获取浏览器超时")
+    return driver
 
 def scroll_page(driver, scroll_count: int, last_index: int) -> bool:
     """智能滚动页面，基于商品索引优化滚动
@@ -128,9 +149,7 @@ def scroll_page(driver, scroll_count: int, last_index: int) -> bool:
     """
     try:
         # 获取页面信息
-        window_height = driver.execute_script("return window.innerHeight;")
-        total_height = driver.execute_script("return document.body.scrollHeight;")
-        current_position = driver.execute_script("return window.pageYOffset;")
+        window_height, total_height, current_position = get_scroll_metrics(driver)
         
         log_info(f"滚动 #{scroll_count} - 窗口高度: {window_height}px, 总高度: {total_height}px, 当前位置: {current_position}px")
         
@@ -292,37 +311,31 @@ def process_visible_products(
     seen_asins: set,
     stats: CrawlStats
 ) -> List[Dict]:
-    """处理当前可见的商品信息，并更新统计数据"""
+    """处理当前可见的商品信息，并更新统计数据
+    
+    所有卡片的ASIN、索引、可见性和优惠券文本通过extract_cards一次往返取回，
+    索引过滤和去重在Python端完成。
+    """
     products = []
     processed_in_view = set()
     
     try:
         # 等待商品卡片加载
         WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((
-                By.CSS_SELECTOR, 
-                'div[data-testid^="B"][class*="GridItem-module__container"]'
-            ))
+            EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR))
         )
         
-        # 获取当前视图中的所有商品卡片
-        cards = driver.find_elements(
-            By.CSS_SELECTOR,
-            'div[data-testid^="B"][class*="GridItem-module__container"]'
-        )
+        # 一次往返获取当前页面所有商品卡片
+        cards = extract_cards(driver)
         
         # 按data-test-index排序处理商品
         indexed_cards = []
         for card in cards:
-            if not card.is_displayed():
-                continue
-                
-            try:
-                index = int(card.get_attribute('data-test-index') or -1)
-                if index > stats.last_index:  # 只处理未处理过的索引
-                    indexed_cards.append((index, card))
-            except ValueError:
+            if not card['displayed']:
                 continue
+            index = parse_card_index(card)
+            if index > stats.last_index:  # 只处理未处理过的索引
+                indexed_cards.append((index, card))
         
         # 按索引排序
         indexed_cards.sort(key=lambda x: x[0])
@@ -331,172 +344,119 @@ def process_visible_products(
         stats.total_seen += len(indexed_cards)
         
         for index, card in indexed_cards:
-            try:
-                # 获取ASIN
-                asin = card.get_attribute('data-testid')
-                if not asin or asin in processed_in_view:
-                    continue
-                    
-                processed_in_view.add(asin)
+            asin = card['asin']
+            if not asin or asin in processed_in_view:
+                continue
+                
+            processed_in_view.add(asin)
+            
+            # 检查是否是重复的ASIN
+            if asin in seen_asins:
+                stats.duplicate_count += 1
+                log_debug(f"跳过重复商品: {asin}")
+                continue
+            
+            # 确保元素在视图中完全可见
+            if not card['fully_visible']:
+                log_debug(f"商品不完全可见，跳过: {asin}")
+                continue
+            
+            # 提取商品信息
+            product = extract_product_info(card)
+            if product:
+                seen_asins.add(asin)
+                stats.unique_count += 1
+                stats.last_index = index
                 
-                # 检查是否是重复的ASIN
-                if asin in seen_asins:
-                    stats.duplicate_count += 1
-                    log_debug(f"跳过重复商品: {asin}")
-                    continue
+                # 添加索引信息到商品数据
+                product['index'] = index
                 
-                # 确保元素在视图中完全可见
-                if not is_element_fully_visible(driver, card):
-                    log_debug(f"商品不完全可见，跳过: {asin}")
-                    continue
+                # 更新优惠券统计
+                coupon_info = product['coupon']
+                stats.update_coupon_stats(
+                    coupon_info['type'],
+                    coupon_info['value']
+                )
                 
-                # 提取商品信息
-                product = extract_product_info(card)
-                if product:
-                    seen_asins.add(asin)
-                    stats.unique_count += 1
-                    stats.last_index = index
-                    
-                    # 添加索引信息到商品数据
-                    product['index'] = index
-                    
-                    # 更新优惠券统计
-                    coupon_info = product['coupon']
-                    stats.update_coupon_stats(
-                        coupon_info['type'],
-                        coupon_info['value']
-                    )
-                    
-                    products.append(product)
-                    log_debug(f"成功处理商品: {asin} (索引: {index})")
-                    
-            except Exception as e:
-                log_error(f"处理商品卡片时出错: {str(e)}")
-                continue
+                products.append(product)
+                log_debug(f"成功处理商品: {asin} (索引: {index})")
                 
     except Exception as e:
         log_error(f"处理可见商品时出错: {str(e)}")
         
     return products
 
-def is_element_fully_visible(driver, element) -> bool:
-    """检查元素是否完全在视图中可见
-    
-    Args:
-        driver: WebDriver实例
-        element: 要检查的元素
-        
-    Returns:
-        bool: 元素是否完全可见
-    """
-    try:
-        # 获取元素和视窗的位置信息
-        viewport_height = driver.execute_script("return window.innerHeight")
-        element_top = element.location['y']
-        element_bottom = element_top + element.size['height']
-        current_scroll = driver.execute_script("return window.pageYOffset")
-        
-        # 检查元素是否完全在视图中
-        is_visible = (
-            element_top >= current_scroll and 
-            element_bottom <= current_scroll + viewport_height
-        )
-        
-        return is_visible
-    except Exception:
-        return False
-
-def extract_coupon_info(card_element) -> Optional[Dict]:
+def extract_coupon_info(coupon_text: Optional[str]) -> Optional[Dict]:
     """
-    从商品卡片中提取优惠券信息，支持多语言格式
+    解析商品卡片上的优惠券文本，支持多语言格式
     
     Args:
-        card_element: Selenium WebElement对象，表示商品卡片元素
+        coupon_text: 优惠券标记的文本，卡片没有优惠券时为None
         
     Returns:
         Dict: 包含优惠券类型和值的字典，如果没有优惠券则返回None
     """
-    try:
-        # 首先检查卡片是否包含优惠券标记
-        coupon_badge = card_element.find_element(By.CSS_SELECTOR, 'span[class*="CouponExperienceBadge-module__label"]')
-        if not coupon_badge:
-            return None
-            
-        log_debug("发现优惠券卡片")
+    coupon_text = (coupon_text or "").strip()
+    if not coupon_text:
+        return None
         
-        # 获取优惠券文本
-        coupon_text = coupon_badge.text.strip()
-        if not coupon_text:
-            return None
-            
-        log_success(f"成功找到优惠券: {coupon_text}")
+    log_success(f"成功找到优惠券: {coupon_text}")
+    
+    # 提取优惠券值和类型
+    # 处理百分比优惠券 (例如: "节省 20%" 或 "Save 20%")
+    percentage_match = re.search(r'(\d+)%', coupon_text)
+    if percentage_match:
+        value = float(percentage_match.group(1))
+        return {
+            "type": "percentage",
+            "value": value
+        }
         
-        # 提取优惠券值和类型
-        # 处理百分比优惠券 (例如: "节省 20%" 或 "Save 20%")
-        percentage_match = re.search(r'(\d+)%', coupon_text)
-        if percentage_match:
-            value = float(percentage_match.group(1))
+    # 处理固定金额优惠券 (例如: "节省 $30" 或 "Save $30" 或 "Save US$30")
+    # 移除所有空格，以便更好地匹配
+    normalized_text = coupon_text.replace(" ", "")
+    amount_match = re.search(r'(?:US)?\$(\d+(?:\.\d{2})?)', normalized_text)
+    if amount_match:
+        value = float(amount_match.group(1))
+        return {
+            "type": "fixed",
+            "value": value
+        }
+        
+    # 尝试匹配纯数字（针对某些特殊格式）
+    number_match = re.search(r'(?:Save|节省)\s*(\d+(?:\.\d{2})?)', coupon_text)
+    if number_match:
+        value = float(number_match.group(1))
+        # 如果文本中包含%，则认为是百分比优惠券
+        if "%" in coupon_text:
             return {
                 "type": "percentage",
                 "value": value
             }
-            
-        # 处理固定金额优惠券 (例如: "节省 $30" 或 "Save $30" 或 "Save US$30")
-        # 移除所有空格，以便更好地匹配
-        normalized_text = coupon_text.replace(" ", "")
-        amount_match = re.search(r'(?:US)?\$(\d+(?:\.\d{2})?)', normalized_text)
-        if amount_match:
-            value = float(amount_match.group(1))
+        else:
             return {
                 "type": "fixed",
                 "value": value
             }
-            
-        # 尝试匹配纯数字（针对某些特殊格式）
-        number_match = re.search(r'(?:Save|节省)\s*(\d+(?:\.\d{2})?)', coupon_text)
-        if number_match:
-            value = float(number_match.group(1))
-            # 如果文本中包含%，则认为是百分比优惠券
-            if "%" in coupon_text:
-                return {
-                    "type": "percentage",
-                    "value": value
-                }
-            else:
-                return {
-                    "type": "fixed",
-                    "value": value
-                }
-        
-        log_warning(f"无法解析优惠券格式: {coupon_text}")
+    
+    log_warning(f"无法解析优惠券格式: {coupon_text}")
+    return None
+
+def extract_product_info(card: CardInfo) -> Optional[Dict]:
+    """从卡片快照提取商品信息，没有商品链接或优惠券时返回None"""
+    if not card['url']:
         return None
         
-    except Exception as e:
-        log_error(f"提取优惠券信息时出错: {str(e)}")
-        log_error(f"原始文本: {coupon_text if 'coupon_text' in locals() else 'N/A'}")
+    # 获取优惠券信息
+    coupon = extract_coupon_info(card['coupon_text'])
+    if not coupon:
         return None
-
-def extract_product_info(card) -> Optional[Dict]:
-    """提取商品信息"""
-    try:
-        # 获取商品链接和ASIN
-        link_element = card.find_element(By.CSS_SELECTOR, 'a[href*="/dp/"]')
-        url = link_element.get_attribute('href')
-        asin = card.get_attribute('data-testid')
-        
-        # 获取优惠券信息
-        coupon = extract_coupon_info(card)
-        if not coupon:
-            return None
-            
-        return {
-            'asin': asin,
-            'url': url,
-            'coupon': coupon
-        }
         
-    except Exception:
-        return None
+    return {
+        'asin': card['asin'],
+        'url': card['url'],
+        'coupon': coupon
+    }
 
 class CouponInfo(TypedDict):
     type: str
@@ -568,9 +528,17 @@ async def save_coupon_results(
 async def crawl_coupon_deals(
     max_items: int,
     timeout: int,
-    headless: bool
+    headless: bool,
+    on_items: Optional[Callable[[List[Dict]], None]] = None
 ) -> tuple[List[Dict], CrawlStats]:
-    """爬取优惠券商品数据"""
+    """爬取优惠券商品数据
+    
+    Args:
+        max_items: 目标商品数量
+        timeout: 连续未发现新商品的最大次数
+        headless: 是否使用无头模式
+        on_items: 每次滚动发现新商品后的回调，用于边爬取边处理
+    """
     try:
         log_section("启动优惠券商品爬虫")
         stats = CrawlStats(start_time=datetime.now())
@@ -614,72 +582,79 @@ async def crawl_coupon_deals(
             scroll_count = 0
             last_scroll_position = -1
             
-            while len(products) < max_items:
-                scroll_count += 1
-                log_debug(f"执行第 {scroll_count} 次页面滚动")
+            with track_round_trips(driver) as round_trips:
+                while len(products) < max_items:
+                    scroll_count += 1
+                    stats.scroll_count = scroll_count
+                    stats.round_trips = round_trips.count
+                    log_debug(f"执行第 {scroll_count} 次页面滚动，累计WebDriver往返 {round_trips.count} 次")
                 
-                # 获取当前滚动位置
-                current_position = driver.execute_script("return window.pageYOffset;")
+                    # 获取当前滚动位置
+                    current_position = driver.execute_script("return window.pageYOffset;")
                 
-                # 检查是否真的滚动了
-                if current_position == last_scroll_position:
-                    consecutive_empty_scrolls += 1
-                    if consecutive_empty_scrolls >= 3:
-                        log_warning("连续3次未能滚动，可能已到达页面底部")
-                        break
-                else:
-                    consecutive_empty_scrolls = 0
-                    last_scroll_position = current_position
+                    # 检查是否真的滚动了
+                    if current_position == last_scroll_position:
+                        consecutive_empty_scrolls += 1
+                        if consecutive_empty_scrolls >= 3:
+                            log_warning("连续3次未能滚动，可能已到达页面底部")
+                            break
+                    else:
+                        consecutive_empty_scrolls = 0
+                        last_scroll_position = current_position
                 
-                # 处理当前可见商品
-                new_products = process_visible_products(driver, seen_asins, stats)
-                if new_products:
-                    remaining = max_items - len(products)
-                    products.extend(new_products[:remaining])
+                    # 处理当前可见商品
+                    new_products = process_visible_products(driver, seen_asins, stats)
+                    if new_products:
+                        remaining = max_items - len(products)
+                        products.extend(new_products[:remaining])
+                        if on_items:
+                            on_items(new_products[:remaining])
                     
-                    # 输出进度信息
-                    log_progress(f"已采集 {len(products)}/{max_items} 个商品 ({len(products)/max_items*100:.1f}%)")
-                    log_success(f"本次滚动新增 {len(new_products)} 个商品")
-                    log_debug(
-                        f"采集状态:\n"
-                        f"  • 唯一商品数: {stats.unique_count}\n"
-                        f"  • 重复率: {stats.duplicate_rate:.1f}%\n"
-                        f"  • 当前索引: {stats.last_index}"
-                    )
-                    
-                    if len(products) >= max_items:
-                        break
-                        
-                    last_products_count = len(products)
-                    no_new_items_count = 0
-                else:
-                    no_new_items_count += 1
-                    if no_new_items_count >= 3:
-                        log_warning(
-                            f"连续 {no_new_items_count} 次未发现新商品\n"
-                            f"  • 当前进度: {len(products)}/{max_items}\n"
+                        # 输出进度信息
+                        log_progress(f"已采集 {len(products)}/{max_items} 个商品 ({len(products)/max_items*100:.1f}%)")
+                        log_success(f"本次滚动新增 {len(new_products)} 个商品")
+                        log_debug(
+                            f"采集状态:\n"
+                            f"  • 唯一商品数: {stats.unique_count}\n"
                             f"  • 重复率: {stats.duplicate_rate:.1f}%\n"
                             f"  • 当前索引: {stats.last_index}"
                         )
-                        
-                        if no_new_items_count >= timeout:
-                            log_warning(f"{timeout}秒内未发现新商品，结束爬取")
+                    
+                        if len(products) >= max_items:
                             break
+                        
+                        last_products_count = len(products)
+                        no_new_items_count = 0
+                    else:
+                        no_new_items_count += 1
+                        if no_new_items_count >= 3:
+                            log_warning(
+                                f"连续 {no_new_items_count} 次未发现新商品\n"
+                                f"  • 当前进度: {len(products)}/{max_items}\n"
+                                f"  • 重复率: {stats.duplicate_rate:.1f}%\n"
+                                f"  • 当前索引: {stats.last_index}"
+                            )
+                        
+                            if no_new_items_count >= timeout:
+                                log_warning(f"{timeout}秒内未发现新商品，结束爬取")
+                                break
                 
-                # 滚动页面
-                if not scroll_page(driver, scroll_count, stats.last_index):
-                    log_warning("已到达页面底部，结束爬取")
-                    break
+                    # 滚动页面
+                    if not scroll_page(driver, scroll_count, stats.last_index):
+                        log_warning("已到达页面底部，结束爬取")
+                        break
                     
-                # 处理可能的连接问题
-                if handle_connection_problem(driver):
-                    continue
+                    # 处理可能的连接问题
+                    if handle_connection_problem(driver):
+                        continue
                     
-                # 动态调整等待时间
-                if stats.duplicate_rate > 30:
-                    time.sleep(1.5)  # 重复率高时，增加等待时间
-                else:
-                    time.sleep(0.5)
+                    # 动态调整等待时间
+                    if stats.duplicate_rate > 30:
+                        time.sleep(1.5)  # 重复率高时，增加等待时间
+                    else:
+                        time.sleep(0.5)
+            
+                stats.round_trips = round_trips.count
             
             # 输出最终统计信息
             log_section("爬取任务完成")
@@ -692,6 +667,8 @@ async def crawl_coupon_deals(
             log_success(f"  • 重复商品: {stats.duplicate_count} 个")
             log_success(f"  • 重复率: {stats.duplicate_rate:.1f}%")
             log_success(f"  • 处理速度: {stats.total_seen/duration:.1f} 个/秒")
+            log_success(f"  • 滚动次数: {stats.scroll_count} 次")
+            log_success(f"  • WebDriver往返: {stats.round_trips} 次 (平均每次滚动 {stats.round_trips_per_scroll:.1f} 次)")
             
             # 输出优惠券统计
             log_section("优惠券统计")
@@ -705,8 +682,8 @@ async def crawl_coupon_deals(
             return products[:max_items], stats
             
         finally:
-            driver.quit()
-            log_debug("浏览器资源已释放")
+            get_driver_pool(headless).release_driver(driver, pages=1)
+            log_debug("浏览器已归还WebDriver池")
             
     except Exception as e:
         log_error(f"爬取过程中发生错误: {str(e)}")
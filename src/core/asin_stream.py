@@ -0,0 +1,206 @@
+"""
+ASIN流式交接模块
+将同步的Selenium爬虫（在独立线程中运行）发现的商品按批次交给asyncio中的富化工作者，
+使浏览器滚动与PA-API/CJ请求重叠进行。
+
+主要功能：
+1. 爬虫每次滚动后通过回调提交新发现的商品，凑满一批立即交给消费者
+2. 有界队列提供背压：富化跟不上时爬虫线程等待，而不是无限堆积
+3. 固定数量的富化工作者并发消费批次，批次开始的间隔由所有工作者共享，
+   增加工作者不会提高API请求频率
+4. 爬虫中途出错时，已发现但未凑满一批的商品仍会被处理
+5. 在track_task上下文中运行时，向任务登记表上报发现、保存的批次和错误
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional
+
+from src.core.task_registry import EVENT_BATCH_SAVED, EVENT_ERROR, EVENT_ITEMS_FOUND, report_progress
+from src.utils.logger_manager import log_info, log_error, log_success
+
+# 爬虫回调：接收本次滚动新发现的商品列表
+ItemsCallback = Callable[[List[Any]], None]
+
+
+@dataclass
+class StreamStats:
+    """流式处理统计"""
+    items: int = 0                  # 爬虫提交的商品数
+    batches: int = 0                # 交给富化工作者的批次数
+    saved: int = 0                  # 富化后保存成功的商品数
+    first_batch_seconds: Optional[float] = None   # 从开始到第一批进入富化的耗时
+    crawl_seconds: float = 0.0      # 爬虫运行耗时
+    total_seconds: float = 0.0      # 整体耗时
+
+
+class _StreamClosed(Exception):
+    """消费端已停止，爬虫线程不再提交"""
+
+
+class AsinBatchStream:
+    """线程安全的批次交接器
+
+    爬虫线程调用emit()提交商品，凑满batch_size后阻塞地放入有界asyncio队列；
+    消费者在事件循环中从queue取批次，收到None表示结束。
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, batch_size: int = 10,
+                 max_pending_batches: int = 4):
+        """
+        初始化交接器
+
+        Args:
+            loop: 消费者所在的事件循环
+            batch_size: 每批商品数量
+            max_pending_batches: 队列中最多等待处理的批次数
+        """
+        self.loop = loop
+        self.batch_size = max(1, batch_size)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_pending_batches))
+        self.stats = StreamStats()
+        self._buffer: List[Any] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._started_at = time.monotonic()
+
+    def emit(self, items: List[Any]):
+        """提交新发现的商品（在爬虫线程中调用），凑满一批即交给消费者"""
+        with self._lock:
+            self._buffer.extend(items)
+            self.stats.items += len(items)
+            batches = []
+            while len(self._buffer) >= self.batch_size:
+                batches.append(self._buffer[:self.batch_size])
+                del self._buffer[:self.batch_size]
+        for batch in batches:
+            self._put(batch)
+
+    def flush(self):
+        """提交缓冲区中不足一批的剩余商品"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._put(batch)
+
+    def _put(self, batch: List[Any]):
+        """阻塞地把批次放入队列，队列满时等待消费者"""
+        self.stats.batches += 1
+        if self.stats.first_batch_seconds is None:
+            self.stats.first_batch_seconds = time.monotonic() - self._started_at
+        report_progress(EVENT_ITEMS_FOUND, count=len(batch), total=self.stats.items)
+        future = asyncio.run_coroutine_threadsafe(self.queue.put(batch), self.loop)
+        while True:
+            try:
+                future.result(timeout=1)
+                return
+            except concurrent.futures.TimeoutError:
+                if self._stopped.is_set():
+                    future.cancel()
+                    raise _StreamClosed()
+
+    def stop(self):
+        """消费端停止，让阻塞在emit中的爬虫线程退出"""
+        self._stopped.set()
+
+
+async def stream_enrich(
+    crawl: Callable[[ItemsCallback], Awaitable[Any]],
+    enrich: Callable[[List[Any], int], Awaitable[int]],
+    batch_size: int = 10,
+    workers: int = 2,
+    max_pending_batches: Optional[int] = None,
+    batch_interval: float = 0.0
+) -> StreamStats:
+    """
+    边爬取边富化
+
+    爬虫协程在独立线程的事件循环中运行（Selenium调用是阻塞的），
+    每次回调提交的商品按batch_size分批，由workers个富化工作者并发处理。
+
+    Args:
+        crawl: 接收回调并返回爬虫协程的函数，例如 lambda on_items: crawl_deals(..., on_items=on_items)
+        enrich: 处理一批商品的协程函数，参数为(批次, 批次序号)，返回保存成功的数量
+        batch_size: 每批商品数量
+        workers: 富化工作者数量
+        max_pending_batches: 队列中最多等待处理的批次数，默认为workers的两倍
+        batch_interval: 相邻两批开始富化的最小间隔（秒），所有工作者共享，用于控制API请求频率；
+            每批一次PA-API查询时，请求频率不超过 1/batch_interval 次每秒，与workers无关
+
+    Returns:
+        StreamStats: 流式处理统计
+    """
+    loop = asyncio.get_running_loop()
+    workers = max(1, workers)
+    stream = AsinBatchStream(loop, batch_size, max_pending_batches or workers * 2)
+    batch_counter = itertools.count()
+    start_time = time.monotonic()
+    pacing_lock = asyncio.Lock()
+    next_batch_at = 0.0
+
+    async def wait_for_turn():
+        """等到距上一批开始至少batch_interval秒，多个工作者按顺序排队"""
+        nonlocal next_batch_at
+        async with pacing_lock:
+            delay = next_batch_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_batch_at = time.monotonic() + batch_interval
+
+    def produce():
+        """在线程中运行爬虫，结束或出错时提交剩余商品"""
+        crawl_start = time.monotonic()
+        try:
+            asyncio.run(crawl(stream.emit))
+        except _StreamClosed:
+            log_info("富化已停止，结束爬虫数据提交")
+        except Exception as e:
+            log_error(f"爬虫运行出错，继续处理已发现的 {stream.stats.items} 个商品: {str(e)}")
+            report_progress(EVENT_ERROR, stage="crawl", message=str(e))
+        finally:
+            stream.stats.crawl_seconds = time.monotonic() - crawl_start
+            try:
+                stream.flush()
+            except _StreamClosed:
+                pass
+
+    async def consume(worker_id: int):
+        """富化工作者：逐批处理直到收到结束信号"""
+        while True:
+            batch = await stream.queue.get()
+            if batch is None:
+                return
+            if batch_interval > 0:
+                await wait_for_turn()
+            batch_index = next(batch_counter)
+            try:
+                saved = await enrich(batch, batch_index)
+                stream.stats.saved += saved
+                report_progress(EVENT_BATCH_SAVED, batch=batch_index + 1, items=len(batch), saved=saved)
+            except Exception as e:
+                log_error(f"富化工作者 {worker_id} 处理第 {batch_index + 1} 批时出错: {str(e)}")
+                report_progress(EVENT_ERROR, stage="enrich", batch=batch_index + 1, message=str(e))
+
+    consumers = [asyncio.create_task(consume(i + 1)) for i in range(workers)]
+    try:
+        await asyncio.to_thread(produce)
+        for _ in consumers:
+            await stream.queue.put(None)
+        await asyncio.gather(*consumers)
+    finally:
+        stream.stop()
+        for task in consumers:
+            task.cancel()
+
+    stats = stream.stats
+    stats.total_seconds = time.monotonic() - start_time
+    log_success(
+        f"流式采集完成: 发现 {stats.items} 个商品, {stats.batches} 批, 保存 {stats.saved} 个; "
+        f"爬取耗时 {stats.crawl_seconds:.1f} 秒, 总耗时 {stats.total_seconds:.1f} 秒"
+        + (f", 首批在 {stats.first_batch_seconds:.1f} 秒后开始富化" if stats.first_batch_seconds is not None else "")
+    )
+    return stats
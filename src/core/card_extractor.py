@@ -0,0 +1,129 @@
+"""
+商品卡片批量提取模块
+在浏览器端一次execute_script调用中提取所有商品卡片的ASIN、索引、可见性和优惠券文本，
+避免对每个卡片逐一调用is_displayed、get_attribute等WebDriver命令。
+
+主要功能：
+1. extract_cards: 一次往返返回当前页面所有商品卡片的快照
+2. get_scroll_metrics: 一次往返获取窗口高度、页面总高度和当前滚动位置
+3. track_round_trips: 统计一段代码中WebDriver命令的往返次数，用于评估优化效果
+
+已见ASIN和索引的去重逻辑仍由各爬虫在Python端处理。
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple, TypedDict
+
+# Deals页面的商品卡片
+CARD_SELECTOR = 'div[data-testid^="B"][class*="GridItem-module__container"]'
+# 卡片内的优惠券标记
+COUPON_BADGE_SELECTOR = 'span[class*="CouponExperienceBadge-module__label"]'
+
+EXTRACT_CARDS_SCRIPT = """
+const root = arguments[0] || document;
+const cardSelector = arguments[1];
+const badgeSelector = arguments[2];
+const viewportHeight = window.innerHeight;
+return Array.from(root.querySelectorAll(cardSelector)).map(function (card) {
+    const rect = card.getBoundingClientRect();
+    const style = window.getComputedStyle(card);
+    const displayed = rect.width > 0 && rect.height > 0
+        && style.display !== 'none' && style.visibility !== 'hidden';
+    const link = card.querySelector('a[href*="/dp/"]');
+    const badge = card.querySelector(badgeSelector);
+    return {
+        asin: card.getAttribute('data-testid'),
+        index: card.getAttribute('data-test-index'),
+        displayed: displayed,
+        fully_visible: displayed && rect.top >= 0 && rect.bottom <= viewportHeight,
+        url: link ? link.href : null,
+        coupon_text: badge ? (badge.innerText || badge.textContent || '').trim() : null
+    };
+});
+"""
+
+SCROLL_METRICS_SCRIPT = "return [window.innerHeight, document.body.scrollHeight, window.pageYOffset];"
+
+
+class CardInfo(TypedDict):
+    """浏览器端返回的商品卡片快照"""
+    asin: Optional[str]
+    index: Optional[str]         # data-test-index原始值，由调用方转换为整数
+    displayed: bool
+    fully_visible: bool          # 卡片是否完全位于当前视窗内
+    url: Optional[str]
+    coupon_text: Optional[str]   # 优惠券标记文本，没有优惠券时为None
+
+
+def extract_cards(driver, root=None, card_selector: str = CARD_SELECTOR,
+                  badge_selector: str = COUPON_BADGE_SELECTOR) -> List[CardInfo]:
+    """
+    一次往返提取所有商品卡片
+
+    Args:
+        driver: Selenium WebDriver对象
+        root: 查找范围的容器元素，为None时在整个文档中查找
+        card_selector: 商品卡片的CSS选择器
+        badge_selector: 优惠券标记的CSS选择器
+
+    Returns:
+        List[CardInfo]: 按文档顺序排列的卡片快照
+    """
+    return driver.execute_script(EXTRACT_CARDS_SCRIPT, root, card_selector, badge_selector) or []
+
+
+def get_scroll_metrics(driver) -> Tuple[int, int, int]:
+    """
+    一次往返获取滚动状态
+
+    Returns:
+        Tuple[int, int, int]: (窗口高度, 页面总高度, 当前滚动位置)
+    """
+    window_height, total_height, current_position = driver.execute_script(SCROLL_METRICS_SCRIPT)
+    return int(window_height), int(total_height), int(current_position)
+
+
+def parse_card_index(card: CardInfo) -> int:
+    """将卡片的data-test-index转换为整数，缺失或无效时返回-1"""
+    try:
+        return int(card.get('index') or -1)
+    except (TypeError, ValueError):
+        return -1
+
+
+class RoundTripCounter:
+    """WebDriver命令往返计数"""
+
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def track_round_trips(driver) -> Iterator[RoundTripCounter]:
+    """
+    统计上下文内WebDriver命令的往返次数
+
+    WebElement上的命令同样经由driver.execute发送，因此也会被计入。
+    退出时恢复原始方法，不影响池中被复用的driver。
+
+    示例：
+        with track_round_trips(driver) as round_trips:
+            cards = extract_cards(driver)
+        print(round_trips.count)
+    """
+    counter = RoundTripCounter()
+    original_execute = driver.execute
+    patched_before = 'execute' in vars(driver)
+
+    def counting_execute(driver_command, params=None):
+        counter.count += 1
+        return original_execute(driver_command, params)
+
+    driver.execute = counting_execute
+    try:
+        yield counter
+    finally:
+        if patched_before:
+            driver.execute = original_execute
+        else:
+            del driver.execute
@@ -357,43 +357,58 @@ class CJAPIClient:
         return {}
         
     @log_function_call
-    async def check_products_availability(self, asins: List[str]) -> Dict[str, bool]:
-        """检查多个商品在CJ平台的可用性
-        
+    async def get_products_details(self, asins: List[str]) -> Dict[str, Dict]:
+        """批量获取多个商品在CJ平台的详细信息
+
+        与check_products_availability使用同一次get_products查询，
+        返回的商品数据即为详情，无需再逐个调用get_product_details。
+
         Args:
             asins: ASIN列表
-            
+
         Returns:
-            Dict[str, bool]: 商品可用性字典，key为ASIN，value为是否可用
+            Dict[str, Dict]: 商品详情字典，key为ASIN，只包含CJ平台可用的商品
+
+        Raises:
+            Exception: 当API返回错误时抛出
         """
         # 由于API限制每次最多查询50个ASIN，需要分批处理
         result = {}
-        
+
         for i in range(0, len(asins), 50):
             batch_asins = asins[i:i+50]
-            self.logger.debug(f"批量检查商品可用性，批次: {i//50+1}，商品数: {len(batch_asins)}")
-            
+            self.logger.debug(f"批量获取商品详情，批次: {i//50+1}，商品数: {len(batch_asins)}")
+
             response = await self.get_products(asins=batch_asins)
-            
+
             if response.get("code") != 0:
                 self.logger.error(f"检查商品可用性失败: {response.get('message', '未知错误')}")
                 raise Exception(f"检查商品可用性失败: {response.get('message', '未知错误')}")
-                
-            # 初始化所有ASIN为不可用
-            for asin in batch_asins:
-                result[asin] = False
-                
-            # 设置API返回的ASIN为可用
+
+            # API返回的ASIN即为可用商品
             if response.get("data") and response["data"].get("list"):
                 for product in response["data"]["list"]:
                     if product.get("asin"):
-                        result[product["asin"]] = True
-                        
-            await asyncio.sleep(0.5)  # 避免API限流
-        
-        available_count = sum(1 for available in result.values() if available)
-        self.logger.info(f"商品可用性检查完成，总数: {len(asins)}，可用: {available_count}，不可用: {len(asins) - available_count}")
+                        result[product["asin"]] = product
+
+            if i + 50 < len(asins):
+                await asyncio.sleep(0.5)  # 避免API限流
+
+        self.logger.info(f"商品详情获取完成，总数: {len(asins)}，可用: {len(result)}，不可用: {len(asins) - len(result)}")
         return result
+
+    @log_function_call
+    async def check_products_availability(self, asins: List[str]) -> Dict[str, bool]:
+        """检查多个商品在CJ平台的可用性
+        
+        Args:
+            asins: ASIN列表
+            
+        Returns:
+            Dict[str, bool]: 商品可用性字典，key为ASIN，value为是否可用
+        """
+        details = await self.get_products_details(asins)
+        return {asin: asin in details for asin in asins}
         
     @log_function_call
     async def get_product_details(self, asin: str) -> Optional[Dict]:
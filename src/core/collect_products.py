@@ -5,13 +5,14 @@ import argparse
 import yaml
 from pathlib import Path
 from datetime import datetime
-from typing import List, Set, Dict, Any, Optional
+from typing import List, Set, Dict, Any, Optional, Tuple
 from enum import Enum
 import sys
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 from src.core.amazon_bestseller import crawl_deals
 from src.core.amazon_coupon_crawler import crawl_coupon_deals
+from src.core.asin_stream import stream_enrich
 from src.core.amazon_product_api import AmazonProductAPI
 from models.database import init_db, SessionLocal
 from models.product_service import ProductService
@@ -68,6 +69,7 @@ class Config:
         self.timeout = kwargs.get("timeout", 30)
         self.headless = kwargs.get("headless", True)
         self.crawler_types = kwargs.get("crawler_types", [CrawlerType.ALL])
+        self.enrich_workers = kwargs.get("enrich_workers", 2)
         
     @classmethod
     def from_file(cls, config_path: str) -> "Config":
@@ -101,7 +103,8 @@ class Config:
                 batch_size=config_data.get("batch_size", 10),
                 timeout=config_data.get("timeout", 30),
                 headless=config_data.get("headless", True),
-                crawler_types=crawler_types or [CrawlerType.ALL]
+                crawler_types=crawler_types or [CrawlerType.ALL],
+                enrich_workers=config_data.get("enrich_workers", 2)
             )
             
             log_success(f"成功加载配置: {config.__dict__}")
@@ -123,9 +126,55 @@ class Config:
             batch_size=args.batch_size,
             timeout=args.timeout,
             headless=not args.no_headless,
-            crawler_types=crawler_types or [CrawlerType.ALL]
+            crawler_types=crawler_types or [CrawlerType.ALL],
+            enrich_workers=args.enrich_workers
         )
 
+# 同时向CJ平台发起请求的批次数上限
+CJ_MAX_CONCURRENT_BATCHES = 2
+# CJ一次最多生成10个推广链接
+CJ_LINK_BATCH_SIZE = 10
+
+async def fetch_cj_data(
+    cj_client: CJAPIClient,
+    batch_asins: List[str],
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """
+    批量获取一批商品的CJ详情和推广链接
+
+    可用性查询的响应直接作为商品详情使用，推广链接按10个一组批量生成，
+    每批商品的CJ请求次数与商品数量无关。
+
+    Args:
+        cj_client: CJ API客户端
+        batch_asins: ASIN列表
+        semaphore: 限制同时访问CJ平台的批次数，为None时不限制
+
+    Returns:
+        Tuple[Dict[str, Dict], Dict[str, str]]: (CJ可用商品的详情, 推广链接)，key均为ASIN
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)
+
+    async with semaphore:
+        log_progress(f"正在检查CJ平台可用性: {batch_asins}")
+        cj_details = await cj_client.get_products_details(batch_asins)
+        log_progress(f"CJ平台可用商品数量: {len(cj_details)}/{len(batch_asins)}")
+
+        cj_links = {}
+        cj_asins = [asin for asin in batch_asins if asin in cj_details]
+        for i in range(0, len(cj_asins), CJ_LINK_BATCH_SIZE):
+            cj_links.update(await cj_client.batch_generate_product_links(cj_asins[i:i + CJ_LINK_BATCH_SIZE]))
+
+    missing_links = [asin for asin in cj_asins if asin not in cj_links]
+    if missing_links:
+        log_warning(f"以下CJ商品未能生成推广链接，使用默认链接: {missing_links}")
+        for asin in missing_links:
+            cj_links[asin] = f"https://www.amazon.com/dp/{asin}?tag=default"
+
+    return cj_details, cj_links
+
 async def process_products_batch(
     api: AmazonProductAPI,
     cj_client: CJAPIClient,
@@ -134,7 +183,8 @@ async def process_products_batch(
     total_batches: int,
     coupon_info: Optional[Dict] = None,
     max_retries: int = 3,  # 最大重试次数
-    retry_delay: float = 2.0  # 重试延迟（秒）
+    retry_delay: float = 2.0,  # 重试延迟（秒）
+    cj_semaphore: Optional[asyncio.Semaphore] = None  # 多个批次共享的CJ并发限制
 ) -> int:
     """处理一批产品数据"""
     for retry in range(max_retries):
@@ -143,14 +193,10 @@ async def process_products_batch(
             if retry > 0:
                 log_info(f"第 {retry} 次重试...")
             
-            # 首先检查CJ平台的可用性
-            log_progress(f"正在检查CJ平台可用性: {batch_asins}")
-            cj_availability = await cj_client.check_products_availability(batch_asins)
-            available_count = sum(1 for v in cj_availability.values() if v)
-            log_progress(f"CJ平台可用商品数量: {available_count}/{len(batch_asins)}")
-            
-            cj_asins = [asin for asin, available in cj_availability.items() if available]
-            if available_count > 0:
+            # 首先批量获取CJ平台的商品详情和推广链接
+            cj_details, cj_links = await fetch_cj_data(cj_client, batch_asins, cj_semaphore)
+            cj_asins = list(cj_details)
+            if cj_asins:
                 log_info(f"CJ平台可用商品: {cj_asins}")
             
             products = []
@@ -190,14 +236,10 @@ async def process_products_batch(
                         try:
                             log_progress(f"正在处理CJ商品数据: {product.asin}")
                             
-                            # 获取CJ商品详情
-                            cj_product = await cj_client.get_product_details(product.asin)
+                            # 可用性查询返回的数据即为CJ商品详情
+                            cj_product = cj_details.get(product.asin)
                             if cj_product and isinstance(cj_product, dict):
-                                log_success(f"成功获取CJ商品详情: {product.asin}")
-                                
-                                # 生成CJ推广链接
-                                cj_link = await cj_client.generate_product_link(product.asin)
-                                log_success(f"成功生成CJ推广链接: {product.asin}")
+                                cj_link = cj_links[product.asin]
                                 
                                 # 整合CJ数据到product对象
                                 if not hasattr(product, 'offers') or not product.offers:
@@ -311,49 +353,50 @@ async def crawl_bestseller_products(
     max_items: int,
     batch_size: int,
     timeout: int,
-    headless: bool
+    headless: bool,
+    enrich_workers: int = 2
 ) -> int:
-    """爬取畅销商品数据"""
+    """爬取畅销商品数据，边滚动边把发现的ASIN分批交给富化工作者"""
     try:
         log_info("开始爬取畅销商品ASIN...")
-        asins = await crawl_deals(
-            max_items=max_items,
-            timeout=timeout,
-            headless=headless
-        )
-        
-        if not asins:
-            log_warning("未获取到任何畅销商品ASIN")
-            return 0
-            
-        log_success(f"成功获取 {len(asins)} 个畅销商品ASIN")
         
         # 初始化CJ客户端
         cj_client = CJAPIClient()
+        batch_size = min(batch_size, 10)  # PA-API一次最多查询10个ASIN
+        total_batches = (max_items + batch_size - 1) // batch_size
+        cj_semaphore = asyncio.Semaphore(CJ_MAX_CONCURRENT_BATCHES)
         
-        # 分批处理ASIN
-        total_success = 0
-        asin_list = list(asins)
-        total_batches = (len(asin_list) + batch_size - 1) // batch_size
+        async def enrich(batch_asins: List[str], batch_index: int) -> int:
+            return await process_products_batch(
+                api,
+                cj_client,
+                batch_asins,
+                batch_index,
+                total_batches,
+                cj_semaphore=cj_semaphore
+            )
         
         # 使用异步上下文管理器确保会话正确关闭
         async with api:
-            for i in range(0, len(asin_list), batch_size):
-                batch_asins = asin_list[i:i + batch_size]
-                success_count = await process_products_batch(
-                    api,
-                    cj_client,
-                    batch_asins,
-                    i // batch_size,
-                    total_batches
-                )
-                total_success += success_count
-                
-                # 增加批次间的延迟
-                if i + batch_size < len(asin_list):
-                    await asyncio.sleep(5)  # 增加到5秒延迟
-                
-        return total_success
+            stats = await stream_enrich(
+                lambda on_items: crawl_deals(
+                    max_items=max_items,
+                    timeout=timeout,
+                    headless=headless,
+                    on_items=on_items
+                ),
+                enrich,
+                batch_size=batch_size,
+                workers=enrich_workers,
+                batch_interval=5  # 所有工作者共享，PA-API请求不超过每5秒1次
+            )
+        
+        if stats.items == 0:
+            log_warning("未获取到任何畅销商品ASIN")
+            return 0
+            
+        log_success(f"成功获取 {stats.items} 个畅销商品ASIN")
+        return stats.saved
         
     except Exception as e:
         log_error(f"畅销商品爬取任务出错: {str(e)}")
@@ -364,64 +407,58 @@ async def crawl_coupon_products(
     max_items: int,
     batch_size: int,
     timeout: int,
-    headless: bool
+    headless: bool,
+    enrich_workers: int = 2
 ) -> int:
-    """爬取优惠券商品数据"""
+    """爬取优惠券商品数据，边滚动边把发现的商品分批交给富化工作者"""
     try:
         log_info("开始爬取优惠券商品...")
-        results, stats = await crawl_coupon_deals(
-            max_items=max_items,
-            timeout=timeout,
-            headless=headless
-        )
-        
-        if not results:
-            log_warning("未获取到任何优惠券商品")
-            return 0
-            
-        log_success(f"成功获取 {len(results)} 个优惠券商品")
         
         # 初始化CJ客户端
         cj_client = CJAPIClient()
+        batch_size = min(batch_size, 10)  # PA-API一次最多查询10个ASIN
+        total_batches = (max_items + batch_size - 1) // batch_size
+        cj_semaphore = asyncio.Semaphore(CJ_MAX_CONCURRENT_BATCHES)
         
-        # 提取ASIN列表和优惠券信息
-        asins = []
-        coupon_info = {}
-        for item in results:
-            asin = item['asin']
-            asins.append(asin)
-            if 'coupon' in item and item['coupon']:
-                coupon_info[asin] = item['coupon']
-        
-        total_success = 0
-        total_batches = (len(asins) + batch_size - 1) // batch_size
+        async def enrich(batch_items: List[Dict], batch_index: int) -> int:
+            # 提取ASIN列表和该批次的优惠券信息
+            batch_asins = [item['asin'] for item in batch_items]
+            batch_coupon_info = {
+                item['asin']: item['coupon']
+                for item in batch_items
+                if item.get('coupon')
+            }
+            return await process_products_batch(
+                api,
+                cj_client,
+                batch_asins,
+                batch_index,
+                total_batches,
+                batch_coupon_info,  # 传递优惠券信息
+                cj_semaphore=cj_semaphore
+            )
         
         # 使用异步上下文管理器
         async with api:
-            # 分批处理
-            for i in range(0, len(asins), batch_size):
-                batch_asins = asins[i:i + batch_size]
-                # 为每个批次提取相应的优惠券信息
-                batch_coupon_info = {
-                    asin: coupon_info[asin]
-                    for asin in batch_asins
-                    if asin in coupon_info
-                }
-                
-                success_count = await process_products_batch(
-                    api,
-                    cj_client,
-                    batch_asins,
-                    i // batch_size,
-                    total_batches,
-                    batch_coupon_info  # 传递优惠券信息
-                )
-                total_success += success_count
-                
-                if i + batch_size < len(asins):
-                    await asyncio.sleep(1)  # 避免API限制
-                
-        return total_success
+            stats = await stream_enrich(
+                lambda on_items: crawl_coupon_deals(
+                    max_items=max_items,
+                    timeout=timeout,
+                    headless=headless,
+                    on_items=on_items
+                ),
+                enrich,
+                batch_size=batch_size,
+                workers=enrich_workers,
+                batch_interval=1  # 所有工作者共享，PA-API请求不超过每秒1次
+            )
+        
+        if stats.items == 0:
+            log_warning("未获取到任何优惠券商品")
+            return 0
+            
+        log_success(f"成功获取 {stats.items} 个优惠券商品")
+        return stats.saved
         
     except Exception as e:
         log_error(f"优惠券商品爬取任务出错: {str(e)}")
@@ -439,6 +476,7 @@ async def collect_products(config: Config) -> None:
     log_info(f"  • 爬虫类型: {[t.value for t in config.crawler_types]}")
     log_info(f"  • 目标数量: 每类 {config.max_items} 个商品")
     log_info(f"  • 批处理大小: {config.batch_size} 个商品/批次")
+    log_info(f"  • 富化工作者: {config.enrich_workers} 个")
     log_info(f"  • 超时时间: {config.timeout} 秒")
     log_info(f"  • 无头模式: {'是' if config.headless else '否'}")
     
@@ -480,7 +518,8 @@ async def collect_products(config: Config) -> None:
                     config.max_items, 
                     config.batch_size, 
                     config.timeout, 
-                    config.headless
+                    config.headless,
+                    enrich_workers=config.enrich_workers
                 )
             )
             
@@ -492,7 +531,8 @@ async def collect_products(config: Config) -> None:
                     config.max_items, 
                     config.batch_size, 
                     config.timeout, 
-                    config.headless
+                    config.headless,
+                    enrich_workers=config.enrich_workers
                 )
             )
         
@@ -559,6 +599,13 @@ def parse_args() -> argparse.Namespace:
         help="爬虫超时时间(秒)"
     )
     
+    parser.add_argument(
+        "--enrich-workers",
+        type=int,
+        default=2,
+        help="并发处理PA-API/CJ富化批次的工作者数量（批次间隔共享，不提高PA-API请求频率）"
+    )
+    
     parser.add_argument(
         "--no-headless",
         action="store_true",
@@ -0,0 +1,259 @@
+"""
+HTTP优先的优惠券详情抓取模块
+该模块使用连接池化的aiohttp下载商品页面，并用lxml解析优惠券区块，
+只有在页面需要JavaScript渲染或出现验证码时才回退到WebDriverPool中的浏览器。
+
+主要功能：
+1. 复用同一个aiohttp会话和连接池下载商品详情页
+2. 使用coupon_parser解析优惠券类型、金额、有效期和条款
+3. 检测验证码页面和需要JavaScript渲染的页面
+4. 从WebDriverPool租用浏览器作为回退方案
+5. 为多线程抓取器提供同步调用接口
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple, List
+
+import aiohttp
+
+# 添加项目根目录到Python路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.utils.webdriver_manager import WebDriverConfig
+from src.core.coupon_parser import CouponInfo, to_document, is_captcha_page, needs_javascript, parse_coupon
+from src.utils.log_config import get_logger
+
+logger = get_logger("CouponFetcher")
+
+
+@dataclass
+class CouponFetchResult:
+    """单个ASIN的抓取结果"""
+    asin: str
+    coupon_type: Optional[str] = None
+    coupon_value: Optional[float] = None
+    expiration_date: Optional[datetime] = None
+    terms: Optional[str] = None
+    source: str = "http"          # 结果来源: http 或 browser
+    captcha: bool = False         # 回退后仍然是验证码页面
+    error: Optional[str] = None   # 下载或解析失败的原因
+
+    @property
+    def ok(self) -> bool:
+        """是否成功获取到可解析的页面"""
+        return not self.captcha and self.error is None
+
+    def as_tuple(self) -> CouponInfo:
+        """返回与_extract_coupon_info相同格式的元组"""
+        return self.coupon_type, self.coupon_value, self.expiration_date, self.terms
+
+
+class CouponFetcher:
+    """
+    HTTP优先的优惠券详情抓取器
+
+    所有请求共享一个aiohttp会话和连接池；遇到验证码或需要JavaScript的页面时，
+    从WebDriverPool租用浏览器重新加载页面。既可以在asyncio中使用，也可以通过
+    start()/fetch_sync()在工作线程中使用。
+
+    示例：
+        async with CouponFetcher(driver_pool=pool) as fetcher:
+            result = await fetcher.fetch("B0XXXXXXX")
+    """
+
+    def __init__(self, driver_pool=None, base_url: str = "https://www.amazon.com",
+                 max_connections: int = 8, timeout: float = 20.0,
+                 browser_wait: Tuple[float, float] = (1.0, 3.0)):
+        """
+        初始化抓取器
+
+        Args:
+            driver_pool: 回退时使用的WebDriverPool实例，为None时不回退
+            base_url: 商品页面的基础URL
+            max_connections: 连接池最大连接数
+            timeout: 单次请求超时时间（秒）
+            browser_wait: 浏览器回退加载页面后的随机等待区间（秒）
+        """
+        self.driver_pool = driver_pool
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.browser_wait = browser_wait
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self.stats = {'http': 0, 'browser': 0, 'captcha': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def open(self):
+        """创建共享的aiohttp会话"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={
+                    "User-Agent": random.choice(WebDriverConfig.USER_AGENTS),
+                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                    "Accept-Language": "en-US,en;q=0.9",
+                }
+            )
+
+    async def aclose(self):
+        """关闭aiohttp会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def product_url(self, asin: str) -> str:
+        """生成商品详情页URL"""
+        return f"{self.base_url}/dp/{asin}?th=1"
+
+    async def _download(self, asin: str) -> str:
+        """下载商品详情页源码"""
+        await self.open()
+        async with self._session.get(self.product_url(asin)) as response:
+            if response.status == 503:
+                # 亚马逊在限流时返回503并附带验证码页面
+                return await response.text()
+            response.raise_for_status()
+            return await response.text()
+
+    def _fetch_with_browser(self, asin: str) -> CouponFetchResult:
+        """从WebDriverPool租用浏览器加载页面并解析"""
+        driver = self.driver_pool.get_driver()
+        if driver is None:
+            return CouponFetchResult(asin=asin, source="browser", error="获取WebDriver超时")
+        try:
+            driver.get(self.product_url(asin))
+            time.sleep(random.uniform(*self.browser_wait))
+            html = driver.page_source
+        except Exception as e:
+            return CouponFetchResult(asin=asin, source="browser", error=str(e))
+        finally:
+            self.driver_pool.release_driver(driver, pages=1)
+
+        if is_captcha_page(html):
+            self._count('captcha')
+            return CouponFetchResult(asin=asin, source="browser", captcha=True)
+        self._count('browser')
+        return CouponFetchResult(asin, *parse_coupon(html), source="browser")
+
+    async def fetch(self, asin: str) -> CouponFetchResult:
+        """
+        抓取单个商品的优惠券信息
+
+        Args:
+            asin: 商品ASIN
+
+        Returns:
+            CouponFetchResult: 抓取结果
+        """
+        reason = None
+        try:
+            html = await self._download(asin)
+            if is_captcha_page(html):
+                reason = "captcha"
+            else:
+                # 页面只解析一次，结构检查和优惠券提取共用同一个文档
+                doc = to_document(html)
+                if doc is None or needs_javascript(doc):
+                    reason = "javascript"
+                else:
+                    self._count('http')
+                    return CouponFetchResult(asin, *parse_coupon(doc), source="http")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            reason = f"http_error: {e}"
+
+        logger.debug("商品 {} 的HTTP抓取需要回退: {}", asin, reason)
+        if self.driver_pool is None:
+            if reason == "captcha":
+                self._count('captcha')
+                return CouponFetchResult(asin=asin, captcha=True)
+            self._count('errors')
+            return CouponFetchResult(asin=asin, error=reason)
+
+        return await asyncio.to_thread(self._fetch_with_browser, asin)
+
+    async def fetch_many(self, asins: List[str], concurrency: int = 4) -> List[CouponFetchResult]:
+        """
+        并发抓取多个商品的优惠券信息
+
+        Args:
+            asins: 商品ASIN列表
+            concurrency: 最大并发请求数
+
+        Returns:
+            List[CouponFetchResult]: 与输入顺序一致的抓取结果
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _bounded(asin):
+            async with semaphore:
+                return await self.fetch(asin)
+
+        return await asyncio.gather(*(_bounded(asin) for asin in asins))
+
+    def start(self):
+        """在后台线程中启动事件循环，供多个工作线程共享连接池"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever, name="CouponFetcherLoop", daemon=True
+        )
+        self._loop_thread.start()
+        asyncio.run_coroutine_threadsafe(self.open(), self._loop).result()
+        logger.info("HTTP抓取引擎已启动，连接池大小: {}", self.max_connections)
+
+    def fetch_sync(self, asin: str, timeout: Optional[float] = None) -> CouponFetchResult:
+        """
+        在工作线程中同步抓取单个商品（需要先调用start）
+
+        Args:
+            asin: 商品ASIN
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            CouponFetchResult: 抓取结果
+        """
+        if self._loop is None:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(self.fetch(asin), self._loop)
+        return future.result(timeout)
+
+    def close(self):
+        """关闭会话并停止后台事件循环"""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+        self._loop_thread = None
+        logger.info("HTTP抓取引擎已关闭，统计: {}", self.stats)
@@ -0,0 +1,287 @@
+"""
+优惠券信息解析模块
+该模块从商品详情页源码或已解析的DOM快照中提取优惠券信息，
+供Selenium抓取器（CouponScraper、CouponScraperWorker）和HTTP抓取引擎共用。
+
+主要功能：
+1. 页面只解析一次，所有XPath和正则表达式在模块加载时预编译
+2. 提取优惠券类型、金额、有效期和条款 (type, value, expiration, terms)
+3. 识别验证码页面和需要JavaScript渲染的页面
+"""
+
+import re
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+import lxml.html
+from lxml import etree
+from dateutil import parser as date_parser
+
+CouponInfo = Tuple[Optional[str], Optional[float], Optional[datetime], Optional[str]]
+PageSource = Union[str, bytes, lxml.html.HtmlElement]
+
+EMPTY_RESULT: CouponInfo = (None, None, None, None)
+
+# 这些标签中的文本对用户不可见，不参与匹配
+SKIP_TAGS = frozenset(('script', 'style', 'noscript', 'template'))
+
+# 优惠券区块XPath，按优先级排列；命中后只要文本中有金额即可
+COUPON_XPATHS = tuple(etree.XPath(xpath) for xpath in (
+    "//div[@id='promoPriceBlockMessage_feature_div']//span[@class='a-size-base a-color-success']",
+    "//div[@id='promoPriceBlockMessage_feature_div']//div[@class='a-box a-alert-inline a-alert-inline-success a-text-bold']//div[@class='a-alert-content']",
+    "//div[contains(@id, 'coupon')]//span[contains(@class, 'a-color-success')]",
+    "//div[contains(@id, 'promotion')]//span[contains(@class, 'promotion-message')]",
+    "//div[@id='buybox']//span[contains(text(), 'coupon')]",
+    "//div[@id='promoPriceBlockMessage']//span[contains(@class, 'promotion')]",
+    "//div[contains(@class, 'coupon-text')]",
+    "//div[contains(@id, 'dealPrice')]//span[contains(text(), '%') or contains(text(), 'off')]",
+    "//*[contains(text(), 'Apply $') and contains(text(), 'coupon')]",
+    "//*[contains(text(), 'Apply') and contains(text(), '%') and contains(text(), 'coupon')]",
+    "//span[contains(@class, 'couponBadge')]",
+    "//div[contains(@class, 'promotions')]//span[contains(text(), 'coupon')]",
+    "//div[contains(@class, 'applyPromotions')]",
+    "//div[@id='corePrice_desktop']//span[contains(text(), 'coupon')]",
+))
+
+# 兜底XPath，文本中必须出现coupon关键词才会采用
+FALLBACK_XPATHS = tuple(etree.XPath(xpath) for xpath in (
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' couponBadge ')]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' promoPriceBlockMessage ')]",
+    "//label[starts-with(@for, 'checkbox')]",
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' a-color-success ')]",
+    "//*[contains(text(), 'coupon') or contains(text(), 'Coupon')]",
+))
+
+# 页面内嵌的条款弹窗内容；通用弹窗需要包含条款关键词才会采用
+TERMS_XPATHS = (
+    (etree.XPath("//div[contains(@id, 'promo_tncPage_')]"), False),
+    (etree.XPath("//div[contains(@id, 'promo_tnc_popup_container_')]"), False),
+    (etree.XPath("//div[contains(@class, 'a-popover-content')]"), True),
+)
+EXPIRATION_XPATH = etree.XPath("//div[contains(@class, 'expiration') or contains(@id, 'expiration')]")
+
+# 正常渲染的商品详情页中一定存在的元素，缺失时说明页面需要JavaScript
+PRODUCT_PAGE_XPATH = etree.XPath("//*[@id='productTitle' or @id='dp-container' or @id='dp']")
+CAPTCHA_ELEMENT_XPATH = etree.XPath("//*[@id='captchacharacters'] | //img[contains(@src, 'captcha')]")
+
+# 验证码页面特征文本
+CAPTCHA_TEXTS = (
+    "enter the characters you see below",
+    "type the characters you see in this image",
+    "sorry, we just need to make sure you're not a robot",
+    "captcha",
+    "bot check"
+)
+
+# 金额和百分比正则表达式
+APPLY_COUPON_RE = re.compile(r'apply\s+(?:\$\s*(\d+(?:\.\d+)?)|(\d+(?:\.\d+)?)\s*%)\s+coupon', re.IGNORECASE)
+PERCENTAGE_AMOUNT_RE = re.compile(r'(?:save|get|take)?\s*(\d+(?:\.\d{1,2})?)\s*(?:%|percent|percentage)', re.IGNORECASE)
+FIXED_AMOUNT_RE = re.compile(r'(?:[\$\£\€])?(\d+(?:\.\d{1,2})?)\s*(?:off|discount|save|coupon)', re.IGNORECASE)
+DOLLAR_RE = re.compile(r'\$\s*(\d+(?:\.\d+)?)')
+PERCENTAGE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+KEYWORD_RE = re.compile(r'coupon|off|save', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+# 有效期正则表达式
+DATE_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'Coupon\s+Expiry\s+Date\s*:?\s*(\w+\s+\d{1,2},?\s+\d{4})',         # Coupon Expiry Date: April 21, 2025
+    r'(?:coupon|offer)\s+expires\s+(?:on)?\s*(\w+\s+\d{1,2},?\s+\d{4})',  # coupon expires on April 21, 2025
+    r'Valid\s+through\s+(\w+\s+\d{1,2},?\s+\d{4})',                       # Valid through May 31, 2024
+    r'Promotion\s+(?:ends|expires)\s+(?:on)?\s*(\w+\s+\d{1,2},?\s+\d{4})',  # Promotion ends on April 21, 2025
+    r'(?:coupon|offer)\s+expires\s+(?:on)?\s*(\d{1,2}/\d{1,2}/\d{2,4})',  # coupon expires on 4/21/25
+    r'Expir(?:y|ation)\s+Date\s*:?\s*(\w+\s+\d{1,2},?\s+\d{4})',          # Expiration Date: April 28, 2025
+))
+TERMS_KEYWORD_RE = re.compile(r'coupon|promotion|expir|terms', re.IGNORECASE)
+
+
+def to_document(source: PageSource) -> Optional[lxml.html.HtmlElement]:
+    """
+    将页面源码转换为lxml文档；已解析的DOM快照直接返回
+
+    Args:
+        source: 页面源码或lxml文档
+
+    Returns:
+        lxml文档，源码为空时返回None
+    """
+    if isinstance(source, lxml.html.HtmlElement):
+        return source
+    if not source or not source.strip():
+        return None
+    try:
+        return lxml.html.fromstring(source)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def element_text(element) -> str:
+    """获取元素的可见文本并压缩空白"""
+    return WHITESPACE_RE.sub(' ', element.text_content()).strip()
+
+
+def is_captcha_page(source: PageSource) -> bool:
+    """
+    检测页面是否为验证码人机验证页面
+
+    Args:
+        source: 页面源码或lxml文档
+
+    Returns:
+        bool: 如果是验证码页面返回True，否则返回False
+    """
+    if isinstance(source, lxml.html.HtmlElement):
+        if CAPTCHA_ELEMENT_XPATH(source):
+            return True
+        text = source.text_content().lower()
+    else:
+        text = source.lower() if isinstance(source, str) else source.decode('utf-8', 'ignore').lower()
+        if 'captchacharacters' in text:
+            return True
+    return any(marker in text for marker in CAPTCHA_TEXTS)
+
+
+def needs_javascript(source: PageSource) -> bool:
+    """
+    判断页面是否缺少商品详情的主体结构（需要JavaScript渲染）
+
+    Args:
+        source: 页面源码或lxml文档
+
+    Returns:
+        bool: 需要浏览器渲染返回True
+    """
+    doc = to_document(source)
+    return doc is None or not PRODUCT_PAGE_XPATH(doc)
+
+
+def parse_coupon_amount(text: str, require_keyword: bool = False) -> Tuple[Optional[str], Optional[float]]:
+    """
+    从优惠券文本中解析类型和金额
+
+    Args:
+        text: 元素文本
+        require_keyword: 是否要求文本中包含coupon关键词
+
+    Returns:
+        Tuple: (优惠券类型, 优惠券值)，无法解析时返回(None, None)
+    """
+    if require_keyword and 'coupon' not in text.lower():
+        return None, None
+
+    match = APPLY_COUPON_RE.search(text)
+    if match:
+        if match.group(1):
+            return "fixed", float(match.group(1))
+        return "percentage", float(match.group(2))
+
+    match = PERCENTAGE_AMOUNT_RE.search(text)
+    if match:
+        return "percentage", float(match.group(1))
+
+    has_keyword = KEYWORD_RE.search(text) is not None
+    if has_keyword:
+        match = DOLLAR_RE.search(text)
+        if match:
+            return "fixed", float(match.group(1))
+        match = PERCENTAGE_RE.search(text)
+        if match:
+            return "percentage", float(match.group(1))
+
+    match = FIXED_AMOUNT_RE.search(text)
+    if match:
+        return "fixed", float(match.group(1))
+    return None, None
+
+
+def parse_expiration(text: str) -> Optional[datetime]:
+    """
+    从文本中解析优惠券到期日期
+
+    Args:
+        text: 条款或到期日期文本
+
+    Returns:
+        datetime: 到期日期，未找到时返回None
+    """
+    for pattern in DATE_RES:
+        match = pattern.search(text)
+        if match:
+            try:
+                return date_parser.parse(match.group(1))
+            except (ValueError, OverflowError):
+                continue
+    return None
+
+
+def _find_amount(doc, xpaths, require_keyword: bool) -> Tuple[Optional[str], Optional[float]]:
+    """按优先级遍历XPath，返回第一个可解析的金额"""
+    for xpath in xpaths:
+        for element in xpath(doc):
+            if not isinstance(element.tag, str) or element.tag in SKIP_TAGS:
+                continue
+            text = element_text(element)
+            if not text:
+                continue
+            coupon_type, coupon_value = parse_coupon_amount(text, require_keyword)
+            if coupon_type:
+                return coupon_type, coupon_value
+    return None, None
+
+
+def parse_terms(source: PageSource) -> Tuple[Optional[datetime], Optional[str]]:
+    """
+    从页面中提取优惠券条款和到期日期
+
+    Args:
+        source: 页面源码或lxml文档（例如打开条款弹窗后的快照）
+
+    Returns:
+        Tuple: (有效期, 条款)
+    """
+    doc = to_document(source)
+    if doc is None:
+        return None, None
+
+    terms = None
+    for xpath, require_keyword in TERMS_XPATHS:
+        for element in xpath(doc):
+            content = element_text(element)
+            if content and (not require_keyword or TERMS_KEYWORD_RE.search(content)):
+                terms = content
+                break
+        if terms:
+            break
+
+    expiration_date = None
+    for element in EXPIRATION_XPATH(doc):
+        expiration_date = parse_expiration(element_text(element))
+        if expiration_date:
+            break
+    if expiration_date is None and terms:
+        expiration_date = parse_expiration(terms)
+
+    return expiration_date, terms
+
+
+def parse_coupon(source: PageSource) -> CouponInfo:
+    """
+    从商品详情页提取优惠券信息
+
+    Args:
+        source: 页面源码或lxml文档
+
+    Returns:
+        Tuple: (优惠券类型, 优惠券值, 有效期, 条款)，没有优惠券时全部为None
+    """
+    doc = to_document(source)
+    if doc is None:
+        return EMPTY_RESULT
+
+    coupon_type, coupon_value = _find_amount(doc, COUPON_XPATHS, require_keyword=False)
+    if not coupon_type:
+        coupon_type, coupon_value = _find_amount(doc, FALLBACK_XPATHS, require_keyword=True)
+    if not coupon_type:
+        return EMPTY_RESULT
+
+    expiration_date, terms = parse_terms(doc)
+    return coupon_type, coupon_value, expiration_date, terms
@@ -8,6 +8,11 @@
 3. 分配更新任务
 4. 监控任务执行
 5. 收集统计信息
+
+调度结构：
+每个商品的下次更新时间保存在带索引的products.next_update_at列中（持久化），
+内存中的IndexedHeap只缓存最早到期的一段窗口。取批次时按到期顺序弹出，
+任务完成后只重新计算该商品的下次更新时间，不再整体重建队列。
 """
 
 import math
@@ -17,16 +22,25 @@ from datetime import datetime, UTC, timedelta
 from typing import List, Dict, Optional, Tuple
 import logging
 from dataclasses import dataclass
-from queue import PriorityQueue
-import heapq
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, text
+from sqlalchemy import func, desc, text, update
 
 from models.database import Product, Offer
+from src.core.priority_scoring import (
+    ProductColumns, load_product_columns, score_discount_priority
+)
+from src.utils.indexed_heap import IndexedHeap
 
 # 初始化日志记录器
 logger = logging.getLogger("DiscountScheduler")
 
+def _timestamp(value: datetime) -> float:
+    """数据库中的时间转换为时间戳，SQLite返回的无时区时间按UTC处理"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
 class TaskLoggerAdapter(logging.LoggerAdapter):
     """为日志添加任务ID的适配器"""
     def process(self, msg, kwargs):
@@ -58,7 +72,8 @@ class DiscountUpdateScheduler:
                  max_interval: int = 7*24*60*60, # 最大更新间隔（秒）
                  batch_size: int = 50,
                  max_load_products: int = 1000,   # 每次最多加载的商品数量
-                 force_update: bool = False):    # 添加强制更新参数
+                 force_update: bool = False,     # 添加强制更新参数
+                 retry_interval: int = 30*60):   # 失败任务的重试间隔（秒）
         """
         初始化调度器
         
@@ -68,8 +83,9 @@ class DiscountUpdateScheduler:
             min_interval: 最小更新间隔（秒）
             max_interval: 最大更新间隔（秒）
             batch_size: 批处理大小
-            max_load_products: 每次最多加载的商品数量
+            max_load_products: 内存调度窗口为该值的两倍
             force_update: 是否强制更新，忽略时间间隔检查
+            retry_interval: 任务失败后的重试间隔（秒）
         """
         self.db = db
         self.base_interval = base_interval
@@ -78,6 +94,7 @@ class DiscountUpdateScheduler:
         self.batch_size = batch_size
         self.max_load_products = max_load_products
         self.force_update = force_update  # 添加force_update属性
+        self.retry_interval = retry_interval
         
         # 优先级计算权重
         self.weights = {
@@ -88,8 +105,14 @@ class DiscountUpdateScheduler:
             'random': 0.10      # 随机因子权重
         }
         
-        # 任务队列
-        self.task_queue = PriorityQueue()
+        # 批量评分使用的随机数生成器（随机因子）
+        self.rng = np.random.default_rng()
+        
+        # 内存调度窗口：按到期时间戳排序的ASIN
+        # 不在窗口中（也不在处理中）的商品，next_update_at都不早于_window_end
+        self.schedule = IndexedHeap()
+        self._window_end = -math.inf
+        self._in_flight: Dict[str, float] = {}  # 已分配未完成的ASIN -> 分配时间
         
         # 统计信息
         self.stats = {
@@ -266,200 +289,145 @@ class DiscountUpdateScheduler:
             has_discount=bool(product.offers and product.offers[0].deal_type != "None")
         )
         
-    def update_task_queue(self):
-        """更新任务队列，采用分批加载商品数据的策略"""
-        self.logger.info("开始更新任务队列...")
+    def score_columns(self, columns: ProductColumns, now: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        批量计算商品优先级
+        
+        与calculate_priority的计算方式一致，使用当前的self.weights。
         
-        # 清空现有队列
-        while not self.task_queue.empty():
-            self.task_queue.get()
+        Args:
+            columns: load_product_columns读取的商品列
+            now: 当前时间，默认为datetime.now(UTC)
             
+        Returns:
+            Dict[str, np.ndarray]: 各因子和最终优先级（key为priority）
+        """
+        now = now or datetime.now(UTC)
+        return score_discount_priority(columns, self.weights, now.timestamp(), self.rng)
+        
+    def schedule_intervals(self, priority: np.ndarray, has_deal: np.ndarray) -> np.ndarray:
+        """
+        批量计算更新间隔（秒），与calculate_next_update_time一致
+        优先级越高间隔越短，限制在最小和最大间隔之间；有优惠的商品间隔减半
+        """
+        interval = np.clip(self.base_interval * (1 - priority), self.min_interval, self.max_interval)
+        return np.where(has_deal, interval * 0.5, interval)
+        
+    def assign_missing_due_times(self, now: Optional[datetime] = None) -> int:
+        """
+        为尚未排期的商品（next_update_at为NULL，例如新采集的商品）批量计算下次更新时间
+        
+        到期时间为最后折扣更新时间加上按优先级计算的间隔，从未更新过的商品立即到期。
+        
+        Returns:
+            int: 新排期的商品数量
+        """
+        now = now or datetime.now(UTC)
+        columns = load_product_columns(self.db, filters=[Product.next_update_at.is_(None)])
+        if not len(columns):
+            return 0
+        
+        scores = self.score_columns(columns, now)
+        interval = self.schedule_intervals(scores['priority'], columns.has_deal)
+        last_update = columns.discount_updated_at
+        due = np.where(np.isnan(last_update), now.timestamp(), np.nan_to_num(last_update) + interval)
+        
+        self.db.execute(update(Product), [
+            {'id': product_id, 'next_update_at': datetime.fromtimestamp(ts, UTC)}
+            for product_id, ts in zip(columns.ids.tolist(), due.tolist())
+        ])
+        self.db.commit()
+        self.logger.info(f"为 {len(columns)} 个新商品计算了下次更新时间")
+        return len(columns)
+        
+    def _refill(self):
+        """从next_update_at索引按到期顺序读取最早的一段商品，填充内存调度窗口"""
+        self.assign_missing_due_times()
+        
+        capacity = self.max_load_products * 2
+        rows = self.db.query(Product.asin, Product.next_update_at)\
+            .filter(Product.next_update_at.isnot(None))\
+            .order_by(Product.next_update_at.asc())\
+            .limit(capacity + len(self._in_flight))\
+            .all()
+        
+        for asin, next_update_at in rows:
+            if asin not in self._in_flight:
+                self.schedule.push(asin, _timestamp(next_update_at))
+        
+        # 读满时窗口之外还有商品，否则数据库中的商品已全部在窗口中
+        if len(rows) >= capacity + len(self._in_flight):
+            self._window_end = _timestamp(rows[-1][1])
+        else:
+            self._window_end = math.inf
+        self.logger.debug(f"调度窗口已填充，窗口大小 {len(self.schedule)}")
+        
+    def update_task_queue(self):
+        """重新同步调度窗口：为新商品排期，并从数据库重新读取最早到期的商品"""
+        self.logger.info("开始同步调度窗口...")
+        start_time = time.time()
         try:
-            # 获取数据库中商品总数
-            total_products = self.db.query(func.count(Product.id)).scalar()
-            self.logger.info(f"数据库中共有 {total_products} 个商品")
-            
-            # 分批加载和处理商品
-            offset = 0
-            batch_size = self.max_load_products
-            total_loaded = 0
-            
-            while offset < total_products:
-                # 按照不同的策略批量加载商品
-                # 1. 优先加载有折扣的商品
-                products_with_discount = self.db.query(Product)\
-                    .join(Offer, Product.id == Offer.product_id)\
-                    .filter(Offer.deal_type != "None")\
-                    .limit(batch_size // 3)\
-                    .all()
-                
-                # 2. 加载高价值商品
-                high_value_products = self.db.query(Product)\
-                    .filter(Product.current_price > 1000)\
-                    .order_by(Product.current_price.desc())\
-                    .offset(offset)\
-                    .limit(batch_size // 3)\
-                    .all()
-                
-                # 3. 加载长时间未更新的商品
-                old_updated_products = self.db.query(Product)\
-                    .order_by(Product.discount_updated_at.asc().nullsfirst())\
-                    .offset(offset)\
-                    .limit(batch_size // 3)\
-                    .all()
-                
-                # 4. 如果前面的商品数量不足批次大小，则随机抽取一些商品补足
-                products_count = len(products_with_discount) + len(high_value_products) + len(old_updated_products)
-                random_products = []
-                
-                if products_count < batch_size:
-                    # 使用 SQL 随机抽取商品
-                    random_products = self.db.query(Product)\
-                        .order_by(func.random())\
-                        .limit(batch_size - products_count)\
-                        .all()
-                
-                # 合并所有获取的商品，去重
-                all_products = []
-                product_asins = set()
-                
-                for product_list in [products_with_discount, high_value_products, old_updated_products, random_products]:
-                    for product in product_list:
-                        if product.asin not in product_asins:
-                            all_products.append(product)
-                            product_asins.add(product.asin)
-                
-                self.logger.info(f"已加载 {len(all_products)} 个商品进行处理")
-                total_loaded += len(all_products)
-                
-                # 为每个商品创建任务并加入队列
-                for product in all_products:
-                    task = self.create_update_task(product)
-                    self.task_queue.put(task)
-                
-                # 更新偏移量
-                offset += batch_size
-                
-                # 如果任务队列已经足够大，则不再继续加载
-                if self.task_queue.qsize() >= self.max_load_products * 2:
-                    break
-            
-            self.logger.info(f"任务队列更新完成，共加载 {total_loaded} 个商品，队列大小 {self.task_queue.qsize()}")
-            
+            self.schedule.clear()
+            self._window_end = -math.inf
+            self._refill()
+            self.logger.info(
+                f"调度窗口同步完成，窗口大小 {len(self.schedule)}，耗时 {time.time() - start_time:.2f} 秒"
+            )
         except Exception as e:
-            self.logger.error(f"更新任务队列时发生错误: {str(e)}")
-            # 如果出错，至少添加一些随机商品以确保系统可以继续运行
-            try:
-                random_products = self.db.query(Product).order_by(func.random()).limit(self.batch_size * 2).all()
-                for product in random_products:
-                    task = self.create_update_task(product)
-                    self.task_queue.put(task)
-                self.logger.info(f"已添加 {len(random_products)} 个随机商品到队列作为备用")
-            except Exception as fallback_error:
-                self.logger.error(f"添加备用商品时也发生错误: {str(fallback_error)}")
+            self.db.rollback()
+            self.logger.error(f"同步调度窗口时发生错误: {str(e)}")
         
     def get_next_batch(self) -> List[str]:
         """
-        获取下一批要更新的商品ASIN
+        按到期顺序获取下一批要更新的商品ASIN
+        
+        只弹出已到期的商品（强制更新模式下按到期顺序弹出，不检查时间），
+        窗口中的到期商品不足时从数据库补充一次。
         
         Returns:
             List[str]: ASIN列表
         """
-        current_time = datetime.now(UTC)
         batch = []
-        temp_tasks = []  # 临时存储不需要立即处理的任务
-        
-        # 记录诊断信息
-        total_tasks_checked = 0
-        tasks_ready = 0
-        tasks_not_ready = 0
         
-        self.logger.info(f"获取下一批任务，当前队列大小: {self.task_queue.qsize()}, 目标批次大小: {self.batch_size}")
-        self.logger.info(f"强制更新模式: {'启用' if self.force_update else '禁用'}")
-        
-        while len(batch) < self.batch_size and not self.task_queue.empty():
-            task = self.task_queue.get()
-            total_tasks_checked += 1
-            
-            # 如果是强制更新或者到达更新时间，则添加到批次中
-            is_ready = self.force_update or (task.next_update_time is None) or (task.next_update_time <= current_time)
-            
-            if is_ready:
-                batch.append(task.asin)
-                self.stats['total_tasks'] += 1
-                tasks_ready += 1
-                
-                # 记录调试信息
-                if self.force_update:
-                    self.logger.debug(f"强制模式添加任务: ASIN={task.asin}, 优先级={task.priority:.2f}")
-                else:
-                    time_info = "无计划时间" if task.next_update_time is None else f"已到期 ({(current_time - task.next_update_time).total_seconds():.0f}秒前)"
-                    self.logger.debug(f"正常添加任务: ASIN={task.asin}, 优先级={task.priority:.2f}, 状态={time_info}")
-            else:
-                # 如果还没到更新时间，保存到临时列表
-                temp_tasks.append(task)
-                tasks_not_ready += 1
-                
-                # 记录调试信息（仅记录部分，避免日志过多）
-                if tasks_not_ready <= 5 or tasks_not_ready % 50 == 0:
-                    time_diff = (task.next_update_time - current_time).total_seconds()
-                    self.logger.debug(f"任务未就绪: ASIN={task.asin}, 优先级={task.priority:.2f}, 剩余时间={time_diff:.0f}秒")
-        
-        # 记录诊断统计信息
-        self.logger.info(f"任务检查统计: 总检查={total_tasks_checked}, 就绪={tasks_ready}, 未就绪={tasks_not_ready}")
-        
-        # 确保至少返回一个任务（如果队列不为空）
-        if len(batch) == 0 and tasks_not_ready > 0:
-            # 如果没有就绪的任务但有未就绪的任务，选择一个最接近就绪的任务
-            nearest_task = min(temp_tasks, key=lambda t: t.next_update_time if t.next_update_time else current_time)
-            batch.append(nearest_task.asin)
-            temp_tasks.remove(nearest_task)
-            self.stats['total_tasks'] += 1
-            
-            # 记录信息
-            time_diff = (nearest_task.next_update_time - current_time).total_seconds() if nearest_task.next_update_time else 0
-            self.logger.info(f"没有就绪任务，选择最接近的任务: ASIN={nearest_task.asin}, 剩余时间={time_diff:.0f}秒")
-                
-        # 将未处理的任务放回队列
-        for task in temp_tasks:
-            self.task_queue.put(task)
-        
-        # 如果批次为空但队列不为空，尝试另一种方法
-        if len(batch) == 0 and self.task_queue.qsize() > 0:
-            self.logger.warning("常规方法未找到可处理任务，尝试备用方法...")
-            
-            # 获取一些任务进行分析
-            sample_tasks = []
-            sample_size = min(10, self.task_queue.qsize())
-            
-            for _ in range(sample_size):
-                if not self.task_queue.empty():
-                    sample_tasks.append(self.task_queue.get())
-            
-            # 分析任务
-            for task in sample_tasks:
-                self.logger.info(f"样本任务: ASIN={task.asin}, 优先级={task.priority:.2f}, "
-                               f"下次更新时间={task.next_update_time}, "
-                               f"是否就绪={task.next_update_time is None or task.next_update_time <= current_time}")
-            
-            # 如果有样本任务，选择其中最高优先级的任务
-            if sample_tasks:
-                best_task = max(sample_tasks, key=lambda t: t.priority)
-                batch.append(best_task.asin)
-                self.stats['total_tasks'] += 1
-                sample_tasks.remove(best_task)
-                self.logger.info(f"选择最高优先级任务: ASIN={best_task.asin}, 优先级={best_task.priority:.2f}")
-            
-            # 将剩余样本任务放回队列
-            for task in sample_tasks:
-                self.task_queue.put(task)
-        
-        self.logger.info(f"最终返回 {len(batch)} 个任务")
+        for attempt in range(2):
+            # 填充窗口时新排期的商品以当前时间为到期时间，因此每次都重新取当前时间
+            now = time.time()
+            cutoff = math.inf if self.force_update else now
+            # 只能弹出窗口范围内的商品，窗口之外可能还有更早到期的商品未加载
+            popped = self.schedule.pop_due(min(cutoff, self._window_end), self.batch_size - len(batch))
+            for asin, _, _ in popped:
+                batch.append(asin)
+                self._in_flight[asin] = now
+            if len(batch) >= self.batch_size or self._window_end >= cutoff or attempt > 0:
+                break
+            try:
+                self._refill()
+            except Exception as e:
+                self.db.rollback()
+                self.logger.error(f"填充调度窗口时发生错误: {str(e)}")
+                break
+        
+        self.stats['total_tasks'] += len(batch)
+        
+        next_due = self.seconds_until_next_due()
+        self.logger.info(
+            f"返回 {len(batch)} 个任务，窗口剩余 {len(self.schedule)} 个"
+            + (f"，下一个任务 {next_due:.0f} 秒后到期" if next_due else "")
+        )
         return batch
         
+    def seconds_until_next_due(self) -> Optional[float]:
+        """距离窗口中最早任务到期的秒数，窗口为空时返回None"""
+        head = self.schedule.peek()
+        if head is None:
+            return None
+        return max(0.0, head[1] - time.time())
+        
     def record_task_result(self, asin: str, success: bool, processing_time: float):
         """
-        记录任务执行结果
+        记录任务执行结果，并重新安排该商品的下次更新时间
+        
+        成功时按最新数据计算优先级和更新间隔，失败时在retry_interval后重试。
         
         Args:
             asin: 商品ASIN
@@ -477,6 +445,45 @@ class DiscountUpdateScheduler:
             (self.stats['avg_processing_time'] * (n-1) + processing_time) / n
         )
         
+        self._in_flight.pop(asin, None)
+        try:
+            self.reschedule(asin, success)
+        except Exception as e:
+            self.db.rollback()
+            self.logger.error(f"重新安排商品 {asin} 的更新时间时出错: {str(e)}")
+            
+    def reschedule(self, asin: str, success: bool = True) -> Optional[datetime]:
+        """
+        重新计算单个商品的下次更新时间，写入数据库并更新调度窗口
+        
+        Returns:
+            Optional[datetime]: 下次更新时间，商品已不存在时返回None
+        """
+        now = datetime.now(UTC)
+        if success:
+            columns = load_product_columns(self.db, filters=[Product.asin == asin])
+            if not len(columns):
+                # 商品已被删除
+                self.schedule.remove(asin)
+                return None
+            priority = self.score_columns(columns, now)['priority']
+            interval = float(self.schedule_intervals(priority, columns.has_deal)[0])
+        else:
+            interval = self.retry_interval
+        
+        next_update_at = now + timedelta(seconds=interval)
+        self.db.query(Product).filter(Product.asin == asin)\
+            .update({Product.next_update_at: next_update_at}, synchronize_session=False)
+        self.db.commit()
+        
+        # 窗口之外的时间交给下次填充读取，保证窗口中始终是最早到期的商品
+        due = next_update_at.timestamp()
+        if due <= self._window_end:
+            self.schedule.push(asin, due)
+        else:
+            self.schedule.remove(asin)
+        return next_update_at
+        
     def get_statistics(self) -> Dict:
         """
         获取任务统计信息
@@ -489,7 +496,8 @@ class DiscountUpdateScheduler:
             self.stats['completed_tasks'] / self.stats['total_tasks'] * 100
             if self.stats['total_tasks'] > 0 else 0
         )
-        stats['queue_size'] = self.task_queue.qsize()
+        stats['queue_size'] = len(self.schedule)
+        stats['in_flight'] = len(self._in_flight)
         return stats
         
     def reset_statistics(self):
@@ -29,7 +29,8 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from models.database import Product, Offer, get_db
-from src.utils.webdriver_manager import WebDriverConfig
+from src.core.webdriver_pool import WebDriverPool, get_shared_pool
+from src.core.coupon_parser import parse_coupon
 
 def parse_arguments():
     """添加命令行参数支持"""
@@ -107,7 +108,8 @@ class CouponScraper:
     
     def __init__(self, db: Session, batch_size: int = 50, headless: bool = True,
                  min_delay: float = 2.0, max_delay: float = 4.0, specific_asins: list = None,
-                 debug: bool = False, verbose: bool = False):
+                 debug: bool = False, verbose: bool = False,
+                 driver_pool: Optional[WebDriverPool] = None):
         """
         初始化抓取器
         
@@ -120,6 +122,7 @@ class CouponScraper:
             specific_asins: 指定要处理的商品ASIN列表
             debug: 是否启用调试模式
             verbose: 是否输出更多详细信息
+            driver_pool: 租用浏览器的WebDriver池，默认使用进程内共享的池
         """
         self.db = db
         self.batch_size = batch_size
@@ -127,6 +130,7 @@ class CouponScraper:
         self.min_delay = min_delay
         self.max_delay = max_delay
         self.specific_asins = specific_asins
+        self.driver_pool = driver_pool
         self.driver = None
         self.logger = logger
         self.debug = debug
@@ -149,44 +153,27 @@ class CouponScraper:
         self._processed_asins = set()
         
     def _init_driver(self):
-        """初始化WebDriver"""
+        """从WebDriver池租用浏览器"""
         if not self.driver:
-            config = WebDriverConfig()
-            self.driver = config.create_chrome_driver(headless=self.headless)
-            
-            # 设置全局超时参数
-            self.driver.set_page_load_timeout(60)  # 页面加载超时
-            self.driver.set_script_timeout(30)     # 脚本执行超时
+            if self.driver_pool is None:
+                self.driver_pool = get_shared_pool(headless=self.headless)
+            self.driver = self.driver_pool.get_driver()
+            if self.driver is None:
+                raise RuntimeError("从WebDriver池获取浏览器超时")
             
             if self.debug:
                 self.logger.debug("WebDriver设置详情:")
                 self.logger.debug(f"  • 无头模式: {self.headless}")
                 self.logger.debug(f"  • 页面加载超时: 60秒")
                 self.logger.debug(f"  • 脚本执行超时: 30秒")
+            self.logger.debug("已租用WebDriver")
             
-            # 添加错误处理
-            try:
-                # 预热浏览器，访问简单页面确保WebDriver正常工作
-                self.driver.get("about:blank")
-                self.logger.info("WebDriver初始化完成")
-            except Exception as e:
-                self.logger.error(f"WebDriver初始化异常: {str(e)}")
-                # 尝试重新创建
-                try:
-                    self.driver.quit()
-                except:
-                    pass
-                self.driver = config.create_chrome_driver(headless=self.headless)
-                self.driver.set_page_load_timeout(60)
-                self.driver.set_script_timeout(30)
-                self.logger.info("WebDriver重新初始化完成")
-            
-    def _close_driver(self):
-        """关闭WebDriver"""
+    def _close_driver(self, pages: int = 0):
+        """归还WebDriver，池会按页面数和内存占用决定是否回收"""
         if self.driver:
-            self.driver.quit()
+            self.driver_pool.release_driver(self.driver, pages=pages)
             self.driver = None
-            self.logger.info("WebDriver已关闭")
+            self.logger.debug("WebDriver已归还")
         
     def _extract_coupon_info(self) -> Tuple[Optional[str], Optional[float]]:
         """
@@ -199,225 +186,11 @@ class CouponScraper:
             if self.debug:
                 self.logger.debug("开始提取优惠券信息...")
             
-            # 增强的正则表达式模式，用于从文本中提取美元金额
-            dollar_pattern = r'\$\s*(\d+(?:\.\d+)?)'
-            percentage_pattern = r'(\d+)%'
-            
-            # 保存页面源代码以便调试
-            if self.debug or self.verbose:
-                page_source = self.driver.page_source
-                # 检查页面源代码中是否包含关键词
-                if 'Apply $' in page_source and 'coupon' in page_source:
-                    self.logger.debug("页面源代码中检测到'Apply $ coupon'字样")
-                    import re
-                    # 使用正则表达式在页面源码中查找优惠券金额
-                    coupon_matches = re.findall(r'Apply\s+\$(\d+)\s+coupon', page_source)
-                    if coupon_matches:
-                        self.logger.debug(f"在页面源码中发现优惠券金额: ${coupon_matches[0]}")
-            
-            # 方法0: 使用更广泛的XPath查询检查包含"Apply $X coupon"的任何元素
-            try:
-                apply_coupon_xpath = "//*[contains(text(), 'Apply $') and contains(text(), 'coupon')]"
-                apply_coupon_elements = self.driver.find_elements(By.XPATH, apply_coupon_xpath)
-                
-                for element in apply_coupon_elements:
-                    text = element.text.strip()
-                    self.logger.debug(f"发现Apply coupon元素: '{text}'")
-                    
-                    # 提取美元金额
-                    import re
-                    match = re.search(dollar_pattern, text)
-                    if match:
-                        amount = float(match.group(1))
-                        self.logger.debug(f"从XPath提取到优惠券金额: ${amount}")
-                        return "fixed", amount
-            except Exception as e:
-                self.logger.debug(f"XPath方法提取优惠券失败: {str(e)}")
-            
-            # 检查优惠券特定元素
-            coupon_elements = self.driver.find_elements(By.CSS_SELECTOR, ".a-section .couponBadge")
-            for element in coupon_elements:
-                text = element.text.strip().lower()
-                if self.debug:
-                    self.logger.debug(f"发现优惠券徽章: '{text}'")
-                if "% off" in text or ("coupon" in text and "%" in text):
-                    try:
-                        # 提取百分比，处理格式如"40% off coupon"
-                        percentage_text = ''.join(c for c in text.split("%")[0] if c.isdigit())
-                        if percentage_text:
-                            percentage = float(percentage_text)
-                            self.logger.debug(f"从优惠券徽章提取到百分比优惠券: {percentage}%")
-                            return "percentage", percentage
-                    except (ValueError, IndexError) as e:
-                        self.logger.warning(f"无法从优惠券徽章提取百分比: {text}, 错误: {str(e)}")
-                        
-            # 方法1: 检查a-color-success元素，这是您提供的HTML中使用的类
-            success_elements = self.driver.find_elements(By.CSS_SELECTOR, ".a-color-success")
-            for element in success_elements:
-                text = element.text.strip()
-                if self.debug:
-                    self.logger.debug(f"发现a-color-success元素: '{text}'")
-                
-                # 检查是否有"apply $X coupon"文本
-                if ("Apply $" in text or "apply $" in text) and "coupon" in text:
-                    try:
-                        # 提取优惠券金额
-                        import re
-                        match = re.search(dollar_pattern, text)
-                        if match:
-                            amount = float(match.group(1))
-                            self.logger.debug(f"从a-color-success元素提取到优惠券金额: ${amount}")
-                            return "fixed", amount
-                    except Exception as e:
-                        self.logger.warning(f"无法从a-color-success元素提取金额: {text}, 错误: {str(e)}")
-            
-            # 方法2: 检查包含"Apply $X coupon"的促销价格信息元素
-            promo_elements = self.driver.find_elements(By.CSS_SELECTOR, ".promoPriceBlockMessage")
-            for element in promo_elements:
-                text = element.text.strip().lower()
-                if self.debug:
-                    self.logger.debug(f"发现促销价格元素: '{text}'")
-                
-                # 检查是否有"apply $X coupon"文本
-                if "apply $" in text and "coupon" in text:
-                    try:
-                        # 提取优惠券金额
-                        amount_text = text.split("apply $")[1].split("coupon")[0].strip()
-                        amount = float(''.join(c for c in amount_text if c.isdigit() or c == '.'))
-                        self.logger.debug(f"从'Apply coupon'元素提取到优惠券金额: ${amount}")
-                        return "fixed", amount
-                    except (IndexError, ValueError) as e:
-                        self.logger.warning(f"无法从'Apply coupon'文本中提取金额: {text}, 错误: {str(e)}")
-                
-                # 检查是否有"$X off coupon applied"文本
-                if "coupon applied" in text:
-                    try:
-                        # 寻找$金额
-                        if "$" in text:
-                            amount_parts = text.split("$")
-                            if len(amount_parts) > 1:
-                                amount_text = amount_parts[1].split(" ")[0].strip()
-                                amount = float(''.join(c for c in amount_text if c.isdigit() or c == '.'))
-                                self.logger.debug(f"从'coupon applied'元素提取到优惠券金额: ${amount}")
-                                return "fixed", amount
-                    except (IndexError, ValueError) as e:
-                        self.logger.warning(f"无法从'coupon applied'文本中提取金额: {text}, 错误: {str(e)}")
-                
-                # 检查是否有"X% off coupon"或类似的百分比优惠券
-                if "%" in text and "coupon" in text:
-                    try:
-                        percentage_parts = text.split("%")
-                        if len(percentage_parts) > 0:
-                            # 提取百分比前面的数字
-                            percentage_text = ''.join(c for c in percentage_parts[0] if c.isdigit() or c == '.')
-                            if percentage_text:
-                                percentage = float(percentage_text)
-                                self.logger.debug(f"从文本中提取到百分比优惠券: {percentage}%")
-                                return "percentage", percentage
-                    except (ValueError, IndexError) as e:
-                        self.logger.warning(f"无法从文本中提取百分比: {text}, 错误: {str(e)}")
-            
-            # 方法3: 检查checkbox和label中的优惠券信息
-            try:
-                coupon_labels = self.driver.find_elements(By.CSS_SELECTOR, "label[for^='checkbox']")
-                for label in coupon_labels:
-                    text = label.text.strip()
-                    if self.debug:
-                        self.logger.debug(f"发现label元素: '{text}'")
-                    
-                    if ("Apply $" in text or "apply $" in text) and "coupon" in text:
-                        try:
-                            # 使用正则表达式提取金额
-                            import re
-                            match = re.search(dollar_pattern, text)
-                            if match:
-                                amount = float(match.group(1))
-                                self.logger.debug(f"从label元素提取到优惠券金额: ${amount}")
-                                return "fixed", amount
-                        except Exception as e:
-                            self.logger.warning(f"无法从label文本中提取金额: {text}, 错误: {str(e)}")
-                    elif "%" in text and "coupon" in text:
-                        try:
-                            # 使用正则表达式提取百分比
-                            import re
-                            match = re.search(percentage_pattern, text)
-                            if match:
-                                percentage = float(match.group(1))
-                                self.logger.debug(f"从label元素提取到百分比优惠券: {percentage}%")
-                                return "percentage", percentage
-                        except Exception as e:
-                            self.logger.warning(f"无法从label文本中提取百分比: {text}, 错误: {str(e)}")
-            except Exception as e:
-                self.logger.debug(f"检查label元素失败: {str(e)}")
-            
-            # 方法4: 检查span元素中的优惠券信息（针对您提供的HTML格式）
-            try:
-                span_elements = self.driver.find_elements(By.CSS_SELECTOR, "span.a-color-success")
-                for span in span_elements:
-                    text = span.text.strip()
-                    if self.debug:
-                        self.logger.debug(f"发现span.a-color-success元素: '{text}'")
-                    
-                    if "Apply $" in text and "coupon" in text:
-                        # 使用正则表达式提取金额
-                        import re
-                        match = re.search(dollar_pattern, text)
-                        if match:
-                            amount = float(match.group(1))
-                            self.logger.debug(f"从span元素提取到优惠券金额: ${amount}")
-                            return "fixed", amount
-            except Exception as e:
-                self.logger.debug(f"检查span元素失败: {str(e)}")
-            
-            # 方法5: 更通用的方法，尝试在整个页面中查找包含"coupon"的元素
-            try:
-                coupon_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'coupon')]")
-                for element in coupon_elements:
-                    text = element.text.strip()
-                    if not text:  # 跳过空文本
-                        continue
-                        
-                    if self.debug and ("$" in text or "%" in text):
-                        self.logger.debug(f"发现包含'coupon'的元素: '{text}'")
-                    
-                    # 检查美元金额
-                    if "$" in text:
-                        # 使用正则表达式提取金额
-                        import re
-                        match = re.search(dollar_pattern, text)
-                        if match and "coupon" in text.lower():
-                            amount = float(match.group(1))
-                            self.logger.debug(f"从通用元素提取到优惠券金额: ${amount}")
-                            return "fixed", amount
-                    
-                    # 检查百分比
-                    if "%" in text:
-                        # 使用正则表达式提取百分比
-                        import re
-                        match = re.search(percentage_pattern, text)
-                        if match and "coupon" in text.lower():
-                            percentage = float(match.group(1))
-                            self.logger.debug(f"从通用元素提取到百分比优惠券: {percentage}%")
-                            return "percentage", percentage
-            except Exception as e:
-                self.logger.debug(f"通用元素搜索失败: {str(e)}")
-            
-            # 如果在调试模式下，打印所有潜在的优惠券元素的HTML
-            if self.debug and self.verbose:
-                self.logger.debug("未找到优惠券信息，尝试分析页面结构...")
-                try:
-                    # 搜索任何可能包含优惠券信息的元素
-                    potential_elements = self.driver.find_elements(By.XPATH, 
-                        "//*[contains(text(), 'coupon') or contains(text(), 'Coupon') or contains(text(), 'COUPON')]")
-                    
-                    if potential_elements:
-                        self.logger.debug(f"找到{len(potential_elements)}个可能包含优惠券信息的元素:")
-                        for i, elem in enumerate(potential_elements[:5]):  # 只记录前5个避免日志过大
-                            self.logger.debug(f"潜在元素 {i+1}: 文本='{elem.text}', 标签='{elem.tag_name}'")
-                    else:
-                        self.logger.debug("未找到包含'coupon'关键词的元素")
-                except Exception as e:
-                    self.logger.debug(f"分析页面结构失败: {str(e)}")
+            # 页面源码只读取一次，由共享的优惠券解析模块完成提取
+            coupon_type, coupon_value, _, _ = parse_coupon(self.driver.page_source)
+            if coupon_type:
+                self.logger.debug(f"提取到优惠券: 类型={coupon_type}, 值={coupon_value}")
+                return coupon_type, coupon_value
                 
         except Exception as e:
             self.logger.warning(f"提取优惠券信息失败: {str(e)}")
@@ -647,8 +420,12 @@ class CouponScraper:
                         self.logger.warning(f"跳过非'coupon'来源的商品: {asin} (source={product.source})")
                         continue
                 
-                # 处理商品
-                success = self.process_asin(asin)
+                # 处理商品：每个商品租用一次浏览器，归还时计入页面数，由池按阈值回收
+                self._init_driver()
+                try:
+                    success = self.process_asin(asin)
+                finally:
+                    self._close_driver(pages=1)
                 self.stats['processed_count'] += 1
                 
                 if success:
@@ -674,7 +451,7 @@ class CouponScraper:
             raise
             
         finally:
-            self.logger.info("关闭WebDriver...")
+            self.logger.info("归还WebDriver...")
             self._close_driver()
             
             # 输出任务统计信息
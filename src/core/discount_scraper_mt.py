@@ -23,7 +23,6 @@ from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from tqdm import tqdm
 import concurrent.futures
-from dateutil import parser as date_parser
 from sqlalchemy import or_  # 添加缺失的or_函数导入
 
 # 添加项目根目录到Python路径
@@ -32,9 +31,15 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from models.database import Product, Offer, CouponHistory, get_db
-from src.utils.webdriver_manager import WebDriverConfig
+from src.core.webdriver_pool import WebDriverPool, get_shared_pool
+from src.core.coupon_fetcher import CouponFetcher
+from src.core.coupon_parser import parse_coupon, parse_terms, is_captcha_page
+from src.utils.delay_queue import DelayQueue
+from src.utils.adaptive_concurrency import AdaptiveConcurrencyController
 # 导入Loguru相关模块
 from src.utils.log_config import get_logger, LogContext, track_performance, LogConfig
+from src.utils.metrics import get_registry
+from src.utils.diagnostics import add_diagnostics_arguments, setup_diagnostics
 
 def parse_arguments():
     """添加命令行参数支持"""
@@ -53,6 +58,12 @@ def parse_arguments():
     parser.add_argument('--update-interval', type=int, default=72, help='优惠券信息更新间隔(小时)，默认72小时')
     parser.add_argument('--force-update', action='store_true', help='强制更新所有商品，忽略更新间隔')
     parser.add_argument('--check-details', action='store_true', help='检查并抓取优惠券的到期日期和条款信息检查并抓取优惠券的到期日期和条款信息')
+    parser.add_argument('--adaptive', action='store_true', help='根据验证码率和失败率自动调整活跃线程数和请求间隔')
+    parser.add_argument('--min-threads', type=int, default=1, help='自适应模式下的最少线程数')
+    parser.add_argument('--max-threads', type=int, default=None, help='自适应模式下的最多线程数，默认为--threads的两倍')
+    parser.add_argument('--engine', type=str, choices=['selenium', 'http'], default='selenium',
+                        help='抓取引擎: selenium为每个线程启动浏览器, http优先使用aiohttp并在需要时回退到浏览器')
+    add_diagnostics_arguments(parser)
     return parser.parse_args()
 
 # 初始化Loguru日志配置
@@ -127,9 +138,23 @@ def init_logger(log_level=None, log_to_console=False, file_use_colors=False):
 # 全局日志记录器
 logger = None  # 将在main函数中初始化
 
+# 条款链接的多种定位方式，合并为一次查询
+TERMS_LINK_XPATH = " | ".join([
+    "//a[contains(text(), 'Terms') or text()='Terms']",
+    "//a[@data-selector='cxcwPopoverLink']",
+    "//span[contains(@class, 'a-declarative') and contains(@data-a-modal, 'Terms')]//a",
+    "//span[contains(@class, 'a-truncate-full')]//a[contains(text(), 'Terms')]",
+    "//a[contains(@class, 'a-link-normal') and (contains(text(), 'Terms') or contains(text(), 'terms'))]"
+])
+
+# 优惠券抓取事件计数，子键记为 "key.subkey"
+_scraper_events = get_registry().counter(
+    "coupon_scraper_events_total", "多线程优惠券抓取的事件计数", ("event",)
+)
+
 # 创建线程安全的统计数据类
 class ThreadSafeStats:
-    """线程安全的统计数据类"""
+    """线程安全的统计数据类，计数同时记入 coupon_scraper_events_total 指标"""
     
     def __init__(self):
         self._lock = threading.RLock()
@@ -142,7 +167,7 @@ class ThreadSafeStats:
             'captcha_count': 0,        # 遇到验证码的次数
             'refresh_success_count': 0, # 通过刷新成功解决验证码的次数
             'retry_count': 0,          # 重试的次数
-            'delayed_count': 0,        # 因等待期而被延迟处理的次数
+            'delayed_count': 0,        # 进入延迟队列等待期的次数
             'max_retry_exceeded': 0,   # 超过最大重试次数的任务数
             'updated_fields': {
                 'coupon_type': 0,
@@ -164,6 +189,7 @@ class ThreadSafeStats:
             else:
                 self._stats[key] += amount
                 logger.debug("统计计数增加: {} += {}", key, amount)
+        _scraper_events.inc(amount, event=f"{key}.{subkey}" if subkey else key)
     
     def set(self, key, value):
         """设置值"""
@@ -179,24 +205,57 @@ class ThreadSafeStats:
             else:
                 return self._stats.copy()
 
+class SharedRetryCounter:
+    """跨工作线程共享的验证码重试计数
+    
+    重试任务可能被任意工作线程取出，计数必须共享，否则换一个线程就会重置退避。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+    
+    def get(self, asin: str) -> int:
+        """获取ASIN已重试的次数"""
+        with self._lock:
+            return self._counts.get(asin, 0)
+    
+    def increment(self, asin: str) -> int:
+        """增加ASIN的重试次数并返回新值"""
+        with self._lock:
+            self._counts[asin] = self._counts.get(asin, 0) + 1
+            return self._counts[asin]
+    
+    def clear(self, asin: str):
+        """处理成功后清除ASIN的重试次数"""
+        with self._lock:
+            self._counts.pop(asin, None)
+
 class CouponScraperWorker:
     """优惠券信息抓取工作线程类"""
     
-    def __init__(self, worker_id: int, task_queue: queue.Queue, stats: ThreadSafeStats, 
+    def __init__(self, worker_id: int, task_queue: DelayQueue, stats: ThreadSafeStats, 
                  headless: bool = True, min_delay: float = 2.0, max_delay: float = 4.0, 
-                 debug: bool = False, verbose: bool = False):
+                 debug: bool = False, verbose: bool = False, fetcher: Optional[CouponFetcher] = None,
+                 retry_counter: Optional[SharedRetryCounter] = None,
+                 controller: Optional[AdaptiveConcurrencyController] = None,
+                 driver_pool: Optional[WebDriverPool] = None):
         """
         初始化工作线程
         
         Args:
             worker_id: 工作线程ID
-            task_queue: 任务队列
+            task_queue: 按就绪时间排序的任务队列
             stats: 线程安全的统计数据
             headless: 是否使用无头模式
             min_delay: 最小请求延迟(秒)
             max_delay: 最大请求延迟(秒)
             debug: 是否启用调试模式
             verbose: 是否输出更多详细信息
+            fetcher: HTTP抓取引擎，提供时不再为该线程启动浏览器
+            retry_counter: 所有工作线程共享的重试计数
+            controller: 自适应并发控制器，决定该线程是否暂停以及请求间隔倍数
+            driver_pool: 租用浏览器的WebDriver池，默认使用进程内共享的池
         """
         self.worker_id = worker_id
         self.task_queue = task_queue
@@ -206,14 +265,14 @@ class CouponScraperWorker:
         self.max_delay = max_delay
         self.debug = debug
         self.verbose = verbose
+        self.fetcher = fetcher
+        self.driver_pool = driver_pool
         self.driver = None
         self.db_session = None
         
-        # 已处理的商品集合，避免重复处理
-        self._processed_asins = set()
-        
-        # 重试计数器和时间戳，用于跟踪每个ASIN的重试次数和下次可处理的时间点
-        self._retry_counter = {}
+        # 共享的重试计数器；下次可处理的时间点由DelayQueue负责
+        self.retry_counter = retry_counter if retry_counter is not None else SharedRetryCounter()
+        self.controller = controller
         # 最大重试次数
         self.max_retries = 3
          
@@ -227,51 +286,31 @@ class CouponScraperWorker:
             logger.exception("数据库会话初始化失败: {}", e)
             raise
         
-        # 初始化WebDriver
-        self._init_driver()
+        # HTTP引擎按需从共享的WebDriverPool租用浏览器，无需为每个线程启动
+        if self.fetcher is None:
+            if self.driver_pool is None:
+                self.driver_pool = get_shared_pool(headless=self.headless)
+            self._init_driver()
     
     def _init_driver(self):
-        """初始化WebDriver"""
+        """从WebDriver池租用浏览器"""
         if not self.driver:
-            try:
-                config = WebDriverConfig()
-                self.driver = config.create_chrome_driver(headless=self.headless)
-                
-                # 设置全局超时参数
-                self.driver.set_page_load_timeout(60)  # 页面加载超时
-                self.driver.set_script_timeout(30)     # 脚本执行超时
-                
-                if self.debug:
-                    logger.debug("WebDriver设置详情:")
-                    logger.debug("  • 无头模式: {}", self.headless)
-                    logger.debug("  • 页面加载超时: 60秒")
-                    logger.debug("  • 脚本执行超时: 30秒")
-                
-                # 预热浏览器，访问简单页面确保WebDriver正常工作
-                self.driver.get("about:blank")
-                logger.info("WebDriver初始化完成")
-            except Exception as e:
-                logger.exception("WebDriver初始化异常: {}", e)
-                # 尝试重新创建
-                try:
-                    if self.driver:
-                        self.driver.quit()
-                except:
-                    pass
-                config = WebDriverConfig()
-                self.driver = config.create_chrome_driver(headless=self.headless)
-                self.driver.set_page_load_timeout(60)
-                self.driver.set_script_timeout(30)
-                logger.info("WebDriver重新初始化完成")
+            self.driver = self.driver_pool.get_driver()
+            if self.driver is None:
+                raise RuntimeError("从WebDriver池获取浏览器超时")
             
-    def _close_driver(self):
-        """关闭WebDriver"""
+            if self.debug:
+                logger.debug("WebDriver设置详情:")
+                logger.debug("  • 无头模式: {}", self.headless)
+                logger.debug("  • 页面加载超时: 60秒")
+                logger.debug("  • 脚本执行超时: 30秒")
+            logger.debug("已租用WebDriver")
+            
+    def _close_driver(self, pages: int = 0):
+        """归还WebDriver，池会按页面数和内存占用决定是否回收"""
         if self.driver:
-            try:
-                self.driver.quit()
-                logger.debug("WebDriver已关闭")
-            except Exception as e:
-                logger.warning("关闭WebDriver时出错: {}", e)
+            self.driver_pool.release_driver(self.driver, pages=pages)
+            logger.debug("WebDriver已归还")
             self.driver = None
             
     def _safe_refresh_page(self) -> bool:
@@ -307,6 +346,9 @@ class CouponScraperWorker:
         """
         从页面提取优惠券信息
         
+        页面源码只读取一次并交给coupon_parser解析；只有找到优惠券但页面中没有内嵌条款时，
+        才点击Terms链接并解析弹窗打开后的页面快照。
+        
         Returns:
             Tuple[Optional[str], Optional[float], Optional[datetime], Optional[str]]: 
             (优惠券类型, 优惠券值, 有效期, 条款)
@@ -315,332 +357,21 @@ class CouponScraperWorker:
             if self.debug:
                 logger.debug("开始提取优惠券信息...")
             
-            # 确保在函数顶部导入re模块
-            import re
-            
-            # 增强的正则表达式模式，用于从文本中提取金额
-            dollar_pattern = r'\$\s*(\d+(?:\.\d+)?)'
-            percentage_pattern = r'(\d+)%'
-            # 增强的正则表达式，匹配更多格式
-            fixed_amount_pattern = r'(?:[\$\£\€])?(\d+(?:\.\d{1,2})?)\s*(?:off|discount|save|coupon)'
-            percentage_amount_pattern = r'(?:save|get|take)?\s*(\d+(?:\.\d{1,2})?)\s*(?:%|percent|percentage)'
-            
-            # 用于匹配有效期的正则表达式，增加更多模式
-            date_patterns = [
-                r'Coupon\s+Expiry\s+Date\s*:?\s*(\w+\s+\d{1,2},?\s+\d{4})',  # Coupon Expiry Date: April 21, 2025
-                r'Coupon\s+Expiry\s+Date\s+(\w+\s+\d{1,2},?\s+\d{4})',  # Coupon Expiry Date April 21, 2025
-                r'(?:coupon|offer)\s+expires\s+(?:on)?\s*(\w+\s+\d{1,2},?\s+\d{4})',  # coupon expires on April 21, 2025
-                r'Valid\s+through\s+(\w+\s+\d{1,2},?\s+\d{4})',  # Valid through May 31, 2024
-                r'Promotion\s+(?:ends|expires)\s+(?:on)?\s*(\w+\s+\d{1,2},?\s+\d{4})',  # Promotion ends on April 21, 2025
-                r'(?:coupon|offer)\s+expires\s+(?:on)?\s*(\d{1,2}/\d{1,2}/\d{2,4})',  # coupon expires on 4/21/25
-                r'Expir(?:y|ation)\s+Date\s*:?\s*(\w+\s+\d{1,2},?\s+\d{4})'  # Expiration Date: April 28, 2025
-            ]
-            
-            # 初始化结果
-            coupon_type = None
-            coupon_value = None
-            expiration_date = None
-            terms = None
-            
-            # 保存页面源代码以便调试
-            if self.debug or self.verbose:
-                page_source = self.driver.page_source
-                # 检查页面源代码中是否包含关键词
-                if 'Apply $' in page_source and 'coupon' in page_source:
-                    logger.debug("页面源代码中检测到'Apply $ coupon'字样")
-                    # 使用正则表达式在页面源码中查找优惠券金额
-                    coupon_matches = re.findall(r'Apply\s+\$(\d+)\s+coupon', page_source)
-                    if coupon_matches:
-                        logger.debug("在页面源码中发现优惠券金额: ${}", coupon_matches[0])
-                
-                # 添加对百分比优惠券的检查
-                if 'Apply' in page_source and '%' in page_source and 'coupon' in page_source:
-                    logger.debug("页面源代码中检测到'Apply X% coupon'字样")
-                    # 匹配百分比优惠券
-                    percent_matches = re.findall(r'Apply\s+(\d+)%\s+coupon', page_source)
-                    if percent_matches:
-                        logger.debug("在页面源码中发现百分比优惠券: {}%", percent_matches[0])
-                        # 设置百分比优惠券信息
-                        coupon_type = "percentage"
-                        coupon_value = float(percent_matches[0])
-            
-            # 尝试提取优惠券值和类型
-            # 使用PHP代码中的XPath路径集合
-            xpath_paths = [
-                "//div[@id='promoPriceBlockMessage_feature_div']//span[@class='a-size-base a-color-success']",
-                "//div[@id='promoPriceBlockMessage_feature_div']//div[@class='a-box a-alert-inline a-alert-inline-success a-text-bold']//div[@class='a-alert-content']",
-                "//div[contains(@id, 'coupon')]//span[contains(@class, 'a-color-success')]",
-                "//div[contains(@id, 'promotion')]//span[contains(@class, 'promotion-message')]",
-                "//div[@id='buybox']//span[contains(text(), 'coupon')]",
-                "//div[@id='promoPriceBlockMessage']//span[contains(@class, 'promotion')]",
-                "//div[contains(@class, 'coupon-text')]",
-                "//div[contains(@id, 'dealPrice')]//span[contains(text(), '%') or contains(text(), 'off')]",
-                "//*[contains(text(), 'Apply $') and contains(text(), 'coupon')]",
-                "//*[contains(text(), 'Apply') and contains(text(), '%') and contains(text(), 'coupon')]",
-                "//span[contains(@class, 'couponBadge')]",
-                "//div[contains(@class, 'promotions')]//span[contains(text(), 'coupon')]",
-                "//div[contains(@class, 'applyPromotions')]",
-                "//div[@id='corePrice_desktop']//span[contains(text(), 'coupon')]"
-            ]
-            
-            # 尝试从所有XPath路径中提取优惠券信息
-            for xpath in xpath_paths:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, xpath)
-                    
-                    for element in elements:
-                        text = element.text.strip()
-                        if not text:
-                            continue
-                            
-                        if self.debug:
-                            logger.debug("发现优惠券元素: '{}'，通过XPath: '{}'", text, xpath)
-                        
-                        # 尝试匹配固定金额优惠券
-                        fixed_match = re.search(fixed_amount_pattern, text, re.IGNORECASE)
-                        if fixed_match:
-                            amount = float(fixed_match.group(1))
-                            logger.debug("提取到固定金额优惠券: ${}", amount)
-                            coupon_type = "fixed"
-                            coupon_value = amount
-                        
-                        # 尝试匹配百分比优惠券
-                        percent_match = re.search(percentage_amount_pattern, text, re.IGNORECASE)
-                        if percent_match:
-                            percentage = float(percent_match.group(1))
-                            logger.debug("提取到百分比优惠券: {}%", percentage)
-                            coupon_type = "percentage"
-                            coupon_value = percentage
-                        
-                        # 尝试基本美元金额模式匹配
-                        dollar_match = re.search(dollar_pattern, text)
-                        if dollar_match and ('coupon' in text.lower() or 'off' in text.lower() or 'save' in text.lower()):
-                            amount = float(dollar_match.group(1))
-                            logger.debug("通过美元符号模式提取到优惠券金额: ${}", amount)
-                            coupon_type = "fixed"
-                            coupon_value = amount
-                        
-                        # 尝试基本百分比模式匹配
-                        percent_basic_match = re.search(percentage_pattern, text)
-                        if percent_basic_match and ('coupon' in text.lower() or 'off' in text.lower() or 'save' in text.lower()):
-                            percentage = float(percent_basic_match.group(1))
-                            logger.debug("通过百分比符号模式提取到优惠券百分比: {}%", percentage)
-                            coupon_type = "percentage"
-                            coupon_value = percentage
-                except Exception as e:
-                    if self.debug:
-                        logger.debug("XPath '{}' 提取失败: {}", xpath, e)
+            coupon_type, coupon_value, expiration_date, terms = parse_coupon(self.driver.page_source)
             
-            # 如果找到了优惠券信息，尝试点击Terms链接获取更多信息
-            if coupon_type and coupon_value:
-                try:
-                    logger.debug("尝试查找Terms链接...")
-                    
-                    # 尝试查找Terms链接
-                    terms_links = []
-                    
-                    # 方法1：使用文本内容查找
-                    terms_xpath1 = "//a[contains(text(), 'Terms') or text()='Terms']"
-                    terms_links.extend(self.driver.find_elements(By.XPATH, terms_xpath1))
-                    
-                    # 方法2：使用data-selector属性查找
-                    terms_xpath2 = "//a[@data-selector='cxcwPopoverLink']"
-                    terms_links.extend(self.driver.find_elements(By.XPATH, terms_xpath2))
-                    
-                    # 方法3：使用更通用的方式查找
-                    terms_xpath3 = "//span[contains(@class, 'a-declarative') and contains(@data-a-modal, 'Terms')]//a"
-                    terms_links.extend(self.driver.find_elements(By.XPATH, terms_xpath3))
-                    
-                    # 方法4：查找coupon页面上的Terms链接
-                    terms_xpath4 = "//span[contains(@class, 'a-truncate-full')]//a[contains(text(), 'Terms')]"
-                    terms_links.extend(self.driver.find_elements(By.XPATH, terms_xpath4))
-                    
-                    # 方法5：查找任何可见的Terms链接
-                    terms_xpath5 = "//a[contains(@class, 'a-link-normal') and (contains(text(), 'Terms') or contains(text(), 'terms'))]"
-                    terms_links.extend(self.driver.find_elements(By.XPATH, terms_xpath5))
-                    
-                    # 如果找到了Terms链接，点击打开模态框
-                    for terms_link in terms_links:
-                        if terms_link.is_displayed() and terms_link.is_enabled():
-                            logger.info("找到并点击Terms链接")
-                            
-                            try:
-                                # 使用JavaScript点击
-                                self.driver.execute_script("arguments[0].click();", terms_link)
-                                
-                                # 等待模态框出现 - 增加等待时间确保完全加载
-                                time.sleep(2)
-                                
-                                # 尝试查找模态框内容 - 增加更多选择器以适应不同的弹窗结构
-                                modal_selectors = [
-                                    "//div[contains(@class, 'a-popover-content')]",
-                                    "//div[@id='a-popover-content-1']",
-                                    "//div[@id='a-popover-content-2']",
-                                    "//div[@id='a-popover-content-3']",
-                                    "//div[@id='a-popover-content-4']",
-                                    "//div[contains(@id, 'promo_tncPage_')]",
-                                    "//div[contains(@id, 'promo_tnc_popup_container_')]"
-                                ]
-                                
-                                for selector in modal_selectors:
-                                    modal_elements = self.driver.find_elements(By.XPATH, selector)
-                                    if modal_elements and modal_elements[0].is_displayed():
-                                        modal_content = modal_elements[0].text.strip()
-                                        if modal_content:
-                                            logger.debug("成功提取模态框内容，长度: {}", len(modal_content))
-                                            if self.debug and len(modal_content) > 0:
-                                                logger.debug("内容预览: {}", modal_content[:100] + "..." if len(modal_content) > 100 else modal_content)
-                                            
-                                            # 保存完整条款
-                                            terms = modal_content
-                                            
-                                            # 尝试直接从弹窗中提取到期日期
-                                            # 1. 寻找特定的到期日期元素
-                                            expiry_elements = self.driver.find_elements(By.XPATH, 
-                                                "//div[contains(@class, 'expiration') or contains(@id, 'expiration')]")
-                                            
-                                            if expiry_elements:
-                                                for expiry_elem in expiry_elements:
-                                                    expiry_text = expiry_elem.text.strip()
-                                                    if expiry_text:
-                                                        logger.debug("找到到期日期元素: {}", expiry_text)
-                                                        # 尝试从文本中提取日期
-                                                        for pattern in date_patterns:
-                                                            date_match = re.search(pattern, expiry_text, re.IGNORECASE)
-                                                            if date_match:
-                                                                date_str = date_match.group(1)
-                                                                try:
-                                                                    expiration_date = date_parser.parse(date_str)
-                                                                    logger.info("成功提取到期日期: {}", expiration_date.strftime('%Y-%m-%d'))
-                                                                    break
-                                                                except Exception as e:
-                                                                    logger.debug("解析日期失败: {} - {}", date_str, e)
-                                            
-                                            # 2. 如果没有找到特定元素，从整个弹窗内容中提取日期
-                                            if not expiration_date:
-                                                for pattern in date_patterns:
-                                                    date_match = re.search(pattern, modal_content, re.IGNORECASE)
-                                                    if date_match:
-                                                        date_str = date_match.group(1)
-                                                        try:
-                                                            expiration_date = date_parser.parse(date_str)
-                                                            logger.info("从模态框内容提取到到期日期: {}", expiration_date.strftime('%Y-%m-%d'))
-                                                            break
-                                                        except Exception as e:
-                                                            logger.debug("解析日期失败: {} - {}", date_str, e)
-                                            
-                                            # 成功提取内容，可以退出循环
-                                            break
-                                
-                                # 点击关闭按钮或按ESC关闭模态框
-                                try:
-                                    # 尝试查找关闭按钮
-                                    close_buttons = self.driver.find_elements(By.XPATH, "//button[@data-action='a-popover-close']")
-                                    if close_buttons:
-                                        self.driver.execute_script("arguments[0].click();", close_buttons[0])
-                                    else:
-                                        # 如果找不到关闭按钮，尝试按ESC键
-                                        from selenium.webdriver.common.keys import Keys
-                                        from selenium.webdriver.common.action_chains import ActionChains
-                                        ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                                except Exception as e:
-                                    logger.debug("关闭模态框失败，但继续处理: {}", e)
-                                
-                                break  # 成功处理了Terms链接，退出循环
-                            except Exception as e:
-                                logger.warning("点击Terms链接或提取模态框内容失败: {}", e)
-                
-                except Exception as e:
-                    logger.warning("处理Terms链接时发生错误: {}", e)
+            # 如果找到了优惠券信息但页面中没有条款，点击Terms链接获取弹窗内容
+            if coupon_type and not terms:
+                modal_source = self._open_terms_modal()
+                if modal_source:
+                    modal_expiration, terms = parse_terms(modal_source)
+                    expiration_date = expiration_date or modal_expiration
             
-            # 如果我们已经找到了优惠券信息，返回所有提取的数据
-            if coupon_type and coupon_value is not None:
+            if coupon_type:
                 logger.debug("返回提取的优惠券信息: 类型={}, 值={}, 有效期={}, 条款长度={}", 
                             coupon_type, coupon_value, 
                             expiration_date.strftime('%Y-%m-%d') if expiration_date else "None", 
                             len(terms) if terms else 0)
                 return coupon_type, coupon_value, expiration_date, terms
-            
-            # 如果未能提取到优惠券信息，尝试其他方法
-            # 检查优惠券特定元素 (保留原代码的方法)
-            coupon_elements = self.driver.find_elements(By.CSS_SELECTOR, ".a-section .couponBadge")
-            for element in coupon_elements:
-                text = element.text.strip().lower()
-                if self.debug:
-                    logger.debug("发现优惠券徽章: '{}'", text)
-                if "% off" in text or ("coupon" in text and "%" in text):
-                    try:
-                        # 提取百分比，处理格式如"40% off coupon"
-                        percentage_text = ''.join(c for c in text.split("%")[0] if c.isdigit())
-                        if percentage_text:
-                            percentage = float(percentage_text)
-                            logger.debug("从优惠券徽章提取到百分比优惠券: {}%", percentage)
-                            return "percentage", percentage, expiration_date, terms
-                    except (ValueError, IndexError) as e:
-                        logger.warning("无法从优惠券徽章提取百分比: {}, 错误: {}", text, e)
-                        
-            # 检查a-color-success元素 (保留原代码的方法)
-            success_elements = self.driver.find_elements(By.CSS_SELECTOR, ".a-color-success")
-            for element in success_elements:
-                text = element.text.strip()
-                if self.debug:
-                    logger.debug("发现a-color-success元素: '{}'", text)
-                
-                # 检查优惠券文本 - 添加对百分比优惠券的支持
-                if "coupon" in text.lower():
-                    # 检查是否有"apply $X coupon"文本
-                    dollar_match = re.search(dollar_pattern, text)
-                    if dollar_match:
-                        amount = float(dollar_match.group(1))
-                        logger.debug("从a-color-success元素提取到优惠券金额: ${}", amount)
-                        return "fixed", amount, expiration_date, terms
-                    
-                    # 检查是否有"apply X% coupon"文本
-                    percent_match = re.search(percentage_pattern, text)
-                    if percent_match:
-                        percentage = float(percent_match.group(1))
-                        logger.debug("从a-color-success元素提取到优惠券百分比: {}%", percentage)
-                        return "percentage", percentage, expiration_date, terms
-            
-            # 检查所有元素是否包含coupon关键词
-            try:
-                all_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'coupon')]")
-                for element in all_elements:
-                    text = element.text.strip()
-                    if not text:
-                        continue
-                        
-                    if self.debug:
-                        logger.debug("发现包含'coupon'的元素: '{}'", text)
-                    
-                    # 尝试所有匹配模式
-                    fixed_match = re.search(fixed_amount_pattern, text, re.IGNORECASE)
-                    if fixed_match:
-                        amount = float(fixed_match.group(1))
-                        logger.debug("从通用元素提取到固定金额优惠券: ${}", amount)
-                        return "fixed", amount, expiration_date, terms
-                    
-                    percent_match = re.search(percentage_amount_pattern, text, re.IGNORECASE)
-                    if percent_match:
-                        percentage = float(percent_match.group(1))
-                        logger.debug("从通用元素提取到百分比优惠券: {}%", percentage)
-                        return "percentage", percentage, expiration_date, terms
-                    
-                    # 手动检查格式如"Apply 15% coupon"
-                    if "apply" in text.lower() and "%" in text and "coupon" in text.lower():
-                        try:
-                            # 提取百分比数值
-                            parts = text.split("%")[0].strip().split()
-                            percentage_text = parts[-1]  # 取分割后最后一个元素作为百分比数值
-                            if percentage_text.isdigit():
-                                percentage = float(percentage_text)
-                                logger.debug("从'Apply X% coupon'格式手动提取百分比: {}%", percentage)
-                                return "percentage", percentage, expiration_date, terms
-                        except Exception as e:
-                            logger.debug("手动提取百分比失败: {}", e)
-            except Exception as e:
-                if self.debug:
-                    logger.debug("通用元素搜索失败: {}", e)
                     
         except Exception as e:
             logger.warning("提取优惠券信息失败: {}", e)
@@ -651,6 +382,43 @@ class CouponScraperWorker:
             logger.debug("未能提取到任何优惠券信息")
         return None, None, None, None
     
+    def _open_terms_modal(self) -> Optional[str]:
+        """
+        点击Terms链接打开条款弹窗
+        
+        Returns:
+            Optional[str]: 弹窗打开后的页面源码，未找到链接或点击失败时返回None
+        """
+        try:
+            logger.debug("尝试查找Terms链接...")
+            terms_links = self.driver.find_elements(By.XPATH, TERMS_LINK_XPATH)
+            for terms_link in terms_links:
+                if not (terms_link.is_displayed() and terms_link.is_enabled()):
+                    continue
+                
+                logger.info("找到并点击Terms链接")
+                # 使用JavaScript点击，并等待模态框完全加载
+                self.driver.execute_script("arguments[0].click();", terms_link)
+                time.sleep(2)
+                modal_source = self.driver.page_source
+                
+                # 点击关闭按钮或按ESC关闭模态框
+                try:
+                    close_buttons = self.driver.find_elements(By.XPATH, "//button[@data-action='a-popover-close']")
+                    if close_buttons:
+                        self.driver.execute_script("arguments[0].click();", close_buttons[0])
+                    else:
+                        from selenium.webdriver.common.keys import Keys
+                        from selenium.webdriver.common.action_chains import ActionChains
+                        ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
+                except Exception as e:
+                    logger.debug("关闭模态框失败，但继续处理: {}", e)
+                
+                return modal_source
+        except Exception as e:
+            logger.warning("点击Terms链接或提取模态框内容失败: {}", e)
+        return None
+    
     def _update_product_coupon(self, product: Product, coupon_type: str, coupon_value: float, 
                               expiration_date: Optional[datetime] = None, terms: Optional[str] = None):
         """更新商品优惠券信息"""
@@ -804,34 +572,9 @@ class CouponScraperWorker:
             bool: 如果是验证码页面返回True，否则返回False
         """
         try:
-            # 检查页面源码中的特定特征
-            page_source = self.driver.page_source.lower()
-            
-            # 检查典型的验证码页面文本
-            captcha_texts = [
-                "enter the characters you see below",
-                "type the characters you see in this image",
-                "sorry, we just need to make sure you're not a robot",
-                "captcha",
-                "bot check"
-            ]
-            
-            # 如果页面源码中包含任何验证码特征文本，则认为是验证码页面
-            for text in captcha_texts:
-                if text in page_source:
-                    logger.warning("检测到验证码页面 - 包含文本: '{}'", text)
-                    return True
-            
-            # 检查是否存在验证码输入框
-            captcha_inputs = self.driver.find_elements(By.ID, "captchacharacters")
-            if captcha_inputs:
-                logger.warning("检测到验证码页面 - 存在ID为'captchacharacters'的输入框")
-                return True
-            
-            # 检查是否存在验证码图片
-            captcha_images = self.driver.find_elements(By.XPATH, "//img[contains(@src, 'captcha')]")
-            if captcha_images:
-                logger.warning("检测到验证码页面 - 存在包含'captcha'的图片URL")
+            # 页面源码包含验证码特征文本、输入框和图片，读取一次即可判断
+            if is_captcha_page(self.driver.page_source):
+                logger.warning("检测到验证码页面 - 页面源码包含验证码特征")
                 return True
             
             # 检查页面标题
@@ -892,6 +635,55 @@ class CouponScraperWorker:
             logger.warning("尝试点击'Try different image'链接时出错: {}", e)
             return False
     
+    def _schedule_captcha_retry(self, asin: str) -> bool:
+        """
+        遇到验证码后安排稍后重试
+        
+        Args:
+            asin: 商品ASIN
+            
+        Returns:
+            bool: 已重新加入队列返回True，超过最大重试次数返回False
+        """
+        retry_count = self.retry_counter.increment(asin)
+        
+        # 如果重试次数超过最大值，则放弃
+        if retry_count > self.max_retries:
+            logger.error("商品 {} 已达到最大重试次数 {}，放弃处理", asin, self.max_retries)
+            self.stats.increment('max_retry_exceeded')
+            return False
+        
+        # 更新重试次数统计
+        self.stats.increment('retry_count')
+        self.stats.increment('delayed_count')
+        
+        # 延迟加入队列，到期前任何工作线程都不会取到该任务
+        delay = random.uniform(50, 70)  # 等待50-70秒
+        self.task_queue.put(asin, delay=delay)
+        
+        logger.info("商品 {} 将在 {:.0f} 秒后可再次处理", asin, delay)
+        return True  # 返回True表示任务已重新加入队列
+    
+    def _fetch_coupon_info_http(self, asin: str):
+        """
+        使用HTTP引擎获取优惠券信息
+        
+        Args:
+            asin: 商品ASIN
+            
+        Returns:
+            Tuple: (优惠券类型, 优惠券值, 有效期, 条款)；遇到验证码返回None
+        """
+        result = self.fetcher.fetch_sync(asin)
+        if result.captcha:
+            self.stats.increment('captcha_count')
+            logger.warning("HTTP引擎与浏览器回退均遇到验证码，商品 {} 稍后重试", asin)
+            return None
+        if result.error:
+            raise RuntimeError(f"HTTP引擎抓取失败: {result.error}")
+        logger.debug("优惠券信息来源: {}", result.source)
+        return result.as_tuple()
+    
     @track_performance  # 使用装饰器记录函数执行时间
     def process_product(self, product: Product) -> bool:
         """
@@ -904,6 +696,13 @@ class CouponScraperWorker:
             bool: 处理是否成功
         """
         try:
+            if self.fetcher is not None:
+                logger.info("开始处理商品(HTTP引擎): {}", product.asin)
+                coupon_info = self._fetch_coupon_info_http(product.asin)
+                if coupon_info is None:
+                    return self._schedule_captcha_retry(product.asin)
+                return self._save_coupon_info(product, *coupon_info)
+            
             url = f"https://www.amazon.com/dp/{product.asin}?th=1"
             logger.info("开始处理商品: {}", url)
             
@@ -951,11 +750,9 @@ class CouponScraperWorker:
                     refresh_success = self._safe_refresh_page()
                     
                     if not refresh_success:
-                        logger.warning("刷新页面失败，将商品 {} 放回队列尾部", product.asin)
+                        logger.warning("刷新页面失败，商品 {} 将延迟后重试", product.asin)
                         self.stats.increment('captcha_count')
-                        self.stats.increment('retry_count')
-                        self.task_queue.put(product.asin)
-                        return True
+                        return self._schedule_captcha_retry(product.asin)
                 
                 # 再次检查是否还是验证码页面
                 if self._is_captcha_page():
@@ -963,36 +760,7 @@ class CouponScraperWorker:
                     self.stats.increment('captcha_count')
                     logger.warning("尝试后仍然是验证码页面，商品 {} 将放回队列尾部稍后重试", product.asin)
                     
-                    # 获取当前ASIN的重试信息
-                    retry_info = self._retry_counter.get(product.asin, (0, 0))
-                    # 如果是旧格式（整数），则转换为元组格式
-                    if isinstance(retry_info, int):
-                        retry_count = retry_info + 1
-                    else:
-                        # 如果已经是元组格式，取出重试次数并增加
-                        retry_count = retry_info[0] + 1
-                    
-                    # 如果重试次数超过最大值，则放弃
-                    if retry_count > self.max_retries:
-                        logger.error("商品 {} 已达到最大重试次数 {}，放弃处理", product.asin, self.max_retries)
-                        self.stats.increment('max_retry_exceeded')
-                        return False
-                    
-                    # 更新重试次数统计
-                    self.stats.increment('retry_count')
-                    
-                    # 计算下次处理时间（当前时间 + 延迟）
-                    delay = random.uniform(50, 70)  # 等待50-70秒
-                    next_process_time = time.time() + delay
-                    
-                    # 创建一个包含时间戳的元组 (retry_count, next_process_time)
-                    self._retry_counter[product.asin] = (retry_count, next_process_time)
-                    
-                    logger.info("商品 {} 将在 {:.0f} 秒后可再次处理", product.asin, delay)
-                    
-                    # 将任务重新加入队列，但不等待
-                    self.task_queue.put(product.asin)
-                    return True  # 返回True表示任务已重新加入队列
+                    return self._schedule_captcha_retry(product.asin)
                 else:
                     # 操作成功解决了验证码问题
                     logger.info("操作成功，验证码已消失，继续处理")
@@ -1001,7 +769,22 @@ class CouponScraperWorker:
             # 提取优惠券信息
             logger.debug("提取优惠券信息...")
             coupon_type, coupon_value, expiration_date, terms = self._extract_coupon_info()
+            return self._save_coupon_info(product, coupon_type, coupon_value, expiration_date, terms)
             
+        except Exception as e:
+            self.db_session.rollback()
+            logger.exception("处理商品失败")
+            return False
+    
+    def _save_coupon_info(self, product: Product, coupon_type: Optional[str], coupon_value: Optional[float],
+                          expiration_date: Optional[datetime], terms: Optional[str]) -> bool:
+        """
+        记录并保存提取到的优惠券信息
+        
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
             # 记录提取到的信息
             coupon_value_str = str(coupon_value) if coupon_value is not None else "无"
             exp_date_str = expiration_date.strftime('%Y-%m-%d') if expiration_date else "无"
@@ -1021,8 +804,7 @@ class CouponScraperWorker:
             logger.info("商品优惠券信息更新成功")
             
             # 清除该ASIN的重试计数
-            if product.asin in self._retry_counter:
-                del self._retry_counter[product.asin]
+            self.retry_counter.clear(product.asin)
                 
             return True
             
@@ -1041,29 +823,8 @@ class CouponScraperWorker:
         Returns:
             bool: 处理是否成功
         """
-        # 检查商品是否在等待重试的状态
-        if asin in self._retry_counter:
-            retry_info = self._retry_counter[asin]
-            # 如果是元组格式 (retry_count, next_process_time)
-            if isinstance(retry_info, tuple) and len(retry_info) == 2:
-                retry_count, next_process_time = retry_info
-                current_time = time.time()
-                # 如果当前时间未到允许处理的时间点
-                if current_time < next_process_time:
-                    remaining_time = next_process_time - current_time
-                    logger.info("商品 {} 尚在等待期，还需等待 {:.1f} 秒，重新放回队列", 
-                              asin, remaining_time)
-                    # 更新延迟处理的计数
-                    self.stats.increment('delayed_count')
-                    # 重新放回队列并跳过处理
-                    self.task_queue.put(asin)
-                    return True
-        
-        # 检查是否是首次处理此ASIN
-        is_first_attempt = asin not in self._processed_asins
-        
-        # 将ASIN加入已处理集合，无论是否成功
-        self._processed_asins.add(asin)
+        # 重试中的ASIN已经统计过，不重复计数
+        is_first_attempt = self.retry_counter.get(asin) == 0
         
         # 仅在首次处理时增加processed_count计数
         if is_first_attempt:
@@ -1095,6 +856,27 @@ class CouponScraperWorker:
         
         return success
     
+    def _process_leased(self, asin: str) -> bool:
+        """
+        租用浏览器处理一个ASIN，处理完立即归还并计入页面数，由池按阈值回收或替换
+        
+        Returns:
+            bool: 处理是否成功
+        """
+        if self.fetcher is not None:
+            return self.process_asin(asin)
+        
+        try:
+            self._init_driver()
+        except RuntimeError as e:
+            logger.error("{}，商品 {} 处理失败", e, asin)
+            return False
+        
+        try:
+            return self.process_asin(asin)
+        finally:
+            self._close_driver(pages=1)
+    
     def run(self):
         """启动工作线程处理任务"""
         # 使用Loguru上下文管理
@@ -1109,9 +891,14 @@ class CouponScraperWorker:
             
             try:
                 while True:
-                    # 从队列获取任务，如果队列为空则返回None
+                    # 自适应模式下，超出活跃线程数的工作线程在此暂停
+                    if self.controller is not None and not self.controller.park(self.worker_id):
+                        logger.info("并发控制器已停止，退出")
+                        break
+                    
+                    # 阻塞等待最早到期的任务；队列为空且没有处理中的任务时退出
                     try:
-                        asin = self.task_queue.get(block=False)
+                        asin = self.task_queue.get()
                     except queue.Empty:
                         logger.info("任务队列为空，退出")
                         break
@@ -1124,27 +911,34 @@ class CouponScraperWorker:
                     # 处理商品
                     logger.info("处理商品 ASIN: {}", asin)
                     
-                    # 使用当前线程的会话处理ASIN
-                    # 注意：processed_count统计已移至process_asin方法中
-                    success = self.process_asin(asin)
-                    
-                    if success:
-                        self.stats.increment('success_count')
-                        logger.info("商品处理成功")
-                        # 成功后等待随机时间
-                        delay = random.uniform(self.min_delay, self.max_delay)
-                        logger.debug("等待 {:.1f} 秒...", delay)
-                        time.sleep(delay)
-                    else:
-                        self.stats.increment('failure_count')
-                        logger.warning("商品处理失败")
-                        # 失败后等待较长时间
-                        delay = random.uniform(5, 10)
-                        logger.debug("失败后等待 {:.1f} 秒...", delay)
-                        time.sleep(delay)
+                    # 无论处理结果如何都要标记任务完成，否则其他线程的get()和join()会一直等待
+                    try:
+                        # 使用当前线程的会话处理ASIN
+                        # 注意：processed_count统计已移至process_asin方法中
+                        try:
+                            success = self._process_leased(asin)
+                        except Exception:
+                            logger.exception("处理商品时发生异常")
+                            success = False
                     
-                    # 标记任务完成
-                    self.task_queue.task_done()
+                        if success:
+                            self.stats.increment('success_count')
+                            logger.info("商品处理成功")
+                            # 成功后等待随机时间
+                            delay = random.uniform(self.min_delay, self.max_delay)
+                            if self.controller is not None:
+                                delay = self.controller.scaled_delay(delay)
+                            logger.debug("等待 {:.1f} 秒...", delay)
+                            time.sleep(delay)
+                        else:
+                            self.stats.increment('failure_count')
+                            logger.warning("商品处理失败")
+                            # 失败后等待较长时间
+                            delay = random.uniform(5, 10)
+                            logger.debug("失败后等待 {:.1f} 秒...", delay)
+                            time.sleep(delay)
+                    finally:
+                        self.task_queue.task_done()
             
             except Exception as e:
                 logger.exception("工作线程发生异常")
@@ -1167,7 +961,9 @@ class CouponScraperMT:
     def __init__(self, num_threads: int = 4, batch_size: int = 50, headless: bool = True,
                  min_delay: float = 2.0, max_delay: float = 4.0, specific_asins: list = None,
                  debug: bool = False, verbose: bool = False, update_interval: int = 24,
-                 force_update: bool = False, log_to_console: bool = False, file_use_colors: bool = False):
+                 force_update: bool = False, log_to_console: bool = False, file_use_colors: bool = False,
+                 engine: str = 'selenium', adaptive: bool = False, min_threads: int = 1,
+                 max_threads: Optional[int] = None):
         """
         初始化多线程抓取器
         
@@ -1184,6 +980,10 @@ class CouponScraperMT:
             force_update: 强制更新所有商品，忽略更新间隔
             log_to_console: 是否将日志输出到控制台
             file_use_colors: 是否在文件日志中使用颜色，默认False
+            engine: 抓取引擎，'selenium'或'http'（HTTP优先，需要时回退到WebDriverPool）
+            adaptive: 是否启用自适应并发控制，num_threads作为初始线程数
+            min_threads: 自适应模式下的最少线程数
+            max_threads: 自适应模式下的最多线程数，默认为num_threads的两倍
         """
         # 检查环境变量，判断是否应该禁用颜色
         force_no_color = False
@@ -1243,14 +1043,22 @@ class CouponScraperMT:
         self.verbose = verbose
         self.update_interval = update_interval
         self.force_update = force_update
+        self.engine = engine
+        self.driver_pool = None
+        self.fetcher = None
+        self.adaptive = adaptive
+        self.min_threads = max(1, min(min_threads, self.num_threads))
+        self.max_threads = max(self.num_threads, min(max_threads or self.num_threads * 2, 32))
+        self.controller = None
+        self._workers_lock = threading.Lock()
         
         # 初始化数据库会话
         from models.database import get_db
         self.db = next(get_db())
         
-        # 初始化任务队列
-        import queue
-        self.task_queue = queue.Queue()
+        # 初始化任务队列（按就绪时间排序，验证码重试任务延迟到期后才会被取出）
+        self.task_queue = DelayQueue()
+        self.retry_counter = SharedRetryCounter()
         
         # 初始化线程安全统计数据
         self.stats = ThreadSafeStats()
@@ -1261,10 +1069,89 @@ class CouponScraperMT:
         # 添加完整的配置日志
         logger.info(
             "CouponScraperMT配置详情: 线程数={}, 批大小={}, 无头模式={}, 最小延迟={}, 最大延迟={}, "
-            "调试模式={}, 详细模式={}, 更新间隔={}小时, 强制更新={}, 日志到控制台={}, 文件日志颜色={}",
+            "调试模式={}, 详细模式={}, 更新间隔={}小时, 强制更新={}, 日志到控制台={}, 文件日志颜色={}, 抓取引擎={}",
             self.num_threads, self.batch_size, self.headless, self.min_delay, self.max_delay,
-            self.debug, self.verbose, self.update_interval, self.force_update, log_to_console, file_use_colors
+            self.debug, self.verbose, self.update_interval, self.force_update, log_to_console, file_use_colors,
+            self.engine
+        )
+    
+    def _start_driver_pool(self):
+        """创建所有工作线程共享的WebDriver池"""
+        if self.engine == 'http':
+            # 浏览器只在回退时按需创建，因此不预热空闲实例
+            self.driver_pool = WebDriverPool(
+                size=max(1, self.num_threads // 2),
+                headless=self.headless,
+                min_idle=0
+            )
+        else:
+            # 每个活跃线程一个浏览器，并保持一个预热实例用于替换被回收的浏览器
+            max_workers = self.max_threads if self.adaptive else self.num_threads
+            self.driver_pool = WebDriverPool(
+                size=max_workers + 1,
+                headless=self.headless,
+                min_idle=1,
+                max_wait_time=120,
+                page_load_timeout=60
+            )
+    
+    def _start_fetcher(self):
+        """启动HTTP抓取引擎，回退时使用共享的WebDriver池"""
+        self.fetcher = CouponFetcher(driver_pool=self.driver_pool, max_connections=self.num_threads * 2)
+        self.fetcher.start()
+    
+    def _stop_fetcher(self):
+        """关闭HTTP抓取引擎和WebDriver池"""
+        if self.fetcher is not None:
+            self.fetcher.close()
+            self.fetcher = None
+        if self.driver_pool is not None:
+            self.driver_pool.close_all()
+            self.driver_pool = None
+    
+    def _start_worker(self, worker_id: int):
+        """创建并启动一个工作线程"""
+        worker = CouponScraperWorker(
+            worker_id=worker_id,
+            task_queue=self.task_queue,
+            stats=self.stats,
+            headless=self.headless,
+            min_delay=self.min_delay,
+            max_delay=self.max_delay,
+            debug=self.debug,
+            verbose=self.verbose,
+            fetcher=self.fetcher,
+            retry_counter=self.retry_counter,
+            controller=self.controller,
+            driver_pool=self.driver_pool
+        )
+        thread = threading.Thread(
+            target=worker.run,
+            name=f"Worker-{worker_id}",
+            daemon=True
+        )
+        self.workers.append(thread)
+        thread.start()
+    
+    def _ensure_workers(self, count: int):
+        """确保至少启动了count个工作线程，供并发控制器扩容时调用"""
+        with self._workers_lock:
+            for worker_id in range(len(self.workers) + 1, count + 1):
+                logger.info("并发控制器扩容，启动工作线程 {}", worker_id)
+                self._start_worker(worker_id)
+    
+    def _start_controller(self):
+        """启动自适应并发控制器，决策时间序列写入日志目录"""
+        log_dir = Path(project_root) / os.getenv("APP_LOG_DIR", "logs")
+        self.controller = AdaptiveConcurrencyController(
+            stats_source=self.stats.get,
+            min_workers=self.min_threads,
+            max_workers=self.max_threads,
+            initial_workers=self.num_threads,
+            decision_log=log_dir / f"concurrency_decisions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+            on_resize=self._ensure_workers
         )
+        self.controller.start()
     
     @track_performance
     def _populate_queue(self):
@@ -1446,6 +1333,9 @@ class CouponScraperMT:
                 logger.info("- 强制更新模式: {}", "启用" if self.force_update else "禁用")
                 logger.info("- 无头模式: {}", "启用" if self.headless else "禁用")
                 logger.info("- 调试模式: {}", "启用" if self.debug else "禁用")
+                logger.info("- 抓取引擎: {}", self.engine)
+                if self.adaptive:
+                    logger.info("- 自适应并发: 启用 (线程数范围 {}-{})", self.min_threads, self.max_threads)
                 logger.info("=====================================================")
                 
                 # 填充任务队列
@@ -1454,26 +1344,16 @@ class CouponScraperMT:
                     logger.warning("没有找到需要处理的商品，任务结束")
                     return
                 
+                self._start_driver_pool()
+                if self.engine == 'http':
+                    self._start_fetcher()
+                
+                if self.adaptive:
+                    self._start_controller()
+                
                 # 创建并启动工作线程
                 logger.info("启动 {} 个工作线程", self.num_threads)
-                for i in range(self.num_threads):
-                    worker = CouponScraperWorker(
-                        worker_id=i+1,
-                        task_queue=self.task_queue,
-                        stats=self.stats,
-                        headless=self.headless,
-                        min_delay=self.min_delay,
-                        max_delay=self.max_delay,
-                        debug=self.debug,
-                        verbose=self.verbose
-                    )
-                    
-                    # 使用线程池启动工作线程
-                    threading.Thread(
-                        target=worker.run,
-                        name=f"Worker-{i+1}",
-                        daemon=True
-                    ).start()
+                self._ensure_workers(self.num_threads)
                 
                 # 等待所有任务完成
                 logger.info("等待所有任务完成...")
@@ -1486,6 +1366,12 @@ class CouponScraperMT:
                 logger.exception("抓取过程发生错误")
             
             finally:
+                # 停止并发控制器，唤醒暂停中的工作线程使其退出
+                if self.controller is not None:
+                    self.controller.stop()
+                pool_metrics = self.driver_pool.get_metrics() if self.driver_pool is not None else None
+                self._stop_fetcher()
+                
                 # 设置结束时间
                 self.stats.set('end_time', time.time())
                 
@@ -1500,7 +1386,16 @@ class CouponScraperMT:
                 # 将统计信息作为消息内容直接打印，而不是使用extra参数
                 logger.info(f"任务统计:")
                 logger.info(f"线程数: {self.num_threads}")
+                if self.controller is not None:
+                    logger.info(f"自适应并发: 最终活跃线程数 {self.controller.active_workers}, "
+                                f"请求间隔倍数 {self.controller.delay_scale:.2f}, 决策次数 {len(self.controller.history)}")
                 logger.info(f"总耗时: {duration:.1f}秒")
+                if pool_metrics is not None:
+                    startup, lease_wait = pool_metrics['startup_seconds'], pool_metrics['lease_wait_seconds']
+                    logger.info(f"WebDriver池: 启动 {pool_metrics['created']} 个 (平均 {startup['avg']:.2f}秒, "
+                                f"P95 {startup['p95']:.2f}秒), 租用 {pool_metrics['leases']} 次 "
+                                f"(平均等待 {lease_wait['avg']:.3f}秒, P95 {lease_wait['p95']:.3f}秒), "
+                                f"回收 {pool_metrics['recycled']} 个, 异常替换 {pool_metrics['unhealthy']} 个")
                 logger.info(f"处理商品数: {stats['processed_count']}")
                 # 如果处理过程中存在重试，添加独立商品数的计数说明
                 if stats['retry_count'] > 0:
@@ -1692,6 +1587,7 @@ def main():
         log_level=args.log_level or ('DEBUG' if args.debug else 'INFO'),
         log_to_console=args.log_to_console
     )
+    setup_diagnostics(args)
     
     # 处理命令行参数中的ASIN
     specific_asins = None
@@ -1728,7 +1624,11 @@ def main():
                 debug=args.debug,
                 verbose=args.verbose,
                 update_interval=args.update_interval,
-                force_update=args.force_update
+                force_update=args.force_update,
+                engine=args.engine,
+                adaptive=args.adaptive,
+                min_threads=args.min_threads,
+                max_threads=args.max_threads
             )
         
         try:
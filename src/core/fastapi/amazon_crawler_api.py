@@ -14,9 +14,9 @@ Amazon爬虫和产品API FastAPI服务
 - 缓存管理
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Path, Depends
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Path, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List, Optional, Any, Union
+from typing import Callable, Dict, List, Optional, Any, Sequence, Union
 from datetime import datetime, UTC
 import asyncio
 import uvicorn
@@ -25,14 +25,18 @@ import os
 from pathlib import Path as PathLib
 import aiohttp
 from sqlalchemy import or_, and_
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, Response
+from sse_starlette.sse import EventSourceResponse
+import json
 from models.crawler import CrawlerRequest, CrawlerResponse, CrawlerResult
 from models.product import ProductInfo, ProductOffer
 from pydantic import BaseModel, Field, field_validator
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
-from models.database import SessionLocal, init_db, Product, ProductVariant
+from models.database import SessionLocal, init_db, Product, ProductVariant, engine, get_data_versions
 from models.product_service import ProductService
+from models.product_serializer import Projection, resolve_projection
 from enum import Enum
 from models.scheduler import SchedulerManager
 from models.scheduler_models import JobConfig, JobStatus, SchedulerStatus, JobHistory
@@ -52,6 +56,13 @@ try:
     from src.core.amazon_bestseller import crawl_deals, save_results
     from src.core.amazon_product_api import AmazonProductAPI
     from src.core.cj_api_client import CJAPIClient
+    from src.core.task_registry import (
+        get_task_registry, track_task, report_progress, task_event_stream,
+        EVENT_ITEMS_FOUND, STATUS_COMPLETED, STATUS_FAILED
+    )
+    from src.utils.metrics import get_registry, HTTPMetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+    from src.utils.request_timing import TimedAPIRoute, RequestTimingMiddleware, instrument_engine
+    from src.utils.response_cache import ResponseCache
 except ImportError as e:
     logger.error(f"导入错误: {str(e)}")
     raise
@@ -158,13 +169,16 @@ if os.environ.get("UVICORN_WORKER_INITIALIZED", "0") != "1":
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 创建并启动调度器
+    # 创建并启动调度器，任务工作进程池只在当选主节点的工作进程中启动
     scheduler_manager = SchedulerManager()
     scheduler_manager.start()
     logger.info("调度器已启动")
     yield
     # 在这里可以添加应用关闭时需要执行的清理代码
     logger.info("应用关闭，执行清理工作")
+    # 释放主节点租约，其他API工作进程可以立即接管定时任务
+    scheduler_manager.stop()
+    scheduler_manager.stop_worker_pool()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -183,6 +197,16 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有请求头
 )
 
+# 按路由统计请求数和耗时，供 /metrics 导出
+app.add_middleware(HTTPMetricsMiddleware)
+
+# 把请求耗时拆分为SQL、业务处理和序列化；调试模式（API_DEBUG=true）下
+# 响应头返回 X-Query-Count 和 Server-Timing。路由类需在声明路由之前设置
+app.router.route_class = TimedAPIRoute
+app.add_middleware(RequestTimingMiddleware, debug=os.getenv("API_DEBUG", "false").lower() == "true")
+# 统计SQL耗时，超过 SQL_SLOW_QUERY_MS（默认200毫秒）的语句连同执行计划写入日志
+instrument_engine(engine)
+
 # 导入日志分析API路由
 try:
     from src.api.log_analysis_api import router as log_analysis_router
@@ -191,8 +215,9 @@ try:
 except ImportError as e:
     logger.warning(f"无法导入日志分析API路由: {str(e)}")
 
-# 存储任务状态的字典
-tasks_status: Dict[str, Dict] = {}
+# 运行时诊断API路由（采样分析、tracemalloc、对象统计），需设置ADMIN_TOKEN
+from src.api.diagnostics_api import router as diagnostics_router
+app.include_router(diagnostics_router)
 
 class BatchDeleteRequest(BaseModel):
     """批量删除请求模型"""
@@ -255,11 +280,15 @@ class BrandStats(BaseModel):
     total_brands: int                       # 品牌总数
     pagination: Dict[str, Any]              # 分页信息
 
+# 批量查询单次最多的ASIN数；商品、优惠和优惠券按批次加载，查询数不随ASIN数线性增长
+MAX_QUERY_ASINS = 1000
+
 class ProductQueryRequest(BaseModel):
     """商品查询请求模型"""
-    asins: List[str] = Field(..., min_items=1, max_items=50, description="产品ASIN列表,最多50个")
+    asins: List[str] = Field(..., min_items=1, max_items=MAX_QUERY_ASINS, description=f"产品ASIN列表,最多{MAX_QUERY_ASINS}个")
     include_metadata: bool = Field(False, description="是否包含元数据")
     include_browse_nodes: Optional[List[str]] = Field(None, description="要包含的浏览节点ID列表，为空则包含所有节点")
+    fields: Optional[str] = Field(None, description="返回字段：投影名称card/analytics/full，或逗号分隔的字段列表（优惠字段写作offers.price），默认full")
 
     @field_validator('asins')
     @classmethod
@@ -299,6 +328,59 @@ def get_db():
         except Exception:
             pass
 
+# 读接口响应缓存：按规范化的查询参数和数据版本号缓存，数据写入使版本号变化后自动失效
+response_cache = ResponseCache()
+
+# 商品列表依赖的数据表，商品统计不涉及优惠券
+PRODUCT_LIST_TABLES = ("products", "offers", "coupon_history")
+PRODUCT_STATS_TABLES = ("products", "offers")
+
+async def cached_json_response(
+    request: Request,
+    db: Session,
+    namespace: str,
+    params: Dict[str, Any],
+    tables: Sequence[str],
+    compute: Callable[[], Any]
+) -> Response:
+    """
+    返回带ETag的缓存JSON响应
+
+    先读取依赖数据表的版本号，相同参数且数据未变化时直接返回缓存的响应体，
+    If-None-Match 匹配时返回304；并发的相同请求只计算一次。
+
+    Args:
+        request: 请求对象，用于读取If-None-Match
+        db: 数据库会话
+        namespace: 缓存命名空间
+        params: 影响响应内容的全部查询参数
+        tables: 响应依赖的数据表
+        compute: 计算响应内容的同步函数
+    """
+    versions = await asyncio.to_thread(get_data_versions, db, tables)
+    return await response_cache.respond(request, namespace, params, tuple(sorted(versions.items())), compute)
+
+def parse_projection(fields: Optional[str]) -> Optional[Projection]:
+    """解析fields参数为字段投影，无效的投影名称或字段返回400"""
+    try:
+        return resolve_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+
+def get_projection(
+    fields: Optional[str] = Query(
+        None,
+        description="返回字段：投影名称card/analytics/full，或逗号分隔的字段列表（优惠字段写作offers.price），默认full"
+    )
+) -> Optional[Projection]:
+    """
+    字段投影依赖函数
+
+    投影决定SQL查询的列、是否加载优惠和优惠券以及输出的字段，
+    card/analytics 等精简投影可显著减小响应体积和序列化开销
+    """
+    return parse_projection(fields)
+
 def get_product_api(marketplace: str = "www.amazon.com") -> AmazonProductAPI:
     """
     获取AmazonProductAPI实例
@@ -337,21 +419,25 @@ async def crawl_task(task_id: str, params: CrawlerRequest):
         task_id: 任务ID
         params: 爬虫请求参数
         
-    执行爬虫任务并更新任务状态。任务完成后，结果将保存到文件系统。
+    执行爬虫任务并把状态和进度写入任务登记表。任务完成后，结果将保存到文件系统。
     """
+    registry = get_task_registry()
     try:
         start_time = datetime.now()
+        registry.start_task(task_id)
         
         # 创建输出目录
         output_dir = PathLib("crawler_results")
         output_dir.mkdir(exist_ok=True)
         
-        # 执行爬虫
-        asins = crawl_deals(
-            max_items=params.max_items,
-            timeout=params.timeout,
-            headless=params.headless
-        )
+        # 在线程中执行爬虫，避免Selenium阻塞事件循环；每次滚动发现新商品时上报进度
+        with track_task(task_id, registry):
+            asins = await asyncio.to_thread(asyncio.run, crawl_deals(
+                max_items=params.max_items,
+                timeout=params.timeout,
+                headless=params.headless,
+                on_items=lambda items: report_progress(EVENT_ITEMS_FOUND, count=len(items))
+            ))
         
         # 保存结果
         output_file = output_dir / f"{task_id}.{params.output_format}"
@@ -359,20 +445,16 @@ async def crawl_task(task_id: str, params: CrawlerRequest):
         
         # 更新任务状态
         duration = (datetime.now() - start_time).total_seconds()
-        tasks_status[task_id] = {
-            "status": "completed",
+        registry.finish_task(task_id, STATUS_COMPLETED, result={
             "total_items": len(asins),
             "asins": list(asins),
             "duration": duration,
-            "timestamp": datetime.now()
-        }
+            "output_format": params.output_format
+        }, items_saved=len(asins))
         
     except Exception as e:
-        tasks_status[task_id] = {
-            "status": "failed",
-            "error": str(e),
-            "timestamp": datetime.now()
-        }
+        logger.error(f"爬虫任务 {task_id} 失败: {str(e)}")
+        registry.finish_task(task_id, STATUS_FAILED, error=str(e))
 
 # 系统状态相关API
 @app.get("/api/health")
@@ -403,17 +485,26 @@ async def health_check(db: Session = Depends(get_db)):
             "error": str(e)
         }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    以Prometheus文本格式导出进程内指标
+
+    包括HTTP请求、track_performance函数耗时、外部API调用耗时、限流等待和抓取计数。
+    指标保存在各工作进程内，多进程部署时由Prometheus分别抓取。
+    """
+    return Response(get_registry().render(), media_type=METRICS_CONTENT_TYPE)
+
 # 爬虫任务相关API
 @app.post("/api/crawl", response_model=CrawlerResponse, include_in_schema=False)
 async def start_crawler(params: CrawlerRequest, background_tasks: BackgroundTasks):
     """启动爬虫任务"""
     task_id = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # 初始化任务状态
-    tasks_status[task_id] = {
-        "status": "running",
-        "timestamp": datetime.now()
-    }
+    # 登记任务，状态在所有API工作进程间共享
+    get_task_registry().create_task(
+        "crawl", task_id=task_id, crawler_type="deals", params=params.model_dump()
+    )
     
     # 添加后台任务
     background_tasks.add_task(crawl_task, task_id, params)
@@ -428,37 +519,38 @@ async def start_crawler(params: CrawlerRequest, background_tasks: BackgroundTask
 @app.get("/api/status/{task_id}", response_model=CrawlerResult, include_in_schema=False)
 async def get_task_status(task_id: str):
     """获取任务状态"""
-    if task_id not in tasks_status:
+    task_info = get_task_registry().get_task(task_id)
+    if task_info is None:
         raise HTTPException(status_code=404, detail="Task not found")
-        
-    task_info = tasks_status[task_id]
     
-    if task_info["status"] == "failed":
+    if task_info["status"] == STATUS_FAILED:
         raise HTTPException(
             status_code=500,
-            detail=f"Task failed: {task_info.get('error', 'Unknown error')}"
+            detail=f"Task failed: {task_info.get('error') or 'Unknown error'}"
         )
-        
+    
+    result = task_info["result"] or {}
     return CrawlerResult(
         task_id=task_id,
         status=task_info["status"],
-        total_items=task_info.get("total_items", 0),
-        asins=task_info.get("asins", []),
-        duration=task_info.get("duration", 0),
-        timestamp=task_info["timestamp"]
+        total_items=result.get("total_items", task_info["items_found"]),
+        asins=result.get("asins", []),
+        duration=result.get("duration", 0),
+        timestamp=task_info["finished_at"] or task_info["updated_at"]
     )
 
 @app.get("/api/download/{task_id}", include_in_schema=False)
 async def download_results(task_id: str):
     """下载爬虫结果"""
-    if task_id not in tasks_status:
+    task_info = get_task_registry().get_task(task_id)
+    if task_info is None:
         raise HTTPException(status_code=404, detail="Task not found")
-        
-    task_info = tasks_status[task_id]
-    if task_info["status"] != "completed":
+    
+    if task_info["status"] != STATUS_COMPLETED:
         raise HTTPException(status_code=400, detail="Task not completed yet")
-        
-    output_file = PathLib("crawler_results") / f"{task_id}.{task_info.get('output_format', 'json')}"
+    
+    output_format = (task_info["result"] or {}).get("output_format", "json")
+    output_file = PathLib("crawler_results") / f"{task_id}.{output_format}"
     if not output_file.exists():
         raise HTTPException(status_code=404, detail="Result file not found")
         
@@ -468,6 +560,59 @@ async def download_results(task_id: str):
         media_type="application/octet-stream"
     )
 
+# 任务登记和进度推送API
+@app.get("/api/tasks", include_in_schema=False)
+async def list_tasks(
+    kind: Optional[str] = Query(None, description="任务类型：crawl/job"),
+    job_id: Optional[str] = Query(None, description="定时任务ID"),
+    status: Optional[str] = Query(None, description="任务状态"),
+    limit: int = Query(50, ge=1, le=500, description="最多返回的任务数")
+):
+    """列出最近的任务及其进度"""
+    return await asyncio.to_thread(get_task_registry().list_tasks, kind, job_id, status, limit)
+
+@app.get("/api/tasks/events", include_in_schema=False)
+async def stream_task_events(
+    request: Request,
+    task_id: Optional[str] = Query(None, description="只推送该任务的事件"),
+    job_id: Optional[str] = Query(None, description="只推送该定时任务的事件"),
+    kind: Optional[str] = Query(None, description="只推送该类型任务的事件"),
+    last_event_id: Optional[int] = Query(None, description="从该事件ID之后开始推送"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    通过Server-Sent Events推送任务进度
+    
+    首次连接先推送snapshot事件（当前任务列表），之后推送created/status/items_found/batch_saved/error事件。
+    断线重连时浏览器会带上Last-Event-ID请求头，服务端从该事件之后补发。
+    """
+    after_id = last_event_id
+    if after_id is None and last_event_id_header and last_event_id_header.isdigit():
+        after_id = int(last_event_id_header)
+    
+    async def event_generator():
+        async for event in task_event_stream(
+            get_task_registry(), after_id, is_disconnected=request.is_disconnected,
+            task_id=task_id, job_id=job_id, kind=kind
+        ):
+            yield {
+                "id": str(event["id"]),
+                "event": event["type"],
+                "data": json.dumps(event, ensure_ascii=False, default=str)
+            }
+    
+    return EventSourceResponse(event_generator())
+
+@app.get("/api/tasks/{task_id}", include_in_schema=False)
+async def get_task_detail(task_id: str, events: int = Query(100, ge=0, le=1000, description="返回的最近事件数")):
+    """获取任务详情和最近的进度事件"""
+    registry = get_task_registry()
+    task_info = await asyncio.to_thread(registry.get_task, task_id)
+    if task_info is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task_info["events"] = await asyncio.to_thread(registry.get_events, task_id, events) if events else []
+    return task_info
+
 # 商品管理相关API
 @app.get("/api/products/discount")
 async def list_discount_products(
@@ -485,7 +630,8 @@ async def list_discount_products(
     browse_node_ids: Optional[List[str]] = Query(None, description="Browse Node IDs"),
     bindings: Optional[List[str]] = Query(None, description="商品绑定类型"),
     product_groups: Optional[List[str]] = Query(None, description="商品组"),
-    brands: Optional[List[str]] = Query(None, description="品牌")
+    brands: Optional[List[str]] = Query(None, description="品牌"),
+    projection: Optional[Projection] = Depends(get_projection)
 ):
     """获取折扣商品列表"""
     try:
@@ -504,23 +650,12 @@ async def list_discount_products(
             browse_node_ids=browse_node_ids,
             bindings=bindings,
             product_groups=product_groups,
-            brands=brands
+            brands=brands,
+            projection=projection
         )
         
-        # 确保使用数据库中的current_price字段
-        if "items" in result and result["items"]:
-            for product_info in result["items"]:
-                if product_info.offers and len(product_info.offers) > 0:
-                    # 从数据库查询当前价格
-                    db_product = db.query(Product).filter(Product.asin == product_info.asin).first()
-                    if db_product and db_product.current_price is not None:
-                        # 更新第一个offer中的价格为数据库中的current_price
-                        product_info.offers[0].price = db_product.current_price
-                        # 确保original_price字段有值
-                        if db_product.original_price is not None and product_info.offers[0].original_price is None:
-                            product_info.offers[0].original_price = db_product.original_price
-                    
-        return result
+        # 商品字典已由序列化模块生成（第一个优惠价格取自current_price），直接编码返回
+        return JSONResponse(content=result)
     except Exception as e:
         logger.error(f"获取折扣商品列表失败: {str(e)}")
         return {
@@ -547,7 +682,8 @@ async def list_coupon_products(
     browse_node_ids: Optional[List[str]] = Query(None, description="Browse Node IDs"),
     bindings: Optional[List[str]] = Query(None, description="商品绑定类型"),
     product_groups: Optional[List[str]] = Query(None, description="商品组"),
-    brands: Optional[List[str]] = Query(None, description="品牌")
+    brands: Optional[List[str]] = Query(None, description="品牌"),
+    projection: Optional[Projection] = Depends(get_projection)
 ):
     """获取优惠券商品列表"""
     try:
@@ -567,23 +703,12 @@ async def list_coupon_products(
             browse_node_ids=browse_node_ids,
             bindings=bindings,
             product_groups=product_groups,
-            brands=brands
+            brands=brands,
+            projection=projection
         )
         
-        # 确保使用数据库中的current_price字段
-        if "items" in products and products["items"]:
-            for product_info in products["items"]:
-                if product_info.offers and len(product_info.offers) > 0:
-                    # 从数据库查询当前价格
-                    db_product = db.query(Product).filter(Product.asin == product_info.asin).first()
-                    if db_product and db_product.current_price is not None:
-                        # 更新第一个offer中的价格为数据库中的current_price
-                        product_info.offers[0].price = db_product.current_price
-                        # 确保original_price字段有值
-                        if db_product.original_price is not None and product_info.offers[0].original_price is None:
-                            product_info.offers[0].original_price = db_product.original_price
-        
-        return products
+        # 商品字典已由序列化模块生成（第一个优惠价格取自current_price），直接编码返回
+        return JSONResponse(content=products)
     except Exception as e:
         logger.error(f"获取优惠券商品列表失败: {str(e)}")
         return {
@@ -595,6 +720,7 @@ async def list_coupon_products(
 
 @app.get("/api/products/list")
 async def list_products(
+    request: Request,
     db: Session = Depends(get_db),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
@@ -610,7 +736,8 @@ async def list_products(
     product_groups: Optional[Union[List[str], str]] = Query(None, description="商品组，支持数组或逗号分隔的字符串"),
     api_provider: Optional[str] = Query(None, description="数据来源：pa-api/cj-api/all"),
     min_commission: Optional[int] = Query(None, ge=0, le=100, description="最低佣金比例"),
-    brands: Optional[Union[List[str], str]] = Query(None, description="品牌，支持数组或逗号分隔的字符串")
+    brands: Optional[Union[List[str], str]] = Query(None, description="品牌，支持数组或逗号分隔的字符串"),
+    projection: Optional[Projection] = Depends(get_projection)
 ):
     """获取商品列表，支持分页、筛选和排序"""
     try:
@@ -681,8 +808,7 @@ async def list_products(
                         brand_list.append(str(brand).strip())
             logger.info(f"处理后的brand_list: {brand_list}")
 
-        result = ProductService.list_products(
-            db=db,
+        filters = dict(
             page=page,
             page_size=page_size,
             min_price=min_price,
@@ -699,21 +825,13 @@ async def list_products(
             min_commission=min_commission,
             brands=brand_list
         )
+        params = {**filters, "fields": projection.name if projection else None}
         
-        # 确保使用数据库中的current_price字段
-        if "items" in result and result["items"]:
-            for product_info in result["items"]:
-                if product_info.offers and len(product_info.offers) > 0:
-                    # 从数据库查询当前价格
-                    db_product = db.query(Product).filter(Product.asin == product_info.asin).first()
-                    if db_product and db_product.current_price is not None:
-                        # 更新第一个offer中的价格为数据库中的current_price
-                        product_info.offers[0].price = db_product.current_price
-                        # 确保original_price字段有值
-                        if db_product.original_price is not None and product_info.offers[0].original_price is None:
-                            product_info.offers[0].original_price = db_product.original_price
-                        
-        return result
+        # 商品字典已由序列化模块生成（第一个优惠价格取自current_price），按参数和数据版本号缓存编码后的响应
+        return await cached_json_response(
+            request, db, "products:list", params, PRODUCT_LIST_TABLES,
+            lambda: ProductService.list_products(db=db, projection=projection, **filters)
+        )
     except Exception as e:
         logger.error(f"获取商品列表失败: {str(e)}")
         return {
@@ -845,6 +963,7 @@ async def get_products(request: ProductRequest):
 
 @app.get("/api/products/stats")
 async def get_products_stats(
+    request: Request,
     db: Session = Depends(get_db),
     product_type: Optional[str] = Query(None, description="商品类型：discount/coupon/all")
 ):
@@ -858,8 +977,10 @@ async def get_products_stats(
         dict: 统计信息
     """
     try:
-        stats = ProductService.get_products_stats(db, product_type)
-        return stats
+        return await cached_json_response(
+            request, db, "products:stats", {"product_type": product_type}, PRODUCT_STATS_TABLES,
+            lambda: jsonable_encoder(ProductService.get_products_stats(db, product_type))
+        )
     except Exception as e:
         logger.error(f"获取商品统计信息失败: {str(e)}")
         return {
@@ -887,18 +1008,8 @@ async def get_product(
                 detail=f"未找到ASIN为 {asin} 的产品"
             )
             
-        # 确保使用products表中的current_price
-        if product.offers and len(product.offers) > 0:
-            # 从数据库查询当前价格
-            db_product = db.query(Product).filter(Product.asin == asin).first()
-            if db_product and db_product.current_price is not None:
-                # 更新第一个offer中的价格为数据库中的current_price
-                product.offers[0].price = db_product.current_price
-                # 确保original_price字段有值
-                if db_product.original_price is not None and product.offers[0].original_price is None:
-                    product.offers[0].original_price = db_product.original_price
-                
-        return product
+        # 第一个优惠价格已取自products表的current_price；字典按ProductInfo字段生成，跳过响应模型的重复校验
+        return JSONResponse(content=product)
     except HTTPException:
         raise
     except Exception as e:
@@ -997,22 +1108,20 @@ async def query_product(
     Raises:
         HTTPException: 当查询失败时抛出
     """
+    projection = parse_projection(request.fields)
     try:
         # 如果是单个ASIN，传递字符串；否则传递列表
-        if len(request.asins) == 1:
-            products = ProductService.get_product_details_by_asin(
-                db, 
-                request.asins[0],  # 传递单个ASIN字符串
-                include_metadata=request.include_metadata,
-                include_browse_nodes=request.include_browse_nodes
-            )
-        else:
-            products = ProductService.get_product_details_by_asin(
-                db, 
-                request.asins,  # 传递ASIN列表
-                include_metadata=request.include_metadata,
-                include_browse_nodes=request.include_browse_nodes
-            )
+        asins = request.asins[0] if len(request.asins) == 1 else request.asins
+        
+        # 在线程池中查询，大批量ASIN不阻塞事件循环
+        products = await asyncio.to_thread(
+            ProductService.get_product_details_by_asin,
+            db,
+            asins,
+            include_metadata=request.include_metadata,
+            include_browse_nodes=request.include_browse_nodes,
+            projection=projection
+        )
         
         if not products:
             raise HTTPException(
@@ -1028,30 +1137,10 @@ async def query_product(
                     detail=f"未找到ASIN为 {request.asins[0]} 的商品"
                 )
             
-            # 确保使用products表中的current_price和original_price
-            if products.offers and len(products.offers) > 0:
-                db_product = db.query(Product).filter(Product.asin == request.asins[0]).first()
-                if db_product and db_product.current_price is not None:
-                    products.offers[0].price = db_product.current_price
-                    # 确保original_price字段有值
-                    if db_product.original_price is not None and products.offers[0].original_price is None:
-                        products.offers[0].original_price = db_product.original_price
-                
-            return products
+            return JSONResponse(content=products)
             
-        # 如果是批量查询，处理每个商品的价格
-        if isinstance(products, list):
-            for product in products:
-                if product and product.offers and len(product.offers) > 0:
-                    db_product = db.query(Product).filter(Product.asin == product.asin).first()
-                    if db_product and db_product.current_price is not None:
-                        product.offers[0].price = db_product.current_price
-                        # 确保original_price字段有值
-                        if db_product.original_price is not None and product.offers[0].original_price is None:
-                            product.offers[0].original_price = db_product.original_price
-        
-        # 返回结果列表
-        return products
+        # 返回结果列表，第一个优惠价格已取自products表的current_price
+        return JSONResponse(content=products)
         
     except HTTPException:
         raise
@@ -1096,6 +1185,9 @@ async def get_cache_stats():
             "cache_health": "good" if formatted_stats["total_files"] > 0 else "empty"
         }
         
+        # 读接口响应缓存（随数据写入自动失效）
+        formatted_stats["response_cache"] = response_cache.stats()
+        
         return formatted_stats
         
     except Exception as e:
@@ -1336,6 +1428,7 @@ async def execute_job_now(job_id: str):
 
 @app.get("/api/categories/stats", response_model=CategoryStats, include_in_schema=False)
 async def get_category_stats(
+    request: Request,
     product_type: Optional[str] = Query(None, description="商品类型: discount/coupon"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(50, ge=1, le=200, description="每页数量"),
@@ -1345,38 +1438,21 @@ async def get_category_stats(
 ):
     """获取类别统计信息"""
     try:
-        stats = ProductService.get_category_stats(
-            db, 
-            product_type=product_type,
-            page=page,
-            page_size=page_size,
-            sort_by=sort_by,
-            sort_order=sort_order
+        params = dict(product_type=product_type, page=page, page_size=page_size,
+                      sort_by=sort_by, sort_order=sort_order)
+        return await cached_json_response(
+            request, db, "categories:stats", params, ("products",),
+            lambda: CategoryStats(**ProductService.get_category_stats(db, **params)).model_dump(mode="json")
         )
-        return CategoryStats(**stats)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"获取类别统计信息失败: {str(e)}"
         )
 
-@app.post("/api/categories/stats/clear-cache", include_in_schema=False)
-async def clear_category_stats_cache():
-    """清空类别统计缓存"""
-    try:
-        result = ProductService.clear_category_stats_cache()
-        return JSONResponse(
-            content={"status": "success", "message": "类别统计缓存已清空", "result": result},
-            status_code=200
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"清空类别统计缓存失败: {str(e)}"
-        )
-
 @app.get("/api/brands/stats", response_model=BrandStats)
 async def get_brand_stats(
+    request: Request,
     product_type: Optional[str] = Query(None, description="商品类型: discount/coupon"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(50, ge=1, le=200, description="每页数量"),
@@ -1386,36 +1462,18 @@ async def get_brand_stats(
 ):
     """获取品牌统计信息"""
     try:
-        stats = ProductService.get_brand_stats(
-            db, 
-            product_type=product_type,
-            page=page,
-            page_size=page_size,
-            sort_by=sort_by,
-            sort_order=sort_order
+        params = dict(product_type=product_type, page=page, page_size=page_size,
+                      sort_by=sort_by, sort_order=sort_order)
+        return await cached_json_response(
+            request, db, "brands:stats", params, ("products",),
+            lambda: BrandStats(**ProductService.get_brand_stats(db, **params)).model_dump(mode="json")
         )
-        return BrandStats(**stats)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"获取品牌统计信息失败: {str(e)}"
         )
 
-@app.post("/api/brands/stats/clear-cache", include_in_schema=False)
-async def clear_brand_stats_cache():
-    """清空品牌统计缓存"""
-    try:
-        result = ProductService.clear_brand_stats_cache()
-        return JSONResponse(
-            content={"status": "success", "message": "品牌统计缓存已清空", "result": result},
-            status_code=200
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"清空品牌统计缓存失败: {str(e)}"
-        )
-
 @app.get("/api/search/products")
 async def search_products(
     keyword: str = Query(..., description="搜索关键词"),
@@ -1430,6 +1488,7 @@ async def search_products(
     product_groups: Optional[str] = Query(None, description="商品分类，逗号分隔"),
     brands: Optional[str] = Query(None, description="品牌，逗号分隔"),
     api_provider: Optional[str] = Query(None, description="数据来源：pa-api/cj-api"),
+    projection: Optional[Projection] = Depends(get_projection),
     db: Session = Depends(get_db)
 ):
     """根据关键词搜索产品"""
@@ -1450,7 +1509,8 @@ async def search_products(
             is_prime_only=is_prime_only,
             product_groups=product_groups,
             brands=brands,
-            api_provider=api_provider
+            api_provider=api_provider,
+            projection=projection
         )
         
         # 处理ASIN搜索没有结果的情况
@@ -1468,11 +1528,8 @@ async def search_products(
                 "error": f"未找到ASIN为'{keyword}'的商品。这是有效的ASIN格式，但在数据库中不存在。"
             }
             
-        # 如果有ASIN搜索标记，保留它
-        if result.get("data", {}).get("is_asin_search"):
-            return result
-            
-        return result
+        # 商品字典已是可JSON序列化的结构，直接编码返回（ASIN搜索标记随data一并保留）
+        return JSONResponse(content=result)
     except Exception as e:
         logger.error(f"搜索产品失败: {str(e)}")
         
@@ -0,0 +1,495 @@
+"""
+任务工作进程池模块
+在常驻的本地子进程中执行调度任务，既不在API进程内运行爬虫，也不为每个任务启动新的解释器。
+
+主要功能：
+1. 预先启动固定数量的工作进程，进程启动时预加载爬虫模块
+2. 工作进程常驻，进程内的模块级客户端（如共享WebDriver池）在多个任务之间复用
+3. 父进程维护本地任务队列，通过每个工作进程独立的管道分派任务和接收结果
+4. 每个任务有超时时间和内存上限（包含chromedriver等子进程），超限时终止并替换工作进程
+5. 工作进程执行一定数量的任务后自动回收，释放累积的内存
+6. submit返回concurrent.futures.Future，结果由调用方写入任务历史
+"""
+
+import os
+import time
+import uuid
+import signal
+import threading
+import importlib
+import multiprocessing
+from multiprocessing.connection import wait
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import psutil
+
+from src.utils.log_config import get_logger
+
+logger = get_logger("JobWorkerPool")
+
+# 工作进程启动时预加载的模块
+DEFAULT_PRELOAD_MODULES = (
+    "src.core.run_crawler",
+    "src.core.collect_products",
+    "src.core.product_updater",
+    "src.core.discount_scraper_mt",
+    "src.core.cj_products_crawler",
+)
+
+# 工作进程中执行任务的函数，格式为"模块:函数名"
+DEFAULT_JOB_TARGET = "src.core.run_crawler:run_job"
+
+# 任务日志格式，与run_crawler的文件日志一致
+TASK_LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {message}"
+
+
+@dataclass
+class JobRequest:
+    """提交到工作进程的任务"""
+    job_id: str
+    crawler_type: str
+    max_items: int
+    config: Optional[Dict[str, Any]] = None
+    timeout: Optional[float] = None              # 秒，None表示不限制
+    max_memory_mb: Optional[float] = None        # 工作进程及其子进程的RSS上限，None表示不限制
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)  # 区分同一任务的多次执行
+    task_id: Optional[str] = None                # 任务登记表中的任务ID，工作进程向其上报进度
+
+
+@dataclass
+class JobResult:
+    """任务执行结果"""
+    run_id: str
+    job_id: str
+    status: str                                  # completed/failed
+    items_collected: int = 0
+    error: Optional[str] = None
+    log_file: Optional[str] = None
+    worker_pid: Optional[int] = None
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, self.finished_at - self.started_at)
+
+
+def _resolve_target(target: str) -> Callable:
+    """将"模块:函数名"解析为函数"""
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _run_request(func: Callable, request: JobRequest, log_dir: str) -> JobResult:
+    """在工作进程中执行单个任务，任务期间的日志写入独立的任务日志文件"""
+    from loguru import logger as root_logger
+
+    started = time.time()
+    log_file = Path(log_dir) / f"task_{request.job_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    sink_id = root_logger.add(str(log_file), level="INFO", format=TASK_LOG_FORMAT,
+                              colorize=False, encoding="utf-8")
+    try:
+        if request.task_id:
+            from src.core.task_registry import get_task_registry, track_task
+            get_task_registry().start_task(request.task_id)
+            with track_task(request.task_id):
+                items = func(request.job_id, request.crawler_type, request.max_items, request.config)
+        else:
+            items = func(request.job_id, request.crawler_type, request.max_items, request.config)
+        status, error = "completed", None
+    except Exception as e:
+        root_logger.exception(f"任务 {request.job_id} 执行失败: {str(e)}")
+        items, status, error = 0, "failed", f"{type(e).__name__}: {str(e)}"
+    finally:
+        root_logger.remove(sink_id)
+    return JobResult(
+        run_id=request.run_id,
+        job_id=request.job_id,
+        status=status,
+        items_collected=int(items or 0),
+        error=error,
+        log_file=str(log_file),
+        worker_pid=os.getpid(),
+        started_at=started,
+        finished_at=time.time(),
+    )
+
+
+def _worker_main(conn, target: str, preload_modules: Tuple[str, ...], log_dir: str):
+    """工作进程主循环：预加载模块后逐个接收并执行任务，收到None时退出"""
+    # 中断信号由父进程统一处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for name in preload_modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"工作进程预加载模块 {name} 失败: {str(e)}")
+    func = _resolve_target(target)
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        conn.send(_run_request(func, request, log_dir))
+    conn.close()
+
+
+class _Worker:
+    """父进程中对一个工作进程的记录"""
+
+    def __init__(self, worker_id: int, process, conn):
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.request: Optional[JobRequest] = None
+        self.future: Optional[Future] = None
+        self.started_at = 0.0
+        self.jobs_done = 0
+
+    @property
+    def busy(self) -> bool:
+        return self.request is not None
+
+    def memory_mb(self) -> float:
+        """工作进程及其全部子进程的RSS（MB）"""
+        try:
+            proc = psutil.Process(self.process.pid)
+            total = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / (1024 * 1024)
+        except psutil.Error:
+            return 0.0
+
+    def kill(self):
+        """终止工作进程及其子进程（如浏览器和chromedriver）"""
+        try:
+            proc = psutil.Process(self.process.pid)
+            for child in proc.children(recursive=True):
+                try:
+                    child.kill()
+                except psutil.Error:
+                    pass
+        except psutil.Error:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+
+class JobWorkerPool:
+    """常驻工作进程池
+
+    示例：
+        pool = JobWorkerPool(workers=2, job_timeout=3600, max_memory_mb=2048)
+        pool.start()
+        future = pool.submit("bestseller_daily", "bestseller", 100)
+        result = future.result()   # JobResult
+        pool.shutdown()
+    """
+
+    def __init__(self, workers: int = 2, job_timeout: Optional[float] = None,
+                 max_memory_mb: Optional[float] = None, max_jobs_per_worker: int = 50,
+                 target: str = DEFAULT_JOB_TARGET,
+                 preload_modules: Tuple[str, ...] = DEFAULT_PRELOAD_MODULES,
+                 start_method: str = "spawn", log_dir: Optional[str] = None,
+                 poll_interval: float = 0.5):
+        """
+        初始化工作进程池
+
+        Args:
+            workers: 工作进程数量
+            job_timeout: 默认任务超时时间（秒），None表示不限制
+            max_memory_mb: 默认内存上限（MB），None表示不限制
+            max_jobs_per_worker: 单个工作进程执行多少个任务后被回收，0表示不回收
+            target: 工作进程中执行任务的函数，格式为"模块:函数名"
+            preload_modules: 工作进程启动时预加载的模块
+            start_method: 进程启动方式，API进程中有多个线程，默认使用spawn
+            log_dir: 任务日志目录，默认使用APP_LOG_DIR或项目logs目录
+            poll_interval: 检查超时和内存的间隔（秒）
+        """
+        self.workers = max(1, workers)
+        self.job_timeout = job_timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.target = target
+        self.preload_modules = tuple(preload_modules)
+        self.poll_interval = poll_interval
+        project_root = Path(__file__).parent.parent.parent
+        self.log_dir = str(Path(log_dir or os.getenv("APP_LOG_DIR", str(project_root / "logs"))).resolve())
+        self._ctx = multiprocessing.get_context(start_method)
+
+        self._lock = threading.Lock()
+        self._pending: Deque[Tuple[JobRequest, Future]] = deque()
+        self._workers: List[_Worker] = []
+        self._next_worker_id = 0
+        self._wake_reader, self._wake_writer = self._ctx.Pipe(duplex=False)
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._terminate_busy = False
+        self.stats = {"completed": 0, "failed": 0, "killed": 0, "restarted": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._closing
+
+    def start(self):
+        """启动工作进程和监控线程"""
+        if self._thread is not None:
+            return
+        Path(self.log_dir).mkdir(parents=True, exist_ok=True)
+        for _ in range(self.workers):
+            self._workers.append(self._spawn_worker())
+        self._thread = threading.Thread(target=self._supervise, name="JobWorkerPool", daemon=True)
+        self._thread.start()
+        logger.info(f"任务工作进程池已启动，工作进程数: {self.workers}")
+
+    def submit(self, job_id: str, crawler_type: str, max_items: int,
+               config: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+               max_memory_mb: Optional[float] = None, task_id: Optional[str] = None) -> Future:
+        """
+        提交任务到本地队列
+
+        Args:
+            job_id: 任务ID
+            crawler_type: 爬虫类型
+            max_items: 最大采集数量
+            config: 配置参数
+            timeout: 本次任务的超时时间，默认使用进程池的job_timeout
+            max_memory_mb: 本次任务的内存上限，默认使用进程池的max_memory_mb
+            task_id: 任务登记表中的任务ID，工作进程执行时标记开始并上报进度
+
+        Returns:
+            Future: 结果为JobResult
+        """
+        if not self.running:
+            raise RuntimeError("任务工作进程池未启动或已关闭")
+        request = JobRequest(
+            job_id=job_id,
+            crawler_type=crawler_type,
+            max_items=max_items,
+            config=config,
+            timeout=timeout if timeout is not None else self.job_timeout,
+            max_memory_mb=max_memory_mb if max_memory_mb is not None else self.max_memory_mb,
+            task_id=task_id,
+        )
+        future = Future()
+        with self._lock:
+            self._pending.append((request, future))
+        self._wake()
+        return future
+
+    def shutdown(self, wait: bool = True, timeout: float = 30.0):
+        """
+        关闭进程池：未开始的任务直接标记失败，运行中的任务最多等待timeout秒后终止
+
+        Args:
+            wait: 是否等待运行中的任务
+            timeout: 等待运行中任务的最长时间（秒）
+        """
+        if self._thread is None or self._closing:
+            return
+        self._closing = True
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        for request, future in pending:
+            self._finish(future, self._failed_result(request, "工作进程池已关闭，任务未执行"))
+        self._wake()
+        self._thread.join(timeout if wait else 0)
+        # 等待超时后终止仍在运行的任务
+        self._terminate_busy = True
+        self._wake()
+        self._thread.join(10)
+        self._wake_reader.close()
+        self._wake_writer.close()
+        logger.info("任务工作进程池已关闭")
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取进程池状态"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "running": self.running,
+            "workers": len(self._workers),
+            "busy": sum(1 for w in self._workers if w.busy),
+            "pending": pending,
+            "jobs": [
+                {"job_id": w.request.job_id, "pid": w.process.pid,
+                 "elapsed": round(time.time() - w.started_at, 1)}
+                for w in self._workers if w.busy
+            ],
+            **self.stats,
+        }
+
+    def _wake(self):
+        """唤醒监控线程立即处理队列"""
+        try:
+            self._wake_writer.send_bytes(b"")
+        except (OSError, ValueError):
+            pass
+
+    def _spawn_worker(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.target, self.preload_modules, self.log_dir),
+            name=f"JobWorker-{self._next_worker_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(self._next_worker_id, process, parent_conn)
+        self._next_worker_id += 1
+        return worker
+
+    def _replace_worker(self, worker: _Worker):
+        """终止工作进程并在原位置启动新进程"""
+        worker.kill()
+        index = self._workers.index(worker)
+        if self._closing:
+            self._workers.pop(index)
+        else:
+            self._workers[index] = self._spawn_worker()
+            self.stats["restarted"] += 1
+
+    @staticmethod
+    def _failed_result(request: JobRequest, error: str, worker: Optional[_Worker] = None) -> JobResult:
+        now = time.time()
+        return JobResult(
+            run_id=request.run_id,
+            job_id=request.job_id,
+            status="failed",
+            error=error,
+            worker_pid=worker.process.pid if worker else None,
+            started_at=worker.started_at if worker else now,
+            finished_at=now,
+        )
+
+    def _finish(self, future: Future, result: JobResult):
+        self.stats["completed" if result.status == "completed" else "failed"] += 1
+        if not future.done():
+            future.set_result(result)
+
+    def _dispatch(self):
+        """把本地队列中的任务分派给空闲的工作进程"""
+        for worker in self._workers:
+            if not worker.ready or worker.busy:
+                continue
+            with self._lock:
+                if not self._pending:
+                    return
+                request, future = self._pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker.conn.send(request)
+            except (OSError, ValueError) as e:
+                self._finish(future, self._failed_result(request, f"分派任务失败: {str(e)}"))
+                self._replace_worker(worker)
+                continue
+            worker.request, worker.future = request, future
+            worker.started_at = time.time()
+            logger.info(f"任务 {request.job_id} 已分派到工作进程 {worker.process.pid}")
+
+    def _receive(self, worker: _Worker):
+        """读取工作进程发来的消息"""
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            return  # 进程已退出，由_check_workers处理
+        if isinstance(message, tuple) and message[0] == "ready":
+            worker.ready = True
+            return
+        if worker.busy and isinstance(message, JobResult):
+            future = worker.future
+            worker.request, worker.future = None, None
+            worker.jobs_done += 1
+            logger.info(f"任务 {message.job_id} 执行结束，状态: {message.status}，"
+                        f"处理数量: {message.items_collected}，耗时: {message.duration:.1f}秒")
+            self._finish(future, message)
+
+    def _check_workers(self):
+        """检查进程存活、任务超时和内存上限，回收执行任务过多的进程"""
+        now = time.time()
+        for worker in list(self._workers):
+            request = worker.request
+            if not worker.process.is_alive():
+                future = worker.future
+                self._replace_worker(worker)
+                if request is not None:
+                    self._finish(future, self._failed_result(
+                        request, f"工作进程异常退出，退出代码: {worker.process.exitcode}", worker))
+                continue
+            if request is None:
+                if (not self._closing and self.max_jobs_per_worker
+                        and worker.jobs_done >= self.max_jobs_per_worker):
+                    logger.info(f"工作进程 {worker.process.pid} 已执行 {worker.jobs_done} 个任务，回收")
+                    self._replace_worker(worker)
+                continue
+
+            error = None
+            if self._terminate_busy:
+                error = "工作进程池已关闭，任务被终止"
+            elif request.timeout is not None and now - worker.started_at > request.timeout:
+                error = f"任务超时（{request.timeout:g}秒），已终止工作进程"
+            elif request.max_memory_mb is not None:
+                memory = worker.memory_mb()
+                if memory > request.max_memory_mb:
+                    error = f"内存超限（{memory:.0f}MB > {request.max_memory_mb:.0f}MB），已终止工作进程"
+            if error:
+                logger.error(f"任务 {request.job_id}: {error}")
+                self.stats["killed"] += 1
+                future = worker.future
+                self._replace_worker(worker)
+                # 替换进程后再返回结果，调用方看到结果时进程池已恢复
+                self._finish(future, self._failed_result(request, error, worker))
+
+    def _supervise(self):
+        """监控线程：分派任务、接收结果、检查资源限制"""
+        while True:
+            if self._closing and not any(w.busy for w in self._workers):
+                break
+            if not self._closing:
+                self._dispatch()
+            connections = {w.conn: w for w in self._workers}
+            try:
+                ready = wait(list(connections) + [self._wake_reader], timeout=self.poll_interval)
+            except OSError:
+                ready = []
+            for conn in ready:
+                if conn is self._wake_reader:
+                    try:
+                        while self._wake_reader.poll():
+                            self._wake_reader.recv_bytes()
+                    except (EOFError, OSError):
+                        pass
+                else:
+                    self._receive(connections[conn])
+            self._check_workers()
+
+        # 通知空闲进程退出
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.kill()
+        self._workers.clear()
@@ -0,0 +1,221 @@
+"""
+基于租约的主节点选举模块
+多个API工作进程共享同一个调度器数据库，只有持有租约的进程运行定时任务。
+
+主要功能：
+1. 在调度器数据库中维护一行租约记录（持有者、任期、到期时间）
+2. 获取和续约都是单条条件UPDATE，由数据库保证同一时刻只有一个持有者
+3. 后台心跳线程定期续约，续约失败或租约被他人取得时立即降级
+4. 主节点退出时主动释放租约，异常退出时其他进程在租约到期后接管
+   （接管时间不超过 lease_seconds + heartbeat_interval）
+"""
+
+import os
+import time
+import uuid
+import socket
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, Column, Float, Integer, String, case, insert, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.declarative import declarative_base
+
+from src.utils.log_config import get_logger
+
+logger = get_logger("LeaderElection")
+
+Base = declarative_base()
+
+
+class SchedulerLeaseModel(Base):
+    """主节点租约数据库模型"""
+    __tablename__ = 'scheduler_lease'
+
+    name = Column(String(50), primary_key=True)      # 租约名称，同一数据库可有多个独立选举
+    holder = Column(String(100), nullable=False)     # 当前持有者ID
+    term = Column(Integer, nullable=False, default=1)  # 任期，持有者变化时加1
+    acquired_at = Column(Float, nullable=False)      # 当前持有者取得租约的时间戳
+    renewed_at = Column(Float, nullable=False)       # 最近一次续约的时间戳
+    expires_at = Column(Float, nullable=False)       # 租约到期时间戳
+
+
+def default_holder_id() -> str:
+    """生成当前进程的持有者ID：主机名:进程ID:随机后缀"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElection:
+    """租约选举器
+
+    示例：
+        election = LeaderElection("sqlite:///data/db/scheduler.db",
+                                  on_elected=scheduler.resume, on_revoked=scheduler.pause)
+        election.start()
+        ...
+        election.stop()   # 释放租约，其他进程立即接管
+    """
+
+    def __init__(self, db_url: str, name: str = "scheduler", lease_seconds: float = 30.0,
+                 heartbeat_interval: float = 10.0, holder_id: Optional[str] = None,
+                 on_elected: Optional[Callable[[], None]] = None,
+                 on_revoked: Optional[Callable[[], None]] = None,
+                 on_heartbeat: Optional[Callable[[], None]] = None):
+        """
+        初始化选举器
+
+        Args:
+            db_url: 数据库URL
+            name: 租约名称
+            lease_seconds: 租约有效期（秒）
+            heartbeat_interval: 续约间隔（秒），应明显小于lease_seconds
+            holder_id: 持有者ID，默认由主机名和进程ID生成
+            on_elected: 成为主节点时的回调
+            on_revoked: 失去主节点身份时的回调
+            on_heartbeat: 主节点每次续约成功后的回调
+        """
+        if heartbeat_interval >= lease_seconds:
+            raise ValueError("heartbeat_interval必须小于lease_seconds")
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.holder_id = holder_id or default_holder_id()
+        self.on_elected = on_elected
+        self.on_revoked = on_revoked
+        self.on_heartbeat = on_heartbeat
+        self.term: Optional[int] = None
+
+        connect_args = {"timeout": 10} if db_url.startswith("sqlite") else {}
+        self.engine = create_engine(db_url, connect_args=connect_args)
+        Base.metadata.create_all(self.engine)
+
+        self._leader = False
+        self._deadline = 0.0  # 本地认为租约有效的截止时间
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """当前进程是否持有未过期的租约"""
+        return self._leader and time.time() < self._deadline
+
+    def try_acquire(self) -> bool:
+        """
+        获取或续约租约
+
+        Returns:
+            bool: 当前进程是否持有租约
+        """
+        table = SchedulerLeaseModel.__table__
+        now = time.time()
+        expires_at = now + self.lease_seconds
+        is_holder = table.c.holder == self.holder_id
+        with self.engine.begin() as conn:
+            # 自己持有或已过期时才能取得，SET中的表达式使用更新前的值
+            result = conn.execute(
+                update(table)
+                .where(table.c.name == self.name)
+                .where(or_(is_holder, table.c.expires_at <= now))
+                .values(
+                    term=case((is_holder, table.c.term), else_=table.c.term + 1),
+                    acquired_at=case((is_holder, table.c.acquired_at), else_=now),
+                    holder=self.holder_id,
+                    renewed_at=now,
+                    expires_at=expires_at,
+                )
+            )
+            acquired = result.rowcount == 1
+            if not acquired:
+                # 租约记录不存在时插入，并发插入只有一个成功
+                result = conn.execute(
+                    insert(table).prefix_with("OR IGNORE").values(
+                        name=self.name, holder=self.holder_id, term=1,
+                        acquired_at=now, renewed_at=now, expires_at=expires_at,
+                    )
+                )
+                acquired = result.rowcount == 1
+            if acquired:
+                self.term = conn.execute(select(table.c.term).where(table.c.name == self.name)).scalar()
+        if acquired:
+            self._deadline = expires_at
+        return acquired
+
+    def release(self):
+        """主动释放租约，使其他进程在下一次心跳时接管"""
+        table = SchedulerLeaseModel.__table__
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    update(table)
+                    .where(table.c.name == self.name, table.c.holder == self.holder_id)
+                    .values(expires_at=0.0)
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"释放租约失败: {str(e)}")
+        self._set_leader(False)
+
+    def current_holder(self) -> Optional[dict]:
+        """返回当前租约记录，不存在时返回None"""
+        table = SchedulerLeaseModel.__table__
+        with self.engine.connect() as conn:
+            row = conn.execute(select(table).where(table.c.name == self.name)).mappings().first()
+        if row is None:
+            return None
+        return {**row, "expired": row["expires_at"] <= time.time()}
+
+    def start(self):
+        """立即尝试取得租约，然后启动心跳线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._tick()
+        self._thread = threading.Thread(target=self._run, name=f"LeaderElection-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"选举已启动，持有者ID: {self.holder_id}，租约: {self.lease_seconds}秒，"
+                    f"心跳间隔: {self.heartbeat_interval}秒")
+
+    def stop(self):
+        """停止心跳并释放租约"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.heartbeat_interval + 5)
+            self._thread = None
+        if self._leader:
+            self.release()
+        self.engine.dispose()
+
+    def _run(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self._tick()
+
+    def _tick(self):
+        """一次心跳：续约或尝试接管，并在身份变化时触发回调"""
+        try:
+            acquired = self.try_acquire()
+        except SQLAlchemyError as e:
+            # 数据库暂时不可用时，本地租约到期前保持身份
+            logger.warning(f"续约失败: {str(e)}")
+            acquired = self.is_leader
+        was_leader = self._leader
+        self._set_leader(acquired)
+        if acquired and was_leader and self.on_heartbeat:
+            self._callback(self.on_heartbeat)
+
+    def _set_leader(self, leader: bool):
+        if leader == self._leader:
+            return
+        self._leader = leader
+        if leader:
+            logger.info(f"{self.holder_id} 成为主节点，任期: {self.term}")
+            self._callback(self.on_elected)
+        else:
+            logger.warning(f"{self.holder_id} 不再是主节点")
+            self._callback(self.on_revoked)
+
+    def _callback(self, func: Optional[Callable[[], None]]):
+        if func is None:
+            return
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"选举回调执行失败: {str(e)}")
@@ -0,0 +1,345 @@
+"""
+商品更新优先级批量评分模块
+只从数据库读取评分需要的列并转换为NumPy数组，对全部商品一次性计算各个因子，
+再用argpartition选出优先级最高的k个待更新商品，避免逐个ORM对象进行datetime运算。
+
+主要功能：
+1. load_product_columns: 按列分块读取商品评分数据
+2. score_discount_priority: DiscountUpdateScheduler的价格、时间衰减、热度、优惠和随机因子评分
+3. score_update_priority / update_due_mask: ProductUpdater的更新得分、优先级等级和到期判断
+4. top_k_indices: 在（可选的）到期掩码内选出得分最高的k个商品，按得分降序返回
+"""
+
+from dataclasses import dataclass, fields
+from datetime import datetime, UTC
+from typing import Dict, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from models.database import Product, Offer
+
+# SQLite的julianday转换为Unix时间戳（秒）
+_JULIAN_UNIX_EPOCH = 2440587.5
+_SECONDS_PER_DAY = 86400.0
+
+# ProductUpdater优先级等级编码，顺序与UPDATE_LEVEL_NAMES一致
+LEVEL_HIGH, LEVEL_MEDIUM, LEVEL_LOW, LEVEL_VERY_LOW = range(4)
+UPDATE_LEVEL_NAMES = ("high", "medium", "low", "very_low")
+# 接近更新时间时被提前更新的概率
+EARLY_UPDATE_CHANCE = np.array([0.4, 0.2, 0.1, 0.05])
+
+
+@dataclass
+class ProductColumns:
+    """评分所需的商品列，时间列为Unix时间戳（秒），缺失值为NaN"""
+    ids: np.ndarray
+    asins: np.ndarray
+    current_price: np.ndarray
+    created_at: np.ndarray
+    updated_at: np.ndarray
+    discount_updated_at: np.ndarray
+    is_cj: np.ndarray                # api_provider为cj-api或有CJ推广链接
+    has_offer: np.ndarray
+    has_deal: np.ndarray             # 首个优惠的deal_type不是"None"
+    has_coupon: np.ndarray
+    savings_percentage: np.ndarray   # 首个优惠的折扣百分比，缺失为0
+    has_deal_badge: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls) -> "ProductColumns":
+        return cls(**{f.name: np.empty(0, dtype=_COLUMN_DTYPES[f.name]) for f in fields(cls)})
+
+    @classmethod
+    def from_products(cls, products: Sequence[Product]) -> "ProductColumns":
+        """从已加载的ORM对象构造列（用于单个商品评分）"""
+        rows = []
+        for product in products:
+            offer = product.offers[0] if product.offers else None
+            rows.append((
+                product.id or 0,
+                product.asin,
+                product.current_price,
+                _to_timestamp(product.created_at),
+                _to_timestamp(product.updated_at),
+                _to_timestamp(product.discount_updated_at),
+                product.api_provider == 'cj-api' or bool(product.cj_url),
+                offer is not None,
+                offer is not None and offer.deal_type != "None",
+                bool(offer and offer.coupon_type and offer.coupon_value),
+                (offer.savings_percentage or 0) if offer else 0,
+                bool(offer and offer.deal_badge),
+            ))
+        return cls._from_rows(rows)
+
+    @classmethod
+    def _from_rows(cls, rows: Sequence[tuple]) -> "ProductColumns":
+        if not rows:
+            return cls.empty()
+        columns = list(zip(*rows))
+        return cls(**{
+            f.name: np.array(column, dtype=_COLUMN_DTYPES[f.name])
+            for f, column in zip(fields(cls), columns)
+        })
+
+    @classmethod
+    def concat(cls, parts: Iterable["ProductColumns"]) -> "ProductColumns":
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        return cls(**{
+            f.name: np.concatenate([getattr(part, f.name) for part in parts])
+            for f in fields(cls)
+        })
+
+
+_COLUMN_DTYPES = {
+    'ids': np.int64,
+    'asins': object,
+    'current_price': np.float64,
+    'created_at': np.float64,
+    'updated_at': np.float64,
+    'discount_updated_at': np.float64,
+    'is_cj': bool,
+    'has_offer': bool,
+    'has_deal': bool,
+    'has_coupon': bool,
+    'savings_percentage': np.float64,
+    'has_deal_badge': bool,
+}
+
+
+def _to_timestamp(value: Optional[datetime]) -> float:
+    """datetime转换为Unix时间戳，无时区信息时按UTC处理"""
+    if value is None:
+        return np.nan
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+def _epoch_seconds(column):
+    """SQLite中将DateTime列转换为Unix时间戳的表达式，NULL保持为NULL"""
+    return (func.julianday(column) - _JULIAN_UNIX_EPOCH) * _SECONDS_PER_DAY
+
+
+def _truthy(column):
+    """与Python真值判断一致：非NULL且非空字符串"""
+    return and_(column.isnot(None), column != '')
+
+
+def load_product_columns(db: Session, filters: Sequence = (), chunk_size: int = 50000) -> ProductColumns:
+    """
+    按列读取商品评分数据
+
+    只查询评分需要的列，日期在SQLite中直接转换为时间戳，结果按chunk_size分块转换为数组。
+    每个商品只取id最小的优惠（与product.offers[0]一致）。
+
+    Args:
+        db: 数据库会话
+        filters: 附加到商品查询上的过滤条件
+        chunk_size: 每次从游标读取的行数
+
+    Returns:
+        ProductColumns: 商品列数据
+    """
+    first_offer = (
+        select(Offer.product_id, func.min(Offer.id).label('offer_id'))
+        .group_by(Offer.product_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            Product.id,
+            Product.asin,
+            Product.current_price,
+            _epoch_seconds(Product.created_at),
+            _epoch_seconds(Product.updated_at),
+            _epoch_seconds(Product.discount_updated_at),
+            or_(Product.api_provider == 'cj-api', _truthy(Product.cj_url)),
+            Offer.id.isnot(None),
+            and_(Offer.id.isnot(None), func.coalesce(Offer.deal_type, '') != 'None'),
+            and_(_truthy(Offer.coupon_type), func.coalesce(Offer.coupon_value, 0) != 0),
+            func.coalesce(Offer.savings_percentage, 0),
+            _truthy(Offer.deal_badge),
+        )
+        .outerjoin(first_offer, first_offer.c.product_id == Product.asin)
+        .outerjoin(Offer, Offer.id == first_offer.c.offer_id)
+        .where(*filters)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = db.execute(stmt)
+    # 没有优惠时布尔表达式为NULL，转换为bool数组时按False处理
+    return ProductColumns.concat(
+        ProductColumns._from_rows(partition) for partition in result.partitions()
+    )
+
+
+def score_discount_priority(
+    columns: ProductColumns,
+    weights: Mapping[str, float],
+    now: Optional[float] = None,
+    rng: Optional[np.random.Generator] = None
+) -> Dict[str, np.ndarray]:
+    """
+    计算DiscountUpdateScheduler的优先级
+
+    与calculate_priority逐个商品的计算方式一致，权重在调用时从weights读取，
+    因此调整权重后下一次评分立即生效。
+
+    Args:
+        columns: 商品列数据
+        weights: 各因子权重，包含price/time/popularity/discount/random
+        now: 当前时间戳，默认为当前时间
+        rng: 随机数生成器，用于随机因子
+
+    Returns:
+        Dict[str, np.ndarray]: 各因子和最终优先级，key为price/time/popularity/discount/random/priority
+    """
+    now = datetime.now(UTC).timestamp() if now is None else now
+    rng = rng or np.random.default_rng()
+    price = np.nan_to_num(columns.current_price, nan=0.0)
+
+    price_factor = np.where(price > 0, np.minimum(1.0, np.log1p(np.maximum(price, 0) / 100) / 5), 0.0)
+
+    hours_since_update = (now - columns.discount_updated_at) / 3600
+    time_decay = np.where(
+        np.isnan(columns.discount_updated_at), 1.0,
+        np.minimum(1.0, np.nan_to_num(hours_since_update) / (24 * 7))
+    )
+
+    popularity = np.minimum(1.0, 0.5 + 0.2 * columns.has_deal + 0.3 * (price > 100))
+
+    discount = np.where(
+        columns.has_offer,
+        np.minimum(1.0, 0.5 + 0.3 * columns.has_coupon
+                   + 0.2 * (columns.savings_percentage / 100) + 0.2 * columns.has_deal_badge),
+        0.5
+    )
+
+    random_factor = rng.random(len(columns))
+
+    priority = np.minimum(1.0, (
+        weights['price'] * price_factor +
+        weights['time'] * time_decay +
+        weights['popularity'] * popularity +
+        weights['discount'] * discount +
+        weights['random'] * random_factor
+    ))
+
+    return {
+        'price': price_factor,
+        'time': time_decay,
+        'popularity': popularity,
+        'discount': discount,
+        'random': random_factor,
+        'priority': priority,
+    }
+
+
+def score_update_priority(
+    columns: ProductColumns,
+    now: Optional[float] = None,
+    rng: Optional[np.random.Generator] = None
+) -> Dict[str, np.ndarray]:
+    """
+    计算ProductUpdater的更新得分和优先级等级
+
+    得分由创建时间（每30天5分，最多25分）、距上次更新时间（每24小时10分，最多30分，
+    从未更新为30分）、CJ商品加分（20分）和-5到5分的随机扰动组成。
+
+    Returns:
+        Dict[str, np.ndarray]: score为得分，level为优先级等级编码（LEVEL_*）
+    """
+    now = datetime.now(UTC).timestamp() if now is None else now
+    rng = rng or np.random.default_rng()
+
+    days_since_creation = np.floor((now - columns.created_at) / _SECONDS_PER_DAY)
+    creation_score = np.where(
+        np.isnan(columns.created_at), 0.0,
+        np.minimum(np.floor(np.nan_to_num(days_since_creation) / 30) * 5, 25)
+    )
+
+    hours_since_update = (now - columns.updated_at) / 3600
+    update_score = np.where(
+        np.isnan(columns.updated_at), 30.0,
+        np.minimum(np.nan_to_num(hours_since_update) / 24 * 10, 30)
+    )
+
+    score = creation_score + update_score + 20.0 * columns.is_cj + rng.integers(-5, 6, len(columns))
+    level = np.select(
+        [score >= 60, score >= 40, score >= 20],
+        [LEVEL_HIGH, LEVEL_MEDIUM, LEVEL_LOW],
+        default=LEVEL_VERY_LOW
+    )
+    return {'score': score, 'level': level}
+
+
+def update_due_mask(
+    columns: ProductColumns,
+    level: np.ndarray,
+    level_hours: Sequence[float],
+    now: Optional[float] = None
+) -> np.ndarray:
+    """
+    判断商品是否需要更新
+
+    价格为0或从未更新的商品总是需要更新；超过所在等级更新间隔的商品需要更新；
+    超过间隔90%的商品按等级概率提前更新，概率由商品id和当前小时决定，同一小时内结果稳定。
+
+    Args:
+        columns: 商品列数据
+        level: score_update_priority返回的优先级等级编码
+        level_hours: 各等级的更新间隔（小时），顺序与LEVEL_*一致
+        now: 当前时间戳，默认为当前时间
+
+    Returns:
+        np.ndarray: 布尔掩码
+    """
+    now = datetime.now(UTC).timestamp() if now is None else now
+    interval = np.asarray(level_hours, dtype=np.float64)[level] * 3600
+    since_update = now - columns.updated_at
+    never_updated = np.isnan(columns.updated_at)
+    since_update = np.nan_to_num(since_update)
+
+    # 基于商品id和当前小时的确定性伪随机数（Knuth乘法散列）
+    hour = np.int64(now // 3600)
+    mixed = ((columns.ids + hour) * 2654435761) % (1 << 32)
+    jitter = mixed / float(1 << 32)
+
+    return (
+        (columns.current_price == 0)
+        | never_updated
+        | (since_update > interval)
+        | ((since_update > interval * 0.9) & (jitter < EARLY_UPDATE_CHANCE[level]))
+    )
+
+
+def top_k_indices(scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    选出得分最高的k个元素的下标，按得分降序排列
+
+    先用argpartition在O(n)内找出前k个，只对这k个排序。
+
+    Args:
+        scores: 得分数组
+        k: 返回数量
+        mask: 可选的候选掩码，只在掩码为True的元素中选择
+
+    Returns:
+        np.ndarray: 下标数组
+    """
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+    if k <= 0 or len(candidates) == 0:
+        return np.empty(0, dtype=np.int64)
+    candidate_scores = scores[candidates]
+    if k < len(candidates):
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+    else:
+        top = np.arange(len(candidates))
+    order = top[np.argsort(-candidate_scores[top], kind='stable')]
+    return candidates[order]
@@ -31,8 +31,8 @@ import sys
 from pathlib import Path
 from sqlalchemy.orm import Session
 from enum import Enum
-import random
 from tqdm import tqdm  # 添加tqdm库支持进度条
+import numpy as np
 import time
 
 # 添加项目根目录到Python路径
@@ -47,8 +47,22 @@ from models.product_service import ProductService
 from src.utils.log_config import get_logger, LogContext, track_performance
 from src.utils.api_retry import with_retry
 from src.utils.config_loader import config_loader
+from src.utils.metrics import get_registry
+from src.utils.diagnostics import add_diagnostics_arguments, setup_diagnostics
 from src.core.discount_scraper_mt import CouponScraperMT
 from src.core.discount_scraper import CouponScraper
+from src.core.priority_scoring import (
+    ProductColumns, UPDATE_LEVEL_NAMES, load_product_columns,
+    score_update_priority, top_k_indices, update_due_mask
+)
+
+_task_logger = get_logger(name="ProductUpdater")
+
+# PA/CJ API限流等待时间，未等待的请求记为0
+_rate_limit_wait = get_registry().histogram(
+    "rate_limit_wait_seconds", "API限流器让请求等待的时间（秒）", ("api",),
+    buckets=(0, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+)
 
 class TaskLogContext:
     """
@@ -75,18 +89,16 @@ class TaskLogContext:
         self.context_data = {"task_id": task_id, "name": "ProductUpdater"}
         self.context_data.update(kwargs)
         
-        # 使用环境变量中的日志目录
-        log_dir = Path(os.getenv("APP_LOG_DIR", "logs"))
-        log_dir.mkdir(parents=True, exist_ok=True)
-        
-        self._logger = get_logger(name="ProductUpdater")
+        # 每个商品都会创建一次，这里只做O(1)的工作：共享logger，上下文由LogContext的contextvar承载
+        self._logger = _task_logger
         self._log_context = LogContext(**self.context_data)
         self._bound_logger = None
         
     def __enter__(self):
         """进入上下文，设置日志上下文"""
         self._log_context.__enter__()
-        self._bound_logger = self._logger.bind(**self.context_data)
+        # 上下文内的记录由全局patcher合并上下文，不需要再bind
+        self._bound_logger = self._logger
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -102,7 +114,7 @@ class TaskLogContext:
     async def __aenter__(self):
         """异步进入上下文"""
         await self._log_context.__aenter__()
-        self._bound_logger = self._logger.bind(**self.context_data)
+        self._bound_logger = self._logger
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -242,6 +254,9 @@ class ProductUpdater:
         self.coupon_check_retry_delay = 5
         self.coupon_scraper = None
         
+        # 优先级评分中随机扰动使用的随机数生成器
+        self.rng = np.random.default_rng()
+        
     async def initialize_clients(self):
         """初始化API客户端"""
         # 获取环境变量
@@ -278,6 +293,7 @@ class ProductUpdater:
     async def _rate_limit_pa_api(self):
         """限制PA API请求频率，避免429错误"""
         now = datetime.now(UTC)
+        wait_time = 0.0
         if self.last_pa_api_request_time:
             # 确保last_pa_api_request_time有时区信息
             last_time = self.last_pa_api_request_time
@@ -288,11 +304,13 @@ class ProductUpdater:
             if elapsed < self.pa_api_request_interval:
                 wait_time = self.pa_api_request_interval - elapsed
                 await asyncio.sleep(wait_time)
+        _rate_limit_wait.observe(wait_time, api="pa")
         self.last_pa_api_request_time = now
         
     async def _rate_limit_cj_api(self):
         """限制CJ API请求频率"""
         now = datetime.now(UTC)
+        wait_time = 0.0
         if self.last_cj_api_request_time:
             # 确保last_cj_api_request_time有时区信息
             last_time = self.last_cj_api_request_time
@@ -303,8 +321,13 @@ class ProductUpdater:
             if elapsed < self.cj_api_request_interval:
                 wait_time = self.cj_api_request_interval - elapsed
                 await asyncio.sleep(wait_time)
+        _rate_limit_wait.observe(wait_time, api="cj")
         self.last_cj_api_request_time = now
         
+    def _level_hours(self) -> List[int]:
+        """各优先级等级的更新间隔（小时），顺序与priority_scoring中的等级编码一致"""
+        return [self.config.priority_hours[UpdatePriority(name)] for name in UPDATE_LEVEL_NAMES]
+        
     def _calculate_priority(self, product: Product) -> UpdatePriority:
         """
         计算商品的更新优先级
@@ -315,60 +338,24 @@ class ProductUpdater:
         3. CJ平台状态（CJ平台商品优先级更高）
         4. 随机因素（防止所有同类商品在同一时间更新）
         
+        与批量评分使用同一套计算（priority_scoring.score_update_priority）。
+        
         Args:
             product: 商品数据库记录
             
         Returns:
             UpdatePriority: 商品更新优先级
         """
-        # 基础得分
-        score = 0
-        
-        now = datetime.now(UTC)
-        
-        # 1. 基于创建时间计算得分
-        if product.created_at:
-            # 确保created_at有时区信息
-            created_at = product.created_at.replace(tzinfo=UTC) if product.created_at.tzinfo is None else product.created_at
-            days_since_creation = (now - created_at).days
-            # 每30天增加5分，最多25分
-            creation_score = min(days_since_creation // 30 * 5, 25)
-            score += creation_score
-            
-        # 2. 基于更新时间计算得分
-        if product.updated_at:
-            # 确保updated_at有时区信息
-            updated_at = product.updated_at.replace(tzinfo=UTC) if product.updated_at.tzinfo is None else product.updated_at
-            hours_since_update = (now - updated_at).total_seconds() / 3600
-            # 每24小时增加10分，最多30分
-            update_score = min(hours_since_update / 24 * 10, 30)
-            score += update_score
-        else:
-            # 如果从未更新过，给予最高更新时间得分
-            score += 30
-            
-        # 3. CJ商品优先级加分
-        if product.api_provider == 'cj-api' or product.cj_url:
-            score += 20
-            
-        # 4. 添加随机因素（-5到5分）防止更新扎堆
-        score += random.randint(-5, 5)
-        
-        # 根据最终得分确定优先级
-        if score >= 60:  # 创建很久 + 更新很久 + CJ平台
-            return UpdatePriority.HIGH
-        elif score >= 40:  # 创建较久或更新较久 + CJ平台
-            return UpdatePriority.MEDIUM
-        elif score >= 20:  # 创建较久或更新较久
-            return UpdatePriority.LOW
-        else:
-            return UpdatePriority.VERY_LOW
+        columns = ProductColumns.from_products([product])
+        level = score_update_priority(columns, rng=self.rng)['level'][0]
+        return UpdatePriority(UPDATE_LEVEL_NAMES[level])
             
     def _should_update(self, product: Product) -> bool:
         """判断商品是否需要更新
         
         基于上次更新时间和商品优先级决定是否需要更新
         对于价格为0的商品，忽略更新间隔，直接返回True
+        接近更新时间的商品按优先级概率提前更新，避免所有商品在同一时间点需要更新
         
         Args:
             product: 商品数据库记录
@@ -376,57 +363,9 @@ class ProductUpdater:
         Returns:
             bool: 是否需要更新
         """
-        # 如果价格为0，立即更新
-        if product.current_price == 0:
-            return True
-        
-        # 如果没有更新时间，则需要更新
-        if not product.updated_at:
-            return True
-        
-        # 计算商品优先级
-        priority = self._calculate_priority(product)
-        
-        # 获取当前时间
-        now = datetime.now(UTC)
-        
-        # 确保updated_at有时区信息
-        updated_at = product.updated_at.replace(tzinfo=UTC) if product.updated_at.tzinfo is None else product.updated_at
-        
-        # 获取该优先级的更新间隔时间
-        hours = self.config.priority_hours[priority]
-        
-        # 计算上次更新到现在的时间间隔
-        time_since_update = now - updated_at
-        
-        # 基础判断：如果时间间隔大于更新间隔，则需要更新
-        if time_since_update > timedelta(hours=hours):
-            return True
-            
-        # 添加智能调度策略：负载均衡
-        # 对于接近更新时间的商品，根据当前系统负载随机选择一部分更新
-        # 这样可以避免所有商品都在同一时间点需要更新
-        if time_since_update > timedelta(hours=hours * 0.9):
-            # 创建一个基于ASIN的确定性随机数，确保同一商品在短时间内得到一致的结果
-            try:
-                # 使用ASIN的哈希值作为种子，更安全且适用于所有ASIN格式
-                seed = hash(product.asin) % 10000
-                random.seed(seed + int(now.timestamp() / 3600))  # 每小时变化一次
-                
-                # 高优先级的商品有更高概率被提前更新
-                chance = {
-                    UpdatePriority.HIGH: 0.4,      # 高优先级有40%概率被提前更新
-                    UpdatePriority.MEDIUM: 0.2,    # 中优先级有20%概率被提前更新
-                    UpdatePriority.LOW: 0.1,       # 低优先级有10%概率被提前更新
-                    UpdatePriority.VERY_LOW: 0.05  # 非常低优先级有5%概率被提前更新
-                }.get(priority, 0)
-                
-                return random.random() < chance
-            except Exception as e:
-                # 如果计算随机概率时出错，默认不更新
-                return False
-            
-        return False
+        columns = ProductColumns.from_products([product])
+        level = score_update_priority(columns, rng=self.rng)['level']
+        return bool(update_due_mask(columns, level, self._level_hours())[0])
     
     @track_performance
     async def delete_zero_price_products(self, db: Session) -> int:
@@ -491,46 +430,36 @@ class ProductUpdater:
             if deleted_count > 0:
                 self.logger.info(f"已删除 {deleted_count} 个价格异常的商品")
             
-            # 获取需要更新的常规商品
-            regular_products = []
-            
-            # 按照上次更新时间升序排序，优先更新最久未更新的商品
-            products = db.query(Product).filter(
-                Product.current_price != 0
-            ).order_by(
-                Product.updated_at.asc().nulls_first()
-            ).all()
+            # 按列读取全部商品，批量计算得分和到期状态
+            columns = load_product_columns(db, filters=[Product.current_price != 0])
+            self.logger.info(f"数据库中共找到 {len(columns)} 个商品")
             
-            self.logger.info(f"数据库中共找到 {len(products)} 个商品")
+            now = datetime.now(UTC).timestamp()
+            scores = score_update_priority(columns, now, self.rng)
+            due = update_due_mask(columns, scores['level'], self._level_hours(), now)
+            total_need_update = int(due.sum())
             
-            # 筛选需要更新的商品
-            self.logger.info(f"正在筛选需要更新的商品...")
-            selection_count = 0
-            total_need_update = 0
+            # 在需要更新的商品中选出得分最高的limit个，再加载ORM对象
+            top = top_k_indices(scores['score'], limit, due)
+            selected_ids = columns.ids[top].tolist()
+            products_by_id = {}
+            for i in range(0, len(selected_ids), 500):
+                for product in db.query(Product).filter(Product.id.in_(selected_ids[i:i + 500])):
+                    products_by_id[product.id] = product
             
-            for product in products:
-                try:
-                    if self._should_update(product):
-                        total_need_update += 1
-                        # 如果未达到limit限制，添加到更新列表
-                        if len(regular_products) < limit:
-                            # 记录每个选中商品的详细信息（降级为DEBUG）
-                            priority = self._calculate_priority(product)
-                            last_update = product.updated_at.strftime('%Y-%m-%d %H:%M:%S') if product.updated_at else "从未更新"
-                            self.logger.debug(
-                                f"选中商品更新: ASIN={product.asin}, "
-                                f"最后更新时间={last_update}, "
-                                f"优先级={priority.value}, "
-                                f"API来源={product.api_provider or 'unknown'}"
-                            )
-                            regular_products.append(product)
-                            selection_count += 1
-                            # 显示选择进度
-                            if selection_count % 100 == 0:
-                                self.logger.debug(f"已选择 {selection_count} 个商品...")
-                except Exception as e:
-                    self.logger.debug(f"商品 {product.asin} 检查更新状态时出错: {str(e)}，已跳过")
+            regular_products = []
+            for index, product_id in zip(top.tolist(), selected_ids):
+                product = products_by_id.get(product_id)
+                if product is None:
                     continue
+                last_update = product.updated_at.strftime('%Y-%m-%d %H:%M:%S') if product.updated_at else "从未更新"
+                self.logger.debug(
+                    f"选中商品更新: ASIN={product.asin}, "
+                    f"最后更新时间={last_update}, "
+                    f"优先级={UPDATE_LEVEL_NAMES[scores['level'][index]]}, "
+                    f"API来源={product.api_provider or 'unknown'}"
+                )
+                regular_products.append(product)
             
             # 只在INFO级别记录汇总信息
             cj_count = sum(1 for p in regular_products if p.api_provider == 'cj-api')
@@ -1191,6 +1120,7 @@ class ProductUpdater:
         parser.add_argument("--debug", action="store_true", help="启用调试模式")
         parser.add_argument("--json-logs", action="store_true", help="使用JSON格式记录日志")
         parser.add_argument("--log-dir", type=str, default="logs", help="日志文件目录")
+        add_diagnostics_arguments(parser)
         
         args = parser.parse_args()
         
@@ -1254,6 +1184,7 @@ class ProductUpdater:
         
         # 获取带有名称的 logger
         product_logger = get_logger("ProductUpdater")
+        setup_diagnostics(args)
         
         if not args.scheduled and not args.asin:
             product_logger.warning(
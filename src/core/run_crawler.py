@@ -18,6 +18,9 @@ python -m src.core.run_crawler --job-id <任务ID> --crawler-type <爬虫类型>
 - update: 商品信息更新任务
 - cj: CJ商品数据爬虫
 - coupon_details: 优惠券详情抓取任务
+- discount: 优惠券/折扣信息更新任务
+
+任务工作进程池（src.core.job_worker_pool）在常驻进程中直接调用run_job，不经过命令行。
 """
 
 import os
@@ -38,6 +41,9 @@ if project_root not in sys.path:
 # 导入日志配置
 from src.utils.log_config import get_logger, LogConfig, LogContext
 
+# 默认日志记录器，命令行入口会替换为带任务ID的记录器
+logger = get_logger("Crawler")
+
 def parse_arguments():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='爬虫任务执行脚本')
@@ -136,6 +142,33 @@ async def execute_task(job_id: str, crawler_type: str, max_items: int, config: O
         logger.success(f"优惠券详情抓取完成，处理: {processed_count}，成功更新: {updated_count}")
         return updated_count
     
+    elif crawler_type == "discount":
+        # 执行优惠券/折扣信息更新任务
+        from src.core.discount_scraper_mt import CouponScraperMT
+        
+        discount_config = config.get("discount_config", {}) if config else {}
+        if discount_config:
+            logger.info(f"使用自定义优惠券更新爬虫配置: {discount_config}")
+        else:
+            logger.info("使用默认优惠券更新爬虫配置")
+        
+        scraper = CouponScraperMT(
+            num_threads=discount_config.get("num_threads", 4),
+            batch_size=max_items,
+            headless=discount_config.get("headless", True),
+            min_delay=discount_config.get("min_delay", 2.0),
+            max_delay=discount_config.get("max_delay", 4.0),
+            update_interval=discount_config.get("update_interval", 72),
+            force_update=discount_config.get("force_update", False),
+            debug=discount_config.get("debug", False),
+            log_to_console=discount_config.get("log_to_console", False)
+        )
+        scraper.run()
+        
+        stats = scraper.stats.get()
+        logger.success(f"优惠券更新爬虫完成，处理: {stats['processed_count']}，成功: {stats['success_count']}，失败: {stats['failure_count']}")
+        return stats['success_count']
+    
     elif crawler_type == "cj":
         # 执行CJ爬虫任务
         from models.database import SessionLocal
@@ -267,6 +300,21 @@ async def execute_task(job_id: str, crawler_type: str, max_items: int, config: O
         else:
             raise ValueError(f"不支持的爬虫类型: {crawler_type}")
 
+def run_job(job_id: str, crawler_type: str, max_items: int, config: Optional[Dict[str, Any]] = None) -> int:
+    """在当前进程中同步执行爬虫任务，供任务工作进程调用
+    
+    Args:
+        job_id: 任务ID
+        crawler_type: 爬虫类型
+        max_items: 最大采集数量
+        config: 配置参数
+        
+    Returns:
+        int: 采集到的商品数量
+    """
+    with LogContext(job_id=job_id, crawler_type=crawler_type):
+        return asyncio.run(execute_task(job_id, crawler_type, max_items, config)) or 0
+
 async def main():
     """主函数"""
     global logger
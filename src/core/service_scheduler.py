@@ -12,6 +12,7 @@
 
 import os
 import asyncio
+import argparse
 from datetime import datetime
 from typing import Optional, Dict, Any
 import yaml
@@ -30,6 +31,7 @@ from src.core.product_updater import ProductUpdater, UpdateConfiguration
 from models.database import SessionLocal
 from models.scheduler import JobHistoryModel
 from src.core.cj_products_crawler import CJProductsCrawler
+from src.utils.diagnostics import add_diagnostics_arguments, setup_diagnostics
 
 class SchedulerManager:
     """定时任务管理器
@@ -651,9 +653,15 @@ async def main():
     创建并启动调度器管理器的入口点。
     处理键盘中断和其他异常。
     """
+    parser = argparse.ArgumentParser(description="定时任务调度服务")
+    parser.add_argument("--config", type=str, default="config/app.yaml", help="配置文件路径")
+    add_diagnostics_arguments(parser)
+    args = parser.parse_args()
+    setup_diagnostics(args)
+    
     try:
         # 获取配置文件路径
-        config_path = "config/app.yaml"
+        config_path = args.config
         
         # 创建调度器管理器
         scheduler_manager = SchedulerManager(config_path)
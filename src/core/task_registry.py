@@ -0,0 +1,377 @@
+"""
+爬虫任务登记模块
+把手动爬虫任务和定时任务的每次执行保存在调度器数据库中，并记录增量进度事件。
+数据库在多个API工作进程和任务工作进程之间共享，重启后任务状态不会丢失。
+
+主要功能：
+1. 任务记录：状态、发现商品数、保存商品数、批次数、错误数和最终结果
+2. 进度事件：按自增ID保存，客户端用最后收到的事件ID增量读取
+3. track_task/report_progress：爬虫代码通过上下文变量上报进度，未登记任务时不做任何事
+4. task_event_stream：供SSE接口使用的异步事件流
+"""
+
+import os
+import json
+import asyncio
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, Column, DateTime, Integer, String, Text, select
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+from src.utils.log_config import get_logger
+
+logger = get_logger("TaskRegistry")
+
+Base = declarative_base()
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+FINAL_STATUSES = (STATUS_COMPLETED, STATUS_FAILED)
+
+# 进度事件类型
+EVENT_CREATED = "created"
+EVENT_STATUS = "status"
+EVENT_ITEMS_FOUND = "items_found"
+EVENT_BATCH_SAVED = "batch_saved"
+EVENT_ERROR = "error"
+
+
+class TaskRunModel(Base):
+    """任务执行记录数据库模型"""
+    __tablename__ = 'task_runs'
+
+    id = Column(String(64), primary_key=True)
+    kind = Column(String(20), nullable=False, index=True)      # crawl: 手动爬虫任务，job: 定时任务
+    job_id = Column(String(50), index=True)
+    crawler_type = Column(String(50))
+    status = Column(String(20), nullable=False, index=True)
+    items_found = Column(Integer, nullable=False, default=0)
+    items_saved = Column(Integer, nullable=False, default=0)
+    batches_saved = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    params = Column(Text)        # JSON
+    result = Column(Text)        # JSON
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, index=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class TaskEventModel(Base):
+    """任务进度事件数据库模型"""
+    __tablename__ = 'task_events'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(String(64), nullable=False, index=True)
+    type = Column(String(20), nullable=False)
+    data = Column(Text)          # JSON
+    created_at = Column(DateTime, nullable=False)
+
+
+def _now() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    """数据库中保存的是UTC时间，输出时带上时区"""
+    return value.replace(tzinfo=UTC).isoformat() if value else None
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return json.dumps(value, ensure_ascii=False, default=str) if value is not None else None
+
+
+def _loads(value: Optional[str]) -> Any:
+    return json.loads(value) if value else None
+
+
+def _task_to_dict(task: TaskRunModel) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "kind": task.kind,
+        "job_id": task.job_id,
+        "crawler_type": task.crawler_type,
+        "status": task.status,
+        "items_found": task.items_found,
+        "items_saved": task.items_saved,
+        "batches_saved": task.batches_saved,
+        "errors": task.errors,
+        "params": _loads(task.params),
+        "result": _loads(task.result),
+        "error": task.error,
+        "created_at": _isoformat(task.created_at),
+        "started_at": _isoformat(task.started_at),
+        "finished_at": _isoformat(task.finished_at),
+        "updated_at": _isoformat(task.updated_at),
+    }
+
+
+def _event_to_dict(event: TaskEventModel, task: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "id": event.id,
+        "task_id": event.task_id,
+        "type": event.type,
+        "data": _loads(event.data) or {},
+        "created_at": _isoformat(event.created_at),
+        "task": task,
+    }
+
+
+def default_db_url() -> str:
+    """与SchedulerManager使用同一个数据库"""
+    if "SCHEDULER_DB_PATH" in os.environ:
+        return f"sqlite:///{os.environ['SCHEDULER_DB_PATH']}"
+    data_dir = Path(__file__).parent.parent.parent / "data" / "db"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return f"sqlite:///{data_dir}/scheduler.db"
+
+
+class TaskRegistry:
+    """任务登记表
+
+    示例：
+        registry = get_task_registry()
+        task_id = registry.create_task("crawl", crawler_type="deals", params={"max_items": 100})
+        registry.start_task(task_id)
+        registry.record_event(task_id, EVENT_ITEMS_FOUND, count=10)
+        registry.finish_task(task_id, STATUS_COMPLETED, result={"total_items": 10})
+    """
+
+    def __init__(self, db_url: Optional[str] = None):
+        db_url = db_url or default_db_url()
+        connect_args = {"timeout": 10} if db_url.startswith("sqlite") else {}
+        self.engine = create_engine(db_url, connect_args=connect_args)
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def create_task(self, kind: str, task_id: Optional[str] = None, job_id: Optional[str] = None,
+                    crawler_type: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        登记新任务，状态为pending
+
+        Returns:
+            str: 任务ID
+        """
+        task_id = task_id or uuid.uuid4().hex
+        now = _now()
+        with self.Session.begin() as session:
+            session.add(TaskRunModel(
+                id=task_id, kind=kind, job_id=job_id, crawler_type=crawler_type,
+                status=STATUS_PENDING, params=_dumps(params), created_at=now, updated_at=now,
+            ))
+            session.add(TaskEventModel(task_id=task_id, type=EVENT_CREATED,
+                                       data=_dumps({"status": STATUS_PENDING}), created_at=now))
+        return task_id
+
+    def start_task(self, task_id: str) -> Optional[int]:
+        """标记任务开始运行"""
+        return self._update(task_id, EVENT_STATUS, {"status": STATUS_RUNNING},
+                            status=STATUS_RUNNING, started_at=_now())
+
+    def finish_task(self, task_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                    error: Optional[str] = None, items_saved: Optional[int] = None) -> Optional[int]:
+        """
+        标记任务结束
+
+        Args:
+            task_id: 任务ID
+            status: completed或failed
+            result: 任务结果
+            error: 错误信息
+            items_saved: 最终保存的商品数，覆盖按批次累计的数量
+        """
+        values = {"status": status, "finished_at": _now(), "result": _dumps(result), "error": error}
+        if items_saved is not None:
+            values["items_saved"] = items_saved
+        return self._update(task_id, EVENT_STATUS, {"status": status, "error": error}, **values)
+
+    def record_event(self, task_id: str, event_type: str, **data) -> Optional[int]:
+        """
+        记录进度事件并累计任务计数
+
+        items_found事件累计count，batch_saved事件累计saved，error事件累计错误数。
+
+        Returns:
+            Optional[int]: 事件ID，任务不存在时返回None
+        """
+        return self._update(task_id, event_type, data)
+
+    def _update(self, task_id: str, event_type: str, data: Dict[str, Any], **values) -> Optional[int]:
+        """在一个事务中更新任务记录并写入事件"""
+        now = _now()
+        with self.Session.begin() as session:
+            task = session.get(TaskRunModel, task_id)
+            if task is None:
+                logger.warning(f"任务 {task_id} 未登记，忽略事件 {event_type}")
+                return None
+            if event_type == EVENT_ITEMS_FOUND:
+                task.items_found += int(data.get("count", 0))
+            elif event_type == EVENT_BATCH_SAVED:
+                task.batches_saved += 1
+                task.items_saved += int(data.get("saved", 0))
+            elif event_type == EVENT_ERROR:
+                task.errors += 1
+            for key, value in values.items():
+                setattr(task, key, value)
+            task.updated_at = now
+            event = TaskEventModel(task_id=task_id, type=event_type, data=_dumps(data), created_at=now)
+            session.add(event)
+            session.flush()
+            return event.id
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务记录"""
+        with self.Session() as session:
+            task = session.get(TaskRunModel, task_id)
+            return _task_to_dict(task) if task else None
+
+    def list_tasks(self, kind: Optional[str] = None, job_id: Optional[str] = None,
+                   status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """按创建时间倒序列出任务"""
+        query = select(TaskRunModel)
+        if kind:
+            query = query.where(TaskRunModel.kind == kind)
+        if job_id:
+            query = query.where(TaskRunModel.job_id == job_id)
+        if status:
+            query = query.where(TaskRunModel.status == status)
+        query = query.order_by(TaskRunModel.created_at.desc()).limit(limit)
+        with self.Session() as session:
+            return [_task_to_dict(task) for task in session.scalars(query)]
+
+    def events_since(self, after_id: int = 0, task_id: Optional[str] = None, job_id: Optional[str] = None,
+                     kind: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        读取ID大于after_id的事件，每个事件附带任务的最新状态
+
+        Args:
+            after_id: 客户端最后收到的事件ID
+            task_id/job_id/kind: 过滤条件
+            limit: 最多返回的事件数
+        """
+        query = (
+            select(TaskEventModel, TaskRunModel)
+            .join(TaskRunModel, TaskRunModel.id == TaskEventModel.task_id)
+            .where(TaskEventModel.id > after_id)
+        )
+        if task_id:
+            query = query.where(TaskEventModel.task_id == task_id)
+        if job_id:
+            query = query.where(TaskRunModel.job_id == job_id)
+        if kind:
+            query = query.where(TaskRunModel.kind == kind)
+        query = query.order_by(TaskEventModel.id).limit(limit)
+        with self.Session() as session:
+            rows = session.execute(query).all()
+            tasks: Dict[str, Dict[str, Any]] = {}
+            events = []
+            for event, task in rows:
+                if task.id not in tasks:
+                    tasks[task.id] = _task_to_dict(task)
+                events.append(_event_to_dict(event, tasks[task.id]))
+            return events
+
+    def get_events(self, task_id: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """获取任务最近的事件（按时间顺序）"""
+        query = (
+            select(TaskEventModel).where(TaskEventModel.task_id == task_id)
+            .order_by(TaskEventModel.id.desc()).limit(limit)
+        )
+        with self.Session() as session:
+            return [_event_to_dict(event) for event in reversed(session.scalars(query).all())]
+
+    def latest_event_id(self) -> int:
+        """当前最大的事件ID"""
+        with self.Session() as session:
+            return session.scalar(select(TaskEventModel.id).order_by(TaskEventModel.id.desc()).limit(1)) or 0
+
+
+_registry: Optional[TaskRegistry] = None
+_current_task: ContextVar[Optional[Tuple[str, TaskRegistry]]] = ContextVar("current_task", default=None)
+
+
+def get_task_registry() -> TaskRegistry:
+    """获取当前进程的任务登记表"""
+    global _registry
+    if _registry is None:
+        _registry = TaskRegistry()
+    return _registry
+
+
+@contextmanager
+def track_task(task_id: str, registry: Optional[TaskRegistry] = None):
+    """在上下文中执行的代码通过report_progress向task_id上报进度"""
+    token = _current_task.set((task_id, registry or get_task_registry()))
+    try:
+        yield
+    finally:
+        _current_task.reset(token)
+
+
+def report_progress(event_type: str, **data):
+    """向当前任务上报进度事件，没有正在跟踪的任务时不做任何事，上报失败不影响爬虫"""
+    current = _current_task.get()
+    if current is None:
+        return
+    task_id, registry = current
+    try:
+        registry.record_event(task_id, event_type, **data)
+    except Exception as e:
+        logger.warning(f"上报任务 {task_id} 进度失败: {str(e)}")
+
+
+async def task_event_stream(registry: TaskRegistry, after_id: Optional[int] = None,
+                            is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                            poll_interval: float = 1.0, keepalive_interval: float = 15.0,
+                            **filters) -> AsyncIterator[Dict[str, Any]]:
+    """
+    持续产生任务事件
+
+    after_id为None时先产生一个snapshot事件（当前任务列表），然后只推送新事件；
+    断线重连时传入最后收到的事件ID即可补发期间的事件。
+    超过keepalive_interval秒没有新事件时产生一个keepalive事件，客户端借此检查自己的截止时间。
+
+    Args:
+        registry: 任务登记表
+        after_id: 最后收到的事件ID
+        is_disconnected: 检查客户端是否断开的协程函数
+        poll_interval: 没有新事件时的查询间隔（秒）
+        keepalive_interval: 没有新事件时发送keepalive事件的间隔（秒）
+        **filters: 传给events_since的过滤条件（task_id/job_id/kind）
+    """
+    if after_id is None:
+        after_id = await asyncio.to_thread(registry.latest_event_id)
+        tasks = await asyncio.to_thread(
+            registry.list_tasks, filters.get("kind"), filters.get("job_id"), None, 50
+        )
+        if filters.get("task_id"):
+            task = await asyncio.to_thread(registry.get_task, filters["task_id"])
+            tasks = [task] if task else []
+        yield {"id": after_id, "type": "snapshot", "data": {"tasks": tasks}}
+
+    last_sent = time.monotonic()
+    while True:
+        if is_disconnected is not None and await is_disconnected():
+            return
+        events = await asyncio.to_thread(registry.events_since, after_id, **filters)
+        for event in events:
+            after_id = event["id"]
+            yield event
+        if events:
+            last_sent = time.monotonic()
+            continue
+        if time.monotonic() - last_sent >= keepalive_interval:
+            last_sent = time.monotonic()
+            yield {"id": after_id, "type": "keepalive"}
+        await asyncio.sleep(poll_interval)
@@ -7,16 +7,21 @@ WebDriver池管理模块
 2. 提供线程安全的获取和释放WebDriver方法
 3. 支持动态扩展和收缩池大小
 4. 监控资源使用情况
+5. 按页面数或内存占用回收WebDriver，并保持预热的空闲实例
+6. 租用前进行健康检查，记录启动耗时和租用等待时间
 """
 
 import os
 import sys
 import time
+import atexit
 import threading
 import logging
 import random
 import psutil
-from typing import Optional, List, Dict
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Callable, Iterator, Tuple
 from datetime import datetime
 
 # 添加项目根目录到Python路径
@@ -28,124 +33,323 @@ from src.utils.webdriver_manager import WebDriverConfig
 from selenium import webdriver
 
 
+def _summarize(values) -> Dict[str, float]:
+    """计算耗时样本的数量、平均值、P95和最大值（秒）"""
+    values = sorted(values)
+    if not values:
+        return {'count': 0, 'avg': 0.0, 'p95': 0.0, 'max': 0.0}
+    p95_index = min(len(values) - 1, int(round(0.95 * (len(values) - 1))))
+    return {
+        'count': len(values),
+        'avg': round(sum(values) / len(values), 4),
+        'p95': round(values[p95_index], 4),
+        'max': round(values[-1], 4)
+    }
+
+
 class WebDriverPool:
     """WebDriver池管理类
-    
+
     负责创建和管理多个WebDriver实例，提供线程安全的获取和释放方法。
     支持动态调整池大小，监控资源使用，以及智能分配WebDriver。
+
+    示例：
+        pool = WebDriverPool(size=4, min_idle=1, max_pages=200)
+        with pool.lease() as driver:
+            driver.get(url)
     """
-    
-    def __init__(self, size: int = 5, headless: bool = True, 
+
+    def __init__(self, size: int = 5, headless: bool = True,
                  min_idle: int = 1, max_wait_time: int = 30,
-                 check_interval: int = 5):
+                 check_interval: int = 5, max_pages: int = 200,
+                 max_rss_mb: float = 1500.0,
+                 driver_factory: Optional[Callable[[bool], webdriver.Chrome]] = None,
+                 page_load_timeout: int = 30, script_timeout: int = 30):
         """
         初始化WebDriver池
-        
+
         Args:
             size: 池中WebDriver的最大数量
             headless: 是否使用无头模式
-            min_idle: 保持的最小空闲WebDriver数量
+            min_idle: 保持的最小空闲WebDriver数量（预热备用实例）
             max_wait_time: 获取WebDriver的最大等待时间（秒）
             check_interval: 资源检查间隔（秒）
+            max_pages: 单个WebDriver加载多少个页面后回收，0表示不限制
+            max_rss_mb: 单个WebDriver进程树的内存上限（MB），超过后回收，0表示不限制
+            driver_factory: 自定义创建函数，参数为headless，默认使用WebDriverConfig.create_chrome_driver
+            page_load_timeout: 页面加载超时（秒）
+            script_timeout: 脚本执行超时（秒）
         """
-        self.size = size
+        self.size = max(1, size)
         self.headless = headless
-        self.min_idle = min_idle
+        self.min_idle = max(0, min(min_idle, self.size))
         self.max_wait_time = max_wait_time
         self.check_interval = check_interval
-        
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.driver_factory = driver_factory
+        self.page_load_timeout = page_load_timeout
+        self.script_timeout = script_timeout
+
         # 初始化池和使用状态
         self._pool: List[webdriver.Chrome] = []
         self._used: Dict[webdriver.Chrome, datetime] = {}
+        self._pages: Dict[webdriver.Chrome, int] = {}
+        self._creating = 0  # 正在锁外创建的WebDriver数量，计入池容量
         self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
         self._config = WebDriverConfig()
-        
+        self._closed = False
+
+        # 指标：计数和最近的耗时样本
+        self._counters = {
+            'created': 0,
+            'create_failures': 0,
+            'leases': 0,
+            'lease_timeouts': 0,
+            'recycled': 0,
+            'unhealthy': 0
+        }
+        self._startup_times = deque(maxlen=500)
+        self._lease_waits = deque(maxlen=2000)
+
         # 线程本地存储
         self._thread_local = threading.local()
-        
-        # 启动资源监控线程
-        self._stop_monitor = False
-        self._monitor_thread = threading.Thread(target=self._monitor_resources, daemon=True)
-        self._monitor_thread.start()
-        
-        # 初始化日志
+
+        # 初始化日志（监控线程会用到，需在启动前设置）
         self.logger = logging.getLogger("WebDriverPool")
-        
+
         # 预创建部分WebDriver
         self._prefill_pool()
-        
+
+        # 启动资源监控线程；释放时回收了WebDriver会提前唤醒它补充备用实例
+        self._stop_monitor = False
+        self._wakeup = threading.Event()
+        self._monitor_thread = threading.Thread(target=self._monitor_resources, daemon=True)
+        self._monitor_thread.start()
+
+    @property
+    def closed(self) -> bool:
+        """池是否已关闭"""
+        return self._closed
+
     def _prefill_pool(self):
         """预先填充池，创建最小数量的WebDriver"""
+        for _ in range(self.min_idle):
+            if not self._add_standby():
+                break
+            self.logger.info(f"预创建WebDriver成功，当前池大小: {len(self._pool)}")
+
+    def _add_standby(self) -> bool:
+        """在锁外创建一个空闲WebDriver并加入池，池已满或创建失败时返回False"""
         with self._lock:
-            for _ in range(self.min_idle):
-                if len(self._pool) < self.size:
-                    try:
-                        driver = self._create_driver()
-                        self._pool.append(driver)
-                        self.logger.info(f"预创建WebDriver成功，当前池大小: {len(self._pool)}")
-                    except Exception as e:
-                        self.logger.error(f"预创建WebDriver失败: {str(e)}")
-        
-    def get_driver(self) -> Optional[webdriver.Chrome]:
+            if self._closed or len(self._pool) + self._creating >= self.size:
+                return False
+            self._creating += 1
+
+        driver = None
+        try:
+            driver = self._create_driver()
+        except Exception as e:
+            self.logger.error(f"创建备用WebDriver失败: {str(e)}")
+
+        with self._available:
+            self._creating -= 1
+            if driver is not None and not self._closed:
+                self._pool.append(driver)
+                self._pages[driver] = 0
+                self._available.notify()
+                return True
+        if driver is not None:
+            self._quit(driver)
+        return False
+
+    def get_driver(self, timeout: Optional[float] = None) -> Optional[webdriver.Chrome]:
         """
         获取可用的WebDriver实例
-        
+
+        优先复用当前线程上次持有的实例；交出前先做健康检查，异常的实例会被替换。
+
+        Args:
+            timeout: 最长等待时间（秒），默认为max_wait_time
+
         Returns:
             webdriver.Chrome: 可用的WebDriver实例，如果没有可用实例则返回None
         """
-        start_time = time.time()
-        
-        while time.time() - start_time < self.max_wait_time:
-            with self._lock:
+        start_time = time.monotonic()
+        deadline = start_time + (self.max_wait_time if timeout is None else timeout)
+
+        while True:
+            driver = None
+            create = False
+            with self._available:
+                if self._closed:
+                    return None
+
+                idle = [d for d in self._pool if d not in self._used]
                 # 首先检查当前线程是否已经持有WebDriver
-                if hasattr(self._thread_local, 'driver'):
-                    driver = self._thread_local.driver
-                    if driver in self._pool and driver not in self._used:
-                        self._used[driver] = datetime.now()
-                        return driver
-                
-                # 尝试从空闲池中获取
-                available = [d for d in self._pool if d not in self._used]
-                if available:
-                    driver = random.choice(available)  # 随机选择，避免总是使用同一个
+                previous = getattr(self._thread_local, 'driver', None)
+                if previous is not None and previous in idle:
+                    driver = previous
+                elif idle:
+                    driver = random.choice(idle)  # 随机选择，避免总是使用同一个
+                elif len(self._pool) + self._creating < self.size:
+                    # 如果没有可用的driver并且池还没满，在锁外创建新的
+                    self._creating += 1
+                    create = True
+                else:
+                    # 如果所有WebDriver都在使用，等待释放或超时
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['lease_timeouts'] += 1
+                        break
+                    self._available.wait(remaining)
+                    continue
+
+                if driver is not None:
                     self._used[driver] = datetime.now()
-                    self._thread_local.driver = driver
-                    self.logger.debug(f"获取到现有WebDriver，当前使用: {len(self._used)}/{len(self._pool)}")
-                    return driver
-                
-                # 如果没有可用的driver并且池还没满，创建新的
-                if len(self._pool) < self.size:
-                    try:
-                        driver = self._create_driver()
-                        self._pool.append(driver)
-                        self._used[driver] = datetime.now()
-                        self._thread_local.driver = driver
-                        self.logger.info(f"创建新WebDriver成功，当前池大小: {len(self._pool)}")
-                        return driver
-                    except Exception as e:
-                        self.logger.error(f"创建新WebDriver失败: {str(e)}")
-            
-            # 如果所有WebDriver都在使用，等待一段时间后重试
-            time.sleep(0.5)
-        
-        self.logger.warning(f"获取WebDriver超时，已等待{self.max_wait_time}秒")
+
+            if create:
+                driver = self._create_leased_driver()
+                if driver is None:
+                    if time.monotonic() >= deadline:
+                        with self._lock:
+                            self._counters['lease_timeouts'] += 1
+                        break
+                    time.sleep(0.5)
+                    continue
+                self.logger.info(f"创建新WebDriver成功，当前池大小: {len(self._pool)}")
+            elif not self._is_healthy(driver):
+                self.logger.warning("租用前健康检查失败，替换该WebDriver")
+                self._retire(driver, "健康检查失败", unhealthy=True)
+                continue
+
+            return self._record_lease(driver, start_time)
+
+        self.logger.warning(f"获取WebDriver超时，已等待{time.monotonic() - start_time:.1f}秒")
+        return None
+
+    def _create_leased_driver(self) -> Optional[webdriver.Chrome]:
+        """为租用方创建新的WebDriver，调用前已占用一个容量名额"""
+        driver = None
+        try:
+            driver = self._create_driver()
+        except Exception as e:
+            self.logger.error(f"创建新WebDriver失败: {str(e)}")
+
+        with self._available:
+            self._creating -= 1
+            if driver is not None and not self._closed:
+                self._pool.append(driver)
+                self._pages[driver] = 0
+                self._used[driver] = datetime.now()
+                return driver
+            self._available.notify()
+        if driver is not None:
+            self._quit(driver)
         return None
-    
+
+    def _record_lease(self, driver: webdriver.Chrome, start_time: float) -> webdriver.Chrome:
+        """记录租用等待时间并绑定到当前线程"""
+        wait = time.monotonic() - start_time
+        with self._lock:
+            self._counters['leases'] += 1
+            self._lease_waits.append(wait)
+            in_use, total = len(self._used), len(self._pool)
+        self._thread_local.driver = driver
+        self.logger.debug(f"获取到WebDriver，等待{wait:.3f}秒，当前使用: {in_use}/{total}")
+        return driver
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None, pages: int = 1) -> Iterator[webdriver.Chrome]:
+        """
+        以上下文管理器方式租用WebDriver，退出时自动归还
+
+        Args:
+            timeout: 最长等待时间（秒），默认为max_wait_time
+            pages: 本次租用期间加载的页面数，计入回收阈值
+
+        Raises:
+            TimeoutError: 等待超时仍未获取到WebDriver
+        """
+        driver = self.get_driver(timeout)
+        if driver is None:
+            raise TimeoutError("获取WebDriver超时")
+        try:
+            yield driver
+        finally:
+            self.release_driver(driver, pages=pages)
+
     def _create_driver(self) -> webdriver.Chrome:
         """创建新的WebDriver实例"""
-        driver = self._config.create_chrome_driver(headless=self.headless)
-        # 设置页面加载超时
-        driver.set_page_load_timeout(30)
-        # 设置脚本执行超时
-        driver.set_script_timeout(30)
+        start_time = time.monotonic()
+        try:
+            if self.driver_factory is not None:
+                driver = self.driver_factory(self.headless)
+            else:
+                driver = self._config.create_chrome_driver(headless=self.headless)
+            # 设置页面加载超时
+            driver.set_page_load_timeout(self.page_load_timeout)
+            # 设置脚本执行超时
+            driver.set_script_timeout(self.script_timeout)
+        except Exception:
+            with self._lock:
+                self._counters['create_failures'] += 1
+            raise
+
+        elapsed = time.monotonic() - start_time
+        with self._lock:
+            self._counters['created'] += 1
+            self._startup_times.append(elapsed)
+        self.logger.debug(f"WebDriver启动耗时: {elapsed:.2f}秒")
         return driver
-    
-    def release_driver(self, driver: Optional[webdriver.Chrome] = None):
+
+    def _is_healthy(self, driver: webdriver.Chrome) -> bool:
+        """简单测试WebDriver是否正常工作"""
+        try:
+            driver.current_url
+            return True
+        except Exception as e:
+            self.logger.debug(f"WebDriver健康检查失败: {str(e)}")
+            return False
+
+    def _driver_rss_mb(self, driver: webdriver.Chrome) -> float:
+        """统计chromedriver及其浏览器子进程的常驻内存（MB），无法获取时返回0"""
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+        except (AttributeError, psutil.Error):
+            return 0.0
+
+        rss = 0
+        for proc in processes:
+            try:
+                rss += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / 1024 / 1024
+
+    def _recycle_reason(self, driver: webdriver.Chrome, pages: int) -> Optional[str]:
+        """判断WebDriver是否需要回收，返回原因或None"""
+        if self.max_pages and pages >= self.max_pages:
+            return f"已加载{pages}个页面"
+        if self.max_rss_mb:
+            rss_mb = self._driver_rss_mb(driver)
+            if rss_mb > self.max_rss_mb:
+                return f"内存占用{rss_mb:.0f}MB超过上限{self.max_rss_mb:.0f}MB"
+        return None
+
+    def release_driver(self, driver: Optional[webdriver.Chrome] = None, pages: int = 0,
+                       discard: bool = False):
         """
         释放WebDriver实例
-        
+
+        达到页面数或内存上限的实例会被关闭，由监控线程补充新的备用实例。
+
         Args:
             driver: 要释放的WebDriver实例，如果为None则释放当前线程持有的WebDriver
+            pages: 本次租用期间加载的页面数
+            discard: 是否直接丢弃该实例（例如调用方发现浏览器已崩溃）
         """
         if driver is None:
             # 如果没有指定driver，尝试获取当前线程持有的driver
@@ -153,91 +357,201 @@ class WebDriverPool:
                 driver = self._thread_local.driver
             else:
                 return
-            
+
+        with self._lock:
+            if driver not in self._used:
+                return
+            self._pages[driver] = self._pages.get(driver, 0) + pages
+            page_count = self._pages[driver]
+
+        # 内存检查需要遍历进程树，放在锁外进行
+        reason = "调用方要求丢弃" if discard else self._recycle_reason(driver, page_count)
+        if reason:
+            self._retire(driver, reason)
+            self._wakeup.set()
+            return
+
+        with self._available:
+            self._used.pop(driver, None)
+            self._available.notify()
+            self.logger.debug(f"释放WebDriver成功，当前使用: {len(self._used)}/{len(self._pool)}")
+
+    def _retire(self, driver: webdriver.Chrome, reason: str, unhealthy: bool = False):
+        """从池中移除并关闭WebDriver"""
+        with self._available:
+            if driver in self._pool:
+                self._pool.remove(driver)
+            self._used.pop(driver, None)
+            pages = self._pages.pop(driver, 0)
+            self._counters['unhealthy' if unhealthy else 'recycled'] += 1
+            self._available.notify()
+
+        if getattr(self._thread_local, 'driver', None) is driver:
+            delattr(self._thread_local, 'driver')
+        self.logger.info(f"回收WebDriver（{reason}，累计页面数: {pages}），当前池大小: {len(self._pool)}")
+        self._quit(driver)
+
+    def _quit(self, driver: webdriver.Chrome):
+        """关闭WebDriver，忽略已崩溃实例的异常"""
+        try:
+            driver.quit()
+        except Exception as e:
+            self.logger.error(f"关闭WebDriver时出错: {str(e)}")
+
+    def _claim_idle(self) -> List[webdriver.Chrome]:
+        """将当前空闲的WebDriver临时标记为使用中，以便在锁外检查"""
         with self._lock:
-            if driver in self._used:
-                del self._used[driver]
-                self.logger.debug(f"释放WebDriver成功，当前使用: {len(self._used)}/{len(self._pool)}")
-                
-                # 清除线程本地存储
-                if hasattr(self._thread_local, 'driver') and self._thread_local.driver == driver:
-                    delattr(self._thread_local, 'driver')
-    
+            idle = [d for d in self._pool if d not in self._used]
+            for driver in idle:
+                self._used[driver] = datetime.now()
+            return idle
+
+    def _maintain(self):
+        """执行一次资源检查：释放多余实例、回收异常或超限实例、补充备用实例"""
+        # 获取系统内存使用率
+        mem_usage = psutil.virtual_memory().percent
+        # 获取CPU使用率（与上次调用之间的平均值，不阻塞）
+        cpu_usage = psutil.cpu_percent(interval=None)
+        high_pressure = mem_usage > 85 or cpu_usage > 85
+
+        idle = self._claim_idle()
+        keep = []
+        for driver in idle:
+            # 检查WebDriver健康状态
+            if not self._is_healthy(driver):
+                self.logger.warning("检测到异常WebDriver，将其移除")
+                self._retire(driver, "健康检查失败", unhealthy=True)
+                continue
+            with self._lock:
+                pages = self._pages.get(driver, 0)
+            reason = self._recycle_reason(driver, pages)
+            if reason:
+                self._retire(driver, reason)
+                continue
+            keep.append(driver)
+
+        # 如果资源使用率过高，释放多余的空闲WebDriver
+        release_count = max(0, len(keep) - self.min_idle) if high_pressure else 0
+        if release_count > 0:
+            self.logger.warning(
+                f"系统资源使用率高(内存:{mem_usage}%, CPU:{cpu_usage}%)，"
+                f"释放{release_count}个空闲WebDriver"
+            )
+            for _ in range(release_count):
+                self._retire(keep.pop(), "系统资源使用率高")
+
+        with self._available:
+            for driver in keep:
+                self._used.pop(driver, None)
+            self._available.notify_all()
+            missing = self.min_idle - sum(1 for d in self._pool if d not in self._used) - self._creating
+
+        # 补充预热的备用实例，资源紧张时不补充
+        if not high_pressure:
+            for _ in range(max(0, missing)):
+                if not self._add_standby():
+                    break
+                self.logger.info("创建备用WebDriver成功")
+
     def _monitor_resources(self):
         """监控系统资源使用情况，动态调整池大小"""
         while not self._stop_monitor:
             try:
-                # 获取系统内存使用率
-                mem_usage = psutil.virtual_memory().percent
-                # 获取CPU使用率
-                cpu_usage = psutil.cpu_percent(interval=1)
-                
-                # 如果资源使用率过高，考虑减少池大小
-                if mem_usage > 85 or cpu_usage > 85:
-                    with self._lock:
-                        # 计算可以释放的WebDriver数量
-                        idle_drivers = [d for d in self._pool if d not in self._used]
-                        release_count = max(0, len(idle_drivers) - self.min_idle)
-                        
-                        if release_count > 0:
-                            self.logger.warning(
-                                f"系统资源使用率高(内存:{mem_usage}%, CPU:{cpu_usage}%)，"
-                                f"释放{release_count}个空闲WebDriver"
-                            )
-                            
-                            # 释放多余的空闲WebDriver
-                            for _ in range(release_count):
-                                if idle_drivers:
-                                    driver = idle_drivers.pop()
-                                    self._pool.remove(driver)
-                                    try:
-                                        driver.quit()
-                                    except Exception as e:
-                                        self.logger.error(f"关闭WebDriver时出错: {str(e)}")
-                
-                # 检查WebDriver健康状态
-                with self._lock:
-                    for driver in list(self._pool):
-                        if driver not in self._used:
-                            try:
-                                # 简单测试WebDriver是否正常工作
-                                driver.current_url
-                            except Exception as e:
-                                self.logger.warning(f"检测到异常WebDriver，将其移除: {str(e)}")
-                                self._pool.remove(driver)
-                                try:
-                                    driver.quit()
-                                except:
-                                    pass
-                                
-                                # 创建新的替代
-                                if len(self._pool) < self.min_idle:
-                                    try:
-                                        new_driver = self._create_driver()
-                                        self._pool.append(new_driver)
-                                        self.logger.info("创建替代WebDriver成功")
-                                    except Exception as e:
-                                        self.logger.error(f"创建替代WebDriver失败: {str(e)}")
-                
+                self._maintain()
             except Exception as e:
                 self.logger.error(f"资源监控线程出错: {str(e)}")
-                
-            # 等待下一个检查周期
-            time.sleep(self.check_interval)
-    
+
+            # 等待下一个检查周期，回收实例后会被提前唤醒
+            self._wakeup.wait(self.check_interval)
+            self._wakeup.clear()
+
+    def get_metrics(self) -> Dict:
+        """
+        获取池的运行指标
+
+        Returns:
+            Dict: 计数器、当前池状态，以及启动耗时和租用等待时间的统计（秒）
+        """
+        with self._lock:
+            metrics = dict(self._counters)
+            metrics['pool_size'] = len(self._pool)
+            metrics['in_use'] = len(self._used)
+            metrics['idle'] = len(self._pool) - len(self._used)
+            startup_times = list(self._startup_times)
+            lease_waits = list(self._lease_waits)
+        metrics['startup_seconds'] = _summarize(startup_times)
+        metrics['lease_wait_seconds'] = _summarize(lease_waits)
+        return metrics
+
+    def log_metrics(self):
+        """将运行指标写入日志"""
+        metrics = self.get_metrics()
+        startup, lease_wait = metrics['startup_seconds'], metrics['lease_wait_seconds']
+        self.logger.info(
+            f"WebDriver池指标: 创建{metrics['created']}个(失败{metrics['create_failures']}), "
+            f"租用{metrics['leases']}次(超时{metrics['lease_timeouts']}), "
+            f"回收{metrics['recycled']}个, 异常替换{metrics['unhealthy']}个; "
+            f"启动耗时 平均{startup['avg']:.2f}s/P95 {startup['p95']:.2f}s; "
+            f"租用等待 平均{lease_wait['avg']:.3f}s/P95 {lease_wait['p95']:.3f}s"
+        )
+
     def close_all(self):
         """关闭所有WebDriver实例并清理资源"""
         self._stop_monitor = True
+        self._wakeup.set()
         if self._monitor_thread.is_alive():
             self._monitor_thread.join(timeout=2)
-            
-        with self._lock:
-            for driver in self._pool:
-                try:
-                    driver.quit()
-                except Exception as e:
-                    self.logger.error(f"关闭WebDriver时出错: {str(e)}")
-                    
+
+        with self._available:
+            self._closed = True
+            drivers = self._pool
             self._pool = []
             self._used = {}
-            self.logger.info("已关闭所有WebDriver实例") 
\ No newline at end of file
+            self._pages = {}
+            self._available.notify_all()
+
+        for driver in drivers:
+            self._quit(driver)
+        self.log_metrics()
+        self.logger.info("已关闭所有WebDriver实例")
+
+
+# 进程内共享的WebDriver池，按(名称, 无头模式)区分
+_shared_pools: Dict[Tuple[str, bool], WebDriverPool] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool(name: str = "default", headless: bool = True, **kwargs) -> WebDriverPool:
+    """
+    获取进程内共享的WebDriver池，首次调用时按参数创建
+
+    同一进程内的多个爬虫复用同一个池，避免各自启动Chrome；进程退出时自动关闭。
+
+    Args:
+        name: 池名称，需要不同浏览器配置（如自定义driver_factory）的爬虫使用不同名称
+        headless: 是否使用无头模式
+        **kwargs: 传给WebDriverPool的其他参数，仅在首次创建时生效
+
+    Returns:
+        WebDriverPool: 共享的WebDriver池
+    """
+    key = (name, headless)
+    with _shared_lock:
+        pool = _shared_pools.get(key)
+        if pool is None or pool.closed:
+            pool = WebDriverPool(headless=headless, **kwargs)
+            _shared_pools[key] = pool
+        return pool
+
+
+def close_shared_pools():
+    """关闭所有共享的WebDriver池"""
+    with _shared_lock:
+        pools = list(_shared_pools.values())
+        _shared_pools.clear()
+    for pool in pools:
+        if not pool.closed:
+            pool.close_all()
+
+
+atexit.register(close_shared_pools)
@@ -206,6 +206,8 @@ class DevServiceManager:
             env["CONFIG_PATH"] = str(project_root / "config" / "development.yaml")
             
         env["PYTHONPATH"] = str(project_root)
+        # 开发环境在响应头中返回每个请求的SQL语句数和各阶段耗时
+        env.setdefault("API_DEBUG", "true")
         
         # 切换到src目录
         os.chdir(str(project_root / "src"))
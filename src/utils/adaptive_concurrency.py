@@ -0,0 +1,278 @@
+"""
+自适应并发控制模块
+根据滑动窗口内的验证码率、成功率和失败率，动态调整活跃工作线程数和请求间隔倍数。
+
+主要功能：
+1. 定期采样统计计数器，在滑动窗口内计算验证码率和失败率
+2. 验证码或失败过多时减少活跃线程并放大请求间隔，运行平稳时逐步恢复
+3. 超出活跃数的工作线程在park()中阻塞等待，不会取新任务
+4. 每次决策都以JSON Lines时间序列写入文件，便于调参
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+from src.utils.log_config import get_logger
+from src.utils.metrics import get_registry
+
+logger = get_logger("AdaptiveConcurrency")
+
+_registry = get_registry()
+_active_workers_gauge = _registry.gauge("adaptive_active_workers", "自适应并发控制的活跃线程数")
+_delay_scale_gauge = _registry.gauge("adaptive_delay_scale", "自适应并发控制的请求间隔倍数")
+_decisions_total = _registry.counter("adaptive_decisions_total", "自适应并发控制的决策次数", ("action",))
+
+
+@dataclass
+class ConcurrencyDecision:
+    """一次调整决策，作为时间序列的一个数据点"""
+    timestamp: float
+    action: str                 # grow / shrink / hold
+    reason: str
+    active_workers: int
+    delay_scale: float
+    attempts: int               # 窗口内的处理次数（成功+失败）
+    captcha_rate: float
+    success_rate: float
+    failure_rate: float
+
+
+class AdaptiveConcurrencyController:
+    """自适应并发控制器
+
+    示例：
+        controller = AdaptiveConcurrencyController(
+            stats_source=stats.get, min_workers=1, max_workers=8, initial_workers=4
+        )
+        controller.start()
+        # 工作线程中
+        if not controller.park(worker_id):
+            break
+        time.sleep(random.uniform(min_delay, max_delay) * controller.delay_scale)
+    """
+
+    def __init__(self, stats_source: Callable[[], Dict], min_workers: int = 1, max_workers: int = 8,
+                 initial_workers: Optional[int] = None, window_seconds: float = 300.0,
+                 interval: float = 30.0, min_attempts: int = 5,
+                 captcha_high: float = 0.15, captcha_low: float = 0.03, failure_high: float = 0.3,
+                 min_delay_scale: float = 1.0, max_delay_scale: float = 4.0,
+                 decision_log: Optional[Union[str, Path]] = None,
+                 on_resize: Optional[Callable[[int], None]] = None):
+        """
+        初始化控制器
+
+        Args:
+            stats_source: 返回统计快照的函数，需包含success_count、failure_count、captcha_count
+            min_workers: 最少活跃线程数
+            max_workers: 最多活跃线程数
+            initial_workers: 初始活跃线程数，默认为max_workers
+            window_seconds: 滑动窗口长度（秒）
+            interval: 采样和决策间隔（秒）
+            min_attempts: 窗口内处理次数少于该值时不做调整
+            captcha_high: 验证码率高于该值时收缩
+            captcha_low: 验证码率低于该值且失败率正常时扩张
+            failure_high: 失败率高于该值时收缩
+            min_delay_scale: 请求间隔倍数下限
+            max_delay_scale: 请求间隔倍数上限
+            decision_log: 决策时间序列文件路径（JSON Lines），为None时只写日志
+            on_resize: 活跃线程数变化时的回调，用于按需启动新的工作线程
+        """
+        self.stats_source = stats_source
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        initial = initial_workers if initial_workers is not None else self.max_workers
+        self.window_seconds = window_seconds
+        self.interval = interval
+        self.min_attempts = min_attempts
+        self.captcha_high = captcha_high
+        self.captcha_low = captcha_low
+        self.failure_high = failure_high
+        self.min_delay_scale = min_delay_scale
+        self.max_delay_scale = max_delay_scale
+        self.decision_log = Path(decision_log) if decision_log else None
+        self.on_resize = on_resize
+
+        self._active_workers = max(self.min_workers, min(initial, self.max_workers))
+        self._delay_scale = min_delay_scale
+        self._samples = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.history: List[ConcurrencyDecision] = []
+
+    @property
+    def active_workers(self) -> int:
+        """当前允许的活跃线程数"""
+        with self._cond:
+            return self._active_workers
+
+    @property
+    def delay_scale(self) -> float:
+        """当前请求间隔倍数"""
+        with self._cond:
+            return self._delay_scale
+
+    def scaled_delay(self, delay: float) -> float:
+        """按当前倍数放大请求间隔"""
+        return delay * self.delay_scale
+
+    def park(self, worker_id: int) -> bool:
+        """
+        工作线程取任务前调用；编号超出活跃数的线程在此阻塞
+
+        Args:
+            worker_id: 工作线程编号（从1开始）
+
+        Returns:
+            bool: 可以继续工作返回True；控制器已停止时返回False
+        """
+        with self._cond:
+            parked = False
+            while worker_id > self._active_workers and not self._stopped:
+                if not parked:
+                    logger.info("工作线程 {} 暂停，当前活跃线程数: {}", worker_id, self._active_workers)
+                    parked = True
+                self._cond.wait()
+            if parked and not self._stopped:
+                logger.info("工作线程 {} 恢复工作", worker_id)
+            return not self._stopped or worker_id <= self._active_workers
+
+    def record_sample(self, now: Optional[float] = None):
+        """采样一次统计计数器，并丢弃窗口之外的旧样本"""
+        now = time.time() if now is None else now
+        stats = self.stats_source()
+        self._samples.append((
+            now,
+            stats.get('success_count', 0),
+            stats.get('failure_count', 0),
+            stats.get('captcha_count', 0)
+        ))
+        # 保留窗口起点之前的最后一个样本，作为计算增量的基准
+        while len(self._samples) > 2 and self._samples[1][0] <= now - self.window_seconds:
+            self._samples.popleft()
+
+    def window_rates(self) -> Dict[str, float]:
+        """计算滑动窗口内的处理次数和各项比率"""
+        if len(self._samples) < 2:
+            return {'attempts': 0, 'captcha_rate': 0.0, 'success_rate': 0.0, 'failure_rate': 0.0}
+        _, success_0, failure_0, captcha_0 = self._samples[0]
+        _, success_1, failure_1, captcha_1 = self._samples[-1]
+        success = success_1 - success_0
+        failure = failure_1 - failure_0
+        captcha = captcha_1 - captcha_0
+        attempts = success + failure
+        base = max(1, attempts)
+        return {
+            'attempts': attempts,
+            'captcha_rate': captcha / base,
+            'success_rate': success / base,
+            'failure_rate': failure / base
+        }
+
+    def evaluate(self, now: Optional[float] = None) -> ConcurrencyDecision:
+        """
+        采样并做出一次调整决策
+
+        Args:
+            now: 当前时间戳，默认为time.time()
+
+        Returns:
+            ConcurrencyDecision: 本次决策
+        """
+        now = time.time() if now is None else now
+        self.record_sample(now)
+        rates = self.window_rates()
+
+        with self._cond:
+            previous_workers = self._active_workers
+            action, reason = "hold", "样本不足"
+            if rates['attempts'] >= self.min_attempts:
+                if rates['captcha_rate'] > self.captcha_high:
+                    action, reason = "shrink", "验证码率过高"
+                    self._active_workers = max(self.min_workers, self._active_workers - 1)
+                    self._delay_scale = min(self.max_delay_scale, self._delay_scale * 1.5)
+                elif rates['failure_rate'] > self.failure_high:
+                    action, reason = "shrink", "失败率过高"
+                    self._active_workers = max(self.min_workers, self._active_workers - 1)
+                elif rates['captcha_rate'] < self.captcha_low:
+                    action, reason = "grow", "运行平稳"
+                    self._active_workers = min(self.max_workers, self._active_workers + 1)
+                    self._delay_scale = max(self.min_delay_scale, self._delay_scale * 0.8)
+                else:
+                    reason = "比率在目标区间内"
+            if self._active_workers == previous_workers and action != "hold":
+                reason += "（已达边界）"
+            self._cond.notify_all()
+
+            decision = ConcurrencyDecision(
+                timestamp=now,
+                action=action,
+                reason=reason,
+                active_workers=self._active_workers,
+                delay_scale=round(self._delay_scale, 3),
+                attempts=rates['attempts'],
+                captcha_rate=round(rates['captcha_rate'], 4),
+                success_rate=round(rates['success_rate'], 4),
+                failure_rate=round(rates['failure_rate'], 4)
+            )
+
+        self._record_decision(decision)
+        if decision.active_workers > previous_workers and self.on_resize:
+            self.on_resize(decision.active_workers)
+        return decision
+
+    def _record_decision(self, decision: ConcurrencyDecision):
+        """记录决策到内存、日志、指标和时间序列文件"""
+        self.history.append(decision)
+        _active_workers_gauge.set(decision.active_workers)
+        _delay_scale_gauge.set(decision.delay_scale)
+        _decisions_total.inc(action=decision.action)
+        logger.info(
+            "并发控制决策: {} ({}), 活跃线程={}, 间隔倍数={}, 窗口处理数={}, 验证码率={:.1%}, 失败率={:.1%}",
+            decision.action, decision.reason, decision.active_workers, decision.delay_scale,
+            decision.attempts, decision.captcha_rate, decision.failure_rate
+        )
+        if self.decision_log:
+            try:
+                self.decision_log.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.decision_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(asdict(decision), ensure_ascii=False) + '\n')
+            except OSError as e:
+                logger.warning("写入并发控制决策日志失败: {}", e)
+
+    def _run(self):
+        """后台决策循环"""
+        self.record_sample()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped, timeout=self.interval)
+                if self._stopped:
+                    return
+            try:
+                self.evaluate()
+            except Exception as e:
+                logger.exception("并发控制决策失败: {}", e)
+
+    def start(self):
+        """启动后台决策线程"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="AdaptiveConcurrency", daemon=True)
+        self._thread.start()
+        logger.info("自适应并发控制已启动: 线程数范围 {}-{}, 初始 {}, 窗口 {} 秒, 决策间隔 {} 秒",
+                    self.min_workers, self.max_workers, self._active_workers,
+                    self.window_seconds, self.interval)
+
+    def stop(self):
+        """停止决策线程并唤醒所有暂停的工作线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -4,13 +4,17 @@ API日志记录模块，提供API调用的详细日志记录功能。
 """
 
 import json
+import time
 import asyncio
 from typing import Any, Dict, Optional
-from datetime import datetime
 from functools import wraps
-import re
-from loguru import logger
-from .log_config import get_logger, LogContext
+from .log_config import get_logger, LogContext, is_level_enabled, make_sampler
+from .metrics import get_registry
+
+# 外部API调用耗时，无论是否采样都记录
+_api_call_duration = get_registry().histogram(
+    "api_call_duration_seconds", "with_api_logging 包装的外部API调用耗时（秒）", ("api", "outcome")
+)
 
 class APILogger:
     """API日志记录器，用于记录API请求和响应的详细信息。"""
@@ -117,6 +121,9 @@ class APILogger:
             data: 请求体数据
             **extra_kwargs: 其他请求相关信息
         """
+        if not is_level_enabled("INFO"):
+            return
+        
         # 深拷贝并遮蔽敏感数据
         headers_copy = self._mask_sensitive_data(headers or {})
         data_copy = self._mask_sensitive_data(data or {}) if data else None
@@ -132,9 +139,8 @@ class APILogger:
         # 将请求信息转换为字符串
         request_str = "API请求: " + json.dumps(request_info, ensure_ascii=False)
         
-        # 直接写入日志，不传递额外参数
         with self.logger.catch(message="记录API请求时发生错误"):
-            self.logger.opt(raw=True).info(request_str + "\n")
+            self.logger.info(request_str)
     
     def log_response(
         self,
@@ -152,6 +158,11 @@ class APILogger:
             elapsed: 请求耗时（秒）
             **extra_kwargs: 其他响应相关信息
         """
+        # 选择日志级别，未开启时不截断也不序列化响应
+        log_level = "INFO" if 200 <= status_code < 400 else "ERROR"
+        if not is_level_enabled(log_level):
+            return
+        
         response_info = {
             "status_code": status_code,
             "elapsed": f"{elapsed:.3f}s",
@@ -160,16 +171,10 @@ class APILogger:
         
         # 将响应信息转换为字符串
         response_str = "API响应: " + json.dumps(response_info, ensure_ascii=False)
-        
-        # 选择日志级别
-        log_level = "INFO" if 200 <= status_code < 400 else "ERROR"
-        
-        # 直接写入日志，不传递额外参数
+
+        # 耗时和状态码绑定到extra，日志汇总据此统计接口耗时分布
         with self.logger.catch(message="记录API响应时发生错误"):
-            if log_level == "INFO":
-                self.logger.opt(raw=True).info(response_str + "\n")
-            else:
-                self.logger.opt(raw=True).error(response_str + "\n")
+            self.logger.bind(elapsed=elapsed, status_code=status_code).log(log_level, response_str)
     
     def log_error(
         self,
@@ -194,107 +199,93 @@ class APILogger:
         # 将错误信息转换为字符串
         error_str = "API错误: " + json.dumps(error_info, ensure_ascii=False)
         
-        # 直接写入日志，不传递额外参数
         with self.logger.catch(message="记录API错误时发生错误"):
-            self.logger.opt(raw=True).error(error_str + "\n")
+            self.logger.error(error_str)
 
-def with_api_logging(api_name: str):
+def with_api_logging(api_name: str, sample_rate: float = 1.0):
     """
-    API日志记录装饰器
+    API日志记录装饰器，支持同步函数和协程函数。
+    
+    INFO级别未开启或本次调用未被采样时，不遮蔽、不截断、不序列化请求和响应；
+    异常总是记录。每次调用的耗时都记入 api_call_duration_seconds 直方图。
     
     Args:
         api_name: API名称，用于日志标识
+        sample_rate: 请求/响应日志的采样率（0-1）
         
     Returns:
         Callable: 装饰器函数
     """
     api_logger = APILogger(api_name)
+    sampled = make_sampler(sample_rate)
+    ok_duration = _api_call_duration.labels(api=api_name, outcome="ok")
+    error_duration = _api_call_duration.labels(api=api_name, outcome="error")
+    
+    def start_call(kwargs) -> bool:
+        """记录请求信息，返回本次调用是否被跟踪"""
+        traced = is_level_enabled("INFO") and sampled()
+        if traced:
+            # 提取参数，使用默认值
+            api_logger.log_request(
+                method=kwargs.get("method", "UNKNOWN"),
+                url=kwargs.get("url", "UNKNOWN"),
+                headers=kwargs.get("headers", {}),
+                params=kwargs.get("params", {}),
+                data=kwargs.get("data", {})
+            )
+        return traced
+    
+    def finish_call(traced: bool, response: Any, start_time: float):
+        elapsed = time.perf_counter() - start_time
+        ok_duration.observe(elapsed)
+        if traced:
+            api_logger.log_response(
+                status_code=getattr(response, "status_code", 200),
+                response_data=response,
+                elapsed=elapsed
+            )
+    
+    def fail_call(error: Exception, args, kwargs, start_time: float):
+        error_duration.observe(time.perf_counter() - start_time)
+        api_logger.log_error(
+            error=error,
+            context={
+                "args": str(args),
+                "kwargs": str(kwargs)
+            }
+        )
     
     def decorator(func):
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            start_time = datetime.now()
-            request_id = kwargs.get("request_id", str(start_time.timestamp()))
+            start_time = time.perf_counter()
+            request_id = kwargs.get("request_id") or str(time.time())
             
             with LogContext(api_name=api_name, request_id=request_id):
+                traced = start_call(kwargs)
                 try:
-                    # 记录请求信息 - 提取参数，使用默认值
-                    api_logger.log_request(
-                        method=kwargs.get("method", "UNKNOWN"),
-                        url=kwargs.get("url", "UNKNOWN"),
-                        headers=kwargs.get("headers", {}),
-                        params=kwargs.get("params", {}),
-                        data=kwargs.get("data", {})
-                    )
-                    
-                    # 执行API调用
                     response = await func(*args, **kwargs)
-                    
-                    # 计算耗时
-                    elapsed = (datetime.now() - start_time).total_seconds()
-                    
-                    # 记录响应信息
-                    api_logger.log_response(
-                        status_code=getattr(response, "status_code", 200),
-                        response_data=response,
-                        elapsed=elapsed
-                    )
-                    
-                    return response
-                    
                 except Exception as e:
-                    # 记录错误信息
-                    api_logger.log_error(
-                        error=e,
-                        context={
-                            "args": str(args),
-                            "kwargs": str(kwargs)
-                        }
-                    )
+                    fail_call(e, args, kwargs, start_time)
                     raise
+                finish_call(traced, response, start_time)
+                return response
                     
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            start_time = datetime.now()
-            request_id = kwargs.get("request_id", str(start_time.timestamp()))
+            start_time = time.perf_counter()
+            request_id = kwargs.get("request_id") or str(time.time())
             
             with LogContext(api_name=api_name, request_id=request_id):
+                traced = start_call(kwargs)
                 try:
-                    # 记录请求信息 - 提取参数，使用默认值
-                    api_logger.log_request(
-                        method=kwargs.get("method", "UNKNOWN"),
-                        url=kwargs.get("url", "UNKNOWN"),
-                        headers=kwargs.get("headers", {}),
-                        params=kwargs.get("params", {}),
-                        data=kwargs.get("data", {})
-                    )
-                    
-                    # 执行API调用
                     response = func(*args, **kwargs)
-                    
-                    # 计算耗时
-                    elapsed = (datetime.now() - start_time).total_seconds()
-                    
-                    # 记录响应信息
-                    api_logger.log_response(
-                        status_code=getattr(response, "status_code", 200),
-                        response_data=response,
-                        elapsed=elapsed
-                    )
-                    
-                    return response
-                    
                 except Exception as e:
-                    # 记录错误信息
-                    api_logger.log_error(
-                        error=e,
-                        context={
-                            "args": str(args),
-                            "kwargs": str(kwargs)
-                        }
-                    )
+                    fail_call(e, args, kwargs, start_time)
                     raise
+                finish_call(traced, response, start_time)
+                return response
                     
         return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
     
-    return decorator 
\ No newline at end of file
+    return decorator
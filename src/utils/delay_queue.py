@@ -0,0 +1,120 @@
+"""
+延迟任务队列模块
+提供按就绪时间排序的线程安全工作队列，用于需要等待一段时间后才能再次处理的任务（如验证码重试）。
+
+主要功能：
+1. 基于最小堆按就绪时间排序，插入和取出均为O(log n)
+2. 工作线程在get()上阻塞，直到最早的任务到期，而不是反复取出再放回
+3. 与queue.Queue兼容的task_done()/join()/qsize()接口
+4. 所有任务处理完毕后get()抛出queue.Empty，便于工作线程退出
+"""
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from typing import Any, Optional
+
+
+class DelayQueue:
+    """按就绪时间排序的阻塞队列
+
+    示例：
+        task_queue = DelayQueue()
+        task_queue.put("B0XXXXXXX")             # 立即可处理
+        task_queue.put("B0YYYYYYY", delay=60)   # 60秒后可处理
+
+        while True:
+            try:
+                asin = task_queue.get()
+            except queue.Empty:
+                break
+            ...
+            task_queue.task_done()
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()  # 相同就绪时间时保持先进先出
+        self._cond = threading.Condition(threading.Lock())
+        self._unfinished_tasks = 0
+
+    def put(self, item: Any, delay: float = 0.0):
+        """
+        加入任务
+
+        Args:
+            item: 任务内容
+            delay: 延迟秒数，到期前get()不会返回该任务
+        """
+        ready_at = time.monotonic() + max(0.0, delay)
+        with self._cond:
+            heapq.heappush(self._heap, (ready_at, next(self._sequence), item))
+            self._unfinished_tasks += 1
+            # 新任务可能比当前等待的任务更早到期，唤醒等待者重新计算
+            self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        取出最早到期的任务，未到期时阻塞等待
+
+        队列为空且没有正在处理的任务时抛出queue.Empty；
+        队列为空但仍有任务在处理时继续等待，因为它们可能被重新加入队列。
+
+        Args:
+            timeout: 最长等待秒数，None表示一直等待
+
+        Returns:
+            到期的任务内容
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._heap:
+                    ready_at = self._heap[0][0]
+                    if ready_at <= now:
+                        return heapq.heappop(self._heap)[2]
+                    wait_time = ready_at - now
+                elif self._unfinished_tasks == 0:
+                    raise queue.Empty
+                else:
+                    wait_time = None
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise queue.Empty
+                    wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                self._cond.wait(wait_time)
+
+    def task_done(self):
+        """标记一个已取出的任务处理完成"""
+        with self._cond:
+            if self._unfinished_tasks <= 0:
+                raise ValueError("task_done() called too many times")
+            self._unfinished_tasks -= 1
+            if self._unfinished_tasks == 0:
+                self._cond.notify_all()
+
+    def join(self):
+        """阻塞直到所有任务都处理完成"""
+        with self._cond:
+            while self._unfinished_tasks:
+                self._cond.wait()
+
+    def qsize(self) -> int:
+        """队列中的任务数（包含未到期的任务）"""
+        with self._cond:
+            return len(self._heap)
+
+    def delayed_size(self) -> int:
+        """队列中尚未到期的任务数"""
+        now = time.monotonic()
+        with self._cond:
+            return sum(1 for ready_at, _, _ in self._heap if ready_at > now)
+
+    def empty(self) -> bool:
+        """队列是否为空"""
+        return self.qsize() == 0
@@ -0,0 +1,445 @@
+"""
+运行时诊断模块，供长时间运行的进程（API服务、调度器、多线程优惠券抓取）在不重启的情况下排查性能和内存问题。
+
+主要功能：
+1. 限时栈采样分析：后台线程定期读取所有线程的调用栈，输出折叠栈（collapsed stacks），
+   可直接交给 flamegraph.pl、speedscope 或 inferno 生成火焰图
+2. tracemalloc 快照：按需开启跟踪、保存快照，并比较两个快照之间按代码位置的内存增长
+3. 对象类型统计：按类型统计垃圾回收器跟踪的对象数，并给出与上次统计相比的增量，
+   用于发现持续增长的ORM对象、Session、WebDriver等
+4. 命令行参数和信号处理：收到 SIGUSR1 时采样分析，收到 SIGUSR2 时输出内存报告
+
+全部基于标准库（sys._current_frames、tracemalloc、gc），不依赖外部分析器。
+
+示例：
+    result = profile(seconds=10)
+    Path("api.folded").write_text(format_collapsed(result["stacks"]))
+
+    start_tracemalloc()
+    base = take_snapshot()["id"]
+    ...
+    compare_snapshots(base)  # 与当前内存比较
+
+    object_type_counts(limit=20)
+"""
+
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from src.utils.log_config import get_logger
+
+logger = get_logger("Diagnostics")
+
+# 单次采样分析的时长上限（秒）
+MAX_PROFILE_SECONDS = 300
+
+# 内存中保留的 tracemalloc 快照数，快照较大，超出后丢弃最早的
+MAX_SNAPSHOTS = 5
+
+# 调用栈叶子帧为这些函数时视为空闲等待（条件变量、select、线程join）
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("connection.py", "wait"),
+}
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+_profile_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+_snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_next_snapshot_id = 1
+_object_counts_lock = threading.Lock()
+_previous_object_counts: Optional[Counter] = None
+
+
+class DiagnosticsBusyError(RuntimeError):
+    """已有采样分析在运行"""
+
+
+def _short_path(filename: str) -> str:
+    """项目内的文件显示相对路径，第三方库和标准库只显示包内路径"""
+    try:
+        return str(Path(filename).resolve().relative_to(PROJECT_ROOT))
+    except ValueError:
+        parts = Path(filename).parts
+        for marker in ("site-packages", "dist-packages"):
+            if marker in parts:
+                return "/".join(parts[parts.index(marker) + 1:])
+        return Path(filename).name
+    except OSError:
+        return filename
+
+
+def _frame_label(code, cache: Dict[Any, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        # 折叠栈中 ';' 分隔帧、空格分隔计数，标签中不能出现这两个字符
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        label = label.replace(";", ":").replace(" ", "_")
+        cache[code] = label
+    return label
+
+
+def _is_idle(frame) -> bool:
+    return (Path(frame.f_code.co_filename).name, frame.f_code.co_name) in IDLE_LEAVES
+
+
+def profile(seconds: float = 10.0, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+    """
+    对本进程的所有线程做限时栈采样
+
+    Args:
+        seconds: 采样时长（秒），不超过 MAX_PROFILE_SECONDS
+        interval: 采样间隔（秒）
+        include_idle: 是否包含在锁、队列、select上空闲等待的栈
+
+    Returns:
+        {"stacks": {折叠栈: 次数}, "samples": 采样轮数, "seconds": 实际时长, "interval": 采样间隔}
+
+    Raises:
+        DiagnosticsBusyError: 已有采样在进行
+    """
+    seconds = min(max(seconds, 0.0), MAX_PROFILE_SECONDS)
+    if not _profile_lock.acquire(blocking=False):
+        raise DiagnosticsBusyError("已有采样分析在运行")
+    try:
+        own_thread = threading.get_ident()
+        stacks: Counter = Counter()
+        labels: Dict[Any, str] = {}
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread or (not include_idle and _is_idle(frame)):
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame.f_code, labels))
+                    frame = frame.f_back
+                thread_name = names.get(thread_id, f"thread-{thread_id}").replace(";", ":").replace(" ", "_")
+                frames.append(thread_name)
+                stacks[";".join(reversed(frames))] += 1
+            samples += 1
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(interval)
+        return {
+            "stacks": dict(stacks),
+            "samples": samples,
+            "seconds": round(time.perf_counter() - start, 3),
+            "interval": interval,
+        }
+    finally:
+        _profile_lock.release()
+
+
+def format_collapsed(stacks: Dict[str, int]) -> str:
+    """输出折叠栈文本，每行为 '帧1;帧2;...;叶子帧 次数'，按次数降序"""
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def top_functions(stacks: Dict[str, int], limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    按自身耗时（叶子帧）和累计耗时（出现在栈中）统计函数
+
+    Returns:
+        [{"function": 帧标签, "self": 叶子次数, "total": 累计次数}]，按自身次数降序
+    """
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]  # 第一帧为线程名
+        if not frames:
+            continue
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+    ranked = sorted(total_counts, key=lambda name: (-self_counts[name], -total_counts[name]))
+    return [{"function": name, "self": self_counts[name], "total": total_counts[name]} for name in ranked[:limit]]
+
+
+def start_tracemalloc(frames: int = 25) -> bool:
+    """
+    开启 tracemalloc 跟踪
+
+    Args:
+        frames: 每次分配保留的调用栈深度，越深越准确但开销越大
+
+    Returns:
+        本次调用是否新开启了跟踪
+    """
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    logger.info("已开启tracemalloc，调用栈深度 {}", frames)
+    return True
+
+
+def stop_tracemalloc():
+    """停止 tracemalloc 跟踪并丢弃已保存的快照"""
+    with _snapshot_lock:
+        _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("已停止tracemalloc")
+
+
+def tracemalloc_status() -> Dict[str, Any]:
+    """tracemalloc 当前状态和已保存的快照"""
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    with _snapshot_lock:
+        snapshots = [_snapshot_summary(entry) for entry in _snapshots.values()]
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+        "traced_current": current,
+        "traced_peak": peak,
+        "snapshots": snapshots,
+    }
+
+
+def _snapshot_summary(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: entry[key] for key in ("id", "label", "time", "traced_current", "traced_peak")}
+
+
+def _capture_snapshot() -> tracemalloc.Snapshot:
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc未开启")
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def take_snapshot(label: Optional[str] = None) -> Dict[str, Any]:
+    """
+    保存一个 tracemalloc 快照
+
+    Raises:
+        RuntimeError: tracemalloc未开启
+    """
+    global _next_snapshot_id
+    snapshot = _capture_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    with _snapshot_lock:
+        entry = {
+            "id": _next_snapshot_id,
+            "label": label,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "traced_current": current,
+            "traced_peak": peak,
+            "snapshot": snapshot,
+        }
+        _next_snapshot_id += 1
+        _snapshots[entry["id"]] = entry
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return _snapshot_summary(entry)
+
+
+def _get_snapshot(snapshot_id: int) -> tracemalloc.Snapshot:
+    with _snapshot_lock:
+        entry = _snapshots.get(snapshot_id)
+    if entry is None:
+        raise KeyError(f"快照 {snapshot_id} 不存在或已被丢弃")
+    return entry["snapshot"]
+
+
+def _format_stat(stat, key_type: str) -> Dict[str, Any]:
+    # tracemalloc的调用栈从最早的帧排到分配发生的帧
+    frames = [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback]
+    result = {
+        "location": frames[-1] if frames else "<unknown>",
+        "size": stat.size,
+        "count": stat.count,
+    }
+    if hasattr(stat, "size_diff"):
+        result["size_diff"] = stat.size_diff
+        result["count_diff"] = stat.count_diff
+    if key_type == "traceback":
+        result["traceback"] = frames
+    return result
+
+
+def top_allocations(snapshot_id: Optional[int] = None, key_type: str = "lineno",
+                    limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    按代码位置统计快照中占用最多的内存
+
+    Args:
+        snapshot_id: 快照ID，为None时使用当前内存
+        key_type: 分组方式：lineno、filename 或 traceback
+        limit: 返回条数
+    """
+    snapshot = _capture_snapshot() if snapshot_id is None else _get_snapshot(snapshot_id)
+    return [_format_stat(stat, key_type) for stat in snapshot.statistics(key_type)[:limit]]
+
+
+def compare_snapshots(base_id: int, target_id: Optional[int] = None, key_type: str = "lineno",
+                      limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    比较两个快照，按内存增长降序返回各代码位置
+
+    Args:
+        base_id: 基准快照ID
+        target_id: 目标快照ID，为None时与当前内存比较
+        key_type: 分组方式：lineno、filename 或 traceback
+        limit: 返回条数
+
+    Raises:
+        KeyError: 快照不存在
+        RuntimeError: tracemalloc未开启且未指定目标快照
+    """
+    base = _get_snapshot(base_id)
+    target = _capture_snapshot() if target_id is None else _get_snapshot(target_id)
+    return [_format_stat(stat, key_type) for stat in target.compare_to(base, key_type)[:limit]]
+
+
+def object_type_counts(limit: int = 30, collect: bool = True) -> List[Dict[str, Any]]:
+    """
+    按类型统计垃圾回收器跟踪的对象数（容器对象和自定义类实例，不含int、str等），
+    并给出与上次统计相比的增量
+
+    Args:
+        limit: 返回条数
+        collect: 统计前是否先执行一次完整垃圾回收，排除已不可达的对象
+
+    Returns:
+        [{"type": 类型全名, "count": 数量, "delta": 与上次相比的增量}]，按数量降序
+    """
+    global _previous_object_counts
+    if collect:
+        gc.collect()
+    counts: Counter = Counter()
+    for obj in gc.get_objects():
+        cls = type(obj)
+        counts[f"{cls.__module__}.{cls.__qualname__}"] += 1
+
+    with _object_counts_lock:
+        previous, _previous_object_counts = _previous_object_counts, counts
+    return [
+        {"type": name, "count": count, "delta": count - previous.get(name, 0) if previous is not None else None}
+        for name, count in counts.most_common(limit)
+    ]
+
+
+def object_type_growth(limit: int = 30) -> List[Dict[str, Any]]:
+    """统计对象类型，只返回自上次统计以来数量增加的类型，按增量降序"""
+    counts = object_type_counts(limit=sys.maxsize)
+    grown = [entry for entry in counts if entry["delta"]]
+    grown.sort(key=lambda entry: -entry["delta"])
+    return grown[:limit]
+
+
+def write_profile(output_dir: Union[str, Path], seconds: float = 30.0, interval: float = 0.005) -> Path:
+    """采样分析并把折叠栈写入 output_dir/profile-<pid>-<时间>.folded"""
+    result = profile(seconds=seconds, interval=interval)
+    path = Path(output_dir) / f"profile-{os.getpid()}-{datetime.now():%Y%m%d-%H%M%S}.folded"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(format_collapsed(result["stacks"]), encoding="utf-8")
+    logger.info("采样分析完成，{}轮采样，折叠栈已写入 {}", result["samples"], path)
+    return path
+
+
+def write_memory_report(output_dir: Union[str, Path], limit: int = 30) -> Path:
+    """
+    把内存报告写入 output_dir/memory-<pid>-<时间>.txt
+
+    报告包含对象类型统计及增量；tracemalloc开启时还包含当前占用最多的代码位置，
+    以及与上一次报告时快照的差异。
+    """
+    lines = [f"内存报告 pid={os.getpid()} {datetime.now().isoformat(timespec='seconds')}", "", "对象类型（数量 / 增量）:"]
+    for entry in object_type_counts(limit=limit):
+        delta = "" if entry["delta"] is None else f"{entry['delta']:+d}"
+        lines.append(f"  {entry['count']:>10}  {delta:>8}  {entry['type']}")
+
+    if tracemalloc.is_tracing():
+        with _snapshot_lock:
+            previous = next(reversed(_snapshots)) if _snapshots else None
+        current = take_snapshot(label="signal")
+        lines += ["", f"tracemalloc 当前 {current['traced_current']} 字节，峰值 {current['traced_peak']} 字节",
+                  "", "占用最多的代码位置:"]
+        for stat in top_allocations(current["id"], limit=limit):
+            lines.append(f"  {stat['size']:>12}  {stat['count']:>8}  {stat['location']}")
+        if previous is not None:
+            lines += ["", f"与快照 {previous} 相比的增长:"]
+            for stat in compare_snapshots(previous, current["id"], limit=limit):
+                lines.append(f"  {stat['size_diff']:>+12}  {stat['count_diff']:>+8}  {stat['location']}")
+
+    path = Path(output_dir) / f"memory-{os.getpid()}-{datetime.now():%Y%m%d-%H%M%S}.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    logger.info("内存报告已写入 {}", path)
+    return path
+
+
+def add_diagnostics_arguments(parser):
+    """为命令行工具添加诊断参数"""
+    group = parser.add_argument_group("诊断")
+    group.add_argument("--diagnostics-dir", type=str, default=None,
+                       help="启用诊断信号：SIGUSR1采样分析、SIGUSR2输出内存报告，结果写入该目录")
+    group.add_argument("--profile-seconds", type=float, default=30.0, help="收到SIGUSR1时的采样时长(秒)")
+    group.add_argument("--tracemalloc", type=int, default=0, metavar="FRAMES",
+                       help="启动时开启tracemalloc并保留的调用栈深度，0为不开启")
+    return parser
+
+
+def setup_diagnostics(args) -> bool:
+    """
+    根据命令行参数开启tracemalloc并注册诊断信号，需在主线程中调用
+
+    Returns:
+        是否注册了信号处理
+    """
+    if getattr(args, "tracemalloc", 0):
+        start_tracemalloc(args.tracemalloc)
+    output_dir = getattr(args, "diagnostics_dir", None)
+    if not output_dir:
+        return False
+    return install_signal_handlers(output_dir, profile_seconds=getattr(args, "profile_seconds", 30.0))
+
+
+def install_signal_handlers(output_dir: Union[str, Path], profile_seconds: float = 30.0) -> bool:
+    """
+    注册 SIGUSR1（采样分析）和 SIGUSR2（内存报告）处理函数
+
+    信号处理函数只启动后台线程，不阻塞被中断的主线程。Windows没有这两个信号，返回False。
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        logger.warning("当前平台不支持SIGUSR1/SIGUSR2，诊断信号未注册")
+        return False
+
+    def run_in_background(target, *args):
+        def run():
+            try:
+                target(*args)
+            except DiagnosticsBusyError as e:
+                logger.warning("诊断信号被忽略: {}", e)
+            except Exception:
+                logger.exception("执行诊断失败")
+        threading.Thread(target=run, name="diagnostics", daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, lambda signum, frame: run_in_background(write_profile, output_dir, profile_seconds))
+    signal.signal(signal.SIGUSR2, lambda signum, frame: run_in_background(write_memory_report, output_dir))
+    logger.info("诊断信号已注册: kill -USR1 {pid} 采样分析{}秒，kill -USR2 {pid} 输出内存报告，目录 {}",
+                profile_seconds, output_dir, pid=os.getpid())
+    return True
@@ -0,0 +1,177 @@
+"""
+索引最小堆模块
+按键维护到期时间的最小堆，同时记录每个键在堆中的位置，支持按键修改和删除。
+
+主要功能：
+1. push/reschedule: 插入或修改键的到期时间，O(log n)
+2. remove: 按键删除，O(log n)
+3. pop_due: 取出最多k个已到期的键，O(k log n)，未到期的键不会被取出再放回
+4. peek: 查看最早到期的键，O(1)
+
+不是线程安全的，由调用方保证在同一线程中使用。
+"""
+
+import itertools
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class IndexedHeap:
+    """按到期时间排序、可按键修改的最小堆
+
+    示例：
+        heap = IndexedHeap()
+        heap.push("B0XXXXXXX", due=time.time() + 60)
+        heap.reschedule("B0XXXXXXX", due=time.time())   # 提前到现在
+        heap.pop_due(time.time(), limit=50)              # [("B0XXXXXXX", due, None)]
+    """
+
+    def __init__(self):
+        self._heap: List[list] = []               # [due, sequence, key, value]
+        self._index: Dict[Hashable, int] = {}     # 键 -> 在_heap中的位置
+        self._sequence = itertools.count()        # 相同到期时间时保持先进先出
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[Hashable]:
+        """按堆中顺序（非到期顺序）遍历键"""
+        return (entry[2] for entry in self._heap)
+
+    def push(self, key: Hashable, due: float, value: Any = None):
+        """
+        插入键，键已存在时修改其到期时间和值
+
+        Args:
+            key: 唯一键
+            due: 到期时间戳
+            value: 附带的数据
+        """
+        position = self._index.get(key)
+        if position is not None:
+            entry = self._heap[position]
+            entry[3] = value
+            self._move(position, due)
+            return
+        entry = [due, next(self._sequence), key, value]
+        self._heap.append(entry)
+        self._index[key] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def reschedule(self, key: Hashable, due: float) -> bool:
+        """
+        修改已有键的到期时间
+
+        Returns:
+            bool: 键是否存在
+        """
+        position = self._index.get(key)
+        if position is None:
+            return False
+        self._move(position, due)
+        return True
+
+    def remove(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """
+        删除键
+
+        Returns:
+            Optional[Tuple[float, Any]]: 被删除键的(到期时间, 值)，键不存在时返回None
+        """
+        position = self._index.pop(key, None)
+        if position is None:
+            return None
+        entry = self._heap[position]
+        last = self._heap.pop()
+        if position < len(self._heap):
+            self._heap[position] = last
+            self._index[last[2]] = position
+            self._restore(position)
+        return entry[0], entry[3]
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """返回键的(到期时间, 值)，键不存在时返回None"""
+        position = self._index.get(key)
+        if position is None:
+            return None
+        entry = self._heap[position]
+        return entry[0], entry[3]
+
+    def peek(self) -> Optional[Tuple[Hashable, float, Any]]:
+        """返回最早到期的(键, 到期时间, 值)，堆为空时返回None"""
+        if not self._heap:
+            return None
+        due, _, key, value = self._heap[0]
+        return key, due, value
+
+    def pop(self) -> Tuple[Hashable, float, Any]:
+        """取出最早到期的(键, 到期时间, 值)，堆为空时抛出IndexError"""
+        if not self._heap:
+            raise IndexError("pop from empty IndexedHeap")
+        key = self._heap[0][2]
+        due, value = self.remove(key)
+        return key, due, value
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[Tuple[Hashable, float, Any]]:
+        """
+        按到期顺序取出到期时间不晚于now的键
+
+        Args:
+            now: 当前时间戳
+            limit: 最多取出的数量，None表示不限制
+
+        Returns:
+            List[Tuple[Hashable, float, Any]]: (键, 到期时间, 值)列表
+        """
+        result = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(result) < limit):
+            result.append(self.pop())
+        return result
+
+    def clear(self):
+        """清空堆"""
+        self._heap.clear()
+        self._index.clear()
+
+    def _move(self, position: int, due: float):
+        """修改指定位置的到期时间并恢复堆序"""
+        self._heap[position][0] = due
+        self._restore(position)
+
+    def _restore(self, position: int):
+        """指定位置的元素变化后，向上或向下调整以恢复堆序"""
+        key = self._heap[position][2]
+        self._sift_up(position)
+        self._sift_down(self._index[key])
+
+    def _less(self, i: int, j: int) -> bool:
+        a, b = self._heap[i], self._heap[j]
+        return (a[0], a[1]) < (b[0], b[1])
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._index[heap[i][2]] = i
+        self._index[heap[j][2]] = j
+
+    def _sift_up(self, position: int):
+        while position > 0:
+            parent = (position - 1) >> 1
+            if not self._less(position, parent):
+                break
+            self._swap(position, parent)
+            position = parent
+
+    def _sift_down(self, position: int):
+        size = len(self._heap)
+        while True:
+            smallest = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size and self._less(child, smallest):
+                    smallest = child
+            if smallest == position:
+                return
+            self._swap(position, smallest)
+            position = smallest
@@ -4,7 +4,6 @@
 """
 
 import json
-import re
 from datetime import datetime, timedelta, UTC
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Union, Tuple
@@ -12,15 +11,26 @@ from collections import defaultdict
 
 from loguru import logger
 
+from .log_index import LogIndex
+from .log_rollup import LogRollup
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """datetime转时间戳，无时区的时间按本地时间处理。"""
+    return value.timestamp() if value is not None else None
+
+
 class LogQuery:
     """
     结构化日志查询工具，支持复杂的日志搜索和过滤。
+    查询基于增量日志索引（见 log_index），每次查询前只导入新写入的日志。
     """
     
-    def __init__(self, log_path: Union[str, Path]):
+    def __init__(self, log_path: Union[str, Path], index_path: Optional[Union[str, Path]] = None):
         self.log_path = Path(log_path)
         if not self.log_path.exists():
             raise FileNotFoundError(f"日志路径不存在: {log_path}")
+        self.index = LogIndex(self.log_path, index_path)
     
     def search(
         self,
@@ -47,37 +57,101 @@ class LogQuery:
         Returns:
             符合条件的日志记录列表
         """
+        self.index.refresh()
+        task_id = context.get('task_id') if context else None
+        # 上下文中除task_id以外的条件没有索引，取出记录后再过滤
+        records = self.index.iter_records(
+            start_ts=_timestamp(start_time),
+            end_ts=_timestamp(end_time),
+            level=level,
+            module=module,
+            task_id=task_id,
+            message_pattern=message_pattern,
+            limit=None if context else limit
+        )
+        
         results = []
-        message_regex = re.compile(message_pattern) if message_pattern else None
+        for record in records:
+            if context:
+                record_context = record.get('extra', {})
+                if any(record_context.get(key) != value for key, value in context.items()):
+                    continue
+            results.append(record)
+            if len(results) >= limit:
+                break
+        return results
+    
+    def count(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        level: Optional[str] = None,
+        module: Optional[str] = None
+    ) -> int:
+        """
+        统计符合条件的日志记录数，不取出记录内容。
         
-        for log_file in self._get_log_files():
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        record = self._parse_log_record(line)
-                        if not record:
-                            continue
-                            
-                        if not self._match_filters(
-                            record,
-                            start_time,
-                            end_time,
-                            level,
-                            module,
-                            message_regex,
-                            context
-                        ):
-                            continue
-                            
-                        results.append(record)
-                        if len(results) >= limit:
-                            return results
-                            
-                    except Exception as e:
-                        logger.warning(f"解析日志记录时出错: {e}")
-                        continue
+        Args:
+            start_time: 开始时间
+            end_time: 结束时间
+            level: 日志级别
+            module: 模块名称
+            
+        Returns:
+            记录数
+        """
+        self.index.refresh()
+        counts = self.index.group_counts(
+            [], start_ts=_timestamp(start_time), end_ts=_timestamp(end_time), level=level, module=module
+        )
+        return counts.get((), 0)
+    
+    def count_by_interval(
+        self,
+        interval: str = 'hour',
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        level: Optional[str] = None,
+        module: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        按时间段统计日志记录数。
         
-        return results
+        Args:
+            interval: 时间间隔（minute/hour/day/week）
+            start_time: 开始时间
+            end_time: 结束时间
+            level: 日志级别
+            module: 模块名称
+            
+        Returns:
+            {时间段: 记录数}，时间段格式与日志自身时区一致
+        """
+        self.index.refresh()
+        bucket = 'day' if interval == 'week' else interval
+        counts = self.index.group_counts(
+            [bucket], start_ts=_timestamp(start_time), end_ts=_timestamp(end_time), level=level, module=module
+        )
+        
+        distribution = defaultdict(int)
+        for (key,), count in counts.items():
+            if key is None:
+                continue
+            if interval == 'week':
+                day = datetime.strptime(key, '%Y-%m-%d')
+                key = f"{day.year}-W{day.isocalendar()[1]}"
+            distribution[key] += count
+        return dict(distribution)
+    
+    def rollups(self) -> LogRollup:
+        """
+        导入新写入的日志，返回按分钟/小时预聚合的汇总表。
+        
+        Returns:
+            LogRollup实例
+        """
+        self.index.refresh()
+        return self.index.rollup
     
     def aggregate(
         self,
@@ -98,101 +172,38 @@ class LogQuery:
         Returns:
             聚合结果
         """
-        results = defaultdict(lambda: defaultdict(int))
+        filters = filters or {}
+        sql_fields = {'level', 'module'}
+        if set(group_by) <= sql_fields and set(metrics) == {'count'} and set(filters) <= sql_fields:
+            # 按级别、模块计数直接在索引上分组统计
+            self.index.refresh()
+            counts = self.index.group_counts(group_by, level=filters.get('level'), module=filters.get('module'))
+            return {
+                tuple(str(value) for value in key): {'count': count}
+                for key, count in counts.items()
+            }
         
-        for log_file in self._get_log_files():
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        record = self._parse_log_record(line)
-                        if not record or not self._match_filters_dict(record, filters or {}):
-                            continue
-                            
-                        group_key = tuple(str(record.get(field, '')) for field in group_by)
+        results = defaultdict(lambda: defaultdict(int))
+        self.index.refresh()
+        for record in self.index.iter_records():
+            try:
+                if not self._match_filters_dict(record, filters):
+                    continue
+                    
+                group_key = tuple(str(record.get(field, '')) for field in group_by)
+                
+                for metric in metrics:
+                    if metric == 'count':
+                        results[group_key]['count'] += 1
+                    elif metric in record:
+                        results[group_key][metric] += 1
                         
-                        for metric in metrics:
-                            if metric == 'count':
-                                results[group_key]['count'] += 1
-                            elif metric in record:
-                                results[group_key][metric] += 1
-                                
-                    except Exception as e:
-                        logger.warning(f"处理日志聚合时出错: {e}")
-                        continue
+            except Exception as e:
+                logger.warning(f"处理日志聚合时出错: {e}")
+                continue
         
         return dict(results)
     
-    def _get_log_files(self) -> List[Path]:
-        """获取所有日志文件。"""
-        if self.log_path.is_file():
-            return [self.log_path]
-        return sorted(self.log_path.glob('*.log'))
-    
-    def _parse_log_record(self, line: str) -> Optional[Dict[str, Any]]:
-        """解析单条日志记录。"""
-        try:
-            if line.strip():
-                # 处理JSON格式日志
-                if line.strip().startswith('{'):
-                    return json.loads(line)
-                    
-                # 处理文本格式日志
-                parts = line.split('|')
-                if len(parts) >= 4:
-                    return {
-                        'time': parts[0].strip(),
-                        'level': parts[1].strip(),
-                        'module': parts[2].strip(),
-                        'message': '|'.join(parts[3:]).strip()
-                    }
-        except Exception:
-            pass
-        return None
-    
-    def _match_filters(
-        self,
-        record: Dict[str, Any],
-        start_time: Optional[datetime],
-        end_time: Optional[datetime],
-        level: Optional[str],
-        module: Optional[str],
-        message_pattern: Optional[re.Pattern],
-        context: Optional[Dict[str, Any]]
-    ) -> bool:
-        """检查日志记录是否匹配过滤条件。"""
-        try:
-            # 检查时间范围
-            if start_time or end_time:
-                record_time = datetime.fromisoformat(record['time'].replace('Z', '+00:00'))
-                if start_time and record_time < start_time:
-                    return False
-                if end_time and record_time > end_time:
-                    return False
-            
-            # 检查日志级别
-            if level and record.get('level', '').upper() != level.upper():
-                return False
-            
-            # 检查模块
-            if module and record.get('module', '') != module:
-                return False
-            
-            # 检查消息模式
-            if message_pattern and not message_pattern.search(record.get('message', '')):
-                return False
-            
-            # 检查上下文
-            if context:
-                record_context = record.get('extra', {})
-                for key, value in context.items():
-                    if record_context.get(key) != value:
-                        return False
-            
-            return True
-            
-        except Exception:
-            return False
-    
     def _match_filters_dict(self, record: Dict[str, Any], filters: Dict[str, Any]) -> bool:
         """检查日志记录是否匹配字典形式的过滤条件。"""
         try:
@@ -228,27 +239,12 @@ class LogAnalytics:
         Returns:
             各时间段的错误数量统计
         """
-        errors = self.query.search(
+        return self.query.count_by_interval(
+            interval=group_by if group_by in ('hour', 'day') else 'week',
             start_time=start_time,
             end_time=end_time,
             level='ERROR'
         )
-        
-        distribution = defaultdict(int)
-        for error in errors:
-            try:
-                time = datetime.fromisoformat(error['time'].replace('Z', '+00:00'))
-                if group_by == 'hour':
-                    key = time.strftime('%Y-%m-%d %H:00')
-                elif group_by == 'day':
-                    key = time.strftime('%Y-%m-%d')
-                else:  # week
-                    key = f"{time.year}-W{time.isocalendar()[1]}"
-                distribution[key] += 1
-            except Exception:
-                continue
-        
-        return dict(distribution)
     
     def detect_anomalies(
         self,
@@ -9,6 +9,7 @@ import json
 import time
 import asyncio
 import re
+import random
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, Union, List, TypeVar, Callable, AsyncContextManager
@@ -19,6 +20,8 @@ from functools import wraps
 from loguru import logger
 from loguru._logger import Logger
 
+from src.utils.metrics import get_registry
+
 # 计算项目根目录
 # 假设当前文件在 src/utils/log_config.py
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
@@ -56,8 +59,10 @@ def clean_format(record):
     # 使用record的所有可用属性进行格式化
     result = formatted.format_map(record)
     
-    # 去除所有ANSI颜色代码
-    return strip_ansi_codes(result)
+    # 去除所有ANSI颜色代码。返回值会被Loguru再格式化一次，
+    # 所以要转义消息中的花括号和颜色标签，并以换行结尾，保证每条记录独占一行
+    escaped = strip_ansi_codes(result).replace('{', '{{').replace('}', '}}').replace('<', r'\<')
+    return escaped + "\n{exception}"
 
 # 默认配置
 DEFAULT_CONFIG = {
@@ -83,15 +88,43 @@ DEFAULT_CONFIG = {
     "COLORIZE_FILE": False      # 文件默认不使用颜色
 }
 
-# 上下文变量
-_context_stack: ContextVar[List[Dict[str, Any]]] = ContextVar('_context_stack', default=[])
+# 上下文变量：当前线程/异步任务的合并上下文，进入上下文时整体替换，不修改已有字典
+_EMPTY_CONTEXT: Dict[str, Any] = {}
+_log_context: ContextVar[Dict[str, Any]] = ContextVar('_log_context', default=_EMPTY_CONTEXT)
 T = TypeVar('T')
 
+
+def _inject_context(record: Dict[str, Any]) -> None:
+    """
+    全局patcher：把当前上下文合并进日志记录的extra。
+    
+    logger.bind()绑定的值优先于上下文中的同名键；未设置name时使用默认名称，
+    保证格式中的 {extra[name]} 总是可用。
+    """
+    extra = record["extra"]
+    for key, value in _log_context.get().items():
+        if key not in extra:
+            extra[key] = value
+    if "name" not in extra:
+        extra["name"] = "DefaultLogger"
+
+
+# 只在导入时安装一次，之后进入和退出上下文不再修改Loguru的全局配置
+logger.configure(patcher=_inject_context)
+
+# track_performance 的耗时直方图，按函数和执行结果（ok/error）区分
+_function_duration = get_registry().histogram(
+    "function_duration_seconds", "track_performance 跟踪的函数耗时（秒）", ("function", "outcome")
+)
+
 class LogContext:
     """
     日志上下文管理器，支持同步和异步操作。
     提供性能监控和上下文数据管理功能。
     
+    上下文保存在contextvars中，进入和退出只是设置/恢复一个上下文变量，
+    各线程和异步任务互不影响；日志记录由全局patcher统一合并上下文。
+    
     示例：
         # 同步使用
         with LogContext(task_id='123', module='user_service'):
@@ -108,28 +141,15 @@ class LogContext:
     """
     
     def __init__(self, **kwargs):
+        self.track_performance = kwargs.pop('track_performance', False)
         self.context_data = kwargs
-        self.track_performance = kwargs.pop('track_performance', False) if 'track_performance' in kwargs else False
         self.start_time = None
         self._token = None
         
     def __enter__(self):
-        # 获取当前上下文栈
-        stack = _context_stack.get()
-        # 创建新的上下文数据，继承父上下文的数据
-        new_context = {}
-        if stack:
-            # 复制父上下文的数据
-            new_context.update(stack[-1])
-        # 更新新的上下文数据
-        new_context.update(self.context_data)
-        
-        # 保存新的上下文栈
-        new_stack = stack + [new_context]
-        self._token = _context_stack.set(new_stack)
-        
-        # 更新logger的extra数据
-        logger.configure(extra=new_context)
+        # 继承父上下文的数据，再覆盖本层的数据
+        parent = _log_context.get()
+        self._token = _log_context.set({**parent, **self.context_data} if parent else self.context_data)
         
         if self.track_performance:
             self.start_time = time.perf_counter()
@@ -139,21 +159,20 @@ class LogContext:
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.track_performance and self.start_time is not None:
             duration = time.perf_counter() - self.start_time
-            # 确保在记录性能统计信息时绑定name属性
-            logger.bind(name="PerformanceTracker").info(f"性能统计 - 执行时间: {duration:.3f}秒")
+            # 确保在记录性能统计信息时绑定name属性，耗时同时写入extra供日志汇总使用
+            function_name = self.context_data.get('tracked_function')
+            _function_duration.labels(
+                function=function_name or "unnamed", outcome="ok" if exc_type is None else "error"
+            ).observe(duration)
+            label = f"{function_name} " if function_name else ""
+            logger.bind(name="PerformanceTracker", duration=duration).info(
+                f"性能统计 - {label}执行时间: {duration:.3f}秒"
+            )
             
-        # 恢复之前的上下文栈
+        # 恢复之前的上下文
         if self._token is not None:
-            _context_stack.reset(self._token)
-            
-        # 获取当前栈
-        stack = _context_stack.get()
-        
-        # 恢复到上一个上下文的extra数据
-        if stack:
-            logger.configure(extra=stack[-1])
-        else:
-            logger.configure(extra={"name": "DefaultLogger"})
+            _log_context.reset(self._token)
+            self._token = None
             
     async def __aenter__(self):
         return self.__enter__()
@@ -163,10 +182,7 @@ class LogContext:
         
     def _get_merged_context(self) -> Dict[str, Any]:
         """合并所有活动的上下文数据。"""
-        stack = _context_stack.get()
-        if not stack:
-            return {}
-        return stack[-1].copy()
+        return dict(_log_context.get())
 
 def get_current_context() -> Dict[str, Any]:
     """
@@ -175,10 +191,7 @@ def get_current_context() -> Dict[str, Any]:
     Returns:
         包含所有活动上下文数据的字典
     """
-    stack = _context_stack.get()
-    if not stack:
-        return {}
-    return stack[-1].copy()
+    return dict(_log_context.get())
 
 def with_context(**context_kwargs):
     """
@@ -210,7 +223,10 @@ def with_context(**context_kwargs):
 def track_performance(func: Callable[..., T]) -> Callable[..., T]:
     """
     用于跟踪函数执行性能的装饰器。
-    
+
+    每次调用的耗时写入一条性能统计日志，同时记入 function_duration_seconds 直方图，
+    可通过 /metrics 获取各函数的 p50/p95/p99。
+
     Args:
         func: 要跟踪的函数
         
@@ -219,7 +235,7 @@ def track_performance(func: Callable[..., T]) -> Callable[..., T]:
         def expensive_operation():
             time.sleep(1)
     """
-    context_kwargs = {'track_performance': True}
+    context_kwargs = {'track_performance': True, 'tracked_function': func.__qualname__}
     return with_context(**context_kwargs)(func)
 
 async def bind_context(task: asyncio.Task, **context_kwargs):
@@ -441,26 +457,102 @@ def get_logger(name: str = "DefaultLogger", **kwargs) -> Logger:
     context.update(kwargs)
     return logger.bind(**context)
 
+# loguru的内部核心对象，其min_level为所有处理器中最低的级别数值
+_LOGGER_CORE = getattr(logger, "_core", None)
+
+def _min_enabled_level() -> int:
+    """
+    当前所有处理器中最低的级别数值。
+    
+    loguru没有公开该值，只能读取内部属性；版本变化导致属性不存在时返回0，
+    即视为所有级别都开启（只是多做格式化，不会漏记日志）。
+    """
+    return getattr(_LOGGER_CORE, "min_level", 0)
+
 # 设置常用的日志装饰器
-def log_function_call(func):
+def is_level_enabled(level: Union[str, int]) -> bool:
+    """
+    判断当前是否有日志处理器会输出该级别，不做任何格式化。
+    
+    Args:
+        level: 日志级别名称或数值
+        
+    Returns:
+        至少有一个处理器接受该级别时返回True
     """
-    记录函数调用的装饰器。
+    level_no = level if isinstance(level, int) else logger.level(level).no
+    return level_no >= _min_enabled_level()
+
+def make_sampler(sample_rate: float) -> Callable[[], bool]:
+    """根据采样率返回采样函数，采样率为1时不调用随机数。"""
+    if sample_rate >= 1:
+        return lambda: True
+    if sample_rate <= 0:
+        return lambda: False
+    return lambda: random.random() < sample_rate
+
+def log_function_call(func: Optional[Callable[..., T]] = None, *, level: str = "DEBUG", sample_rate: float = 1.0):
+    """
+    记录函数调用的装饰器，支持同步函数和协程函数。
+    
+    日志级别未开启或未被采样时，只做一次整数比较，不格式化参数；
+    异常总是以ERROR级别记录。
     
     Args:
         func: 被装饰的函数
+        level: 调用和成功日志的级别
+        sample_rate: 采样率（0-1），高频函数可只记录部分调用
         
     Returns:
         装饰后的函数
+        
+    示例：
+        @log_function_call
+        def get_products(...): ...
+        
+        @log_function_call(sample_rate=0.01)
+        async def batch_generate_product_links(...): ...
     """
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        logger_instance = get_logger(name=func.__name__)
-        logger_instance.debug(f"调用函数 {func.__name__} - 参数: {args}, 关键字参数: {kwargs}")
-        try:
-            result = func(*args, **kwargs)
-            logger_instance.debug(f"函数 {func.__name__} 执行成功")
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        name = func.__name__
+        logger_instance = get_logger(name=name)
+        level_no = logger.level(level).no
+        sampled = make_sampler(sample_rate)
+        
+        def should_log() -> bool:
+            return level_no >= _min_enabled_level() and sampled()
+        
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                traced = should_log()
+                if traced:
+                    logger_instance.log(level, f"调用函数 {name} - 参数: {args}, 关键字参数: {kwargs}")
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception:
+                    logger_instance.exception(f"函数 {name} 执行失败")
+                    raise
+                if traced:
+                    logger_instance.log(level, f"函数 {name} 执行成功")
+                return result
+            return async_wrapper
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            traced = should_log()
+            if traced:
+                logger_instance.log(level, f"调用函数 {name} - 参数: {args}, 关键字参数: {kwargs}")
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                logger_instance.exception(f"函数 {name} 执行失败")
+                raise
+            if traced:
+                logger_instance.log(level, f"函数 {name} 执行成功")
             return result
-        except Exception as e:
-            logger_instance.exception(f"函数 {func.__name__} 执行失败")
-            raise
-    return wrapper 
\ No newline at end of file
+        return wrapper
+    
+    if func is not None:
+        return decorator(func)
+    return decorator
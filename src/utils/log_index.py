@@ -0,0 +1,499 @@
+"""
+日志索引模块，把Loguru日志文件增量导入按天分段的SQLite存储。
+
+主要功能：
+1. 按文件偏移量增量读取 *.log，只解析上次之后新写入的内容
+2. 读取轮转压缩后的 *.zip，通过文件头指纹接上原文件已导入的位置，不重复导入
+3. 每个UTC日期一张分段表，time/level/module/task_id 建索引；
+   分段目录记录每段的时间范围，查询时直接跳过不相关的时间段
+4. 导入的同时维护按分钟/小时的预聚合（见 log_rollup）
+5. 支持JSON（serialize=True）、clean_format文本格式和爬虫日志的方括号格式
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+from .log_rollup import LogRollup
+
+# 文件头指纹长度，用于识别改名、轮转压缩和被替换的文件
+FINGERPRINT_BYTES = 1024
+
+INDEX_FILENAME = ".log_index.sqlite3"
+
+# 可直接在SQL中过滤和分组的列
+INDEXED_COLUMNS = ("level", "module", "task_id")
+
+# 时间分桶，基于日志自身时区的时间字符串 wall（YYYY-MM-DD HH:MM:SS）
+TIME_BUCKETS = {
+    "minute": "substr(wall, 1, 16)",
+    "hour": "substr(wall, 1, 13) || ':00'",
+    "day": "substr(wall, 1, 10)",
+}
+
+# clean_format文本格式：2025-04-01 10:00:00.000 | INFO     | name:function:line | message
+TEXT_RECORD = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)\s*\|\s*(\w+)\s*\|\s*([^|]*?)\s*\|\s?(.*)$"
+)
+# 爬虫日志格式：[2025-04-01 10:00:00] [INFO] message
+BRACKET_RECORD = re.compile(r"^\[(\d{4}-\d{2}-\d{2}[ T][\d:.]+)\]\s*\[(\w+)\]\s?(.*)$")
+
+UNDATED_SEGMENT = "records_undated"
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_log_line(line: str, source_name: str = "") -> Optional[Dict[str, Any]]:
+    """
+    解析一行日志为记录字典。
+
+    Args:
+        line: 日志行
+        source_name: 来源文件名（不含扩展名），方括号格式用作模块名
+
+    Returns:
+        记录字典，不是记录起始行时返回None
+    """
+    stripped = line.strip()
+    if not stripped:
+        return None
+    if stripped.startswith('{'):
+        try:
+            data = json.loads(stripped)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        record = data.get("record")
+        if isinstance(record, dict) and isinstance(record.get("time"), dict):
+            # Loguru serialize=True 的嵌套结构，展开为扁平记录
+            level = record.get("level") or {}
+            exception = record.get("exception")
+            return {
+                "time": record["time"].get("repr", ""),
+                "level": level.get("name", "") if isinstance(level, dict) else str(level),
+                "module": record.get("name") or record.get("module", ""),
+                "function": record.get("function", ""),
+                "line": record.get("line"),
+                "message": record.get("message", ""),
+                "extra": record.get("extra") or {},
+                **({"exception": data.get("text", "")} if exception else {}),
+            }
+        return data
+
+    match = TEXT_RECORD.match(stripped)
+    if match:
+        log_time, level, location, message = match.groups()
+        module, _, rest = location.partition(':')
+        function, _, line_no = rest.partition(':')
+        return {
+            "time": log_time,
+            "level": level,
+            "module": module,
+            "function": function,
+            "line": int(line_no) if line_no.isdigit() else None,
+            "message": message,
+        }
+
+    match = BRACKET_RECORD.match(stripped)
+    if match:
+        log_time, level, message = match.groups()
+        return {"time": log_time, "level": level, "module": source_name, "message": message}
+    return None
+
+
+def _index_columns(record: Dict[str, Any]) -> Tuple:
+    """提取索引列：(ts, wall, level, module, task_id, message)"""
+    parsed = _parse_time(str(record.get("time", "")))
+    ts = parsed.timestamp() if parsed else None
+    wall = parsed.strftime('%Y-%m-%d %H:%M:%S') if parsed else None
+    extra = record.get("extra")
+    task_id = extra.get("task_id") if isinstance(extra, dict) else None
+    if task_id is None:
+        task_id = record.get("task_id")
+    return (
+        ts,
+        wall,
+        str(record.get("level", "")).upper(),
+        str(record.get("module", "")),
+        None if task_id is None else str(task_id),
+        str(record.get("message", "")),
+    )
+
+
+def _segment_name(ts: Optional[float]) -> str:
+    if ts is None:
+        return UNDATED_SEGMENT
+    return "records_" + time.strftime('%Y%m%d', time.gmtime(ts))
+
+
+def _fingerprint(head: bytes) -> str:
+    return hashlib.sha1(head).hexdigest()
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and re.search(pattern, value) is not None
+
+
+class LogIndex:
+    """
+    增量日志索引。
+
+    示例：
+        index = LogIndex("logs")
+        index.refresh()                    # 导入新写入的日志
+        for record in index.iter_records(start_ts=..., level="ERROR"):
+            ...
+    """
+
+    def __init__(self, log_path: Union[str, Path], index_path: Optional[Union[str, Path]] = None):
+        """
+        初始化日志索引。
+
+        Args:
+            log_path: 日志目录或单个日志文件
+            index_path: 索引数据库路径，默认放在日志目录下
+                        （单个文件时为 .<文件名>.index.sqlite3）
+        """
+        self.log_path = Path(log_path)
+        if index_path is None:
+            if self.log_path.is_file():
+                index_path = self.log_path.parent / f".{self.log_path.name}.index.sqlite3"
+            else:
+                index_path = self.log_path / INDEX_FILENAME
+        self.index_path = Path(index_path)
+        self.conn = sqlite3.connect(str(self.index_path), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.create_function("regexp", 2, _regexp, deterministic=True)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS log_sources (
+                path TEXT PRIMARY KEY,
+                fp_len INTEGER NOT NULL,
+                fp TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS log_segments (
+                name TEXT PRIMARY KEY,
+                min_ts REAL,
+                max_ts REAL,
+                rows INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self._segments = {row[0] for row in self.conn.execute("SELECT name FROM log_segments")}
+
+        self.rollup = LogRollup(self.conn)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.rollup.create_tables():
+                self._backfill_rollups()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            self.rollup.discard()
+            raise
+
+    def _backfill_rollups(self):
+        """汇总表新建时，用索引中已有的记录回填"""
+        for segment in self._segments:
+            for row in self.conn.execute(f"SELECT ts, wall, level, module, task_id, message, data FROM {segment}"):
+                self.rollup.add(row[:6], json.loads(row[6]))
+        self.rollup.flush()
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- 导入 ----------
+
+    def _log_files(self) -> List[Path]:
+        if self.log_path.is_file():
+            return [self.log_path]
+        if not self.log_path.is_dir():
+            return []
+        return sorted(self.log_path.glob('*.zip')) + sorted(self.log_path.glob('*.log'))
+
+    def refresh(self) -> int:
+        """
+        导入上次之后新写入的日志。
+
+        整个导入在一个写事务中完成，多个进程同时刷新时串行执行，不会重复导入。
+
+        Returns:
+            新导入的记录数
+        """
+        imported = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            sources = {
+                row[0]: row for row in self.conn.execute(
+                    "SELECT path, fp_len, fp, offset, size, mtime FROM log_sources"
+                )
+            }
+            files = self._log_files()
+            # 原路径已不存在的来源，可能被改名或压缩成zip，用于接续导入位置
+            orphans = [row for path, row in sources.items() if not Path(path).exists()]
+
+            # 先找出所有变化的文件，被替换的旧文件要在导入新文件前加入孤儿列表
+            changed = []
+            for path in files:
+                row = sources.get(str(path))
+                stat = path.stat()
+                if row and row[4] == stat.st_size and row[5] == stat.st_mtime:
+                    continue
+                if row and path.suffix != '.zip' and not self._same_file(path, row, stat.st_size):
+                    # 文件被替换（轮转时同名新建），旧记录作为孤儿，可与改名后的文件匹配
+                    orphans.append(row)
+                    row = None
+                changed.append((path, row, stat))
+            for path, row, stat in changed:
+                imported += self._import_file(path, row, stat, orphans)
+            self.rollup.flush()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            self.rollup.discard()
+            self._segments = {row[0] for row in self.conn.execute("SELECT name FROM log_segments")}
+            raise
+        if imported:
+            logger.debug(f"日志索引导入 {imported} 条记录: {self.log_path}")
+        return imported
+
+    @staticmethod
+    def _read_head(path: Path, length: int) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read(length)
+
+    def _same_file(self, path: Path, row: Tuple, size: int) -> bool:
+        """文件大小不小于已导入偏移量且文件头指纹一致时，认为是同一个文件"""
+        if size < row[3]:
+            return False
+        return _fingerprint(self._read_head(path, row[1])) == row[2]
+
+    @staticmethod
+    def _match_orphan(head: bytes, orphans: List[Tuple]) -> Optional[Tuple]:
+        for orphan in orphans:
+            if len(head) >= orphan[1] and _fingerprint(head[:orphan[1]]) == orphan[2]:
+                return orphan
+        return None
+
+    def _import_file(self, path: Path, row: Optional[Tuple], stat, orphans: List[Tuple]) -> int:
+        if path.suffix == '.zip':
+            try:
+                with zipfile.ZipFile(path) as archive:
+                    names = [name for name in archive.namelist() if not name.endswith('/')]
+                    data = b"".join(archive.read(name) for name in names)
+            except (zipfile.BadZipFile, OSError) as e:
+                logger.warning(f"读取压缩日志失败 {path}: {e}")
+                return 0
+            source_name = Path(names[0]).stem if names else path.stem
+            head = data[:FINGERPRINT_BYTES]
+            start, fp_len, fp = self._resume_point(head, row, orphans)
+            chunk = data[start:]
+        else:
+            with open(path, 'rb') as f:
+                head = f.read(FINGERPRINT_BYTES)
+                start, fp_len, fp = self._resume_point(head, row, orphans)
+                # 只读取上次导入位置之后新写入的内容
+                f.seek(start)
+                chunk = f.read()
+            source_name = path.stem
+            # 只导入完整的行，末尾未写完的行留到下次
+            chunk = chunk[:chunk.rfind(b'\n') + 1]
+
+        count = self._insert_records(chunk, source_name) if chunk else 0
+
+        if fp_len < len(head):
+            fp_len = len(head)
+            fp = _fingerprint(head)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO log_sources (path, fp_len, fp, offset, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            (str(path), fp_len, fp, start + len(chunk), stat.st_size, stat.st_mtime)
+        )
+        return count
+
+    def _resume_point(self, head: bytes, row: Optional[Tuple], orphans: List[Tuple]) -> Tuple[int, int, str]:
+        """根据文件头指纹确定从哪个偏移量继续导入，返回 (偏移量, 指纹长度, 指纹)"""
+        if row is not None and _fingerprint(head[:row[1]]) == row[2]:
+            return row[3], row[1], row[2]
+        orphan = self._match_orphan(head, orphans)
+        if orphan is not None:
+            # 改名或压缩后的同一份内容，从原来导入到的位置继续
+            orphans.remove(orphan)
+            self.conn.execute("DELETE FROM log_sources WHERE path = ? AND fp = ?", (orphan[0], orphan[2]))
+            return orphan[3], orphan[1], orphan[2]
+        return 0, 0, ""
+
+    def _insert_records(self, chunk: bytes, source_name: str) -> int:
+        records: List[Dict[str, Any]] = []
+        last_text = False
+        for line in chunk.decode('utf-8', errors='replace').splitlines():
+            record = parse_log_line(line, source_name)
+            if record is not None:
+                records.append(record)
+                last_text = not line.lstrip().startswith('{')
+            elif last_text and line.strip():
+                # 文本格式的多行消息（如异常堆栈）接到上一条记录
+                records[-1]["message"] += "\n" + line.rstrip()
+
+        by_segment: Dict[str, List[Tuple]] = {}
+        for record in records:
+            columns = _index_columns(record)
+            self.rollup.add(columns, record)
+            by_segment.setdefault(_segment_name(columns[0]), []).append(
+                columns + (json.dumps(record, ensure_ascii=False, default=str),)
+            )
+        for segment, rows in by_segment.items():
+            self._ensure_segment(segment)
+            self.conn.executemany(
+                f"INSERT INTO {segment} (ts, wall, level, module, task_id, message, data) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            if segment == UNDATED_SEGMENT:
+                self.conn.execute("UPDATE log_segments SET rows = rows + ? WHERE name = ?", (len(rows), segment))
+                continue
+            low = min(r[0] for r in rows)
+            high = max(r[0] for r in rows)
+            self.conn.execute(
+                "UPDATE log_segments SET rows = rows + ?, min_ts = min(coalesce(min_ts, ?), ?), "
+                "max_ts = max(coalesce(max_ts, ?), ?) WHERE name = ?",
+                (len(rows), low, low, high, high, segment)
+            )
+        return len(records)
+
+    def _ensure_segment(self, segment: str):
+        if segment in self._segments:
+            return
+        # 在导入事务中执行，不能用executescript（会先隐式提交）
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {segment} (
+                id INTEGER PRIMARY KEY,
+                ts REAL,
+                wall TEXT,
+                level TEXT NOT NULL,
+                module TEXT NOT NULL,
+                task_id TEXT,
+                message TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{segment}_ts ON {segment} (ts)")
+        for column in INDEXED_COLUMNS:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{segment}_{column} ON {segment} ({column}, ts)")
+        self.conn.execute("INSERT OR IGNORE INTO log_segments (name) VALUES (?)", (segment,))
+        self._segments.add(segment)
+
+    # ---------- 查询 ----------
+
+    def segments(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> List[str]:
+        """返回与时间范围相交的分段，按时间顺序，无时间的记录段排在最后且只在不限时间时返回"""
+        sql = "SELECT name FROM log_segments WHERE rows > 0"
+        params: List[Any] = []
+        if start_ts is not None:
+            sql += " AND max_ts >= ?"
+            params.append(start_ts)
+        if end_ts is not None:
+            sql += " AND min_ts <= ?"
+            params.append(end_ts)
+        sql += " ORDER BY min_ts IS NULL, min_ts"
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+    @staticmethod
+    def _where(start_ts: Optional[float], end_ts: Optional[float], level: Optional[str],
+               module: Optional[str], task_id: Optional[str], message_pattern: Optional[str]) -> Tuple[str, List]:
+        clauses, params = [], []
+        if start_ts is not None:
+            clauses.append("ts >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            clauses.append("ts <= ?")
+            params.append(end_ts)
+        if level:
+            clauses.append("level = ?")
+            params.append(level.upper())
+        if module:
+            clauses.append("module = ?")
+            params.append(module)
+        if task_id is not None:
+            clauses.append("task_id = ?")
+            params.append(str(task_id))
+        if message_pattern:
+            clauses.append("message REGEXP ?")
+            params.append(message_pattern)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def iter_records(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+                     level: Optional[str] = None, module: Optional[str] = None,
+                     task_id: Optional[str] = None, message_pattern: Optional[str] = None,
+                     limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按时间顺序返回符合条件的记录，只扫描相关时间段。
+
+        Args:
+            start_ts: 开始时间戳
+            end_ts: 结束时间戳
+            level: 日志级别
+            module: 模块名称
+            task_id: 任务ID（来自extra.task_id）
+            message_pattern: 消息正则表达式
+            limit: 最多返回的记录数
+        """
+        where, params = self._where(start_ts, end_ts, level, module, task_id, message_pattern)
+        remaining = limit
+        for segment in self.segments(start_ts, end_ts):
+            sql = f"SELECT data FROM {segment}{where} ORDER BY ts, id"
+            if remaining is not None:
+                sql += f" LIMIT {int(remaining)}"
+            for (data,) in self.conn.execute(sql, params):
+                yield json.loads(data)
+                if remaining is not None:
+                    remaining -= 1
+            if remaining is not None and remaining <= 0:
+                return
+
+    def group_counts(self, keys: Sequence[str], start_ts: Optional[float] = None,
+                     end_ts: Optional[float] = None, level: Optional[str] = None,
+                     module: Optional[str] = None, task_id: Optional[str] = None,
+                     message_pattern: Optional[str] = None) -> Dict[Tuple, int]:
+        """
+        按索引列或时间分桶计数。
+
+        Args:
+            keys: 分组键，可选 level/module/task_id 和 minute/hour/day
+
+        Returns:
+            {分组值元组: 记录数}
+        """
+        expressions = []
+        for key in keys:
+            if key in TIME_BUCKETS:
+                expressions.append(TIME_BUCKETS[key])
+            elif key in INDEXED_COLUMNS:
+                expressions.append(key)
+            else:
+                raise ValueError(f"不支持的分组键: {key}")
+        where, params = self._where(start_ts, end_ts, level, module, task_id, message_pattern)
+        select = ", ".join(expressions) if expressions else "''"
+        group = f" GROUP BY {select}" if expressions else ""
+
+        counts: Dict[Tuple, int] = {}
+        for segment in self.segments(start_ts, end_ts):
+            for row in self.conn.execute(f"SELECT {select}, COUNT(*) FROM {segment}{where}{group}", params):
+                key = tuple(row[:-1]) if expressions else ()
+                counts[key] = counts.get(key, 0) + row[-1]
+        return counts
@@ -0,0 +1,344 @@
+"""
+日志预聚合模块，在日志导入索引时维护按分钟和按小时的汇总。
+
+主要功能：
+1. 按级别、模块统计每分钟/每小时的日志数
+2. 从 track_performance（性能统计 - 执行时间）、with_api_logging（API响应 elapsed）
+   和记录中的数值耗时字段提取耗时，按固定分桶累积直方图
+3. 图表和仪表板只读汇总表，渲染耗时与保留的日志总量无关
+4. 分钟级汇总只保留最近几天，小时级汇总长期保留
+"""
+
+import bisect
+import json
+import math
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .metrics import histogram_quantile
+
+# 耗时直方图的分桶上界（单位与指标自身一致：秒或毫秒），最后一个桶为 +Inf
+LATENCY_BOUNDS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+)
+
+# 汇总周期及其秒数
+PERIODS = {"minute": 60, "hour": 3600}
+
+# 分钟级汇总保留天数
+MINUTE_RETENTION_DAYS = 7
+
+# 记录中直接携带耗时的数值字段
+LATENCY_FIELDS = ("response_time", "elapsed", "duration")
+
+PERFORMANCE_MESSAGE = re.compile(r"性能统计 - (?:(\S+) )?执行时间: ([\d.]+)秒")
+API_RESPONSE_PREFIX = "API响应: "
+
+
+def extract_latencies(record: Dict[str, Any], module: str) -> List[Tuple[str, str, float]]:
+    """
+    从日志记录中提取耗时。
+
+    Args:
+        record: 日志记录
+        module: 记录所属模块
+
+    Returns:
+        [(指标名, 名称, 数值)]，指标名为 execution_time（track_performance，秒）、
+        api_elapsed（with_api_logging，秒）或记录中的耗时字段名
+    """
+    latencies = []
+    extra = record.get("extra") if isinstance(record.get("extra"), dict) else {}
+    message = str(record.get("message", ""))
+
+    match = PERFORMANCE_MESSAGE.match(message)
+    if match:
+        name = extra.get("tracked_function") or match.group(1) or module
+        latencies.append(("execution_time", name, float(extra.get("duration") or match.group(2))))
+    elif message.startswith(API_RESPONSE_PREFIX):
+        elapsed = extra.get("elapsed")
+        if elapsed is None:
+            try:
+                elapsed = json.loads(message[len(API_RESPONSE_PREFIX):]).get("elapsed")
+            except ValueError:
+                elapsed = None
+        if isinstance(elapsed, str):
+            elapsed = elapsed.rstrip("s")
+        try:
+            latencies.append(("api_elapsed", extra.get("api_name") or extra.get("name") or module, float(elapsed)))
+        except (TypeError, ValueError):
+            pass
+
+    for field in LATENCY_FIELDS:
+        value = record.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            latencies.append((field, module, float(value)))
+    return latencies
+
+
+def _bucket_label(wall: str, period: str) -> str:
+    return wall[:16] if period == "minute" else wall[:13] + ":00"
+
+
+class LogRollup:
+    """
+    日志汇总表，与日志索引共用同一个SQLite连接和导入事务。
+
+    示例：
+        rollup = query.rollups()
+        rollup.counts("hour", keys=("bucket", "level"))
+        rollup.latency_series("execution_time", "minute")
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._counts: Dict[Tuple, int] = {}
+        self._latency: Dict[Tuple, List] = {}
+
+    def create_tables(self) -> bool:
+        """创建汇总表，返回是否为新建（需要从已有索引回填）"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_rollup_counts'"
+        ).fetchone()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS log_rollup_counts (
+                period TEXT NOT NULL,
+                bucket_ts REAL NOT NULL,
+                bucket TEXT NOT NULL,
+                level TEXT NOT NULL,
+                module TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (period, bucket_ts, level, module)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS log_rollup_latency (
+                period TEXT NOT NULL,
+                bucket_ts REAL NOT NULL,
+                bucket TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                name TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                total REAL NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                histogram TEXT NOT NULL,
+                PRIMARY KEY (period, bucket_ts, metric, name)
+            )
+        """)
+        return exists is None
+
+    # ---------- 累积 ----------
+
+    def add(self, columns: Tuple, record: Dict[str, Any]):
+        """
+        累积一条记录，调用 flush 后写入数据库。
+
+        Args:
+            columns: 日志索引列 (ts, wall, level, module, task_id, message)
+            record: 日志记录
+        """
+        ts, wall, level, module = columns[:4]
+        if ts is None:
+            return
+        latencies = extract_latencies(record, module)
+        for period, seconds in PERIODS.items():
+            bucket_ts = math.floor(ts / seconds) * seconds
+            bucket = _bucket_label(wall, period)
+            key = (period, bucket_ts, bucket, level, module)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            for metric, name, value in latencies:
+                key = (period, bucket_ts, bucket, metric, name)
+                entry = self._latency.get(key)
+                if entry is None:
+                    entry = self._latency[key] = [0, 0.0, value, value, [0] * (len(LATENCY_BOUNDS) + 1)]
+                entry[0] += 1
+                entry[1] += value
+                entry[2] = min(entry[2], value)
+                entry[3] = max(entry[3], value)
+                entry[4][bisect.bisect_left(LATENCY_BOUNDS, value)] += 1
+
+    def flush(self):
+        """把累积的汇总合并进数据库，并清理过期的分钟级汇总"""
+        if self._counts:
+            self.conn.executemany(
+                "INSERT INTO log_rollup_counts (period, bucket_ts, bucket, level, module, count) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (period, bucket_ts, level, module) DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in self._counts.items()]
+            )
+        for key, (count, total, low, high, histogram) in self._latency.items():
+            row = self.conn.execute(
+                "SELECT count, total, min, max, histogram FROM log_rollup_latency "
+                "WHERE period = ? AND bucket_ts = ? AND metric = ? AND name = ?",
+                (key[0], key[1], key[3], key[4])
+            ).fetchone()
+            if row is not None:
+                count += row[0]
+                total += row[1]
+                low, high = min(low, row[2]), max(high, row[3])
+                histogram = [a + b for a, b in zip(histogram, json.loads(row[4]))]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO log_rollup_latency "
+                "(period, bucket_ts, bucket, metric, name, count, total, min, max, histogram) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (count, total, low, high, json.dumps(histogram))
+            )
+        if self._counts:
+            newest = max(key[1] for key in self._counts)
+            cutoff = newest - MINUTE_RETENTION_DAYS * 86400
+            self.conn.execute("DELETE FROM log_rollup_counts WHERE period = 'minute' AND bucket_ts < ?", (cutoff,))
+            self.conn.execute("DELETE FROM log_rollup_latency WHERE period = 'minute' AND bucket_ts < ?", (cutoff,))
+        self.discard()
+
+    def discard(self):
+        """丢弃未写入的累积数据（导入事务回滚时调用）"""
+        self._counts.clear()
+        self._latency.clear()
+
+    # ---------- 查询 ----------
+
+    @staticmethod
+    def _range(start_ts: Optional[float], end_ts: Optional[float], period: str) -> Tuple[str, List]:
+        clauses, params = ["period = ?"], [period]
+        if start_ts is not None:
+            # 包含开始时间所在的桶
+            clauses.append("bucket_ts >= ?")
+            params.append(math.floor(start_ts / PERIODS[period]) * PERIODS[period])
+        if end_ts is not None:
+            clauses.append("bucket_ts <= ?")
+            params.append(end_ts)
+        return " WHERE " + " AND ".join(clauses), params
+
+    def counts(self, period: str = "hour", start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+               keys: Sequence[str] = ("bucket",), level: Optional[str] = None) -> Dict[Tuple, int]:
+        """
+        查询日志数汇总。
+
+        Args:
+            period: 汇总周期（minute/hour）
+            start_ts: 开始时间戳
+            end_ts: 结束时间戳
+            keys: 分组键，可选 bucket/level/module
+            level: 只统计该级别
+
+        Returns:
+            {分组值元组: 日志数}
+        """
+        for key in keys:
+            if key not in ("bucket", "level", "module"):
+                raise ValueError(f"不支持的分组键: {key}")
+        where, params = self._range(start_ts, end_ts, period)
+        if level:
+            where += " AND level = ?"
+            params.append(level.upper())
+        select = ", ".join(keys) if keys else "''"
+        group = f" GROUP BY {select}" if keys else ""
+        rows = self.conn.execute(f"SELECT {select}, SUM(count) FROM log_rollup_counts{where}{group}", params)
+        return {tuple(row[:-1]) if keys else (): row[-1] for row in rows if row[-1]}
+
+    def _latency_rows(self, metric: str, period: str, start_ts: Optional[float], end_ts: Optional[float],
+                      name: Optional[str]) -> Iterable[Tuple]:
+        where, params = self._range(start_ts, end_ts, period)
+        where += " AND metric = ?"
+        params.append(metric)
+        if name:
+            where += " AND name = ?"
+            params.append(name)
+        return self.conn.execute(
+            f"SELECT bucket_ts, bucket, count, total, min, max, histogram FROM log_rollup_latency{where} "
+            f"ORDER BY bucket_ts", params
+        )
+
+    @staticmethod
+    def _summary(count: int, total: float, low: float, high: float, histogram: List[int]) -> Dict[str, Any]:
+        return {
+            "count": count,
+            "mean": total / count,
+            "min": low,
+            "max": high,
+            "p50": histogram_quantile(histogram, 0.5, low, high, LATENCY_BOUNDS),
+            "p95": histogram_quantile(histogram, 0.95, low, high, LATENCY_BOUNDS),
+            "p99": histogram_quantile(histogram, 0.99, low, high, LATENCY_BOUNDS),
+        }
+
+    def latency_series(self, metric: str, period: str = "hour", start_ts: Optional[float] = None,
+                       end_ts: Optional[float] = None, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按时间桶返回耗时统计，未指定名称时合并同一指标的所有名称。
+
+        Returns:
+            [{bucket, bucket_ts, count, mean, min, max, p50, p95, p99}]，按时间排序
+        """
+        merged: Dict[float, List] = {}
+        for bucket_ts, bucket, count, total, low, high, histogram in self._latency_rows(
+                metric, period, start_ts, end_ts, name):
+            histogram = json.loads(histogram)
+            entry = merged.get(bucket_ts)
+            if entry is None:
+                merged[bucket_ts] = [bucket, count, total, low, high, histogram]
+            else:
+                entry[1] += count
+                entry[2] += total
+                entry[3], entry[4] = min(entry[3], low), max(entry[4], high)
+                entry[5] = [a + b for a, b in zip(entry[5], histogram)]
+        return [
+            {"bucket": bucket, "bucket_ts": bucket_ts, **self._summary(count, total, low, high, histogram)}
+            for bucket_ts, (bucket, count, total, low, high, histogram) in sorted(merged.items())
+        ]
+
+    def latency_summary(self, metric: str, period: str = "hour", start_ts: Optional[float] = None,
+                        end_ts: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        按名称汇总整个时间范围内的耗时分布。
+
+        Returns:
+            {名称: {count, mean, min, max, p50, p95, p99}}
+        """
+        merged: Dict[str, List] = {}
+        where, params = self._range(start_ts, end_ts, period)
+        rows = self.conn.execute(
+            f"SELECT name, count, total, min, max, histogram FROM log_rollup_latency{where} AND metric = ?",
+            params + [metric]
+        )
+        for name, count, total, low, high, histogram in rows:
+            histogram = json.loads(histogram)
+            entry = merged.get(name)
+            if entry is None:
+                merged[name] = [count, total, low, high, histogram]
+            else:
+                entry[0] += count
+                entry[1] += total
+                entry[2], entry[3] = min(entry[2], low), max(entry[3], high)
+                entry[4] = [a + b for a, b in zip(entry[4], histogram)]
+        return {name: self._summary(*entry) for name, entry in merged.items()}
+
+    def latency_anomalies(self, metric: str, period: str = "minute", threshold: float = 2.0,
+                          start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        检测平均耗时偏离所有时间桶均值超过 threshold 个标准差的时间桶。
+
+        Returns:
+            [{time, value, mean, std, deviation}]，与 LogAnalytics.detect_anomalies 的结构一致
+        """
+        series = self.latency_series(metric, period, start_ts, end_ts)
+        values = [point["mean"] for point in series]
+        if len(values) < 2:
+            return []
+        mean = sum(values) / len(values)
+        std = (sum((x - mean) ** 2 for x in values) / len(values)) ** 0.5
+        if std == 0:
+            return []
+        return [
+            {
+                "time": point["bucket"],
+                "value": point["mean"],
+                "mean": mean,
+                "std": std,
+                "deviation": abs(point["mean"] - mean) / std,
+            }
+            for point in series
+            if abs(point["mean"] - mean) > threshold * std
+        ]
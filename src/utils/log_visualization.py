@@ -16,6 +16,21 @@ import numpy as np
 
 from .log_analysis import LogQuery, LogAnalytics
 
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """datetime转时间戳，无时区的时间按本地时间处理。"""
+    return value.timestamp() if value is not None else None
+
+
+def _interval_key(hour_bucket: str, interval: str) -> str:
+    """把小时汇总的时间桶（YYYY-MM-DD HH:00）换算为 hour/day/week 时间段。"""
+    if interval == 'hour':
+        return hour_bucket
+    if interval == 'day':
+        return hour_bucket[:10]
+    day = datetime.strptime(hour_bucket[:10], '%Y-%m-%d')
+    return f"{day.year}-W{day.isocalendar()[1]}"
+
 # 定义中英文对照的图表文本
 CHART_TEXTS = {
     'error_rate_title': 'Error Rate Statistics',
@@ -27,7 +42,8 @@ CHART_TEXTS = {
     'module_activity_title': 'Module Activity Statistics',
     'module_activity_x_label': 'Module',
     'module_activity_y_label': 'Log Count',
-    'moving_average': 'Moving Average',
+    'mean_line': 'Mean',
+    'p95_line': 'P95',
     
     # 仪表板文本
     'dashboard_title': 'System Health Dashboard',
@@ -72,40 +88,23 @@ class LogChartGenerator:
         Args:
             start_time: 开始时间
             end_time: 结束时间
-            interval: 时间间隔（hour/day/week）
+            interval: 时间间隔（minute/hour/day/week）
             output_path: 输出文件路径
             
         Returns:
             图表文件路径
         """
-        # 获取错误分布
-        error_dist = self.analytics.get_error_distribution(
-            start_time=start_time,
-            end_time=end_time,
-            group_by=interval
+        # 从预聚合汇总读取各时间段的总数和错误数
+        period = 'minute' if interval == 'minute' else 'hour'
+        counts = self.query.rollups().counts(
+            period, _timestamp(start_time), _timestamp(end_time), keys=('bucket', 'level')
         )
-        
-        # 获取所有日志记录的时间分布
-        all_logs = self.query.search(
-            start_time=start_time,
-            end_time=end_time
-        )
-        
-        # 计算每个时间段的总日志数
-        total_dist = {}
-        for log in all_logs:
-            try:
-                log_time = datetime.fromisoformat(log['time'].replace('Z', '+00:00'))
-                if interval == 'hour':
-                    key = log_time.strftime('%Y-%m-%d %H:00')
-                elif interval == 'day':
-                    key = log_time.strftime('%Y-%m-%d')
-                else:  # week
-                    key = f"{log_time.year}-W{log_time.isocalendar()[1]}"
-                    
-                total_dist[key] = total_dist.get(key, 0) + 1
-            except Exception:
-                continue
+        total_dist, error_dist = {}, {}
+        for (bucket, level), count in counts.items():
+            key = bucket if period == 'minute' else _interval_key(bucket, interval)
+            total_dist[key] = total_dist.get(key, 0) + count
+            if level == 'ERROR':
+                error_dist[key] = error_dist.get(key, 0) + count
         
         # 计算错误率
         error_rates = {}
@@ -159,37 +158,24 @@ class LogChartGenerator:
         Returns:
             图表文件路径
         """
-        # 获取响应时间数据
-        logs = self.query.search(
-            start_time=start_time,
-            end_time=end_time
+        # 从预聚合汇总读取各时间桶的耗时统计，一天以内的范围使用分钟粒度
+        short_range = start_time and end_time and end_time - start_time <= timedelta(days=1)
+        series = self.query.rollups().latency_series(
+            metric, 'minute' if short_range else 'hour', _timestamp(start_time), _timestamp(end_time)
         )
         
-        # 提取时间和响应时间
-        times = []
-        response_times = []
-        
-        for log in logs:
-            try:
-                if metric in log:
-                    log_time = datetime.fromisoformat(log['time'].replace('Z', '+00:00'))
-                    response_time = float(log[metric])
-                    
-                    times.append(log_time)
-                    response_times.append(response_time)
-            except Exception:
-                continue
-        
-        if not times:
+        if not series:
             raise ValueError(f"没有找到包含 {metric} 指标的日志记录")
         
-        # 按时间排序
-        sorted_data = sorted(zip(times, response_times), key=lambda x: x[0])
-        times, response_times = zip(*sorted_data)
+        times = [datetime.strptime(point['bucket'], '%Y-%m-%d %H:%M') for point in series]
+        means = [point['mean'] for point in series]
+        p95s = [point['p95'] for point in series]
         
         # 生成图表
         plt.figure(figsize=(12, 6))
-        plt.plot(times, response_times, marker='o', linestyle='-', markersize=3)
+        plt.plot(times, means, marker='o', linestyle='-', markersize=3, label=CHART_TEXTS['mean_line'])
+        plt.plot(times, p95s, 'r--', label=CHART_TEXTS['p95_line'])
+        plt.legend()
         
         metric_title = metric.replace('_', ' ').title()
         plt.title(CHART_TEXTS['response_time_title'].format(metric_title))
@@ -204,13 +190,6 @@ class LogChartGenerator:
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
         ax.xaxis.set_major_locator(mdates.AutoDateLocator())
         
-        # 计算移动平均线
-        if len(response_times) >= 5:
-            window_size = min(5, len(response_times))
-            moving_avg = np.convolve(response_times, np.ones(window_size)/window_size, mode='valid')
-            plt.plot(times[window_size-1:], moving_avg, 'r--', label=CHART_TEXTS['moving_average'])
-            plt.legend()
-        
         plt.tight_layout()
         
         # 保存图表
@@ -239,17 +218,11 @@ class LogChartGenerator:
         Returns:
             图表文件路径
         """
-        # 获取日志数据
-        logs = self.query.search(
-            start_time=start_time,
-            end_time=end_time
+        # 从预聚合汇总读取各模块的日志数量
+        counts = self.query.rollups().counts(
+            'hour', _timestamp(start_time), _timestamp(end_time), keys=('module',)
         )
-        
-        # 统计各模块的日志数量
-        module_counts = {}
-        for log in logs:
-            module = log.get('module', 'unknown')
-            module_counts[module] = module_counts.get(module, 0) + 1
+        module_counts = {(module or 'unknown'): count for (module,), count in counts.items()}
         
         # 按日志数量排序
         sorted_modules = sorted(module_counts.items(), key=lambda x: x[1], reverse=True)
@@ -353,18 +326,16 @@ class SystemHealthDashboard:
     def _generate_html(self, charts: Dict[str, str]) -> str:
         """生成仪表板HTML内容。"""
         # 计算系统健康状态指标
-        error_logs = self.query.search(level='ERROR')
-        all_logs = self.query.search()
+        rollup = self.query.rollups()
+        level_counts = rollup.counts('hour', keys=('level',))
+        total_count = sum(level_counts.values())
+        error_count = level_counts.get(('ERROR',), 0)
         
         # 错误率
-        error_rate = (len(error_logs) / len(all_logs)) * 100 if all_logs else 0
+        error_rate = (error_count / total_count) * 100 if total_count else 0
         
-        # 异常检测
-        anomalies = []
-        try:
-            anomalies = self.analytics.detect_anomalies(metric='response_time')
-        except:
-            pass
+        # 异常检测：按小时平均响应时间偏离整体水平的时间段
+        anomalies = rollup.latency_anomalies(metric='response_time', period='hour')
         
         # 根据错误率判断系统状态
         if error_rate < 1:
@@ -479,7 +450,7 @@ class SystemHealthDashboard:
                     <div class="metric-card">
                         <h3>{CHART_TEXTS['log_count']}</h3>
                         <div class="metric-value">
-                            {len(all_logs)}
+                            {total_count}
                         </div>
                     </div>
                     
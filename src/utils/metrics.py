@@ -0,0 +1,428 @@
+"""
+进程内指标模块，提供计数器、仪表和固定分桶直方图，并以Prometheus文本格式导出。
+
+主要功能：
+1. 全局指标注册表，同名指标重复注册时返回同一个实例，各模块可在导入时声明指标
+2. 带标签的指标按标签值缓存子指标，热路径上只做一次字典查找和一次加锁更新
+3. 直方图按固定分桶累积，可直接估算 p50/p95/p99，无需解析日志
+4. ASGI中间件按路由模板统计HTTP请求数、耗时和进行中的请求数
+5. 所有更新都在短小的线程锁内完成，线程和asyncio中都可安全使用
+
+示例：
+    from src.utils.metrics import get_registry
+
+    registry = get_registry()
+    requests_total = registry.counter("crawler_pages_total", "抓取页面数", ("result",))
+    requests_total.inc(result="ok")
+
+    latency = registry.histogram("crawler_page_seconds", "页面抓取耗时（秒）")
+    latency.observe(0.42)
+    latency.summary()  # {'count': 1, 'sum': 0.42, 'p50': ..., 'p95': ..., 'p99': ...}
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 耗时直方图的默认分桶上界（秒），最后隐含 +Inf 桶
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 25, 50, 100,
+)
+
+# 汇总中默认给出的分位数
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def histogram_quantile(histogram: Sequence[int], q: float, low: float, high: float,
+                       bounds: Sequence[float]) -> Optional[float]:
+    """
+    由分桶直方图估算分位数，桶内线性插值，并限制在观测到的最小值和最大值之间。
+
+    Args:
+        histogram: 各桶计数，与 bounds 对齐，最后一个为 +Inf 桶
+        q: 分位数（0-1）
+        low: 观测最小值
+        high: 观测最大值
+        bounds: 分桶上界
+    """
+    total = sum(histogram)
+    if total == 0:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        if count and cumulative + count >= rank:
+            lower = bounds[i - 1] if i > 0 else 0.0
+            upper = bounds[i] if i < len(bounds) else high
+            value = lower + (upper - lower) * (rank - cumulative) / count
+            return min(max(value, low), high)
+        cumulative += count
+    return high
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    """一组标签值对应的计数器"""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    """一组标签值对应的仪表"""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+
+class _HistogramChild:
+    """一组标签值对应的直方图，counts为各桶（非累积）计数，最后一个为 +Inf 桶"""
+
+    __slots__ = ("_lock", "_bounds", "counts", "sum", "count", "min", "max")
+
+    def __init__(self, lock: threading.Lock, bounds: Tuple[float, ...]):
+        self._lock = lock
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def time(self) -> "_Timer":
+        """返回计时上下文管理器，退出时记录耗时（秒）"""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            counts, low, high = list(self.counts), self.min, self.max
+        return histogram_quantile(counts, q, low, high, bounds=self._bounds)
+
+    def summary(self, quantiles: Sequence[float] = SUMMARY_QUANTILES) -> Dict[str, Any]:
+        with self._lock:
+            counts, total, count, low, high = list(self.counts), self.sum, self.count, self.min, self.max
+        result = {"count": count, "sum": total}
+        for q in quantiles:
+            result[f"p{q * 100:g}"] = histogram_quantile(counts, q, low, high, bounds=self._bounds)
+        return result
+
+
+class _Timer:
+    """直方图计时器，同步和异步上下文中均可使用"""
+
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._child.observe(time.perf_counter() - self._start)
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.__exit__(exc_type, exc_val, exc_tb)
+
+
+class _Metric:
+    """指标基类，按标签值元组缓存子指标"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        """
+        获取一组标签值对应的子指标，热路径上可缓存返回值避免重复查找
+
+        Raises:
+            ValueError: 标签名与注册时不一致
+        """
+        try:
+            key = tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"指标 {self.name} 缺少标签 {e}") from None
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Any]:
+        return {values: child.value for values, child in self._items()}
+
+
+class Counter(_Metric):
+    """单调递增的计数器"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def inc(self, amount: float = 1, **labels):
+        self.labels(**labels).inc(amount)
+
+
+class Gauge(_Metric):
+    """可增可减的仪表"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self._lock)
+
+    def set(self, value: float, **labels):
+        self.labels(**labels).set(value)
+
+    def inc(self, amount: float = 1, **labels):
+        self.labels(**labels).inc(amount)
+
+    def dec(self, amount: float = 1, **labels):
+        self.labels(**labels).dec(amount)
+
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(b for b in buckets if b != math.inf))
+        if "le" in self.labelnames:
+            raise ValueError("直方图不能使用 le 作为标签名")
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.buckets)
+
+    def observe(self, value: float, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels) -> _Timer:
+        return self.labels(**labels).time()
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        return self.labels(**labels).quantile(q)
+
+    def summary(self, **labels) -> Dict[str, Any]:
+        return self.labels(**labels).summary()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.kind}"]
+        bounds = self.buckets + (math.inf,)
+        for values, child in self._items():
+            with self._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Any]:
+        return {values: child.summary() for values, child in self._items()}
+
+
+class MetricsRegistry:
+    """
+    指标注册表。同名指标只创建一次，类型或标签不一致时抛出ValueError。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已注册为 {metric.kind}{metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """获取或创建仪表"""
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """获取或创建直方图"""
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """按名称获取已注册的指标"""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """以Prometheus文本格式导出全部指标"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """返回各指标的当前值，直方图为 count/sum/p50/p95/p99 汇总"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """获取进程内的全局指标注册表"""
+    return _registry
+
+
+def route_label(scope) -> str:
+    """ASGI请求的路由模板，未匹配任何路由时为 unmatched"""
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+class HTTPMetricsMiddleware:
+    """
+    统计HTTP请求的ASGI中间件。
+
+    路由按模板（如 /api/products/{asin}）作为标签，未匹配的路径统一记为 unmatched，
+    避免标签基数随请求路径无限增长。流式响应（SSE）的耗时覆盖整个响应过程。
+
+    示例：
+        app.add_middleware(HTTPMetricsMiddleware)
+    """
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        registry = registry or get_registry()
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP请求数", ("method", "route", "status"))
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP请求耗时（秒）", ("method", "route"))
+        self.in_progress = registry.gauge(
+            "http_requests_in_progress", "正在处理的HTTP请求数").labels()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_progress.dec()
+            route = route_label(scope)
+            method = scope.get("method", "")
+            self.duration.labels(method=method, route=route).observe(time.perf_counter() - start)
+            self.requests.labels(method=method, route=route, status=str(status)).inc()
@@ -0,0 +1,248 @@
+"""
+请求耗时分解模块，把每个API请求的耗时拆分为数据库、业务处理和序列化三部分。
+
+主要功能：
+1. SQLAlchemy before/after_cursor_execute 钩子累计当前请求的SQL耗时和语句数
+2. 超过阈值的慢查询连同参数和 EXPLAIN QUERY PLAN 写入日志
+3. TimedAPIRoute 记录端点函数返回的时刻，此后到响应开始发送之间的时间
+   （response_model 校验、jsonable_encoder、JSON编码）记为序列化耗时
+4. RequestTimingMiddleware 按路由模板把各阶段耗时和语句数记入指标，
+   调试模式下在响应头中返回 X-Query-Count 和 Server-Timing，N+1 查询一眼可见
+
+各阶段的含义：
+    db        所有SQL语句的执行时间
+    app       端点函数（含依赖注入、构建ProductInfo等）中除SQL以外的时间
+    serialize 端点返回后到响应开始发送的时间
+    total     请求开始到响应发送完毕（响应头中为到响应开始发送）的时间
+
+示例：
+    app = FastAPI()
+    app.router.route_class = TimedAPIRoute
+    app.add_middleware(RequestTimingMiddleware, debug=os.getenv("API_DEBUG") == "true")
+    instrument_engine(engine, slow_query_ms=200)
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from src.utils.log_config import get_logger
+from src.utils.metrics import MetricsRegistry, get_registry, route_label
+
+logger = get_logger("RequestTiming")
+
+# 慢查询阈值（毫秒），可通过环境变量 SQL_SLOW_QUERY_MS 覆盖
+DEFAULT_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+
+# 慢查询日志中参数的最大长度
+MAX_PARAMS_LENGTH = 500
+
+# 每个请求的SQL语句数分桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# 已注册钩子的引擎
+_instrumented_engines = weakref.WeakSet()
+
+
+@dataclass
+class RequestTiming:
+    """单个请求的耗时累计，各时间点均为 time.perf_counter() 的值"""
+    start: float
+    db_time: float = 0.0
+    queries: int = 0
+    endpoint_end: Optional[float] = None
+    response_start: Optional[float] = None
+
+    def phases(self, now: float) -> dict:
+        """返回截至now的各阶段耗时（秒），端点未执行（如404、参数校验失败）时不区分序列化"""
+        handled = (self.endpoint_end or now) - self.start
+        result = {"db": self.db_time, "app": max(0.0, handled - self.db_time)}
+        if self.endpoint_end is not None and self.response_start is not None:
+            result["serialize"] = max(0.0, self.response_start - self.endpoint_end)
+        result["total"] = now - self.start
+        return result
+
+
+# 当前请求的耗时累计。同步端点在线程池中运行时会复制上下文，仍然指向同一个对象
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("_current_timing", default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """获取当前请求的耗时累计，不在请求中时返回None"""
+    return _current_timing.get()
+
+
+def _mark_endpoint_end(call: Callable) -> Callable:
+    """包装端点函数，返回时记录时刻"""
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def async_endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                timing = _current_timing.get()
+                if timing is not None:
+                    timing.endpoint_end = time.perf_counter()
+        return async_endpoint
+
+    @wraps(call)
+    def endpoint(*args, **kwargs):
+        try:
+            return call(*args, **kwargs)
+        finally:
+            timing = _current_timing.get()
+            if timing is not None:
+                timing.endpoint_end = time.perf_counter()
+    return endpoint
+
+
+class TimedAPIRoute(APIRoute):
+    """
+    记录端点返回时刻的路由类，用于区分业务处理和序列化耗时。
+
+    只替换运行时调用的函数，参数解析和 response_model 推断仍基于原始端点。
+    """
+
+    def get_route_handler(self):
+        if self.dependant.call is not None:
+            self.dependant.call = _mark_endpoint_end(self.dependant.call)
+        return super().get_route_handler()
+
+
+def _format_params(parameters: Any) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_PARAMS_LENGTH:
+        text = text[:MAX_PARAMS_LENGTH] + f"...（共{len(text)}字符）"
+    return text
+
+
+def explain_query_plan(cursor, statement: str, parameters: Any, executemany: bool) -> str:
+    """
+    用同一个DBAPI连接获取SQLite执行计划
+
+    Returns:
+        缩进表示层级的执行计划文本，失败时返回错误说明
+    """
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    try:
+        plan_cursor = cursor.connection.cursor()
+        try:
+            rows = plan_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ()).fetchall()
+        finally:
+            plan_cursor.close()
+    except Exception as e:
+        return f"（无法获取执行计划: {e}）"
+
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def instrument_engine(engine, slow_query_ms: Optional[float] = None,
+                      registry: Optional[MetricsRegistry] = None):
+    """
+    为引擎注册SQL计时钩子，重复调用不会重复注册
+
+    Args:
+        engine: SQLAlchemy引擎
+        slow_query_ms: 慢查询阈值（毫秒），默认读取 SQL_SLOW_QUERY_MS，为0时记录全部语句
+        registry: 指标注册表，默认为全局注册表
+    """
+    if engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(engine)
+    threshold = (DEFAULT_SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms) / 1000
+    explain = engine.dialect.name == "sqlite"
+    registry = registry or get_registry()
+    slow_queries = registry.counter("db_slow_queries_total", "超过阈值的SQL语句数")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.db_time += elapsed
+            timing.queries += 1
+        if elapsed >= threshold:
+            slow_queries.inc()
+            plan = explain_query_plan(cursor, statement, parameters, executemany) if explain else "（非SQLite，未获取）"
+            logger.bind(sql_elapsed=elapsed).warning(
+                "慢查询 {:.1f}ms: {}\n参数: {}\n执行计划:\n{}",
+                elapsed * 1000, statement, _format_params(parameters), plan
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # 语句执行失败时不会触发after_cursor_execute，弹出对应的开始时间
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+
+class RequestTimingMiddleware:
+    """
+    记录各阶段耗时的ASGI中间件。
+
+    需要配合 TimedAPIRoute 才能区分序列化耗时，配合 instrument_engine 才能统计SQL。
+
+    Args:
+        app: ASGI应用
+        debug: 为True时在响应头中返回 X-Query-Count 和 Server-Timing
+        registry: 指标注册表，默认为全局注册表
+    """
+
+    def __init__(self, app, debug: bool = False, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.debug = debug
+        registry = registry or get_registry()
+        self.phase_duration = registry.histogram(
+            "http_request_phase_seconds", "HTTP请求各阶段耗时（秒）", ("method", "route", "phase"))
+        self.query_count = registry.histogram(
+            "http_request_queries", "每个HTTP请求执行的SQL语句数", ("method", "route"),
+            buckets=QUERY_COUNT_BUCKETS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(start=time.perf_counter())
+        token = _current_timing.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing.response_start = time.perf_counter()
+                if self.debug:
+                    phases = timing.phases(timing.response_start)
+                    server_timing = ", ".join(f"{name};dur={value * 1000:.1f}" for name, value in phases.items())
+                    message = {**message, "headers": [
+                        *message.get("headers", []),
+                        (b"x-query-count", str(timing.queries).encode()),
+                        (b"server-timing", server_timing.encode()),
+                    ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timing.reset(token)
+            method, route = scope.get("method", ""), route_label(scope)
+            for phase, value in timing.phases(time.perf_counter()).items():
+                self.phase_duration.labels(method=method, route=route, phase=phase).observe(value)
+            self.query_count.labels(method=method, route=route).observe(timing.queries)
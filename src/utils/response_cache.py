@@ -0,0 +1,191 @@
+"""
+读接口响应缓存模块，按规范化的查询参数和数据版本号缓存JSON响应体，支持ETag条件请求。
+
+主要功能：
+1. 缓存键由命名空间、规范化后的查询参数（去掉空值、列表排序去重、键排序）和数据版本号组成，
+   数据写入使版本号变化后旧条目不再命中，无需手动清缓存
+2. 响应带强ETag（响应体的哈希），请求的 If-None-Match 匹配时返回304
+3. 相同缓存键的并发未命中合并为一次计算（single-flight），其余请求等待同一结果；
+   发起计算的请求被取消时计算照常完成
+4. 计算在线程池中执行，不阻塞事件循环；LRU淘汰，TTL兜底不更新版本号的写入
+5. 命中、未命中、合并和304次数记入指标
+
+示例：
+    cache = ResponseCache()
+
+    @app.get("/api/brands/stats")
+    async def brand_stats(request: Request, page: int = 1, db: Session = Depends(get_db)):
+        version = await asyncio.to_thread(get_data_versions, db, ["products"])
+        return await cache.respond(
+            request, "brands:stats", {"page": page}, tuple(version.items()),
+            lambda: ProductService.get_brand_stats(db, page=page)
+        )
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from src.utils.log_config import get_logger
+from src.utils.metrics import MetricsRegistry, get_registry
+
+logger = get_logger("ResponseCache")
+
+# 默认最多缓存的响应数
+DEFAULT_MAX_ENTRIES = 512
+
+# 条目最长存活时间（秒），兜底直接执行SQL等不更新版本号的写入
+DEFAULT_TTL = 600.0
+
+# 客户端每次使用前都需用ETag向服务端验证
+CACHE_CONTROL = "no-cache"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """一个已编码的JSON响应"""
+    body: bytes
+    etag: str
+    created_at: float
+
+
+def normalize_params(params: Dict[str, Any]) -> str:
+    """
+    规范化查询参数，语义相同的请求得到相同的字符串
+
+    去掉None和空列表；列表参数（品牌、分类等筛选条件）排序去重；按参数名排序。
+    """
+    normalized = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            if not value:
+                continue
+            value = sorted({str(item) for item in value})
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def encode_json(content: Any) -> bytes:
+    """与JSONResponse相同的编码方式"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    """响应体的强ETag"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否与ETag匹配（按RFC 7232使用弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+class ResponseCache:
+    """
+    按 (命名空间, 规范化参数, 数据版本号) 缓存JSON响应
+
+    只在事件循环线程中读写条目，不需要加锁；计算在线程池中执行。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL,
+                 registry: Optional[MetricsRegistry] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str, Hashable], CachedResponse]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str, Hashable], asyncio.Task] = {}
+
+        registry = registry or get_registry()
+        self._requests = registry.counter(
+            "response_cache_requests_total", "响应缓存查找次数", ("namespace", "result")
+        )
+        self._not_modified = registry.counter(
+            "response_cache_not_modified_total", "ETag匹配返回304的次数", ("namespace",)
+        )
+
+    async def get_or_compute(self, namespace: str, params: Dict[str, Any], version: Hashable,
+                             compute: Callable[[], Any]) -> CachedResponse:
+        """
+        获取缓存的响应，未命中时在线程池中调用compute计算并编码
+
+        Args:
+            namespace: 命名空间，通常为接口名
+            params: 影响响应内容的全部参数
+            version: 数据版本号，需可哈希
+            compute: 返回可JSON序列化内容的同步函数
+        """
+        key = (namespace, normalize_params(params), version)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created_at < self.ttl:
+            self._entries.move_to_end(key)
+            self._requests.inc(namespace=namespace, result="hit")
+            return entry
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._requests.inc(namespace=namespace, result="coalesced")
+            return await asyncio.shield(task)
+
+        self._requests.inc(namespace=namespace, result="miss")
+        task = asyncio.ensure_future(self._compute(key, compute))
+        # 没有其他请求等待时也标记异常已读取，避免"exception was never retrieved"日志
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # 客户端断开时不取消计算：合并等待的请求仍需要结果，
+            # 且compute使用本请求的数据库会话，要等线程中的计算结束后才能让会话关闭
+            await asyncio.wait([task])
+            raise
+
+    async def _compute(self, key: Tuple[str, str, Hashable], compute: Callable[[], Any]) -> CachedResponse:
+        """在线程池中计算并编码响应，写入缓存"""
+        try:
+            body = await asyncio.to_thread(lambda: encode_json(compute()))
+            entry = CachedResponse(body=body, etag=make_etag(body), created_at=time.monotonic())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+    async def respond(self, request: Request, namespace: str, params: Dict[str, Any], version: Hashable,
+                      compute: Callable[[], Any]) -> Response:
+        """返回缓存的JSON响应，If-None-Match与ETag匹配时返回304"""
+        entry = await self.get_or_compute(namespace, params, version, compute)
+        headers = {"ETag": entry.etag, "Cache-Control": CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self._not_modified.inc(namespace=namespace)
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        """清空所有条目"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """当前条目数和进行中的计算数"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,55 @@
+"""
+测试共用的fixture。
+"""
+
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Base
+
+
+@pytest.fixture
+def engine():
+    """建好商品库全部表的内存SQLite引擎"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """绑定到内存商品库的会话"""
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def write_records():
+    """返回把记录以JSON行写入日志文件的函数，默认追加"""
+    def write(path, records, mode='a'):
+        with open(path, mode, encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return write
+
+
+@pytest.fixture
+def make_record():
+    """返回构造一条JSON日志记录的函数，时间为2025-04-{day} {hour}:{minute}，task_id写入extra"""
+    def make(day=1, hour=10, minute=0, level="INFO", module="crawler", message="ok", task_id=None, **fields):
+        record = {
+            "time": f"2025-04-{day:02d}T{hour:02d}:{minute:02d}:00Z",
+            "level": level,
+            "module": module,
+            "message": message,
+            **fields,
+        }
+        if task_id:
+            record["extra"] = {"task_id": task_id}
+        return record
+    return make
@@ -0,0 +1,118 @@
+"""
+测试自适应并发控制模块的功能。
+"""
+
+import json
+import threading
+import time
+
+from src.utils.adaptive_concurrency import AdaptiveConcurrencyController
+
+
+class FakeStats:
+    """可手动推进的统计计数器"""
+
+    def __init__(self):
+        self.data = {'success_count': 0, 'failure_count': 0, 'captcha_count': 0}
+
+    def add(self, success=0, failure=0, captcha=0):
+        self.data['success_count'] += success
+        self.data['failure_count'] += failure
+        self.data['captcha_count'] += captcha
+
+    def get(self):
+        return dict(self.data)
+
+
+def make_controller(stats, **kwargs):
+    options = dict(min_workers=1, max_workers=6, initial_workers=3, window_seconds=100, min_attempts=5)
+    options.update(kwargs)
+    controller = AdaptiveConcurrencyController(stats_source=stats.get, **options)
+    controller.record_sample(now=0)
+    return controller
+
+
+def test_shrinks_and_slows_on_captcha_storm():
+    """测试验证码率过高时减少线程并放大请求间隔"""
+    stats = FakeStats()
+    controller = make_controller(stats)
+    stats.add(success=10, captcha=5)
+
+    decision = controller.evaluate(now=30)
+    assert decision.action == "shrink"
+    assert controller.active_workers == 2
+    assert controller.delay_scale == 1.5
+    assert decision.captcha_rate == 0.5
+
+
+def test_grows_when_healthy_and_respects_bounds():
+    """测试运行平稳时扩容，并且不超过上限"""
+    stats = FakeStats()
+    resized = []
+    controller = make_controller(stats, max_workers=4, on_resize=resized.append)
+
+    for step in range(1, 4):
+        stats.add(success=10)
+        controller.evaluate(now=step * 30)
+
+    assert controller.active_workers == 4
+    assert resized == [4]
+    assert controller.history[-1].reason.endswith("（已达边界）")
+
+
+def test_holds_without_enough_samples():
+    """测试窗口内样本不足时保持不变"""
+    stats = FakeStats()
+    controller = make_controller(stats)
+    stats.add(success=2, captcha=2)
+
+    decision = controller.evaluate(now=30)
+    assert decision.action == "hold"
+    assert controller.active_workers == 3
+
+
+def test_sliding_window_forgets_old_events():
+    """测试窗口外的验证码不再影响决策"""
+    stats = FakeStats()
+    controller = make_controller(stats, window_seconds=60)
+    stats.add(success=10, captcha=10)
+    controller.evaluate(now=30)
+    assert controller.active_workers == 2
+
+    controller.evaluate(now=100)
+    stats.add(success=20)
+    decision = controller.evaluate(now=130)
+    assert decision.captcha_rate == 0
+    assert decision.action == "grow"
+
+
+def test_decisions_written_as_time_series(tmp_path):
+    """测试决策以JSON Lines写入文件"""
+    stats = FakeStats()
+    log_file = tmp_path / "decisions.jsonl"
+    controller = make_controller(stats, decision_log=log_file)
+    stats.add(success=10, failure=10)
+    controller.evaluate(now=30)
+    controller.evaluate(now=60)
+
+    lines = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert [line["action"] for line in lines] == ["shrink", "shrink"]
+    assert [line["active_workers"] for line in lines] == [2, 1]
+    assert lines[0]["timestamp"] == 30
+
+
+def test_park_blocks_inactive_workers_until_stop():
+    """测试超出活跃数的线程暂停，停止后退出"""
+    stats = FakeStats()
+    controller = make_controller(stats, initial_workers=1)
+    assert controller.park(1) is True
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(controller.park(2)))
+    thread.start()
+    time.sleep(0.05)
+    assert results == []
+
+    controller.stop()
+    thread.join(timeout=2)
+    assert results == [False]
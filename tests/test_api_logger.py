@@ -287,4 +287,38 @@ def test_sync_api_logging_decorator(tmp_path):
         assert "测试错误" in log_content
     finally:
         # 清理
-        logger.remove(handler_id) 
\ No newline at end of file
+        logger.remove(handler_id) 
+def test_api_logging_skips_work_when_disabled(monkeypatch):
+    """测试INFO未开启或未被采样时不遮蔽、不序列化请求，异常仍然记录"""
+    def fail(*args, **kwargs):
+        raise AssertionError("不应处理请求数据")
+
+    monkeypatch.setattr(APILogger, "_mask_sensitive_data", fail)
+    monkeypatch.setattr(APILogger, "_truncate_response", fail)
+
+    @with_api_logging("test_api")
+    async def call_api(**kwargs):
+        return {"ok": True}
+
+    @with_api_logging("test_api", sample_rate=0)
+    def call_sampled(**kwargs):
+        if kwargs.get("explode"):
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    messages = []
+    logger.remove()
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="WARNING")
+    try:
+        assert asyncio.run(call_api(headers={"token": "x"})) == {"ok": True}
+    finally:
+        logger.remove(handler_id)
+
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="INFO")
+    try:
+        assert call_sampled(data={"a": 1}) == {"ok": True}
+        with pytest.raises(RuntimeError):
+            call_sampled(explode=True)
+    finally:
+        logger.remove(handler_id)
+    assert len(messages) == 1 and messages[0].startswith("API错误")
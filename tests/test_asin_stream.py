@@ -0,0 +1,93 @@
+"""
+测试ASIN流式交接模块：边爬取边富化、分批、并发上限和中途出错。
+"""
+
+import asyncio
+import time
+
+from src.core.asin_stream import stream_enrich
+
+
+def make_crawl(scrolls, per_scroll=4, delay=0.02, fail_after=None):
+    """模拟阻塞的Selenium爬虫：每次滚动发现per_scroll个ASIN"""
+    events = []
+
+    def crawl(on_items):
+        async def run():
+            for scroll in range(scrolls):
+                if fail_after is not None and scroll == fail_after:
+                    raise RuntimeError("chrome crashed")
+                time.sleep(delay)  # Selenium调用是阻塞的
+                asins = [f"B{scroll:04d}{i:05d}" for i in range(per_scroll)]
+                on_items(asins)
+            events.append(("crawl_done", time.monotonic()))
+        return run()
+
+    return crawl, events
+
+
+def test_enrichment_overlaps_with_crawling():
+    """测试第一批在爬虫结束之前就开始富化，并按10个一批处理"""
+    crawl, events = make_crawl(scrolls=10)
+    batches = []
+
+    async def enrich(batch, index):
+        events.append(("enrich", time.monotonic()))
+        batches.append(list(batch))
+        return len(batch)
+
+    stats = asyncio.run(stream_enrich(crawl, enrich, batch_size=10, workers=2))
+
+    assert stats.items == 40 and stats.saved == 40
+    assert [len(b) for b in batches] == [10, 10, 10, 10]
+    first_enrich = min(t for name, t in events if name == "enrich")
+    crawl_done = next(t for name, t in events if name == "crawl_done")
+    assert first_enrich < crawl_done
+
+
+def test_bounded_worker_concurrency():
+    """测试同时处理的批次数不超过工作者数量"""
+    crawl, _ = make_crawl(scrolls=10, delay=0)
+    running = {'now': 0, 'peak': 0}
+
+    async def enrich(batch, index):
+        running['now'] += 1
+        running['peak'] = max(running['peak'], running['now'])
+        await asyncio.sleep(0.01)
+        running['now'] -= 1
+        return len(batch)
+
+    stats = asyncio.run(stream_enrich(crawl, enrich, batch_size=5, workers=3))
+    assert stats.batches == 8
+    assert running['peak'] <= 3
+
+
+def test_batch_interval_shared_across_workers():
+    """测试批次间隔由所有工作者共享，增加工作者不会提高请求频率"""
+    crawl, _ = make_crawl(scrolls=5, delay=0)
+    starts = []
+
+    async def enrich(batch, index):
+        starts.append(time.monotonic())
+        await asyncio.sleep(0.01)
+        return len(batch)
+
+    stats = asyncio.run(stream_enrich(crawl, enrich, batch_size=4, workers=3, batch_interval=0.05))
+    assert stats.batches == 5
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert min(gaps) >= 0.045
+
+
+def test_crash_mid_run_keeps_collected_asins():
+    """测试爬虫中途出错时，已发现的ASIN（包括不足一批的）仍被处理"""
+    crawl, _ = make_crawl(scrolls=10, per_scroll=3, fail_after=4)
+    processed = []
+
+    async def enrich(batch, index):
+        processed.extend(batch)
+        return len(batch)
+
+    stats = asyncio.run(stream_enrich(crawl, enrich, batch_size=10, workers=1))
+    assert stats.items == 12
+    assert len(processed) == 12
+    assert stats.batches == 2
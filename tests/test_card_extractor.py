@@ -0,0 +1,99 @@
+"""
+测试商品卡片批量提取和优惠券爬虫的卡片处理逻辑。
+"""
+
+from datetime import datetime
+
+from src.core.card_extractor import extract_cards, parse_card_index, track_round_trips
+from src.core.amazon_coupon_crawler import (
+    CrawlStats, extract_coupon_info, process_visible_products
+)
+
+
+def make_card(asin, index, displayed=True, fully_visible=True, coupon_text="Save 20%"):
+    return {
+        'asin': asin,
+        'index': None if index is None else str(index),
+        'displayed': displayed,
+        'fully_visible': fully_visible,
+        'url': f"https://www.amazon.com/dp/{asin}",
+        'coupon_text': coupon_text
+    }
+
+
+class FakeDriver:
+    """模拟WebDriver：所有命令都经由execute发送"""
+
+    def __init__(self, cards):
+        self.cards = cards
+        self.commands = []
+
+    def execute(self, driver_command, params=None):
+        self.commands.append(driver_command)
+        if driver_command == "executeScript":
+            return {'value': self.cards}
+        return {'value': object()}
+
+    def execute_script(self, script, *args):
+        return self.execute("executeScript", {'script': script, 'args': list(args)})['value']
+
+    def find_element(self, by, value):
+        return self.execute("findElement", {'using': by, 'value': value})['value']
+
+
+def test_extract_cards_single_round_trip():
+    """测试无论卡片数量多少，提取只需要一次往返"""
+    driver = FakeDriver([make_card(f"B{i:09d}", i) for i in range(60)])
+
+    with track_round_trips(driver) as round_trips:
+        cards = extract_cards(driver)
+
+    assert len(cards) == 60
+    assert round_trips.count == 1
+    # 退出后恢复原始方法
+    assert 'execute' not in vars(driver)
+
+
+def test_parse_card_index_handles_missing_values():
+    """测试缺失或无效的索引返回-1"""
+    assert parse_card_index(make_card("B000000001", 7)) == 7
+    assert parse_card_index(make_card("B000000001", None)) == -1
+    assert parse_card_index({'index': 'abc'}) == -1
+
+
+def test_process_visible_products_bookkeeping():
+    """测试索引过滤、去重和可见性判断在Python端完成"""
+    cards = [
+        make_card("B000000003", 3),
+        make_card("B000000001", 1),
+        make_card("B000000002", 2, fully_visible=False),
+        make_card("B000000004", 4, displayed=False),
+        make_card("B000000005", 5, coupon_text=None),
+        make_card("B000000000", 0),
+        make_card("B000000006", 6),
+    ]
+    driver = FakeDriver(cards)
+    stats = CrawlStats(start_time=datetime.now())
+    stats.last_index = 0
+    seen = {"B000000006"}
+
+    with track_round_trips(driver) as round_trips:
+        products = process_visible_products(driver, seen, stats)
+
+    assert [p['asin'] for p in products] == ["B000000001", "B000000003"]
+    assert [p['index'] for p in products] == [1, 3]
+    assert stats.last_index == 3
+    assert stats.duplicate_count == 1
+    assert stats.total_seen == 5
+    assert seen == {"B000000001", "B000000003", "B000000006"}
+    # 等待卡片出现一次，批量提取一次
+    assert round_trips.count == 2
+
+
+def test_extract_coupon_info_formats():
+    """测试优惠券文本解析"""
+    assert extract_coupon_info("Save 15%") == {"type": "percentage", "value": 15.0}
+    assert extract_coupon_info("Save US$ 5.50") == {"type": "fixed", "value": 5.5}
+    assert extract_coupon_info("节省 30") == {"type": "fixed", "value": 30.0}
+    assert extract_coupon_info(None) is None
+    assert extract_coupon_info("Limited time deal") is None
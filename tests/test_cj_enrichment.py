@@ -0,0 +1,91 @@
+"""
+测试CJ批量富化：复用可用性查询结果作为商品详情、批量生成推广链接和批次并发限制。
+"""
+
+import asyncio
+from collections import Counter
+
+from src.core.cj_api_client import CJAPIClient
+from src.core.collect_products import fetch_cj_data
+from src.utils.log_config import get_logger
+
+
+class FakeCJClient(CJAPIClient):
+    """替换_make_request的CJ客户端，记录各端点的请求次数"""
+
+    def __init__(self, available, missing_links=(), latency=0.0):
+        self.base_url = "mock://cj"
+        self.pid = "pid"
+        self.cid = "cid"
+        self.headers = {}
+        self.logger = get_logger("FakeCJClient")
+        self.available = set(available)
+        self.missing_links = set(missing_links)
+        self.latency = latency
+        self.calls = Counter()
+        self.running = 0
+        self.peak = 0
+
+    async def _make_request(self, endpoint, method="POST", data=None, **kwargs):
+        self.calls[endpoint] += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.running -= 1
+        asins = data["asins"].split(",")
+        if endpoint == "/get_products":
+            products = [{"asin": asin, "commission": "5%"} for asin in asins if asin in self.available]
+            return {"code": 0, "data": {"list": products}}
+        return {"code": 0, "data": [
+            {"asin": asin, "link": f"https://cj.example/{asin}"}
+            for asin in asins if asin not in self.missing_links
+        ]}
+
+
+def test_fetch_cj_data_uses_two_requests_per_batch():
+    """测试一批商品只需一次详情查询和一次链接生成"""
+    asins = [f"B{i:09d}" for i in range(10)]
+    client = FakeCJClient(available=asins[:7])
+
+    details, links = asyncio.run(fetch_cj_data(client, asins))
+
+    assert list(details) == asins[:7]
+    assert details["B000000000"]["commission"] == "5%"
+    assert set(links) == set(asins[:7])
+    assert client.calls == {"/get_products": 1, "/generate_product_link": 1}
+
+
+def test_fetch_cj_data_chunks_links_and_fills_defaults():
+    """测试超过10个商品时分组生成链接，缺失的链接使用默认链接"""
+    asins = [f"B{i:09d}" for i in range(25)]
+    client = FakeCJClient(available=asins, missing_links={"B000000003"})
+
+    details, links = asyncio.run(fetch_cj_data(client, asins))
+
+    assert len(details) == 25
+    assert client.calls["/generate_product_link"] == 3
+    assert links["B000000003"] == "https://www.amazon.com/dp/B000000003?tag=default"
+
+
+def test_check_products_availability_reuses_details_query():
+    """测试可用性检查基于同一次批量查询"""
+    client = FakeCJClient(available={"B000000001"})
+    result = asyncio.run(client.check_products_availability(["B000000001", "B000000002"]))
+    assert result == {"B000000001": True, "B000000002": False}
+    assert client.calls == {"/get_products": 1}
+
+
+def test_concurrent_batches_share_semaphore():
+    """测试多个批次并发时CJ请求数不超过信号量限制"""
+    client = FakeCJClient(available=[f"B{i:09d}" for i in range(60)], latency=0.01)
+    batches = [[f"B{i:09d}" for i in range(start, start + 10)] for start in range(0, 60, 10)]
+
+    async def run():
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(*(fetch_cj_data(client, batch, semaphore) for batch in batches))
+
+    results = asyncio.run(run())
+    assert sum(len(details) for details, _ in results) == 60
+    assert client.peak == 2
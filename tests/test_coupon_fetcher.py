@@ -0,0 +1,112 @@
+"""
+测试HTTP优先的优惠券抓取模块，使用保存的HTML页面离线运行。
+"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+from src.core.coupon_fetcher import CouponFetcher
+
+FIXTURES = Path(__file__).parent / "fixtures" / "coupon_pages"
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+class FakeDriver:
+    """模拟WebDriver，返回固定的页面源码"""
+
+    def __init__(self, html):
+        self.page_source = html
+        self.visited = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+
+class FakePool:
+    """模拟WebDriverPool的租用接口"""
+
+    def __init__(self, html):
+        self.driver = FakeDriver(html)
+        self.leased = 0
+        self.released = 0
+
+    def get_driver(self):
+        self.leased += 1
+        return self.driver
+
+    def release_driver(self, driver=None, pages=0):
+        self.released += 1
+
+
+def run_with_server(pages, coro_factory):
+    """启动本地aiohttp服务器返回fixture页面，并执行测试协程"""
+    async def handler(request):
+        asin = request.match_info["asin"]
+        name, status = pages[asin]
+        return web.Response(text=load_fixture(name), status=status, content_type="text/html")
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/dp/{asin}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            return await coro_factory(f"http://127.0.0.1:{port}")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_fetch_http_path():
+    """测试HTTP路径直接解析页面，不租用浏览器"""
+    pool = FakePool(load_fixture("percentage_coupon.html"))
+    pages = {"B000FIXED1": ("fixed_coupon.html", 200), "B000NONE01": ("no_coupon.html", 200)}
+
+    async def scenario(base_url):
+        async with CouponFetcher(driver_pool=pool, base_url=base_url) as fetcher:
+            return await fetcher.fetch_many(["B000FIXED1", "B000NONE01"])
+
+    fixed, none = run_with_server(pages, scenario)
+    assert fixed.source == "http" and fixed.ok
+    assert fixed.as_tuple()[:2] == ("fixed", 5.0)
+    assert none.ok and none.coupon_type is None
+    assert pool.leased == 0
+
+
+@pytest.mark.parametrize("fixture,status", [("captcha.html", 503), ("js_shell.html", 200)])
+def test_fetch_falls_back_to_browser(fixture, status):
+    """测试验证码和JavaScript页面回退到浏览器"""
+    pool = FakePool(load_fixture("percentage_coupon.html"))
+    pages = {"B000FALLBK": (fixture, status)}
+
+    async def scenario(base_url):
+        async with CouponFetcher(driver_pool=pool, base_url=base_url, browser_wait=(0, 0)) as fetcher:
+            return await fetcher.fetch("B000FALLBK")
+
+    result = run_with_server(pages, scenario)
+    assert result.source == "browser"
+    assert result.coupon_type == "percentage" and result.coupon_value == 15.0
+    assert pool.leased == pool.released == 1
+    assert pool.driver.visited[0].endswith("/dp/B000FALLBK?th=1")
+
+
+def test_fetch_captcha_without_pool():
+    """测试没有浏览器池时验证码结果被标记"""
+    pages = {"B000CAPTCH": ("captcha.html", 503)}
+
+    async def scenario(base_url):
+        async with CouponFetcher(base_url=base_url) as fetcher:
+            return await fetcher.fetch("B000CAPTCH")
+
+    result = run_with_server(pages, scenario)
+    assert result.captcha and not result.ok
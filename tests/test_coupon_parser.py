@@ -0,0 +1,82 @@
+"""
+测试共享的优惠券解析模块，使用fixture页面语料。
+"""
+
+import json
+from pathlib import Path
+
+import lxml.html
+import pytest
+
+from src.core.coupon_parser import (
+    is_captcha_page,
+    needs_javascript,
+    parse_coupon,
+    parse_coupon_amount,
+    parse_terms,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "coupon_pages"
+EXPECTED = json.loads((FIXTURES / "expected.json").read_text(encoding="utf-8"))
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_parse_coupon_corpus(name):
+    """测试语料中每个页面的解析结果"""
+    expected = EXPECTED[name]
+    coupon_type, value, expiration, terms = parse_coupon(load_fixture(name))
+    assert coupon_type == expected["type"]
+    assert value == expected["value"]
+    assert (expiration.strftime("%Y-%m-%d") if expiration else None) == expected["expiration"]
+    assert bool(terms) == expected["terms"]
+
+
+def test_parse_coupon_accepts_dom_snapshot():
+    """测试传入已解析的DOM快照与传入源码结果一致"""
+    html = load_fixture("fixed_coupon.html")
+    assert parse_coupon(lxml.html.fromstring(html)) == parse_coupon(html)
+
+
+def test_parse_coupon_empty_source():
+    """测试空页面返回空结果"""
+    assert parse_coupon("") == (None, None, None, None)
+    assert parse_coupon("   ") == (None, None, None, None)
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("Apply $5 coupon", ("fixed", 5.0)),
+    ("Apply 20% coupon", ("percentage", 20.0)),
+    ("Save 12.5 percent with coupon", ("percentage", 12.5)),
+    ("$3.00 off coupon applied", ("fixed", 3.0)),
+    ("Get 7 off today", ("fixed", 7.0)),
+    ("In Stock", (None, None)),
+])
+def test_parse_coupon_amount(text, expected):
+    """测试优惠券文本的金额解析"""
+    assert parse_coupon_amount(text) == expected
+
+
+def test_parse_coupon_amount_requires_keyword():
+    """测试兜底匹配要求coupon关键词"""
+    assert parse_coupon_amount("You save $10.00 (20%)", require_keyword=True) == (None, None)
+
+
+def test_parse_terms_from_modal_snapshot():
+    """测试从弹窗打开后的快照中提取条款"""
+    html = '<html><body><div class="a-popover-content">Coupon expires on 4/21/25. One per customer.</div></body></html>'
+    expiration, terms = parse_terms(html)
+    assert expiration.strftime("%Y-%m-%d") == "2025-04-21"
+    assert terms.startswith("Coupon expires")
+
+
+def test_page_classification():
+    """测试验证码和需要JavaScript页面的识别"""
+    assert is_captcha_page(load_fixture("captcha.html"))
+    assert is_captcha_page(lxml.html.fromstring(load_fixture("captcha.html")))
+    assert not is_captcha_page(load_fixture("fixed_coupon.html"))
+    assert needs_javascript(load_fixture("js_shell.html"))
+    assert not needs_javascript(load_fixture("no_coupon.html"))
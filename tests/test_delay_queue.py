@@ -0,0 +1,98 @@
+"""
+测试延迟任务队列模块的功能。
+"""
+
+import queue
+import threading
+import time
+
+import pytest
+
+from src.utils.delay_queue import DelayQueue
+
+
+def test_items_ordered_by_ready_time():
+    """测试任务按就绪时间而不是加入顺序取出"""
+    q = DelayQueue()
+    q.put("late", delay=0.05)
+    q.put("first")
+    q.put("second")
+
+    assert q.get() == "first"
+    assert q.get() == "second"
+    start = time.monotonic()
+    assert q.get() == "late"
+    assert time.monotonic() - start >= 0.04
+
+
+def test_get_blocks_until_due_without_spinning():
+    """测试未到期时get阻塞，而不是把任务取出再放回"""
+    q = DelayQueue()
+    q.put("retry", delay=0.1)
+    assert q.delayed_size() == 1
+
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.02)
+    assert q.qsize() == 1
+
+    assert q.get(timeout=1) == "retry"
+
+
+def test_empty_raised_when_drained():
+    """测试所有任务处理完毕后get抛出queue.Empty"""
+    q = DelayQueue()
+    q.put("a")
+    assert q.get() == "a"
+    q.task_done()
+    with pytest.raises(queue.Empty):
+        q.get()
+
+
+def test_waits_for_in_flight_requeue():
+    """测试队列为空但仍有任务在处理时，等待其重新加入队列"""
+    q = DelayQueue()
+    q.put("asin")
+    assert q.get() == "asin"
+
+    results = []
+
+    def consumer():
+        results.append(q.get(timeout=2))
+        q.task_done()
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    time.sleep(0.05)
+    # 处理中的任务被延迟重新加入队列，然后才标记完成
+    q.put("asin", delay=0.05)
+    q.task_done()
+    thread.join(timeout=2)
+
+    assert results == ["asin"]
+    q.join()
+
+
+def test_join_and_task_done():
+    """测试join在所有任务完成后返回"""
+    q = DelayQueue()
+    for i in range(5):
+        q.put(i)
+
+    def worker():
+        while True:
+            try:
+                q.get()
+            except queue.Empty:
+                break
+            q.task_done()
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    q.join()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert q.empty()
+
+    with pytest.raises(ValueError):
+        q.task_done()
@@ -0,0 +1,137 @@
+"""
+测试运行时诊断：栈采样折叠栈、tracemalloc快照比较、对象类型增量、诊断信号和管理员接口鉴权。
+"""
+
+import os
+import signal
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.diagnostics_api import router
+from src.utils import diagnostics
+
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_profile_collapses_busy_thread_stacks():
+    """测试采样分析能抓到忙碌线程的调用栈，并输出火焰图折叠栈格式"""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        result = diagnostics.profile(seconds=0.3, interval=0.002)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result["samples"] > 10
+    busy = {stack: count for stack, count in result["stacks"].items() if "busy_loop" in stack}
+    assert busy and all(stack.startswith("busy_worker;") for stack in busy)
+
+    lines = diagnostics.format_collapsed(result["stacks"]).splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) == max(result["stacks"].values()) and " " not in stack
+
+    functions = diagnostics.top_functions(result["stacks"])
+    assert any("busy_loop" in entry["function"] and entry["total"] >= len(busy) for entry in functions)
+
+
+def test_profile_rejects_concurrent_runs():
+    """测试同一时间只允许一个采样分析"""
+    started = threading.Event()
+    thread = threading.Thread(target=lambda: (started.set(), diagnostics.profile(seconds=0.3)))
+    thread.start()
+    started.wait()
+    time.sleep(0.05)
+    with pytest.raises(diagnostics.DiagnosticsBusyError):
+        diagnostics.profile(seconds=0.1)
+    thread.join()
+
+
+def test_tracemalloc_diff_points_at_growing_allocation():
+    """测试快照比较能定位到持续分配内存的代码行"""
+    diagnostics.start_tracemalloc(frames=5)
+    try:
+        base = diagnostics.take_snapshot("before")["id"]
+        leaked = [bytearray(10_000) for _ in range(200)]
+        diff = diagnostics.compare_snapshots(base, key_type="traceback", limit=5)
+        assert "tests/test_diagnostics.py" in diff[0]["location"]
+        assert diff[0]["size_diff"] >= 200 * 10_000
+        assert diff[0]["traceback"][-1] == diff[0]["location"]
+        assert diagnostics.tracemalloc_status()["snapshots"][-1]["label"] == "before"
+        del leaked
+    finally:
+        diagnostics.stop_tracemalloc()
+
+    with pytest.raises(KeyError):
+        diagnostics.compare_snapshots(base)
+
+
+class LeakyRecord:
+    pass
+
+
+def test_object_type_counts_report_growth():
+    """测试对象类型统计给出与上次统计相比的增量"""
+    diagnostics.object_type_counts(limit=1)
+    records = [LeakyRecord() for _ in range(5000)]
+    growth = diagnostics.object_type_growth(limit=10)
+    entry = next(item for item in growth if item["type"].endswith("test_diagnostics.LeakyRecord"))
+    assert entry["count"] >= 5000 and entry["delta"] >= 5000
+    del records
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="平台不支持SIGUSR2")
+def test_sigusr2_writes_memory_report(tmp_path):
+    """测试收到SIGUSR2后在后台写出内存报告"""
+    previous = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    try:
+        assert diagnostics.install_signal_handlers(tmp_path, profile_seconds=0.1)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        deadline = time.time() + 10
+        while not list(tmp_path.glob("memory-*.txt")) and time.time() < deadline:
+            time.sleep(0.05)
+        report = next(tmp_path.glob("memory-*.txt")).read_text(encoding="utf-8")
+        assert "对象类型" in report and "builtins.dict" in report
+    finally:
+        signal.signal(signal.SIGUSR1, previous[0])
+        signal.signal(signal.SIGUSR2, previous[1])
+
+
+def test_admin_endpoints_require_token(monkeypatch):
+    """测试诊断接口在未配置或令牌错误时拒绝访问"""
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/api/admin/diagnostics/objects").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/diagnostics/objects", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    headers = {"X-Admin-Token": "secret"}
+    objects = client.get("/api/admin/diagnostics/objects?limit=5", headers=headers)
+    assert objects.status_code == 200 and len(objects.json()) == 5
+
+    folded = client.post("/api/admin/diagnostics/profile?seconds=0.2&include_idle=true", headers=headers)
+    assert folded.status_code == 200
+    assert folded.headers["content-disposition"].endswith('.folded"')
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.text.splitlines())
+
+    assert client.post("/api/admin/diagnostics/tracemalloc/snapshots", headers=headers).status_code == 409
+    try:
+        assert client.post("/api/admin/diagnostics/tracemalloc/start?frames=3", headers=headers).json()["tracing"]
+        snapshot = client.post("/api/admin/diagnostics/tracemalloc/snapshots", headers=headers).json()
+        diff = client.get(f"/api/admin/diagnostics/tracemalloc/diff?base_id={snapshot['id']}", headers=headers)
+        assert diff.status_code == 200 and isinstance(diff.json(), list)
+        assert client.get("/api/admin/diagnostics/tracemalloc/diff?base_id=9999", headers=headers).status_code == 404
+    finally:
+        client.post("/api/admin/diagnostics/tracemalloc/stop", headers=headers)
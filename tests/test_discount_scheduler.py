@@ -0,0 +1,106 @@
+"""
+测试优惠信息更新调度器：基于next_update_at的调度窗口、按到期取批次和增量重新排期。
+"""
+
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from models.database import Product, Offer
+from src.core.discount_scheduler import DiscountUpdateScheduler
+
+NOW = datetime.now(UTC)
+
+
+def add_products(db, count, **kwargs):
+    db.add_all([
+        Product(asin=f"B{i:09d}", current_price=50.0 + i, **kwargs)
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def clear_discount_updated_at(db, *asins):
+    """discount_updated_at有默认值，插入后再置为NULL表示从未更新"""
+    db.query(Product).filter(Product.asin.in_(asins)).update(
+        {Product.discount_updated_at: None}, synchronize_session=False)
+    db.commit()
+
+
+def due_of(db, asin):
+    value = db.query(Product.next_update_at).filter(Product.asin == asin).scalar()
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value
+
+
+def test_new_products_are_scheduled_and_persisted(db):
+    """测试新商品按折扣更新时间排期并写入next_update_at，从未更新的立即到期"""
+    add_products(db, 3, discount_updated_at=NOW - timedelta(days=30))
+    db.add(Product(asin="B999999999", current_price=10.0))
+    db.commit()
+    clear_discount_updated_at(db, "B999999999")
+
+    scheduler = DiscountUpdateScheduler(db, batch_size=10)
+    assert scheduler.assign_missing_due_times() == 4
+    assert db.query(Product).filter(Product.next_update_at.is_(None)).count() == 0
+    assert due_of(db, "B999999999") <= datetime.now(UTC)
+
+    batch = scheduler.get_next_batch()
+    assert sorted(batch) == ["B000000000", "B000000001", "B000000002", "B999999999"]
+    assert scheduler.get_statistics()['in_flight'] == 4
+
+
+def test_not_due_products_are_not_returned(db):
+    """测试未到期的商品不会被取出，强制模式下按到期顺序取出"""
+    add_products(db, 2, discount_updated_at=NOW)
+    scheduler = DiscountUpdateScheduler(db, batch_size=10)
+
+    assert scheduler.get_next_batch() == []
+    assert scheduler.seconds_until_next_due() > 0
+
+    scheduler.force_update = True
+    assert len(scheduler.get_next_batch()) == 2
+
+
+def test_window_refills_in_due_order(db):
+    """测试窗口小于商品总数时按到期顺序分批补充"""
+    db.add_all([
+        Product(asin=f"B{i:09d}", current_price=20.0, next_update_at=NOW - timedelta(minutes=60 - i))
+        for i in range(25)
+    ])
+    db.commit()
+    scheduler = DiscountUpdateScheduler(db, batch_size=4, max_load_products=3)
+
+    seen = []
+    while True:
+        batch = scheduler.get_next_batch()
+        if not batch:
+            break
+        seen.extend(batch)
+    assert seen == [f"B{i:09d}" for i in range(25)]
+
+
+def test_record_task_result_reschedules_incrementally(db):
+    """测试完成后只重新计算该商品的到期时间，失败时按重试间隔重试"""
+    add_products(db, 2)
+    db.add(Offer(product_id="B000000001", deal_type="Lightning"))
+    db.commit()
+    clear_discount_updated_at(db, "B000000000", "B000000001")
+    scheduler = DiscountUpdateScheduler(db, batch_size=10, retry_interval=600)
+    batch = scheduler.get_next_batch()
+    assert len(batch) == 2
+
+    scheduler.record_task_result("B000000000", success=True, processing_time=1.0)
+    scheduler.record_task_result("B000000001", success=False, processing_time=2.0)
+
+    ok_due = due_of(db, "B000000000") - datetime.now(UTC)
+    retry_due = due_of(db, "B000000001") - datetime.now(UTC)
+    assert ok_due >= timedelta(seconds=scheduler.min_interval - 5)
+    assert timedelta(seconds=590) <= retry_due <= timedelta(seconds=600)
+
+    stats = scheduler.get_statistics()
+    assert stats['completed_tasks'] == 1 and stats['failed_tasks'] == 1
+    assert stats['in_flight'] == 0
+    assert stats['avg_processing_time'] == pytest.approx(1.5)
+    # 重新排期的商品回到窗口中，但尚未到期
+    assert stats['queue_size'] == 2
+    assert scheduler.get_next_batch() == []
@@ -0,0 +1,55 @@
+"""
+测试索引最小堆：按到期时间弹出、按键修改和删除。
+"""
+
+import random
+
+import pytest
+
+from src.utils.indexed_heap import IndexedHeap
+
+
+def test_pop_due_in_order_and_only_due_items():
+    """测试只弹出已到期的键，并按到期时间排序"""
+    heap = IndexedHeap()
+    for key, due in [("c", 30), ("a", 10), ("d", 40), ("b", 20)]:
+        heap.push(key, due)
+
+    assert heap.pop_due(25) == [("a", 10, None), ("b", 20, None)]
+    assert heap.pop_due(100, limit=1) == [("c", 30, None)]
+    assert len(heap) == 1 and "d" in heap and "a" not in heap
+
+
+def test_reschedule_and_remove_keep_heap_order():
+    """测试随机修改和删除后仍按到期时间弹出"""
+    rng = random.Random(7)
+    heap = IndexedHeap()
+    expected = {}
+    for i in range(500):
+        key = f"B{i:09d}"
+        expected[key] = rng.random()
+        heap.push(key, expected[key])
+    for key in rng.sample(sorted(expected), 200):
+        expected[key] = rng.random()
+        assert heap.reschedule(key, expected[key])
+    for key in rng.sample(sorted(expected), 100):
+        assert heap.remove(key) == (expected.pop(key), None)
+
+    assert heap.reschedule("missing", 1.0) is False
+    assert heap.remove("missing") is None
+    popped = heap.pop_due(float("inf"))
+    assert [key for key, _, _ in popped] == sorted(expected, key=expected.get)
+
+
+def test_push_existing_key_updates_value_and_due():
+    """测试重复插入同一个键时只保留一份并更新到期时间"""
+    heap = IndexedHeap()
+    heap.push("a", 10, "old")
+    heap.push("b", 5)
+    heap.push("a", 1, "new")
+    assert len(heap) == 2
+    assert heap.peek() == ("a", 1, "new")
+    assert heap.get("b") == (5, None)
+    heap.clear()
+    with pytest.raises(IndexError):
+        heap.pop()
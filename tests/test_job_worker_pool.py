@@ -0,0 +1,77 @@
+"""
+测试任务工作进程池：常驻进程复用、失败任务、超时和内存上限时替换工作进程。
+"""
+
+import time
+
+import pytest
+
+from src.core.job_worker_pool import JobWorkerPool
+
+
+def sample_job(job_id, crawler_type, max_items, config=None):
+    """测试用任务函数，在工作进程中执行"""
+    from loguru import logger
+
+    config = config or {}
+    if crawler_type == "fail":
+        raise ValueError("配置错误")
+    if crawler_type == "sleep":
+        time.sleep(config["seconds"])
+    if crawler_type == "memory":
+        block = b"\x01" * (config["mb"] * 1024 * 1024)
+        time.sleep(10)
+        return len(block)
+    logger.info(f"处理商品数: {max_items}")
+    return max_items
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = JobWorkerPool(workers=2, target=f"{__name__}:sample_job", preload_modules=(),
+                         log_dir=str(tmp_path), poll_interval=0.1)
+    pool.start()
+    yield pool
+    pool.shutdown(timeout=5)
+
+
+def test_workers_are_reused_across_jobs(pool):
+    """测试多个任务由同一组常驻进程执行，结果和任务日志正确"""
+    futures = [pool.submit(f"job{i}", "bestseller", i) for i in range(6)]
+    results = [future.result(timeout=60) for future in futures]
+
+    assert [r.items_collected for r in results] == list(range(6))
+    assert all(r.status == "completed" for r in results)
+    assert len({r.worker_pid for r in results}) <= 2
+    with open(results[3].log_file, encoding="utf-8") as f:
+        assert "处理商品数: 3" in f.read()
+
+
+def test_failed_job_keeps_worker(pool):
+    """测试任务抛出异常时返回失败结果，工作进程继续可用"""
+    failed = pool.submit("bad", "fail", 1).result(timeout=60)
+    assert failed.status == "failed"
+    assert "配置错误" in failed.error
+
+    ok = pool.submit("good", "bestseller", 5).result(timeout=60)
+    assert ok.status == "completed"
+    assert pool.stats["restarted"] == 0
+
+
+def test_timeout_replaces_worker(pool):
+    """测试超时任务被终止，工作进程被替换后继续执行新任务"""
+    started = time.time()
+    result = pool.submit("slow", "sleep", 1, {"seconds": 30}, timeout=0.5).result(timeout=60)
+    assert result.status == "failed"
+    assert "超时" in result.error
+    assert time.time() - started < 20
+    assert pool.stats["killed"] == 1 and pool.stats["restarted"] == 1
+
+    assert pool.submit("after", "bestseller", 2).result(timeout=60).items_collected == 2
+
+
+def test_memory_limit_kills_job(pool):
+    """测试超过内存上限的任务被终止"""
+    result = pool.submit("big", "memory", 1, {"mb": 300}, max_memory_mb=200).result(timeout=60)
+    assert result.status == "failed"
+    assert "内存超限" in result.error
@@ -0,0 +1,93 @@
+"""
+测试租约选举：同一时刻只有一个持有者、释放和过期后接管，以及多进程下主节点退出后的接管时间。
+"""
+
+import os
+import time
+import multiprocessing
+
+from src.core.leader_election import LeaderElection
+
+LEASE = 1.0
+HEARTBEAT = 0.2
+
+
+def run_candidate(db_url, holder_id, events, stop_file):
+    """测试用候选进程：记录成为主节点和失去主节点的时间，stop_file出现后退出
+
+    不使用multiprocessing.Event：等待中的进程被杀死后，Event.set会一直阻塞。
+    """
+    election = LeaderElection(
+        db_url, lease_seconds=LEASE, heartbeat_interval=HEARTBEAT, holder_id=holder_id,
+        on_elected=lambda: events.put(("elected", holder_id, time.time())),
+        on_revoked=lambda: events.put(("revoked", holder_id, time.time())),
+    )
+    election.start()
+    deadline = time.time() + 60
+    while not os.path.exists(stop_file) and time.time() < deadline:
+        time.sleep(0.05)
+    election.stop()
+
+
+def test_single_holder_and_takeover_after_release(tmp_path):
+    """测试租约被持有时其他候选无法取得，释放后可以接管且任期加1"""
+    db_url = f"sqlite:///{tmp_path}/scheduler.db"
+    a = LeaderElection(db_url, lease_seconds=LEASE, heartbeat_interval=HEARTBEAT, holder_id="a")
+    b = LeaderElection(db_url, lease_seconds=LEASE, heartbeat_interval=HEARTBEAT, holder_id="b")
+
+    assert a.try_acquire()
+    assert not b.try_acquire()
+    assert a.try_acquire()  # 续约不改变任期
+    assert a.term == 1
+    assert a.current_holder()["holder"] == "a"
+
+    a.release()
+    assert b.try_acquire()
+    assert b.term == 2
+    assert not a.try_acquire()
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    """测试持有者停止续约后，租约到期即可被接管"""
+    db_url = f"sqlite:///{tmp_path}/scheduler.db"
+    a = LeaderElection(db_url, lease_seconds=0.3, heartbeat_interval=0.1, holder_id="a")
+    b = LeaderElection(db_url, lease_seconds=0.3, heartbeat_interval=0.1, holder_id="b")
+
+    assert a.try_acquire()
+    assert not b.try_acquire()
+    time.sleep(0.35)
+    assert not a.is_leader
+    assert b.try_acquire()
+    assert b.current_holder()["holder"] == "b"
+
+
+def test_processes_elect_one_leader_and_fail_over(tmp_path):
+    """测试多个进程只选出一个主节点，主节点被杀死后在租约期限内被接管"""
+    ctx = multiprocessing.get_context("spawn")
+    db_url = f"sqlite:///{tmp_path}/scheduler.db"
+    events, stop_file = ctx.Queue(), str(tmp_path / "stop")
+    processes = {
+        f"worker{i}": ctx.Process(target=run_candidate, args=(db_url, f"worker{i}", events, stop_file), daemon=True)
+        for i in range(3)
+    }
+    for process in processes.values():
+        process.start()
+    try:
+        kind, leader, _ = events.get(timeout=30)
+        assert kind == "elected"
+        # 多次心跳后仍只有一个主节点
+        time.sleep(LEASE * 2)
+        assert events.empty()
+
+        processes[leader].kill()
+        killed_at = time.time()
+        kind, new_leader, elected_at = events.get(timeout=30)
+        assert kind == "elected"
+        assert new_leader != leader
+        assert elected_at - killed_at <= LEASE + HEARTBEAT + 0.5
+    finally:
+        open(stop_file, "w").close()
+        for process in processes.values():
+            process.join(10)
+            if process.is_alive():
+                process.kill()
@@ -236,4 +236,101 @@ def test_context_decorator(temp_log_dir, capsys):
     # 检查日志输出
     captured = capsys.readouterr()
     assert "module" in captured.err
-    assert "test_module" in captured.err 
\ No newline at end of file
+    assert "test_module" in captured.err 
+
+def test_log_context_is_isolated_per_thread(monkeypatch):
+    """测试上下文按线程隔离，进入和退出不调用logger.configure"""
+    import threading
+    from loguru import logger
+
+    records = []
+    handler_id = logger.add(lambda message: records.append(message.record["extra"]), level="INFO")
+
+    def fail_configure(*args, **kwargs):
+        raise AssertionError("不应修改Loguru全局配置")
+
+    monkeypatch.setattr(logger, "configure", fail_configure)
+    barrier = threading.Barrier(4)
+
+    def worker(index):
+        with LogContext(task_id=f"T{index}"):
+            barrier.wait()
+            for _ in range(20):
+                logger.info("处理商品")
+            barrier.wait()
+
+    try:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.bind(task_id="bound").info("绑定优先")
+        with LogContext(task_id="ctx"):
+            logger.bind(task_id="bound").info("绑定优先")
+        logger.info("上下文之外")
+    finally:
+        logger.remove(handler_id)
+
+    thread_records = records[:80]
+    assert sorted(r["task_id"] for r in thread_records) == sorted(f"T{i}" for i in range(4) for _ in range(20))
+    assert [r["task_id"] for r in records[80:82]] == ["bound", "bound"]
+    assert "task_id" not in records[-1] and records[-1]["name"] == "DefaultLogger"
+    assert not get_current_context()
+
+
+def test_log_function_call_is_lazy_and_awaits_coroutines():
+    """测试级别未开启时不格式化参数，协程函数在await完成后才记录成功，异常总是记录"""
+    from loguru import logger
+
+    class Expensive:
+        formatted = 0
+
+        def __repr__(self):
+            Expensive.formatted += 1
+            return "Expensive()"
+
+    messages = []
+    logger.remove()
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), format="{message}", level="INFO", diagnose=False)
+    try:
+        @log_function_call
+        async def fetch(item):
+            await asyncio.sleep(0)
+            return "done"
+
+        @log_function_call(sample_rate=0)
+        def fail(item):
+            raise ValueError("bad")
+
+        assert asyncio.run(fetch(Expensive())) == "done"
+        with pytest.raises(ValueError):
+            fail(Expensive())
+        assert Expensive.formatted == 0
+        assert messages == ["函数 fail 执行失败"]
+
+        handler_debug = logger.add(lambda message: messages.append(message.record["message"]), format="{message}", level="DEBUG", diagnose=False)
+        try:
+            asyncio.run(fetch(Expensive()))
+        finally:
+            logger.remove(handler_debug)
+        assert messages[1:] == ["调用函数 fetch - 参数: (Expensive(),), 关键字参数: {}", "函数 fetch 执行成功"]
+    finally:
+        logger.remove(handler_id)
+
+
+def test_level_check_falls_back_to_enabled_without_loguru_internals(monkeypatch):
+    """测试读取不到loguru内部的最低级别时，视为所有级别都开启"""
+    from loguru import logger
+    from src.utils import log_config
+
+    logger.remove()
+    handler_id = logger.add(lambda message: None, level="WARNING")
+    try:
+        assert not log_config.is_level_enabled("DEBUG")
+        assert log_config.is_level_enabled("ERROR")
+
+        monkeypatch.setattr(log_config, "_LOGGER_CORE", object())
+        assert log_config.is_level_enabled("DEBUG")
+    finally:
+        logger.remove(handler_id)
@@ -0,0 +1,127 @@
+"""
+测试日志索引：增量导入、轮转压缩后不重复导入、按时间分段跳过和多种日志格式解析。
+"""
+
+import os
+import zipfile
+from datetime import datetime, UTC
+
+from src.utils import log_index
+from src.utils.log_analysis import LogQuery
+from src.utils.log_index import FINGERPRINT_BYTES, LogIndex
+
+
+def test_refresh_imports_only_new_complete_lines(tmp_path, write_records, make_record):
+    """测试每次刷新只导入新增的完整行，未写完的行留到下次"""
+    log_file = tmp_path / "app.2025-04-01.log"
+    write_records(log_file, [make_record(day=1, minute=i) for i in range(3)])
+    index = LogIndex(tmp_path)
+    assert index.refresh() == 3
+    assert index.refresh() == 0
+
+    write_records(log_file, [make_record(day=1, minute=3)])
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write('{"time": "2025-04-01T10:04:00Z", "level": "INFO"')
+    assert index.refresh() == 1
+
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write(', "module": "crawler", "message": "late"}\n')
+    assert index.refresh() == 1
+    assert [r["message"] for r in index.iter_records()][-1] == "late"
+
+
+def test_refresh_reads_only_appended_bytes(tmp_path, monkeypatch, write_records, make_record):
+    """测试大文件追加后刷新只读取文件头指纹和新增的内容"""
+    log_file = tmp_path / "app.2025-04-01.log"
+    write_records(log_file, [make_record(day=1, minute=i % 60, message="x" * 200) for i in range(5000)])
+    index = LogIndex(tmp_path)
+    assert index.refresh() == 5000
+
+    write_records(log_file, [make_record(day=1, minute=59), make_record(day=1, minute=59)])
+    appended = os.path.getsize(log_file) - index.conn.execute("SELECT offset FROM log_sources").fetchone()[0]
+    bytes_read = []
+
+    class CountingFile:
+        def __init__(self, f):
+            self.f = f
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.f.close()
+
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+
+        def read(self, *args):
+            data = self.f.read(*args)
+            bytes_read.append(len(data))
+            return data
+
+    monkeypatch.setattr(log_index, "open", lambda *args, **kwargs: CountingFile(open(*args, **kwargs)), raising=False)
+    assert index.refresh() == 2
+    # 判断是否被替换和确定续读位置各读一次文件头，之后只读新增部分
+    assert bytes_read[-1] == appended
+    assert sum(bytes_read) <= 2 * FINGERPRINT_BYTES + appended
+    assert os.path.getsize(log_file) > 100 * sum(bytes_read)
+
+
+def test_rotated_zip_continues_from_indexed_offset(tmp_path, write_records, make_record):
+    """测试日志轮转压缩后只导入压缩前未导入的部分，新文件从头导入"""
+    log_file = tmp_path / "app.2025-04-01.log"
+    write_records(log_file, [make_record(day=1, minute=i) for i in range(5)])
+    index = LogIndex(tmp_path)
+    assert index.refresh() == 5
+
+    # 轮转前又写入两条，然后像Loguru一样压缩并删除原文件
+    write_records(log_file, [make_record(day=1, minute=5), make_record(day=1, minute=6)])
+    with zipfile.ZipFile(tmp_path / "app.2025-04-01.log.zip", 'w') as archive:
+        archive.write(log_file, log_file.name)
+    os.remove(log_file)
+    write_records(tmp_path / "app.2025-04-02.log", [make_record(day=2, minute=0)])
+
+    assert index.refresh() == 3
+    assert index.refresh() == 0
+    assert LogQuery(tmp_path).count() == 8
+
+
+def test_time_range_skips_segments(tmp_path, write_records, make_record):
+    """测试记录按天分段，时间范围查询只访问相交的分段"""
+    log_file = tmp_path / "app.log"
+    write_records(log_file, [make_record(day=day, minute=i, level="ERROR" if i == 0 else "INFO")
+                             for day in (1, 2, 3) for i in range(4)])
+    query = LogQuery(tmp_path)
+    start = datetime(2025, 4, 2, tzinfo=UTC)
+    end = datetime(2025, 4, 2, 23, 59, tzinfo=UTC)
+
+    assert len(query.search()) == 12
+    assert query.index.segments(start.timestamp(), end.timestamp()) == ["records_20250402"]
+    assert len(query.search(start_time=start, end_time=end)) == 4
+    assert query.count(level="ERROR") == 3
+    assert query.count_by_interval("day", level="ERROR") == {
+        "2025-04-01": 1, "2025-04-02": 1, "2025-04-03": 1
+    }
+
+
+def test_text_formats_and_task_filter(tmp_path, write_records, make_record):
+    """测试文本格式（含多行异常）、爬虫方括号格式和按task_id过滤"""
+    (tmp_path / "app.2025-04-01.log").write_text(
+        "2025-04-01 10:00:00.000 | INFO     | src.core.crawler:run:12 | 开始采集\n"
+        "2025-04-01 10:00:01.000 | ERROR    | src.core.crawler:run:20 | 采集失败\n"
+        "Traceback (most recent call last):\n"
+        "ValueError: bad\n",
+        encoding='utf-8'
+    )
+    (tmp_path / "crawler.log").write_text(
+        "[2025-04-01 10:00:02] [SUCCESS] 成功找到优惠券\n", encoding='utf-8'
+    )
+    write_records(tmp_path / "tasks.log", [make_record(day=1, minute=5, task_id="t-1"), make_record(day=1, minute=6, task_id="t-2")])
+
+    query = LogQuery(tmp_path)
+    errors = query.search(level="ERROR")
+    assert len(errors) == 1
+    assert errors[0]["module"] == "src.core.crawler" and errors[0]["line"] == 20
+    assert errors[0]["message"].endswith("ValueError: bad")
+    assert query.search(module="crawler", level="SUCCESS")[0]["message"] == "成功找到优惠券"
+    assert [r["time"] for r in query.search(context={"task_id": "t-2"})] == ["2025-04-01T10:06:00Z"]
@@ -0,0 +1,106 @@
+"""
+测试日志预聚合：按分钟/小时计数、耗时直方图、增量合并、回填，以及仪表板只读汇总表。
+"""
+
+import pytest
+from loguru import logger
+
+from src.utils.api_logger import APILogger
+from src.utils.log_analysis import LogQuery
+from src.utils.log_config import clean_format, track_performance
+from src.utils.log_index import LogIndex
+from src.utils.log_rollup import LATENCY_BOUNDS
+from src.utils.log_visualization import SystemHealthDashboard
+from src.utils.metrics import histogram_quantile
+
+
+def test_counts_accumulate_across_refreshes(tmp_path, write_records, make_record):
+    """测试计数按分钟和小时汇总，新导入的记录合并进已有时间桶"""
+    log_file = tmp_path / "app.log"
+    write_records(log_file, [make_record(hour=10, minute=0), make_record(hour=10, minute=0, level="ERROR"), make_record(hour=10, minute=5, module="db")])
+    query = LogQuery(tmp_path)
+    assert query.rollups().counts("minute", keys=("bucket",)) == {
+        ("2025-04-01 10:00",): 2, ("2025-04-01 10:05",): 1
+    }
+
+    write_records(log_file, [make_record(hour=10, minute=59, level="ERROR"), make_record(hour=11, minute=0)])
+    rollup = query.rollups()
+    assert rollup.counts("hour", keys=("bucket", "level")) == {
+        ("2025-04-01 10:00", "INFO"): 2, ("2025-04-01 10:00", "ERROR"): 2, ("2025-04-01 11:00", "INFO"): 1
+    }
+    assert rollup.counts("hour", keys=("module",), level="error") == {("crawler",): 2}
+
+
+def test_latency_from_track_performance_and_api_logging(tmp_path):
+    """测试从 track_performance 和 APILogger 写出的文本日志中提取耗时直方图"""
+    logger.remove()
+    logger.add(str(tmp_path / "app.log"), format=clean_format)
+
+    @track_performance
+    def crawl_page():
+        return None
+
+    for _ in range(3):
+        crawl_page()
+    api_logger = APILogger("PAAPI")
+    for elapsed in (0.2, 0.4, 3.0):
+        api_logger.log_response(status_code=200, response_data={"items": []}, elapsed=elapsed)
+    logger.remove()
+
+    rollup = LogQuery(tmp_path).rollups()
+    executions = rollup.latency_summary("execution_time")
+    assert list(executions) == ["test_latency_from_track_performance_and_api_logging.<locals>.crawl_page"]
+    assert executions[next(iter(executions))]["count"] == 3
+
+    api = rollup.latency_summary("api_elapsed")
+    assert list(api) == ["src.utils.api_logger"]
+    assert api["src.utils.api_logger"]["count"] == 3
+    assert api["src.utils.api_logger"]["max"] == 3.0
+    assert api["src.utils.api_logger"]["mean"] == pytest.approx(3.6 / 3)
+
+
+def test_histogram_quantiles_and_series(tmp_path, write_records, make_record):
+    """测试分位数估算落在真实值所在的分桶内，时间序列按桶合并"""
+    values = [10 + i for i in range(90)] + [900 + i for i in range(10)]
+    write_records(tmp_path / "app.log", [
+        make_record(hour=10, minute=i % 2, response_time=value) for i, value in enumerate(values)
+    ])
+    series = LogQuery(tmp_path).rollups().latency_series("response_time", "minute")
+    assert [point["count"] for point in series] == [50, 50]
+
+    summary = LogQuery(tmp_path).rollups().latency_summary("response_time")["crawler"]
+    assert summary["count"] == 100 and summary["min"] == 10 and summary["max"] == 909
+    assert 25 <= summary["p50"] <= 100
+    assert 500 <= summary["p99"] <= 909
+    assert histogram_quantile([0] * (len(LATENCY_BOUNDS) + 1), 0.5, 0, 0, LATENCY_BOUNDS) is None
+
+
+def test_rollups_backfilled_for_existing_index(tmp_path, write_records, make_record):
+    """测试已有索引首次创建汇总表时用已导入的记录回填"""
+    write_records(tmp_path / "app.log", [make_record(hour=10, minute=i) for i in range(4)])
+    index = LogIndex(tmp_path)
+    index.refresh()
+    index.conn.execute("DROP TABLE log_rollup_counts")
+    index.conn.execute("DROP TABLE log_rollup_latency")
+    index.close()
+
+    assert LogIndex(tmp_path).rollup.counts("hour") == {("2025-04-01 10:00",): 4}
+
+
+def test_dashboard_reads_only_rollups(tmp_path, monkeypatch, write_records, make_record):
+    """测试仪表板和图表不扫描原始记录"""
+    write_records(tmp_path / "app.log", [
+        make_record(hour=10 + i % 3, minute=i, level="ERROR" if i % 5 == 0 else "INFO", response_time=100 + i)
+        for i in range(30)
+    ])
+
+    def fail(*args, **kwargs):
+        raise AssertionError("不应扫描原始日志记录")
+
+    monkeypatch.setattr(LogIndex, "iter_records", fail)
+    monkeypatch.setattr(LogIndex, "group_counts", fail)
+    dashboard = SystemHealthDashboard(tmp_path)
+    charts = dashboard.generate_dashboard(output_dir=str(tmp_path / "dashboard"))
+    assert {"error_rate", "response_time", "module_activity", "dashboard"} <= set(charts)
+    with open(charts["dashboard"], encoding="utf-8") as f:
+        assert "20.00%" in f.read()
@@ -0,0 +1,138 @@
+"""
+测试进程内指标：注册表、直方图分位数、Prometheus文本导出、并发更新，以及各埋点和HTTP中间件。
+"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from src.utils.api_logger import with_api_logging
+from src.utils.log_config import track_performance
+from src.utils.metrics import CONTENT_TYPE, HTTPMetricsMiddleware, MetricsRegistry, get_registry
+
+
+def test_registry_renders_prometheus_text():
+    """测试同名指标只注册一次，导出格式包含累积分桶、sum和count"""
+    registry = MetricsRegistry()
+    pages = registry.counter("pages_total", "抓取页面数", ("result",))
+    assert registry.counter("pages_total", "抓取页面数", ("result",)) is pages
+    with pytest.raises(ValueError):
+        registry.gauge("pages_total", "抓取页面数", ("result",))
+    with pytest.raises(ValueError):
+        pages.inc(status="ok")
+
+    pages.inc(result="ok")
+    pages.inc(2, result="ok")
+    pages.inc(result='say "hi"')
+    registry.gauge("workers", "活跃线程数").set(3)
+    latency = registry.histogram("page_seconds", "页面耗时", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.observe(value)
+
+    text = registry.render()
+    assert 'pages_total{result="ok"} 3' in text
+    assert 'pages_total{result="say \\"hi\\""} 1' in text
+    assert "# TYPE workers gauge\nworkers 3" in text
+    assert 'page_seconds_bucket{le="0.1"} 1' in text
+    assert 'page_seconds_bucket{le="1"} 3' in text
+    assert 'page_seconds_bucket{le="+Inf"} 4' in text
+    assert "page_seconds_sum 4.25" in text
+    assert "page_seconds_count 4" in text
+
+
+def test_histogram_quantiles_under_concurrent_updates():
+    """测试多线程和协程同时更新时计数不丢失，分位数落在真实值所在的分桶内"""
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "操作耗时", ("op",))
+    values = [0.001 * (i + 1) for i in range(1000)]
+
+    def observe_all():
+        child = latency.labels(op="read")
+        for value in values:
+            child.observe(value)
+
+    async def observe_async():
+        async def observe_chunk(chunk):
+            for value in chunk:
+                latency.observe(value, op="read")
+                await asyncio.sleep(0)
+        await asyncio.gather(*(observe_chunk(values[i::4]) for i in range(4)))
+
+    threads = [threading.Thread(target=observe_all) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    asyncio.run(observe_async())
+    for thread in threads:
+        thread.join()
+
+    summary = latency.summary(op="read")
+    assert summary["count"] == 9000
+    assert summary["sum"] == pytest.approx(9 * sum(values))
+    assert 0.25 <= summary["p50"] <= 0.5
+    assert 0.5 <= summary["p95"] <= 1.0
+    assert 0.5 <= summary["p99"] <= 1.0
+    assert latency.summary(op="write")["p50"] is None
+
+
+def test_track_performance_and_api_logging_feed_histograms():
+    """测试 track_performance 和 with_api_logging 按函数/API和执行结果记录耗时"""
+    registry = get_registry()
+
+    @track_performance
+    def parse_page(fail=False):
+        if fail:
+            raise ValueError("bad")
+
+    @with_api_logging("MetricsTestAPI", sample_rate=0)
+    async def call_api(fail=False):
+        if fail:
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    parse_page()
+    parse_page()
+    with pytest.raises(ValueError):
+        parse_page(fail=True)
+    asyncio.run(call_api())
+    with pytest.raises(RuntimeError):
+        asyncio.run(call_api(fail=True))
+
+    functions = registry.get("function_duration_seconds")
+    name = parse_page.__qualname__
+    assert functions.summary(function=name, outcome="ok")["count"] == 2
+    assert functions.summary(function=name, outcome="error")["count"] == 1
+
+    api_calls = registry.get("api_call_duration_seconds")
+    assert api_calls.summary(api="MetricsTestAPI", outcome="ok")["count"] == 1
+    assert api_calls.summary(api="MetricsTestAPI", outcome="error")["count"] == 1
+
+
+def test_http_middleware_labels_routes_by_template():
+    """测试HTTP中间件按路由模板统计，未匹配路径记为unmatched，/metrics导出文本格式"""
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.add_middleware(HTTPMetricsMiddleware, registry=registry)
+
+    @app.get("/api/products/{asin}")
+    async def get_product(asin: str):
+        return {"asin": asin}
+
+    @app.get("/metrics")
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    client = TestClient(app)
+    for asin in ("B001", "B002", "B003"):
+        assert client.get(f"/api/products/{asin}").status_code == 200
+    assert client.get("/missing").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/api/products/{asin}",status="200"} 3' in response.text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/products/{asin}"} 3' in response.text
+    assert "http_requests_in_progress 1" in response.text
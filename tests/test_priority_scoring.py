@@ -0,0 +1,126 @@
+"""
+测试商品优先级批量评分：按列读取、与逐个商品计算结果一致、top-k选择和调度器集成。
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, UTC
+
+import numpy as np
+import pytest
+from models.database import Product, Offer
+from src.core.discount_scheduler import DiscountUpdateScheduler
+from src.core.priority_scoring import (
+    ProductColumns, load_product_columns, score_discount_priority, top_k_indices
+)
+from src.core.product_updater import ProductUpdater, UpdatePriority
+
+NOW = datetime.now(UTC)
+
+
+@pytest.fixture
+def db(db):
+    """在共享的内存商品库中写入测试商品"""
+    products = [
+        # 价格、折扣更新时间、创建/更新时间、CJ链接、优惠
+        Product(asin="B000000001", current_price=250.0, discount_updated_at=NOW - timedelta(days=10),
+                created_at=NOW - timedelta(days=200), updated_at=NOW - timedelta(days=5), cj_url="https://cj/1",
+                offers=[Offer(deal_type="Lightning", coupon_type="percentage", coupon_value=10,
+                              savings_percentage=30, deal_badge="Deal"),
+                        Offer(deal_type="None")]),
+        Product(asin="B000000002", current_price=15.0, discount_updated_at=NOW - timedelta(hours=2),
+                created_at=NOW - timedelta(days=3), updated_at=NOW - timedelta(hours=1), api_provider="pa-api",
+                offers=[Offer(deal_type="None")]),
+        Product(asin="B000000003", current_price=None, discount_updated_at=None,
+                created_at=NOW - timedelta(days=40), updated_at=None, api_provider="cj-api"),
+        Product(asin="B000000004", current_price=80.0, discount_updated_at=NOW - timedelta(days=2),
+                created_at=NOW - timedelta(days=1), updated_at=NOW - timedelta(days=1), api_provider="pa-api",
+                offers=[Offer(deal_type=None, coupon_type="fixed", coupon_value=0)]),
+    ]
+    db.add_all(products)
+    db.commit()
+    return db
+
+
+def test_load_columns_matches_orm_objects(db):
+    """测试SQL按列读取的结果与从ORM对象构造的一致"""
+    columns = load_product_columns(db, chunk_size=2)
+    products = db.query(Product).order_by(Product.id).all()
+    expected = ProductColumns.from_products(products)
+
+    order = np.argsort(columns.ids)
+    assert list(columns.asins[order]) == list(expected.asins)
+    for name in ('current_price', 'created_at', 'updated_at', 'discount_updated_at', 'savings_percentage'):
+        np.testing.assert_allclose(getattr(columns, name)[order], getattr(expected, name), atol=1e-3)
+    for name in ('is_cj', 'has_offer', 'has_deal', 'has_coupon', 'has_deal_badge'):
+        assert list(getattr(columns, name)[order]) == list(getattr(expected, name)), name
+
+
+def test_vectorized_priority_matches_scalar(db):
+    """测试批量评分与calculate_priority的结果一致，并使用当前权重"""
+    scheduler = DiscountUpdateScheduler(db)
+    scheduler.weights['random'] = 0.0
+    products = db.query(Product).order_by(Product.id).all()
+    columns = ProductColumns.from_products(products)
+
+    priority = scheduler.score_columns(columns, NOW)['priority']
+    expected = [scheduler.calculate_priority(p) for p in products]
+    np.testing.assert_allclose(priority, expected, atol=1e-4)  # calculate_priority使用调用时的当前时间
+
+    scheduler.weights.update({'price': 1.0, 'time': 0.0, 'popularity': 0.0, 'discount': 0.0})
+    reweighted = scheduler.score_columns(columns, NOW)['priority']
+    np.testing.assert_allclose(reweighted, [scheduler.calculate_price_factor(p.current_price or 0) for p in products])
+
+
+def test_top_k_indices_with_mask():
+    """测试top-k按得分降序返回，并只在掩码内选择"""
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3, 0.8])
+    assert top_k_indices(scores, 3).tolist() == [1, 5, 3]
+    mask = np.array([True, False, True, True, True, False])
+    assert top_k_indices(scores, 2, mask).tolist() == [3, 2]
+    assert top_k_indices(scores, 10, mask).tolist() == [3, 2, 4, 0]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_score_million_products_quickly():
+    """测试一百万个商品的评分和top-k选择在一秒内完成"""
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    now = NOW.timestamp()
+    columns = ProductColumns(
+        ids=np.arange(n, dtype=np.int64),
+        asins=np.empty(n, dtype=object),
+        current_price=rng.uniform(0, 2000, n),
+        created_at=now - rng.uniform(0, 3e7, n),
+        updated_at=now - rng.uniform(0, 1e6, n),
+        discount_updated_at=now - rng.uniform(0, 1e6, n),
+        is_cj=rng.random(n) < 0.3,
+        has_offer=rng.random(n) < 0.8,
+        has_deal=rng.random(n) < 0.4,
+        has_coupon=rng.random(n) < 0.2,
+        savings_percentage=rng.integers(0, 80, n).astype(np.float64),
+        has_deal_badge=rng.random(n) < 0.1,
+    )
+    start = time.perf_counter()
+    priority = score_discount_priority(columns, {'price': 0.25, 'time': 0.2, 'popularity': 0.25,
+                                                 'discount': 0.2, 'random': 0.1}, now, rng)['priority']
+    top = top_k_indices(priority, 1000)
+    elapsed = time.perf_counter() - start
+    assert len(top) == 1000
+    assert priority[top[0]] == priority.max()
+    assert elapsed < 1.0
+
+
+def test_product_updater_selects_due_products(db):
+    """测试ProductUpdater只选出到期商品，且单个商品的判断与批量一致"""
+    updater = ProductUpdater()
+    products = asyncio.run(updater.get_products_to_update(db, limit=10))
+    asins = [p.asin for p in products]
+
+    # 刚更新过的低分商品不会被选中，久未更新的CJ商品会被选中
+    assert "B000000002" not in asins
+    assert "B000000003" not in asins  # 价格为NULL的商品不参与更新
+    assert "B000000001" in asins
+    for product in products:
+        assert updater._should_update(product)
+    assert isinstance(updater._calculate_priority(products[0]), UpdatePriority)
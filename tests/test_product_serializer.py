@@ -0,0 +1,191 @@
+"""
+测试商品响应序列化：输出与ProductInfo一致、每页查询数固定、JSON列按行版本缓存、批量查询保持顺序、字段投影。
+"""
+
+import json
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy import event
+
+from models import product_serializer
+from models.database import CouponHistory, Offer, Product
+from models.product import ProductInfo
+from models.product_serializer import PROJECTIONS, resolve_projection
+from models.product_service import ProductService
+
+NOW = datetime.now(UTC)
+
+
+@pytest.fixture(autouse=True)
+def clear_json_cache():
+    """每个测试前清空JSON列解析缓存"""
+    product_serializer.clear_json_cache()
+
+
+def add_product(db, asin, api_provider="pa-api", offers=1, **kwargs):
+    values = dict(
+        asin=asin,
+        title=f"Product {asin}",
+        url=f"https://www.amazon.com/dp/{asin}",
+        current_price=19.99,
+        original_price=29.99,
+        categories=json.dumps(["Electronics", "Audio"]),
+        browse_nodes=json.dumps([{"id": "1", "name": "Audio"}, {"id": "2", "name": "Headphones"}]),
+        features=json.dumps(["Wireless"]),
+        api_provider=api_provider,
+        cj_url="https://cj.example/link" if api_provider == "cj-api" else None,
+        source="coupon",
+        timestamp=NOW,
+    )
+    values.update(kwargs)
+    db.add(Product(**values))
+    for i in range(offers):
+        db.add(Offer(product_id=asin, price=24.99 - i, currency="USD", commission="5%", is_prime=True))
+    db.add(CouponHistory(product_id=asin, coupon_type="percentage", coupon_value=5,
+                         updated_at=NOW - timedelta(days=1)))
+    db.add(CouponHistory(product_id=asin, coupon_type="fixed", coupon_value=3, terms="latest",
+                         expiration_date=NOW + timedelta(days=7), updated_at=NOW))
+    db.commit()
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_list_output_matches_product_info_with_fixed_query_count(engine, db):
+    """测试列表输出与ProductInfo序列化结果一致，且查询数不随商品数增长"""
+    for i in range(6):
+        add_product(db, f"B{i:09d}", api_provider="cj-api" if i % 2 else "pa-api", offers=2)
+    add_product(db, "B999999999", features="{broken")
+
+    statements = count_statements(engine)
+    result = ProductService.list_coupon_products(db, page_size=20)
+
+    # count、商品、优惠、最新优惠券各一条
+    assert len(statements) == 4
+    assert result["total"] == 7
+    items = result["items"]
+    assert len(items) == 6 and "B999999999" not in {item["asin"] for item in items}
+
+    for item in items:
+        assert ProductInfo.model_validate(item).model_dump(mode="json") == item
+        assert item["offers"][0]["price"] == 19.99
+        assert item["offers"][1]["price"] == 23.99
+        assert item["coupon_terms"] == "latest"
+        assert item["coupon_history"]["coupon_type"] == "fixed"
+        is_cj = item["api_provider"] == "cj-api"
+        assert (item["offers"][0]["commission"] == "5%") is is_cj
+        assert (item["cj_url"] is not None) is is_cj
+
+    # list_products沿用原有行为：不返回coupon_history
+    listed = ProductService.list_products(db, page_size=20)["items"]
+    assert listed and all(item["coupon_history"] is None and item["coupon_terms"] for item in listed)
+
+
+def test_json_columns_cached_by_row_version(db):
+    """测试JSON列解析结果按(asin, updated_at)缓存，商品更新后重新解析"""
+    add_product(db, "B000000001")
+
+    first = ProductService.get_product_by_asin(db, "B000000001")
+    second = ProductService.get_product_by_asin(db, "B000000001")
+    assert first["features"] == second["features"] == ["Wireless"]
+    stats = product_serializer.json_cache_stats()
+    assert stats["misses"] == 1 and stats["hits"] == 1
+
+    product = db.query(Product).filter(Product.asin == "B000000001").one()
+    product.features = json.dumps(["Noise cancelling"])
+    db.commit()
+
+    assert ProductService.get_product_by_asin(db, "B000000001")["features"] == ["Noise cancelling"]
+    assert product_serializer.json_cache_stats()["misses"] == 2
+
+
+def test_batch_details_keep_request_order(db):
+    """测试批量查询按请求顺序返回，未找到的为None，并支持元数据和浏览节点筛选"""
+    add_product(db, "B000000001", raw_data=json.dumps({"source": "api"}))
+    add_product(db, "B000000002")
+
+    results = ProductService.get_product_details_by_asin(
+        db, ["B000000002", "B00MISSING", "B000000001"],
+        include_metadata=True, include_browse_nodes=["2"]
+    )
+    assert [item and item["asin"] for item in results] == ["B000000002", None, "B000000001"]
+    assert results[2]["raw_data"] == {"source": "api"} and results[0]["raw_data"] is None
+    assert results[0]["browse_nodes"] == [{"id": "2", "name": "Headphones"}]
+
+    single = ProductService.get_product_details_by_asin(db, "B000000001")
+    assert single["raw_data"] is None and len(single["browse_nodes"]) == 2
+
+
+def test_projections_select_only_needed_columns(engine, db):
+    """测试精简投影只查询需要的列、跳过优惠券查询，输出为完整结果的子集"""
+    for i in range(3):
+        add_product(db, f"B{i:09d}", api_provider="cj-api", offers=2)
+    full = {item["asin"]: item for item in ProductService.list_coupon_products(db, page_size=10)["items"]}
+
+    statements = count_statements(engine)
+    for name in ("card", "analytics"):
+        projection = PROJECTIONS[name]
+        statements.clear()
+        items = ProductService.list_coupon_products(db, page_size=10, projection=projection)["items"]
+
+        # count、商品、优惠各一条，不查询优惠券
+        assert len(statements) == 3 and "coupon_history.terms" not in " ".join(statements)
+        assert "products.features" not in statements[1]
+        assert "offers.deal_type" not in statements[2]
+
+        assert len(items) == 3
+        for item in items:
+            expected = full[item["asin"]]
+            assert tuple(item) == projection.fields
+            assert len(item["offers"]) == 1
+            assert item["offers"][0] == {key: expected["offers"][0][key] for key in projection.offer_fields}
+            assert {key: value for key, value in item.items() if key != "offers"} == \
+                {key: expected[key] for key in projection.fields if key != "offers"}
+
+    # analytics投影不查询任何JSON列
+    assert not {"categories", "browse_nodes", "features"} & {c.key for c in PROJECTIONS["analytics"].columns}
+
+
+def test_resolve_projection_from_field_list(db):
+    """测试fields字段列表的解析、规范化和校验"""
+    add_product(db, "B000000001", offers=2)
+
+    assert resolve_projection(None) is None and resolve_projection(" ") is None
+    assert resolve_projection("card") is PROJECTIONS["card"]
+    projection = resolve_projection("offers.price, title ,title")
+    assert projection == resolve_projection("title,offers.price")
+    assert projection.fields == ("asin", "title", "offers") and projection.offer_fields == ("price",)
+    with pytest.raises(ValueError):
+        resolve_projection("title,weight")
+    with pytest.raises(ValueError):
+        resolve_projection("offers.weight")
+
+    item = ProductService.get_product_details_by_asin(db, "B000000001", projection=projection)
+    assert item == {"asin": "B000000001", "title": "Product B000000001",
+                    "offers": [{"price": 19.99}, {"price": 23.99}]}
+    items = ProductService.get_product_details_by_asin(
+        db, ["B000000001", "B00MISSING"], projection=resolve_projection("coupon_terms")
+    )
+    assert items == [{"asin": "B000000001", "coupon_terms": "latest"}, None]
+
+
+def test_batch_query_chunks_in_clause(engine, db, monkeypatch):
+    """测试批量查询按批次拆分IN条件，每批商品、优惠、优惠券各一条查询，重复ASIN按请求顺序返回"""
+    monkeypatch.setattr(product_serializer, "IN_CHUNK_SIZE", 2)
+    for i in range(5):
+        add_product(db, f"B{i:09d}", current_price=10.0 + i)
+
+    asins = ["B000000004", "B000000000", "B00MISSING", "B000000002", "B000000004", "B000000001", "B000000003"]
+    statements = count_statements(engine)
+    results = ProductService.get_product_details_by_asin(db, asins)
+
+    # 6个不同ASIN分3批
+    assert len(statements) == 9
+    assert all(statement.count("?") <= 2 for statement in statements)
+    assert [item and item["asin"] for item in results] == [asin if asin != "B00MISSING" else None for asin in asins]
+    assert [item["offers"][0]["price"] for item in results if item] == [14.0, 10.0, 12.0, 14.0, 11.0, 13.0]
+    assert all(item["coupon_terms"] == "latest" for item in results if item)
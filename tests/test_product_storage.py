@@ -0,0 +1,76 @@
+"""
+测试商品表存储：大字段延迟加载、raw_data压缩存储与明文兼容、更新时跳过未变化的大字段。
+"""
+
+import json
+from datetime import datetime, UTC
+
+from sqlalchemy import event, inspect, text
+
+from models.database import Product
+from models.product import ProductInfo, ProductOffer
+from models.product_service import ProductService
+
+
+def make_product_info(asin="B000000001"):
+    return ProductInfo(
+        asin=asin,
+        title="Headphones",
+        url=f"https://www.amazon.com/dp/{asin}",
+        timestamp=datetime(2024, 1, 1, tzinfo=UTC),
+        categories=["Electronics"],
+        browse_nodes=[{"id": "1", "name": "Audio"}],
+        features=["Wireless " * 50],
+        offers=[ProductOffer(condition="New", price=19.99, currency="USD",
+                             availability="In Stock", merchant_name="Amazon")],
+    )
+
+
+def test_raw_data_stored_compressed_and_plain_text_still_readable(engine, db):
+    """测试raw_data以压缩字节串存储，压缩前写入的明文仍可读出"""
+    ProductService.bulk_create_or_update_products(db, [make_product_info()])
+    with engine.connect() as conn:
+        kind, size = conn.execute(text("SELECT typeof(raw_data), length(raw_data) FROM products")).one()
+    product = db.query(Product).one()
+    assert kind == "blob" and size < len(product.raw_data)
+    assert product.raw_data_dict["asin"] == "B000000001"
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE products SET raw_data = :raw"), {"raw": json.dumps({"legacy": True})})
+    db.expire_all()
+    assert db.query(Product).one().raw_data_dict == {"legacy": True}
+
+
+def test_heavy_columns_deferred_for_entity_queries(engine, db):
+    """测试查询实体时不读取大字段，访问属性时再按组加载"""
+    ProductService.bulk_create_or_update_products(db, [make_product_info()])
+    db.expire_all()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    product = db.query(Product).one()
+    assert "features" not in statements[0] and "raw_data" not in statements[0]
+    assert {"features", "categories", "browse_nodes", "raw_data"}.isdisjoint(inspect(product).dict)
+
+    # 同组的三个JSON列一起加载
+    assert json.loads(product.categories) == ["Electronics"]
+    assert "features" in inspect(product).dict and "raw_data" not in inspect(product).dict
+
+
+def test_unchanged_heavy_columns_not_rewritten(engine, db):
+    """测试重复抓取到相同内容（只有抓取时间不同）时UPDATE语句不包含大字段"""
+    info = make_product_info()
+    ProductService.bulk_create_or_update_products(db, [info])
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    info.timestamp = datetime(2024, 1, 2, tzinfo=UTC)
+    ProductService.bulk_create_or_update_products(db, [info])
+    updates = [statement for statement in statements if statement.startswith("UPDATE products")]
+    assert updates and all("raw_data" not in s and "features" not in s for s in updates)
+
+    statements.clear()
+    info.features = ["Noise cancelling"]
+    ProductService.bulk_create_or_update_products(db, [info])
+    updates = [statement for statement in statements if statement.startswith("UPDATE products")]
+    assert any("raw_data" in s and "features" in s for s in updates)
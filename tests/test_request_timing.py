@@ -0,0 +1,104 @@
+"""
+测试请求耗时分解：SQL计数和耗时、序列化阶段、调试响应头，以及慢查询日志中的参数和执行计划。
+"""
+
+from typing import List
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy import create_engine, text
+
+from src.utils.metrics import MetricsRegistry
+from src.utils.request_timing import RequestTimingMiddleware, TimedAPIRoute, instrument_engine
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def make_engine(tmp_path, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, category TEXT)"))
+        conn.execute(text("CREATE INDEX ix_items_category ON items (category)"))
+        conn.execute(text("INSERT INTO items (id, name, category) VALUES (:id, :name, :category)"),
+                     [{"id": i, "name": f"item-{i}", "category": f"c{i % 3}"} for i in range(30)])
+    instrument_engine(engine, **kwargs)
+    return engine
+
+
+def make_app(engine, registry, debug=True):
+    app = FastAPI()
+    app.router.route_class = TimedAPIRoute
+    app.add_middleware(RequestTimingMiddleware, debug=debug, registry=registry)
+
+    def get_conn():
+        with engine.connect() as conn:
+            yield conn
+
+    @app.get("/items", response_model=List[Item])
+    async def list_items(conn=Depends(get_conn)):
+        ids = [row.id for row in conn.execute(text("SELECT id FROM items ORDER BY id LIMIT 10"))]
+        # 逐个查询，模拟N+1
+        return [dict(conn.execute(text("SELECT id, name FROM items WHERE id = :id"), {"id": i}).mappings().one())
+                for i in ids]
+
+    @app.get("/items/count")
+    def count_items(conn=Depends(get_conn)):
+        return {"count": conn.execute(text("SELECT COUNT(*) FROM items")).scalar()}
+
+    return app
+
+
+def test_debug_headers_and_phase_metrics(tmp_path):
+    """测试每个请求的SQL语句数进入响应头和指标，异步和同步端点都能区分各阶段"""
+    registry = MetricsRegistry()
+    client = TestClient(make_app(make_engine(tmp_path, slow_query_ms=10_000), registry))
+
+    response = client.get("/items")
+    assert response.status_code == 200 and len(response.json()) == 10
+    assert response.headers["x-query-count"] == "11"
+    phases = dict(part.split(";dur=") for part in response.headers["server-timing"].split(", "))
+    assert set(phases) == {"db", "app", "serialize", "total"}
+    assert float(phases["db"]) > 0
+
+    response = client.get("/items/count")
+    assert response.json() == {"count": 30}
+    assert response.headers["x-query-count"] == "1"
+
+    queries = registry.get("http_request_queries")
+    assert queries.summary(method="GET", route="/items")["sum"] == 11
+    phase = registry.get("http_request_phase_seconds")
+    for name in ("db", "app", "serialize", "total"):
+        assert phase.summary(method="GET", route="/items/count", phase=name)["count"] == 1
+
+
+def test_headers_only_in_debug_mode(tmp_path):
+    """测试非调试模式不返回调试响应头，但仍记录指标"""
+    registry = MetricsRegistry()
+    client = TestClient(make_app(make_engine(tmp_path, slow_query_ms=10_000), registry, debug=False))
+    response = client.get("/items/count")
+    assert "x-query-count" not in response.headers
+    assert "server-timing" not in response.headers
+    assert registry.get("http_request_queries").summary(method="GET", route="/items/count")["count"] == 1
+
+
+def test_slow_query_logged_with_params_and_plan(tmp_path):
+    """测试超过阈值的语句连同参数和执行计划写入日志，请求之外的语句同样检查"""
+    engine = make_engine(tmp_path, slow_query_ms=0)
+    messages = []
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="WARNING")
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT name FROM items WHERE category = :category"), {"category": "c1"}).all()
+    finally:
+        logger.remove(handler_id)
+
+    slow = [message for message in messages if "WHERE category" in message]
+    assert len(slow) == 1
+    assert slow[0].startswith("慢查询")
+    assert "'category': 'c1'" in slow[0] or "('c1',)" in slow[0]
+    assert "ix_items_category" in slow[0].split("执行计划:")[1]
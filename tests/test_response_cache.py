@@ -0,0 +1,186 @@
+"""
+测试读接口响应缓存：参数规范化、ETag/304、并发未命中合并、数据版本号随写入变化。
+"""
+
+import asyncio
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, Integer, create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from models.database import Base, Offer, Product, SessionLocal, get_data_versions
+from src.utils.metrics import MetricsRegistry
+from src.utils.response_cache import ResponseCache, etag_matches, normalize_params
+
+
+def test_normalize_params_and_etag_matching():
+    """测试语义相同的参数得到相同的键，If-None-Match按列表和弱标记匹配"""
+    assert normalize_params({"brands": ["b", "a", "a"], "page": 1, "sort_by": None, "bindings": []}) == \
+        normalize_params({"page": 1, "brands": ["a", "b"]})
+    assert normalize_params({"page": 1}) != normalize_params({"page": 2})
+
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"') and not etag_matches(None, '"abc"')
+
+
+def test_concurrent_misses_coalesced_and_versions_invalidate():
+    """测试并发的相同未命中只计算一次，版本号变化后重新计算"""
+    registry = MetricsRegistry()
+    cache = ResponseCache(registry=registry)
+    calls = []
+
+    def compute():
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return {"value": len(calls)}
+
+    async def main():
+        entries = await asyncio.gather(*(
+            cache.get_or_compute("stats", {"page": 1}, ("v", 1), compute) for _ in range(5)
+        ))
+        assert len({entry.etag for entry in entries}) == 1
+        assert await cache.get_or_compute("stats", {"page": 1}, ("v", 1), compute) is entries[0]
+        changed = await cache.get_or_compute("stats", {"page": 1}, ("v", 2), compute)
+        return entries[0], changed
+
+    first, changed = asyncio.run(main())
+    assert len(calls) == 2
+    assert first.body == b'{"value":1}' and changed.etag != first.etag
+
+    requests = registry.get("response_cache_requests_total").snapshot()
+    assert requests[("stats", "miss")] == 2
+    assert requests[("stats", "coalesced")] == 4
+    assert requests[("stats", "hit")] == 1
+
+
+def test_failed_computation_not_cached():
+    """测试计算出错时所有等待的请求都得到异常，且结果不缓存"""
+    cache = ResponseCache(registry=MetricsRegistry())
+    attempts = []
+
+    def compute():
+        attempts.append(1)
+        time.sleep(0.02)
+        raise RuntimeError("db down")
+
+    async def main():
+        results = await asyncio.gather(*(
+            cache.get_or_compute("list", {}, 1, compute) for _ in range(3)
+        ), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        await cache.get_or_compute("list", {}, 1, lambda: {"ok": True})
+
+    asyncio.run(main())
+    assert len(attempts) == 1 and cache.stats()["entries"] == 1
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    """测试发起计算的请求被取消时，计算照常完成，等待中的相同请求拿到结果"""
+    cache = ResponseCache(registry=MetricsRegistry())
+    finished = []
+
+    def compute():
+        time.sleep(0.1)
+        finished.append(1)
+        return {"ok": True}
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_compute("list", {}, 1, compute))
+        await asyncio.sleep(0.02)
+        follower = asyncio.ensure_future(cache.get_or_compute("list", {}, 1, compute))
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        try:
+            await leader
+        except asyncio.CancelledError:
+            # 计算结束后才把取消传出去，请求的数据库会话不会在计算中途被关闭
+            assert finished == [1]
+        else:
+            raise AssertionError("leader should be cancelled")
+        return await follower
+
+    entry = asyncio.run(main())
+    assert entry.body == b'{"ok":true}'
+    assert len(finished) == 1
+    assert cache.stats()["entries"] == 1 and cache.stats()["inflight"] == 0
+
+
+def test_respond_returns_304_for_matching_etag():
+    """测试响应带强ETag，If-None-Match匹配时返回空的304"""
+    cache = ResponseCache(registry=MetricsRegistry())
+    version = {"products": 1}
+    app = FastAPI()
+
+    @app.get("/stats")
+    async def stats(request: Request, page: int = 1):
+        return await cache.respond(request, "stats", {"page": page}, version["products"],
+                                   lambda: {"page": page, "version": version["products"]})
+
+    client = TestClient(app)
+    response = client.get("/stats")
+    etag = response.headers["etag"]
+    assert response.json() == {"page": 1, "version": 1}
+    assert response.headers["cache-control"] == "no-cache"
+
+    not_modified = client.get("/stats", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    version["products"] = 2
+    changed = client.get("/stats", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_writes_bump_table_versions():
+    """测试ORM写入和批量删除提交后对应表的版本号加一，无实际变更和回滚不改变版本号"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = SessionLocal(bind=engine)
+    tables = ("products", "offers")
+
+    assert get_data_versions(db, tables) == {"products": 0, "offers": 0}
+    db.add(Product(asin="B000000001", title="Headphones", url="https://www.amazon.com/dp/B000000001"))
+    db.add(Offer(product_id="B000000001", price=19.99))
+    db.commit()
+    assert get_data_versions(db, tables) == {"products": 1, "offers": 1}
+
+    product = db.query(Product).one()
+    product.title = "Headphones"
+    db.commit()
+    assert get_data_versions(db, tables) == {"products": 1, "offers": 1}
+
+    product.title = "Wireless Headphones"
+    db.commit()
+    db.query(Offer).filter(Offer.product_id == "B000000001").delete()
+    db.commit()
+    assert get_data_versions(db, tables) == {"products": 2, "offers": 2}
+
+    db.query(Product).delete()
+    db.rollback()
+    assert get_data_versions(db, tables) == {"products": 2, "offers": 2}
+    db.close()
+
+
+def test_sessions_on_other_databases_left_alone():
+    """测试其他库的会话（如任务注册表）写入时不更新版本号"""
+    OtherBase = declarative_base()
+
+    class Task(OtherBase):
+        __tablename__ = "tasks"
+        id = Column(Integer, primary_key=True)
+
+    engine = create_engine("sqlite:///:memory:")
+    OtherBase.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    with sessionmaker(bind=engine)() as session:
+        session.add(Task())
+        session.commit()
+        session.query(Task).delete()
+        session.commit()
+    assert statements and not any("data_versions" in statement for statement in statements)
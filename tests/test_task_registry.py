@@ -0,0 +1,116 @@
+"""
+测试任务登记表：状态和计数持久化、增量读取事件、事件流和爬虫进度上报。
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.core.asin_stream import stream_enrich
+from src.core.task_registry import (
+    EVENT_BATCH_SAVED, EVENT_ERROR, EVENT_ITEMS_FOUND, STATUS_COMPLETED, STATUS_RUNNING,
+    TaskRegistry, report_progress, task_event_stream, track_task
+)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return TaskRegistry(f"sqlite:///{tmp_path}/scheduler.db")
+
+
+def test_task_lifecycle_is_persisted(registry, tmp_path):
+    """测试任务状态和计数写入数据库，新的登记表实例可以读到"""
+    task_id = registry.create_task("crawl", crawler_type="deals", params={"max_items": 20})
+    registry.start_task(task_id)
+    registry.record_event(task_id, EVENT_ITEMS_FOUND, count=12)
+    registry.record_event(task_id, EVENT_BATCH_SAVED, batch=1, saved=9)
+    registry.record_event(task_id, EVENT_ERROR, message="429")
+    assert registry.get_task(task_id)["status"] == STATUS_RUNNING
+    registry.finish_task(task_id, STATUS_COMPLETED, result={"total_items": 12})
+
+    task = TaskRegistry(f"sqlite:///{tmp_path}/scheduler.db").get_task(task_id)
+    assert task["status"] == STATUS_COMPLETED
+    assert (task["items_found"], task["items_saved"], task["batches_saved"], task["errors"]) == (12, 9, 1, 1)
+    assert task["params"] == {"max_items": 20}
+    assert task["result"] == {"total_items": 12}
+    assert [e["type"] for e in registry.get_events(task_id)] == [
+        "created", "status", "items_found", "batch_saved", "error", "status"
+    ]
+
+
+def test_events_since_filters_and_attaches_task(registry):
+    """测试按最后事件ID增量读取，并可按任务类型过滤"""
+    crawl_id = registry.create_task("crawl")
+    job_id = registry.create_task("job", job_id="daily_update")
+    checkpoint = registry.latest_event_id()
+    registry.record_event(job_id, EVENT_ITEMS_FOUND, count=5)
+    registry.record_event(crawl_id, EVENT_ITEMS_FOUND, count=3)
+
+    events = registry.events_since(checkpoint)
+    assert [e["task_id"] for e in events] == [job_id, crawl_id]
+    assert events[0]["task"]["items_found"] == 5
+    assert [e["task_id"] for e in registry.events_since(checkpoint, job_id="daily_update")] == [job_id]
+    assert registry.events_since(events[-1]["id"]) == []
+
+
+def test_event_stream_sends_snapshot_then_new_events(registry):
+    """测试事件流先推送当前任务快照，之后只推送新事件"""
+    old_task = registry.create_task("crawl")
+
+    async def collect():
+        received = []
+        stream = task_event_stream(registry, poll_interval=0.01)
+        received.append(await stream.__anext__())
+        new_task = registry.create_task("job", job_id="j1")
+        registry.record_event(new_task, EVENT_BATCH_SAVED, saved=10)
+        while len(received) < 3:
+            received.append(await asyncio.wait_for(stream.__anext__(), 5))
+        await stream.aclose()
+        return received
+
+    snapshot, created, saved = asyncio.run(collect())
+    assert snapshot["type"] == "snapshot"
+    assert [t["id"] for t in snapshot["data"]["tasks"]] == [old_task]
+    assert created["type"] == "created" and saved["type"] == "batch_saved"
+    assert saved["task"]["items_saved"] == 10
+
+
+def test_event_stream_sends_keepalive_when_idle(registry):
+    """测试没有新事件时定期产生keepalive事件，客户端可以按时检查截止时间"""
+    async def collect():
+        stream = task_event_stream(registry, poll_interval=0.01, keepalive_interval=0.05)
+        snapshot = await stream.__anext__()
+        keepalive = await asyncio.wait_for(stream.__anext__(), 5)
+        await stream.aclose()
+        return snapshot, keepalive
+
+    snapshot, keepalive = asyncio.run(collect())
+    assert keepalive == {"id": snapshot["id"], "type": "keepalive"}
+
+
+def test_stream_enrich_reports_progress(registry):
+    """测试在track_task中运行流式采集时上报发现、保存和错误事件"""
+    task_id = registry.create_task("job", job_id="bestseller")
+
+    def crawl(on_items):
+        async def run():
+            for scroll in range(3):
+                time.sleep(0.01)
+                on_items([f"B{scroll:04d}{i:05d}" for i in range(4)])
+        return run()
+
+    async def enrich(batch, index):
+        if index == 1:
+            raise RuntimeError("PA-API 429")
+        return len(batch)
+
+    # 未跟踪任务时上报不做任何事
+    report_progress(EVENT_ITEMS_FOUND, count=1)
+    with track_task(task_id, registry):
+        asyncio.run(stream_enrich(crawl, enrich, batch_size=5, workers=1))
+
+    task = registry.get_task(task_id)
+    assert task["items_found"] == 12
+    assert task["batches_saved"] == 2 and task["items_saved"] == 7
+    assert task["errors"] == 1
@@ -0,0 +1,171 @@
+"""
+测试WebDriver池的回收、健康检查、预热和指标功能。
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.core.webdriver_pool import WebDriverPool
+
+
+class FakeDriver:
+    """模拟WebDriver，可手动标记为崩溃"""
+
+    def __init__(self, number):
+        self.number = number
+        self.crashed = False
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if self.crashed:
+            raise RuntimeError("chrome not reachable")
+        return "about:blank"
+
+    def set_page_load_timeout(self, seconds):
+        self.page_load_timeout = seconds
+
+    def set_script_timeout(self, seconds):
+        self.script_timeout = seconds
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeFactory:
+    """按顺序编号创建FakeDriver"""
+
+    def __init__(self):
+        self.drivers = []
+        self._lock = threading.Lock()
+
+    def __call__(self, headless):
+        with self._lock:
+            driver = FakeDriver(len(self.drivers) + 1)
+            self.drivers.append(driver)
+            return driver
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def factory(**kwargs):
+        options = dict(size=2, min_idle=0, check_interval=3600, max_rss_mb=0, max_wait_time=1)
+        options.update(kwargs)
+        options.setdefault('driver_factory', FakeFactory())
+        pool = WebDriverPool(**options)
+        pools.append(pool)
+        return pool
+
+    yield factory
+    for pool in pools:
+        pool.close_all()
+
+
+def test_recycles_after_max_pages(make_pool):
+    """测试页面数达到上限后关闭并换用新实例"""
+    factory = FakeFactory()
+    pool = make_pool(max_pages=3, driver_factory=factory)
+
+    first = pool.get_driver()
+    pool.release_driver(first, pages=2)
+    assert pool.get_driver() is first  # 同一线程优先复用
+    pool.release_driver(first, pages=1)
+
+    assert first.quit_called
+    second = pool.get_driver()
+    assert second is not first
+    assert pool.get_metrics()['recycled'] == 1
+
+
+def test_recycles_when_rss_exceeds_limit(make_pool):
+    """测试进程树内存超过上限时回收"""
+    pool = make_pool(max_rss_mb=100)
+    pool._driver_rss_mb = lambda driver: 250.0
+
+    driver = pool.get_driver()
+    pool.release_driver(driver, pages=1)
+    assert driver.quit_called
+    assert pool.get_metrics()['pool_size'] == 0
+
+
+def test_unhealthy_driver_replaced_before_lease(make_pool):
+    """测试健康检查失败的实例不会交给调用方"""
+    factory = FakeFactory()
+    pool = make_pool(driver_factory=factory)
+
+    driver = pool.get_driver()
+    pool.release_driver(driver)
+    driver.crashed = True
+
+    replacement = pool.get_driver()
+    assert replacement is not driver
+    assert driver.quit_called
+    assert pool.get_metrics()['unhealthy'] == 1
+
+
+def test_keeps_warm_standby(make_pool):
+    """测试预创建并在回收后补充空闲备用实例"""
+    factory = FakeFactory()
+    pool = make_pool(size=3, min_idle=1, max_pages=1, driver_factory=factory)
+    assert pool.get_metrics()['idle'] == 1
+
+    with pool.lease() as driver:
+        assert driver is factory.drivers[0]
+    assert pool.get_metrics()['idle'] == 0
+
+    # 回收后监控线程被提前唤醒，补充新的备用实例
+    deadline = time.monotonic() + 2
+    while pool.get_metrics()['idle'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    metrics = pool.get_metrics()
+    assert metrics['idle'] == 1
+    assert metrics['created'] == 2
+
+
+def test_lease_times_out_when_pool_exhausted(make_pool):
+    """测试池已满时等待超时返回None并计数"""
+    pool = make_pool(size=1)
+    held = pool.get_driver()
+    assert held is not None
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(pool.get_driver(timeout=0.05)))
+    thread.start()
+    thread.join(timeout=2)
+    assert results == [None]
+
+    with pytest.raises(TimeoutError):
+        with pool.lease(timeout=0.01):
+            pass
+    assert pool.get_metrics()['lease_timeouts'] == 2
+
+
+def test_waiting_lease_wakes_on_release(make_pool):
+    """测试等待中的租用在其他线程归还后立即获得实例"""
+    pool = make_pool(size=1, max_wait_time=5)
+    held = pool.get_driver()
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(pool.get_driver()))
+    thread.start()
+    pool.release_driver(held)
+    thread.join(timeout=2)
+    assert results == [held]
+
+
+def test_metrics_record_startup_and_lease_wait(make_pool):
+    """测试启动耗时和租用等待时间的统计"""
+    pool = make_pool(page_load_timeout=60)
+    for _ in range(3):
+        with pool.lease() as driver:
+            assert driver.page_load_timeout == 60
+
+    metrics = pool.get_metrics()
+    assert metrics['leases'] == 3
+    assert metrics['startup_seconds']['count'] == 1
+    assert metrics['lease_wait_seconds']['count'] == 3
+    assert metrics['lease_wait_seconds']['max'] >= metrics['lease_wait_seconds']['avg']